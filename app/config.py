@@ -26,6 +26,50 @@ class Settings(BaseSettings):
     # Gzip settings
     GZIP_MINIMUM_SIZE: int = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))  # in bytes, default 1KB
 
+    # Search settings
+    COLLECTION_STATS_TTL: int = int(os.getenv("COLLECTION_STATS_TTL", "60"))  # in seconds
+    QUERY_PLAN_CACHE_SIZE: int = int(os.getenv("QUERY_PLAN_CACHE_SIZE", "1024"))  # compiled plans kept, 0 disables
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "0"))  # in seconds, 0 disables the response cache
+    SEARCH_COALESCING: bool = os.getenv("SEARCH_COALESCING", "True").lower() == "true"  # share one execution among identical concurrent searches
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # in bytes, default 64MB
+    STREAM_UNPAGINATED_RESULTS: bool = os.getenv("STREAM_UNPAGINATED_RESULTS", "True").lower() == "true"  # allow stream=true on unpaginated searches
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "500"))  # documents per streamed chunk
+    MAX_FILTER_VALUES: int = int(os.getenv("MAX_FILTER_VALUES", "100"))  # comma-separated values allowed per filter
+    RELEVANCE_DEFAULT_LIMIT: int = int(os.getenv("RELEVANCE_DEFAULT_LIMIT", "100"))  # top-k kept when relevance=true has no page size
+    TEXT_SEARCH_WEIGHTS: str = os.getenv("TEXT_SEARCH_WEIGHTS", "title:10,keyword:5,topic.tag:3,description:1")  # field:weight for text_search_idx
+    NORMALIZED_FILTERS: bool = os.getenv("NORMALIZED_FILTERS", "False").lower() == "true"  # enable after backfill_normalized_fields
+    TEXT_INDEX_ENABLED: bool = os.getenv("TEXT_INDEX_ENABLED", "False").lower() == "true"  # rank record searchphrase queries in process
+    TEXT_INDEX_REFRESH_INTERVAL: int = int(os.getenv("TEXT_INDEX_REFRESH_INTERVAL", "60"))  # in seconds, picks up new records
+    TEXT_INDEX_REBUILD_INTERVAL: int = int(os.getenv("TEXT_INDEX_REBUILD_INTERVAL", "3600"))  # in seconds, catches updates and deletions
+    MEMORY_SNAPSHOTS_ENABLED: bool = os.getenv("MEMORY_SNAPSHOTS_ENABLED", "False").lower() == "true"  # serve small collections from memory, see app/crud/snapshot.py
+    MEMORY_SNAPSHOT_MAX_DOCUMENTS: int = int(os.getenv("MEMORY_SNAPSHOT_MAX_DOCUMENTS", "50000"))  # larger collections stay in MongoDB
+    MEMORY_SNAPSHOT_REFRESH_INTERVAL: int = int(os.getenv("MEMORY_SNAPSHOT_REFRESH_INTERVAL", "60"))  # in seconds, reloads on a version change
+    MEMORY_SNAPSHOT_RELOAD_INTERVAL: int = int(os.getenv("MEMORY_SNAPSHOT_RELOAD_INTERVAL", "3600"))  # in seconds, unconditional reload
+    FIELDS_CATALOG_CHECK_INTERVAL: int = int(os.getenv("FIELDS_CATALOG_CHECK_INTERVAL", "60"))  # in seconds, between checks for field changes
+    TAXONOMY_TREE_CHECK_INTERVAL: int = int(os.getenv("TAXONOMY_TREE_CHECK_INTERVAL", "60"))  # in seconds, between checks for taxonomy changes
+
+    # Papers API settings
+    PAPERS_API_URL: str = os.getenv("PAPERS_API_URL", "https://tsapps-d.nist.gov/nps/nps_public_api/api/Publication/search")
+    PAPERS_API_TIMEOUT: float = float(os.getenv("PAPERS_API_TIMEOUT", "30"))  # in seconds, for the whole upstream response
+    PAPERS_API_CONNECT_TIMEOUT: float = float(os.getenv("PAPERS_API_CONNECT_TIMEOUT", "5"))  # in seconds
+    PAPERS_API_MAX_CONNECTIONS: int = int(os.getenv("PAPERS_API_MAX_CONNECTIONS", "10"))  # pooled connections to the Papers API
+    PAPERS_CACHE_TTL: int = int(os.getenv("PAPERS_CACHE_TTL", "300"))  # in seconds a search is served without asking upstream, 0 disables
+    PAPERS_CACHE_STALE_TTL: int = int(os.getenv("PAPERS_CACHE_STALE_TTL", "3600"))  # in seconds a stale search is served while it refreshes
+    PAPERS_CACHE_MAX_ENTRIES: int = int(os.getenv("PAPERS_CACHE_MAX_ENTRIES", "256"))  # distinct searches kept
+    PAPERS_SOURCE: str = os.getenv("PAPERS_SOURCE", "api")  # "api" for the live Papers API, "mirror" for the local copy
+    PAPERS_MIRROR_FALLBACK: bool = os.getenv("PAPERS_MIRROR_FALLBACK", "False").lower() == "true"  # use the live API when the mirror cannot answer
+    PAPERS_MIRROR_SYNC_INTERVAL: int = int(os.getenv("PAPERS_MIRROR_SYNC_INTERVAL", "3600"))  # in seconds, 0 leaves syncing to sync_papers
+    PAPERS_MIRROR_START_DATE: str = os.getenv("PAPERS_MIRROR_START_DATE", "2010-01-01")  # oldest publications mirrored
+    PAPERS_MIRROR_OVERLAP_DAYS: int = int(os.getenv("PAPERS_MIRROR_OVERLAP_DAYS", "30"))  # re-fetched before the newest mirrored date
+    PAPERS_MIRROR_TEXT_WEIGHTS: str = os.getenv("PAPERS_MIRROR_TEXT_WEIGHTS", "title:10,keywords:5,abstract:1")  # field:weight for the mirror's text index
+
+    # Metrics recording settings
+    METRICS_RECORDING_ENABLED: bool = os.getenv("METRICS_RECORDING_ENABLED", "False").lower() == "true"  # record record lookups in recordMetrics
+    METRICS_QUEUE_SIZE: int = int(os.getenv("METRICS_QUEUE_SIZE", "10000"))  # download events held before new ones are dropped
+    METRICS_BATCH_SIZE: int = int(os.getenv("METRICS_BATCH_SIZE", "1000"))  # download events per bulk write
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "2"))  # in seconds, between flushes
+    METRICS_HLL_PRECISION: int = int(os.getenv("METRICS_HLL_PRECISION", "12"))  # unique-user sketches of 2**p bytes, ~1.6% error at 12
+
     # Main database settings
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     DB_NAME: str = os.getenv("DB_NAME", "oar-rmm")
@@ -56,8 +100,11 @@ class Settings(BaseSettings):
     FILE_METRICS_COLLECTION: str = os.getenv("FILE_METRICS_COLLECTION", "fileMetrics")
     UNIQUE_USERS_COLLECTION: str = os.getenv("UNIQUE_USERS_COLLECTION", "uniqueUsers")
     REPO_METRICS_COLLECTION: str = os.getenv("REPO_METRICS_COLLECTION", "repoMetrics")
+    USER_SKETCHES_COLLECTION: str = os.getenv("USER_SKETCHES_COLLECTION", "userSketches")
+    METRICS_ROLLUPS_COLLECTION: str = os.getenv("METRICS_ROLLUPS_COLLECTION", "metricsRollups")
     VERSIONS_COLLECTION: str = os.getenv("VERSIONS_COLLECTION", "versions")
     RELEASESETS_COLLECTION: str = os.getenv("RELEASESETS_COLLECTION", "releasesets")
+    PAPERS_COLLECTION: str = os.getenv("PAPERS_COLLECTION", "papers")
     
     # Remote Configuration
     USE_REMOTE_CONFIG: bool = os.getenv("USE_REMOTE_CONFIG", "False").lower() == "true"
@@ -14,11 +14,21 @@ class ApiCRUD(BaseCRUD):
         """Get a single API entry by ID."""
         base_result = super().get(api_id)
         return base_result.get("ResultData", [{}])[0]  # Return just the document
+
+    async def get_async(self, api_id: str) -> dict:
+        """Get a single API entry by ID without blocking the event loop."""
+        base_result = await super().get_async(api_id)
+        return base_result.get("ResultData", [{}])[0]
         
     def search(self, **kwargs) -> list:
         """Search APIs based on parameters."""
         base_result = super().search(**kwargs)
         return base_result.get("ResultData", [])  # Return just the list of documents
 
+    async def search_async(self, **kwargs) -> list:
+        """Search APIs without blocking the event loop."""
+        base_result = await super().search_async(**kwargs)
+        return base_result.get("ResultData", [])
+
 # Create singleton instance
 api_crud = ApiCRUD()
\ No newline at end of file
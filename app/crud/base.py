@@ -1,32 +1,91 @@
-from app.middleware.request_processor import ProcessRequest
+from app.middleware.request_processor import SCORE_FIELD, process_search_params, relevance_requested, stream_requested
+from app.crud.collection_stats import CollectionStats
+from app.crud.snapshot import UnsupportedQuery
+from app.crud.response_cache import cache_key, get_response_cache
+from app.crud.singleflight import SingleFlight
+from app.crud import pagination
+from app.config import settings
 from app.middleware.exceptions import ResourceNotFoundException, InternalServerException, KeyWordNotFoundException, IllegalArgumentException
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from bson.objectid import ObjectId
-from app.database import db
+from app.database import db, get_async_db
+import copy
+import json
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Concurrent identical searches, across all collections, run once
+search_flights = SingleFlight()
+
 class BaseCRUD:
+    # Fields maintained for lookups that are never returned to clients
+    internal_fields: tuple = ()
+    # Fields whose exact-match filters use their normalized ``_norm`` shadow fields
+    normalized_fields: frozenset = frozenset()
+    # Fields holding arrays, which cursor pages cannot be sorted on
+    array_fields: tuple = ()
+    # In-process ranking for ``searchphrase`` queries (``app.crud.text_index.TextIndex``), or None for $text
+    text_index = None
+    # In-memory copy of the whole collection (``app.crud.snapshot.CollectionSnapshot``), or None
+    snapshot = None
+
     def __init__(self, collection_name: str):
+        self.collection_name = collection_name
         self.collection = db[collection_name]
-        self.request_processor = ProcessRequest()
+        self.collection_stats = CollectionStats(settings.COLLECTION_STATS_TTL)
+
+    @property
+    def async_collection(self):
+        """Async handle on the same collection, for use from ``async def`` handlers"""
+        return get_async_db()[self.collection_name]
+
+    def create(self, data: dict) -> Dict[str, Any]:
+        """Insert a document and invalidate everything cached for this collection"""
+        start_time = time.time()
+        try:
+            result = self.collection.insert_one(data)
+        except Exception as e:
+            logger.error(f"Error creating document in {self.collection_name}: {e}")
+            raise InternalServerException(f"Failed to create document: {str(e)}")
+        self.invalidate_cache()
+        return {
+            "ResultData": {**data, "_id": str(result.inserted_id)},
+            "Metrics": {"ElapsedTime": time.time() - start_time}
+        }
+
+    def invalidate_cache(self) -> None:
+        """Drop cached search responses and collection statistics after a write"""
+        get_response_cache().invalidate(self.collection_name)
+        self.collection_stats.invalidate()
+        if self.snapshot is not None:
+            self.snapshot.invalidate()
 
     def get(self, doc_id: str) -> Dict[str, Any]:
         """Get a single document by ID"""
         print(f"Getting document with ID: {doc_id}")
         start_time = time.time()
         try:
-            doc = self.collection.find_one({"_id": ObjectId(doc_id)})
-            if not doc:
-                raise ResourceNotFoundException(f"Document with ID {doc_id} not found")
-            doc["_id"] = str(doc["_id"])
-            return {
-                "ResultCount": 1,
-                "ResultData": [doc],
-                "Metrics": {"ElapsedTime": time.time() - start_time}
-            }
+            doc = self._snapshot_get(doc_id)
+            if doc is None:
+                doc = self.collection.find_one({"_id": ObjectId(doc_id)})
+            return self._get_result(doc, doc_id, start_time)
+        except ResourceNotFoundException as e:
+            logger.error(f"Document not found: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to retrieve document: {e}")
+            raise InternalServerException(f"Failed to retrieve document: {str(e)}")
+
+    async def get_async(self, doc_id: str) -> Dict[str, Any]:
+        """Get a single document by ID without blocking the event loop"""
+        start_time = time.time()
+        try:
+            doc = self._snapshot_get(doc_id)
+            if doc is None:
+                doc = await self.async_collection.find_one({"_id": ObjectId(doc_id)})
+            return self._get_result(doc, doc_id, start_time)
         except ResourceNotFoundException as e:
             logger.error(f"Document not found: {e}")
             raise
@@ -38,137 +97,113 @@ class BaseCRUD:
         """Get all documents with optional filtering"""
         start_time = time.time()
         try:
-            cursor = self.collection.find(
-                filter=filters,
-                projection={"_id": 0}
-            ).skip(skip)
-            
-            # Only apply limit if it's greater than 0 (0 means return all)
-            if limit > 0:
-                cursor = cursor.limit(limit)
-            
-            docs = list(cursor)
-            
+            page = self._snapshot_get_all(skip, limit, filters)
+            if page is not None:
+                docs, count = page
+            else:
+                docs = list(self._get_all_cursor(self.collection, skip, limit, filters))
+                count = None
+
             if not docs:
                 raise KeyWordNotFoundException("No documents found matching the criteria")
-            
-            count = self.collection.count_documents(filters)
-            
-            return {
-                "ResultCount": count,
-                "ResultData": docs,
-                "PageSize": limit if limit > 0 else 0,  # 0 indicates all results returned
-                "Metrics": {"ElapsedTime": time.time() - start_time}
-            }
+
+            if count is None:
+                count = self._page_count(len(docs), skip, limit)
+            if count is None:
+                count = self.collection.count_documents(filters)
+
+            return self._get_all_result(docs, count, limit, start_time)
         except KeyWordNotFoundException as e:
             logger.error(f"No documents found: {e}")
             raise
         except Exception as e:
             logger.error(f"Failed to retrieve documents: {e}")
             raise InternalServerException(f"Failed to retrieve documents: {str(e)}")
-        
+
+    async def get_all_async(self, skip: int = 0, limit: int = 10, **filters) -> Dict[str, Any]:
+        """Get all documents with optional filtering without blocking the event loop"""
+        start_time = time.time()
+        try:
+            collection = self.async_collection
+            page = self._snapshot_get_all(skip, limit, filters)
+            if page is not None:
+                docs, count = page
+            else:
+                docs = await self._get_all_cursor(collection, skip, limit, filters).to_list(None)
+                count = None
+
+            if not docs:
+                raise KeyWordNotFoundException("No documents found matching the criteria")
+
+            if count is None:
+                count = self._page_count(len(docs), skip, limit)
+            if count is None:
+                count = await collection.count_documents(filters)
+
+            return self._get_all_result(docs, count, limit, start_time)
+        except KeyWordNotFoundException as e:
+            logger.error(f"No documents found: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to retrieve documents: {e}")
+            raise InternalServerException(f"Failed to retrieve documents: {str(e)}")
+
     def search(self, **kwargs) -> Dict[str, Any]:
         """Generic search function"""
         start_time = time.time()
         try:
-            # Create new request processor instance for each search
-            self.request_processor = ProcessRequest()
-            
             # Log collection being searched
             logger.info(f"Searching collection: {self.collection.name}")
-            
-            # Process request parameters
-            try:
-                processed = self.request_processor.process_search_params(kwargs)
-                # Ensure _id is excluded from projection
-                if "projection" not in processed:
-                    processed["projection"] = {}
-                processed["projection"]["_id"] = 0
-            except Exception as e:
-                # If there's an error processing the search parameters, it's likely an illegal argument
-                logger.error(f"Error processing search parameters: {e}")
-                raise IllegalArgumentException(str(e))
-            
-            logger.info(f"Search parameters: {kwargs}")
-            logger.info(f"Processed query: {processed}")
-
-            # Check if collection exists and has documents
-            if self.collection.count_documents({}) == 0:
-                logger.warning(f"Collection {self.collection.name} is empty")
-                raise KeyWordNotFoundException(f"No documents found in {self.collection.name} collection")
+
+            # Validate before the cache lookup: the key ignores parameter order, which
+            # the request processor does not (e.g. searchphrase must come first)
+            processed = self._process_search_params(kwargs)
+            key = cache_key(kwargs)
+            cached = self._cached_result(key, start_time)
+            if cached is not None:
+                return cached
+
+            result = self._snapshot_search(processed, kwargs, start_time)
+            if result is not None:
+                return self._cache_result(key, result)
+            indexed = self._indexed_search_params(kwargs)
+            if indexed is not None:
+                processed, ranked = indexed
+                if ranked is not None:
+                    return self._cache_result(key, self._ranked_search(processed, ranked, kwargs, start_time))
 
             try:
-                # Using explicit parameters to catch any issues
-                cursor = self.collection.find(
-                    filter=processed["query"],
-                    projection=processed["projection"]
-                )
-
-                # Only apply skip if it's greater than 0
-                if processed["skip"] and processed["skip"] > 0:
-                    cursor = cursor.skip(processed["skip"])
-                
-                # Only apply limit if it's specified and greater than 0 (None or 0 means return all results)
-                if processed["limit"] is not None and processed["limit"] > 0:
-                    cursor = cursor.limit(processed["limit"])
-
-                if processed["sort"] and isinstance(processed["sort"], list) and len(processed["sort"]) > 0:
-                    # For nullable fields like firstIssued/annotated, we need to handle nulls last
-                    sort_spec = []
-                    for field, direction in processed["sort"]:
-                        # Check if this is a nullable field that should sort nulls last
-                        if field in ["firstIssued", "annotated"]:
-                            # First sort by whether the field exists
-                            sort_spec.append((f"{field}", direction))
-                        else:
-                            sort_spec.append((field, direction))
-                            
-                    cursor = cursor.sort(sort_spec)
-                    cursor = cursor.collation({
-                        "locale": "en",
-                        "strength": 3,  # 3 for case+symbol sensitivity
-                        "numericOrdering": True,  # Properly handle numeric parts
-                        "caseLevel": True,  # Ensure proper case handling
-                        "alternate": "shifted"  # Ignore punctuation/symbols in base comparison
-                    })
-                elif "sort_asc" in kwargs or "sort_desc" in kwargs:
-                    logger.warning(f"Sort requested but not properly processed. Processed sort: {processed['sort']}")
+                cursor = self._search_cursor(self.collection, processed, kwargs)
                 # Get results - convert cursor to list to materialize any errors
                 docs = list(cursor)
                 logger.info(f"Found {len(docs)} documents")
             except Exception as e:
                 logger.error(f"MongoDB query execution error: {e}")
                 raise InternalServerException(f"Error executing MongoDB query: {str(e)}")
-            
+
             if not docs:
+                # Only an empty page needs to know whether the collection itself is empty
+                if self.collection_stats.document_count(self.collection) == 0:
+                    logger.warning(f"Collection {self.collection.name} is empty")
+                    raise KeyWordNotFoundException(f"No documents found in {self.collection.name} collection")
                 # raise KeyWordNotFoundException("No documents found matching the search criteria")
                 # MARK: @Mehdi: Instead of raising an exception, return an empty result set to match current
                 # implementation behavior
                 logger.warning("No documents found matching the search criteria")
-                return {
-                    "ResultCount": 0,
-                    "ResultData": [],
-                    "PageSize": processed["limit"] if processed["limit"] is not None else 0,
-                    "Metrics": {"ElapsedTime": time.time() - start_time}
-                }
-                
-            for doc in docs:
-                if "_id" in doc:
-                    doc["_id"] = str(doc["_id"])
+                return self._cache_result(key, self._search_result([], 0, processed, start_time))
 
             # Get total count of matching documents
-            count = self.collection.count_documents(processed["query"])
-            
-            # Determine PageSize based on whether pagination was used
-            page_size = processed["limit"] if processed["limit"] is not None and processed["limit"] > 0 else 0
-            
-            return {
+            source = self._count_source(len(docs), processed, kwargs)
+            if source == "page":
+                count = self._page_count(len(docs), processed["skip"], processed["limit"])
+            elif source == "stats":
+                count = self.collection_stats.document_count(self.collection)
+            elif source == "query":
+                count = self.collection.count_documents(processed["query"])
+            else:
+                count = None
 
-                "ResultCount": count,
-                "ResultData": docs,
-                "PageSize": page_size,  # 0 indicates all results returned
-                "Metrics": {"ElapsedTime": time.time() - start_time}
-            }
+            return self._cache_result(key, self._search_result(docs, count, processed, start_time))
         except KeyWordNotFoundException as e:
             logger.error(f"No search results: {e}")
             raise
@@ -177,4 +212,596 @@ class BaseCRUD:
             raise
         except Exception as e:
             logger.error(f"Search failed: {e}")
-            raise InternalServerException(f"Failed to search documents: {str(e)}")
\ No newline at end of file
+            raise InternalServerException(f"Failed to search documents: {str(e)}")
+
+    async def search_async(self, **kwargs) -> Dict[str, Any]:
+        """Generic search function that awaits MongoDB instead of blocking the event loop"""
+        start_time = time.time()
+        try:
+            collection = self.async_collection
+            logger.info(f"Searching collection: {self.collection_name}")
+
+            # Validate before the cache lookup: the key ignores parameter order, which
+            # the request processor does not (e.g. searchphrase must come first)
+            processed = self._process_search_params(kwargs)
+            key = cache_key(kwargs)
+            cached = self._cached_result(key, start_time)
+            if cached is not None:
+                return cached
+
+            result = self._snapshot_search(processed, kwargs, start_time)
+            if result is not None:
+                return self._cache_result(key, result)
+
+            flight_key = self._flight_key(processed, kwargs)
+            if flight_key is None:
+                return await self._execute_search_async(collection, key, processed, kwargs, start_time)
+            # Identical searches already running share that execution's result; each
+            # caller gets its own copy so one response can't be altered through another
+            shared = await search_flights.do(
+                flight_key, lambda: self._execute_search_async(collection, key, processed, kwargs, start_time))
+            return {**copy.deepcopy(shared), "Metrics": {"ElapsedTime": time.time() - start_time}}
+        except KeyWordNotFoundException as e:
+            logger.error(f"No search results: {e}")
+            raise
+        except IllegalArgumentException as e:
+            logger.error(f"Invalid search parameters: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            raise InternalServerException(f"Failed to search documents: {str(e)}")
+
+    async def _execute_search_async(self, collection, key: str, processed: Dict[str, Any], kwargs: Dict[str, Any],
+                                    start_time: float) -> Dict[str, Any]:
+        """Run a processed search against MongoDB (or the text index) and cache the response"""
+        indexed = self._indexed_search_params(kwargs)
+        if indexed is not None:
+            processed, ranked = indexed
+            if ranked is not None:
+                return self._cache_result(key, await self._ranked_search_async(processed, ranked, kwargs, start_time))
+
+        try:
+            cursor = self._search_cursor(collection, processed, kwargs)
+            docs = await cursor.to_list(None)
+            logger.info(f"Found {len(docs)} documents")
+        except Exception as e:
+            logger.error(f"MongoDB query execution error: {e}")
+            raise InternalServerException(f"Error executing MongoDB query: {str(e)}")
+
+        if not docs:
+            if await self.collection_stats.document_count_async(collection) == 0:
+                logger.warning(f"Collection {self.collection_name} is empty")
+                raise KeyWordNotFoundException(f"No documents found in {self.collection_name} collection")
+            logger.warning("No documents found matching the search criteria")
+            return self._cache_result(key, self._search_result([], 0, processed, start_time))
+
+        count = await self._search_count_async(collection, len(docs), processed, kwargs)
+        return self._cache_result(key, self._search_result(docs, count, processed, start_time))
+
+    async def _search_count_async(self, collection, returned: int, processed: Dict[str, Any],
+                                  kwargs: Dict[str, Any]) -> Optional[int]:
+        """ResultCount of a non-empty search that returned ``returned`` documents, see ``_count_source``"""
+        source = self._count_source(returned, processed, kwargs)
+        if source == "page":
+            return self._page_count(returned, processed["skip"], processed["limit"])
+        if source == "stats":
+            return await self.collection_stats.document_count_async(collection)
+        if source == "query":
+            return await collection.count_documents(processed["query"])
+        return None
+
+    def _flight_key(self, processed: Dict[str, Any], kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        Key under which concurrent identical searches are coalesced, or None when
+        coalescing is disabled.
+
+        Built from the compiled query rather than the raw parameters, so requests
+        spelled differently but compiling to the same query share one execution.
+        """
+        if not settings.SEARCH_COALESCING:
+            return None
+        return json.dumps([self.collection_name, processed["query"], processed["projection"], processed["sort"],
+                           processed["skip"], processed["limit"], processed.get("keyset"),
+                           str(kwargs.get("count") or "exact").lower()],
+                          sort_keys=True, separators=(",", ":"), default=str)
+
+    def _snapshot_get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """The document from the in-memory snapshot, or None to look it up in MongoDB"""
+        if self.snapshot is None or not self.snapshot.ready:
+            return None
+        return self.snapshot.get(ObjectId(doc_id))
+
+    def _snapshot_get_all(self, skip: int, limit: int, filters: Dict[str, Any]) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """A ``get_all`` page and total from the in-memory snapshot, or None to ask MongoDB"""
+        if self.snapshot is None or not self.snapshot.ready:
+            return None
+        try:
+            return self.snapshot.search({
+                "query": filters,
+                "projection": {"_id": 0, **{field: 0 for field in self.internal_fields}},
+                "sort": None,
+                "skip": skip,
+                "limit": limit
+            })
+        except UnsupportedQuery as e:
+            logger.debug(f"Listing {self.collection_name} from MongoDB: {e}")
+            return None
+
+    def _snapshot_search(self, processed: Dict[str, Any], kwargs: Dict[str, Any],
+                         start_time: float) -> Optional[Dict[str, Any]]:
+        """
+        Answer a search from the in-memory snapshot, or return None when MongoDB has
+        to (no snapshot loaded, or a query the snapshot cannot evaluate).
+        """
+        if self.snapshot is None or not self.snapshot.ready:
+            return None
+        try:
+            docs, total = self.snapshot.search(processed)
+        except UnsupportedQuery as e:
+            logger.debug(f"Searching {self.collection_name} in MongoDB: {e}")
+            return None
+
+        if not total and not self.snapshot.document_count:
+            logger.warning(f"Collection {self.collection_name} is empty")
+            raise KeyWordNotFoundException(f"No documents found in {self.collection_name} collection")
+        count = None if docs and self._count_source(len(docs), processed, kwargs) == "none" else total
+        logger.info(f"Found {len(docs)} of {total} documents in memory")
+        return self._search_result(docs, count, processed, start_time)
+
+    def _indexed_search_params(self, kwargs: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Optional[List[Tuple[Any, float]]]]]:
+        """
+        Resolve ``searchphrase`` with the in-process text index instead of ``$text``.
+
+        Returns None when the index is not in use (disabled, still building, no
+        phrase, or keyset paging). Otherwise the remaining parameters are processed
+        without the phrase and returned together with the ranked ``(_id, score)``
+        matches. An explicit sort (without ``relevance``) is left to MongoDB: the
+        matches become an ``_id`` filter and the ranking is returned as None.
+        """
+        index = self.text_index
+        if index is None or not index.ready or not kwargs.get("searchphrase") or kwargs.get("cursor"):
+            return None
+
+        rest = {k: v for k, v in kwargs.items() if k not in ("searchphrase", "relevance")}
+        processed = self._process_search_params(rest)
+        ranked = index.search(str(kwargs["searchphrase"]))
+
+        if processed["sort"] and not relevance_requested(kwargs):
+            matches = {"_id": {"$in": [doc_id for doc_id, _ in ranked]}}
+            processed["query"] = {"$and": [processed["query"], matches]} if processed["query"] else matches
+            return processed, None
+
+        if relevance_requested(kwargs) and not processed["limit"]:
+            processed["limit"] = settings.RELEVANCE_DEFAULT_LIMIT
+        return processed, ranked
+
+    def _ranked_search(self, processed: Dict[str, Any], ranked: List[Tuple[Any, float]], kwargs: Dict[str, Any],
+                       start_time: float) -> Dict[str, Any]:
+        """Filter and page the ranked matches, then fetch the page from MongoDB by ``_id``"""
+        try:
+            if processed["query"]:
+                matching = self.collection.find(self._ranked_filter(processed, ranked), {"_id": 1})
+                ranked = self._keep_matching(ranked, matching)
+            page = self._ranked_page(processed, ranked)
+            docs = list(self.collection.find({"_id": {"$in": [doc_id for doc_id, _ in page]}},
+                                             self._hydrate_projection(processed))) if page else []
+        except Exception as e:
+            logger.error(f"MongoDB query execution error: {e}")
+            raise InternalServerException(f"Error executing MongoDB query: {str(e)}")
+        return self._ranked_result(docs, page, len(ranked), processed, kwargs, start_time)
+
+    async def _ranked_search_async(self, processed: Dict[str, Any], ranked: List[Tuple[Any, float]],
+                                   kwargs: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Async variant of ``_ranked_search``"""
+        collection = self.async_collection
+        try:
+            if processed["query"]:
+                matching = await collection.find(self._ranked_filter(processed, ranked), {"_id": 1}).to_list(None)
+                ranked = self._keep_matching(ranked, matching)
+            page = self._ranked_page(processed, ranked)
+            docs = await collection.find({"_id": {"$in": [doc_id for doc_id, _ in page]}},
+                                         self._hydrate_projection(processed)).to_list(None) if page else []
+        except Exception as e:
+            logger.error(f"MongoDB query execution error: {e}")
+            raise InternalServerException(f"Error executing MongoDB query: {str(e)}")
+        return self._ranked_result(docs, page, len(ranked), processed, kwargs, start_time)
+
+    def should_stream(self, params: Dict[str, Any]) -> bool:
+        """
+        Whether a search should be streamed: streaming is enabled, the client asked
+        for it with ``stream=true`` and the search is not paged in any way (no page,
+        size, limit, skip or cursor) nor ranked. Everything else goes through
+        ``search_async``, with its response cache and request coalescing.
+        """
+        if not stream_requested(params) or params.get("cursor") or relevance_requested(params):
+            return False
+        if any(params.get(key) not in (None, "") for key in ("page", "skip")):
+            return False
+        size = params.get("size") or params.get("limit")
+        return settings.STREAM_UNPAGINATED_RESULTS and (not size or str(size).strip() == "0")
+
+    async def cached_search_async(self, **kwargs) -> Optional[Dict[str, Any]]:
+        """The cached response of a search, or None; the parameters are validated first"""
+        self._process_search_params(kwargs)
+        return self._cached_result(cache_key(kwargs), time.time())
+
+    async def search_stream_async(self, **kwargs) -> AsyncIterator[bytes]:
+        """
+        Run a search and return an async iterator over the JSON-encoded result envelope.
+        See ``open_search_stream_async``.
+        """
+        _, body = await self.open_search_stream_async(**kwargs)
+        return body
+
+    async def open_search_stream_async(self, **kwargs) -> Tuple[Optional[Dict[str, Any]], AsyncIterator[bytes]]:
+        """
+        Run a search and return its first document (None if nothing matched) along
+        with an async iterator over the JSON-encoded result envelope.
+
+        The cursor is read in batches of ``STREAM_BATCH_SIZE`` documents and each batch
+        is encoded and yielded as soon as it arrives, so memory stays bounded however
+        large the result set is. The first document is fetched before returning, so
+        invalid parameters, query errors and an empty collection are still raised
+        here, before any response headers are sent. ``ResultCount`` is written after
+        ``ResultData`` because it is only known once the cursor is exhausted.
+        """
+        start_time = time.time()
+        try:
+            collection = self.async_collection
+            logger.info(f"Streaming search on collection: {self.collection_name}")
+
+            processed = self._process_search_params(kwargs)
+
+            try:
+                cursor = self._search_cursor(collection, processed, kwargs).batch_size(settings.STREAM_BATCH_SIZE)
+                first = await anext(cursor, None)
+            except Exception as e:
+                logger.error(f"MongoDB query execution error: {e}")
+                raise InternalServerException(f"Error executing MongoDB query: {str(e)}")
+
+            if first is None and await self.collection_stats.document_count_async(collection) == 0:
+                logger.warning(f"Collection {self.collection_name} is empty")
+                raise KeyWordNotFoundException(f"No documents found in {self.collection_name} collection")
+
+            return first, self._stream_envelope(first, cursor, collection, processed, kwargs, start_time)
+        except KeyWordNotFoundException as e:
+            logger.error(f"No search results: {e}")
+            raise
+        except IllegalArgumentException as e:
+            logger.error(f"Invalid search parameters: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            raise InternalServerException(f"Failed to search documents: {str(e)}")
+
+    async def _stream_envelope(self, first: Optional[Dict[str, Any]], cursor, collection, processed: Dict[str, Any],
+                               kwargs: Dict[str, Any], start_time: float) -> AsyncIterator[bytes]:
+        """Yield the search envelope in chunks, starting with an already fetched first document"""
+        count = 0
+        try:
+            yield b'{"ResultData":['
+            if first is not None:
+                batch = [self._encode_doc(first)]
+                count = 1
+                separator = ""
+                async for doc in cursor:
+                    batch.append(self._encode_doc(doc))
+                    count += 1
+                    if len(batch) >= settings.STREAM_BATCH_SIZE:
+                        yield (separator + ",".join(batch)).encode("utf-8")
+                        separator = ","
+                        batch = []
+                if batch:
+                    yield (separator + ",".join(batch)).encode("utf-8")
+            page_size = processed["limit"] if processed["limit"] is not None and processed["limit"] > 0 else 0
+            # Counted like a buffered page, so a skip or a limit still gives the total
+            total = await self._search_count_async(collection, count, processed, kwargs) if count else 0
+            tail = {"ResultCount": total, "PageSize": page_size, "Metrics": {"ElapsedTime": time.time() - start_time}}
+            yield b'],' + json.dumps(tail)[1:].encode("utf-8")
+        except Exception as e:
+            # Headers are already sent; all we can do is log and cut the response short
+            logger.error(f"Error while streaming search results: {e}")
+            raise
+        finally:
+            await cursor.close()
+
+    async def export_async(self, after: Optional[str] = None, **kwargs) -> AsyncIterator[bytes]:
+        """
+        Return an async iterator over the matching documents as NDJSON, in ``_id`` order.
+
+        Search filters and ``include``/``exclude`` projections are honoured; paging and
+        sort parameters are ignored, since an export is a single scan of the ``_id``
+        index. Every line carries its ``_id`` as a string, which doubles as the
+        checkpoint: passing the last received ``_id`` as ``after`` resumes the export
+        right after that document.
+        """
+        processed = self._process_search_params(kwargs)
+        query = processed["query"]
+        if after:
+            try:
+                resume = {"_id": {"$gt": ObjectId(after)}}
+            except Exception:
+                raise IllegalArgumentException(f"Invalid export checkpoint: {after}")
+            query = {"$and": [query, resume]} if query else resume
+
+        # The checkpoint needs _id, so it is never excluded
+        projection = {k: v for k, v in processed["projection"].items() if k != "_id"} or None
+
+        try:
+            cursor = self.async_collection.find(query, projection).sort("_id", 1).batch_size(settings.STREAM_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"MongoDB query execution error: {e}")
+            raise InternalServerException(f"Error executing MongoDB query: {str(e)}")
+
+        return self._export_lines(cursor)
+
+    async def _export_lines(self, cursor) -> AsyncIterator[bytes]:
+        """Yield NDJSON lines from ``cursor`` in batches"""
+        batch = []
+        try:
+            async for doc in cursor:
+                batch.append(self._encode_doc(doc))
+                if len(batch) >= settings.STREAM_BATCH_SIZE:
+                    yield ("\n".join(batch) + "\n").encode("utf-8")
+                    batch = []
+            if batch:
+                yield ("\n".join(batch) + "\n").encode("utf-8")
+        except Exception as e:
+            logger.error(f"Error while exporting {self.collection_name}: {e}")
+            raise
+        finally:
+            await cursor.close()
+
+    @staticmethod
+    def _encode_doc(doc: Dict[str, Any]) -> str:
+        """JSON-encode a single result document the way the regular responses do"""
+        if "_id" in doc:
+            doc["_id"] = str(doc["_id"])
+        return json.dumps(doc, ensure_ascii=False, default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v))
+
+    # Helpers shared by the sync and async code paths. They only build queries and
+    # shape results, so the two paths differ solely in how MongoDB is called.
+
+    def _get_result(self, doc: Optional[Dict[str, Any]], doc_id: str, start_time: float) -> Dict[str, Any]:
+        """Wrap a single document in the standard result envelope"""
+        if not doc:
+            raise ResourceNotFoundException(f"Document with ID {doc_id} not found")
+        doc["_id"] = str(doc["_id"])
+        return {
+            "ResultCount": 1,
+            "ResultData": [doc],
+            "Metrics": {"ElapsedTime": time.time() - start_time}
+        }
+
+    def _get_all_cursor(self, collection, skip: int, limit: int, filters: Dict[str, Any]):
+        """Build the cursor used by ``get_all``"""
+        cursor = collection.find(
+            filter=filters,
+            projection={"_id": 0, **{field: 0 for field in self.internal_fields}}
+        ).skip(skip)
+
+        # Only apply limit if it's greater than 0 (0 means return all)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    def _get_all_result(self, docs: List[Dict[str, Any]], count: int, limit: int, start_time: float) -> Dict[str, Any]:
+        """Wrap ``get_all`` results in the standard result envelope"""
+        return {
+            "ResultCount": count,
+            "ResultData": docs,
+            "PageSize": limit if limit > 0 else 0,  # 0 indicates all results returned
+            "Metrics": {"ElapsedTime": time.time() - start_time}
+        }
+
+    def _process_search_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn request parameters into a MongoDB query, projection, sort and page window"""
+        try:
+            processed = process_search_params(kwargs, self.normalized_fields)
+            # Ensure _id is excluded from projection
+            if "projection" not in processed:
+                processed["projection"] = {}
+            processed["projection"]["_id"] = 0
+            # An inclusion projection already leaves them out, and MongoDB rejects
+            # mixing inclusion with exclusion
+            if not any(v == 1 for k, v in processed["projection"].items() if k != "_id"):
+                for field in self.internal_fields:
+                    processed["projection"][field] = 0
+            if kwargs.get("cursor"):
+                self._apply_keyset(processed, str(kwargs["cursor"]))
+        except IllegalArgumentException:
+            raise
+        except Exception as e:
+            # If there's an error processing the search parameters, it's likely an illegal argument
+            logger.error(f"Error processing search parameters: {e}")
+            raise IllegalArgumentException(str(e))
+
+        logger.info(f"Search parameters: {kwargs}")
+        logger.info(f"Processed query: {processed}")
+        return processed
+
+    def _apply_keyset(self, processed: Dict[str, Any], token: str) -> None:
+        """
+        Switch a processed search to keyset pagination.
+
+        The sort gets an ``_id`` tiebreaker, ``skip`` is dropped in favour of a range
+        filter after the token's sort key (kept apart from the query so counts still
+        cover all matches), and the projection is widened to return the sort keys.
+        """
+        sort = pagination.keyset_sort(processed["sort"])
+        pagination.check_sort_fields(sort, self.array_fields)
+        processed["sort"] = sort
+        processed["skip"] = 0
+        processed["keyset"] = None
+        if token != pagination.START_CURSOR:
+            processed["keyset"] = pagination.keyset_filter(sort, pagination.decode_cursor(token, sort))
+        processed["projection"], processed["keyset_strip"] = pagination.keyset_projection(processed["projection"], sort)
+
+    def _search_cursor(self, collection, processed: Dict[str, Any], kwargs: Dict[str, Any]):
+        """Build the search cursor; works for both sync and async collections"""
+        query = processed["query"]
+        if processed.get("keyset"):
+            query = {"$and": [query, processed["keyset"]]} if query else processed["keyset"]
+
+        # Using explicit parameters to catch any issues
+        cursor = collection.find(
+            filter=query,
+            projection=processed["projection"]
+        )
+
+        # Only apply skip if it's greater than 0
+        if processed["skip"] and processed["skip"] > 0:
+            cursor = cursor.skip(processed["skip"])
+
+        # Only apply limit if it's specified and greater than 0 (None or 0 means return all results)
+        if processed["limit"] is not None and processed["limit"] > 0:
+            cursor = cursor.limit(processed["limit"])
+
+        if processed["sort"] and isinstance(processed["sort"], list) and len(processed["sort"]) > 0:
+            # For nullable fields like firstIssued/annotated, we need to handle nulls last
+            sort_spec = []
+            for field, direction in processed["sort"]:
+                # Check if this is a nullable field that should sort nulls last
+                if field in ["firstIssued", "annotated"]:
+                    # First sort by whether the field exists
+                    sort_spec.append((f"{field}", direction))
+                else:
+                    sort_spec.append((field, direction))
+
+            cursor = cursor.sort(sort_spec)
+            # A text score sort ($meta) does not compare strings, so only other keys need the collation
+            if any(not isinstance(direction, dict) for _, direction in sort_spec):
+                cursor = cursor.collation({
+                    "locale": "en",
+                    "strength": 3,  # 3 for case+symbol sensitivity
+                    "numericOrdering": True,  # Properly handle numeric parts
+                    "caseLevel": True,  # Ensure proper case handling
+                    "alternate": "shifted"  # Ignore punctuation/symbols in base comparison
+                })
+        elif "sort_asc" in kwargs or "sort_desc" in kwargs:
+            logger.warning(f"Sort requested but not properly processed. Processed sort: {processed['sort']}")
+        return cursor
+
+    def _ranked_filter(self, processed: Dict[str, Any], ranked: List[Tuple[Any, float]]) -> Dict[str, Any]:
+        """The other search filters, restricted to the text index matches"""
+        return {"$and": [processed["query"], {"_id": {"$in": [doc_id for doc_id, _ in ranked]}}]}
+
+    def _keep_matching(self, ranked: List[Tuple[Any, float]], matching) -> List[Tuple[Any, float]]:
+        """Keep the ranked matches whose ``_id`` is among the ``matching`` documents, in rank order"""
+        ids = {doc["_id"] for doc in matching}
+        return [(doc_id, score) for doc_id, score in ranked if doc_id in ids]
+
+    def _ranked_page(self, processed: Dict[str, Any], ranked: List[Tuple[Any, float]]) -> List[Tuple[Any, float]]:
+        """The slice of the ranking requested by skip/limit"""
+        skip = processed["skip"] or 0
+        limit = processed["limit"]
+        return ranked[skip:skip + limit] if limit and limit > 0 else ranked[skip:]
+
+    def _hydrate_projection(self, processed: Dict[str, Any]) -> Dict[str, Any]:
+        """The search projection with ``_id`` kept, so fetched documents can be put in rank order"""
+        return {k: v for k, v in processed["projection"].items() if k != "_id"} or None
+
+    def _ranked_result(self, docs: List[Dict[str, Any]], page: List[Tuple[Any, float]], count: int,
+                       processed: Dict[str, Any], kwargs: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Put fetched documents in rank order and wrap them like any other search result"""
+        if not docs and not self.text_index.document_count:
+            logger.warning(f"Collection {self.collection_name} is empty")
+            raise KeyWordNotFoundException(f"No documents found in {self.collection_name} collection")
+
+        by_id = {doc.pop("_id"): doc for doc in docs}
+        relevance = relevance_requested(kwargs)
+        ordered = []
+        for doc_id, score in page:
+            doc = by_id.get(doc_id)
+            # A document removed since the index was built is skipped
+            if doc is not None:
+                if relevance:
+                    doc[SCORE_FIELD] = score
+                ordered.append(doc)
+        logger.info(f"Found {len(ordered)} documents of {count} ranked by the text index")
+        return self._search_result(ordered, count, processed, start_time)
+
+    def _cached_result(self, key: str, start_time: float) -> Optional[Dict[str, Any]]:
+        """Return a cached search response with fresh metrics, or None on a miss"""
+        cached = get_response_cache().get(self.collection_name, key)
+        if cached is None:
+            return None
+        logger.info(f"Response cache hit for {self.collection_name}")
+        return {**cached, "Metrics": {"ElapsedTime": time.time() - start_time}}
+
+    def _cache_result(self, key: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a search response in the response cache and return it unchanged"""
+        # The cache keeps its own copy (see ResponseCache.set), so the caller may alter ``result``
+        get_response_cache().set(self.collection_name, key, result)
+        return result
+
+    def _page_count(self, returned: int, skip: Optional[int], limit: Optional[int]) -> Optional[int]:
+        """
+        Total number of matches when the ``returned`` documents of a page already prove
+        it: either no limit was applied or the page came back short. Returns None otherwise.
+        """
+        if not limit or returned < limit:
+            return (skip or 0) + returned
+        return None
+
+    def _count_source(self, returned: int, processed: Dict[str, Any], kwargs: Dict[str, Any]) -> str:
+        """
+        Decide where ResultCount comes from for a non-empty page:
+
+        - ``page``: derived from the page itself, no server round-trip
+        - ``stats``: cached collection statistics (``count=estimated`` on an unfiltered search)
+        - ``query``: ``count_documents`` on the search filter (``count=exact``, the default)
+        - ``none``: not computed at all (``count=none``); ResultCount is returned as null
+        """
+        # Past the first keyset page the documents before the cursor are unknown
+        if not processed.get("keyset") and self._page_count(returned, processed["skip"], processed["limit"]) is not None:
+            return "page"
+        policy = str(kwargs.get("count") or "exact").lower()
+        if policy == "none":
+            return "none"
+        if policy == "estimated" and not processed["query"]:
+            return "stats"
+        # Collection statistics say nothing about a filtered subset, so an estimate
+        # for a filtered search falls back to an exact count
+        return "query"
+
+    def _search_result(self, docs: List[Dict[str, Any]], count: int, processed: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Wrap search results in the standard result envelope"""
+        keyset = "keyset_strip" in processed
+        if not docs:
+            result = {
+                "ResultCount": 0,
+                "ResultData": [],
+                "PageSize": processed["limit"] if processed["limit"] is not None else 0,
+                "Metrics": {"ElapsedTime": time.time() - start_time}
+            }
+            if keyset:
+                result["NextCursor"] = None
+            return result
+
+        # Keyset pages hand out a token for the page after the last document, as
+        # long as the page was full
+        next_cursor = None
+        if keyset:
+            if processed["limit"] and len(docs) >= processed["limit"]:
+                next_cursor = pagination.encode_cursor(docs[-1], processed["sort"])
+            for doc in docs:
+                pagination.strip_fields(doc, processed["keyset_strip"])
+
+        for doc in docs:
+            if "_id" in doc:
+                doc["_id"] = str(doc["_id"])
+
+        # Determine PageSize based on whether pagination was used
+        page_size = processed["limit"] if processed["limit"] is not None and processed["limit"] > 0 else 0
+
+        result = {
+
+            "ResultCount": count,
+            "ResultData": docs,
+            "PageSize": page_size,  # 0 indicates all results returned
+            "Metrics": {"ElapsedTime": time.time() - start_time}
+        }
+        if keyset:
+            result["NextCursor"] = next_cursor
+        return result
@@ -0,0 +1,45 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CollectionStats:
+    """
+    Cached document count for a single collection.
+
+    The count comes from ``estimated_document_count``, which reads collection
+    metadata instead of scanning, and is refreshed at most once every ``ttl``
+    seconds. Call ``invalidate`` after writing to the collection to force the
+    next read to go back to the server.
+    """
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._count = None
+        self._fetched_at = 0.0
+
+    def _is_fresh(self) -> bool:
+        return self._count is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def _store(self, count: int) -> int:
+        self._count = count
+        self._fetched_at = time.monotonic()
+        return count
+
+    def document_count(self, collection) -> int:
+        """Return the cached document count, refreshing it from ``collection`` when stale"""
+        if self._is_fresh():
+            return self._count
+        logger.debug(f"Refreshing document count for {collection.name}")
+        return self._store(collection.estimated_document_count())
+
+    async def document_count_async(self, collection) -> int:
+        """Async variant of ``document_count`` for an async collection"""
+        if self._is_fresh():
+            return self._count
+        logger.debug(f"Refreshing document count for {collection.name}")
+        return self._store(await collection.estimated_document_count())
+
+    def invalidate(self) -> None:
+        """Drop the cached count so the next read refreshes it"""
+        self._count = None
+        self._fetched_at = 0.0
@@ -1,7 +1,12 @@
 from app.crud.base import BaseCRUD
+from app.crud.snapshot import collection_signature_async
 from app.config import settings
+from app.middleware.precompressed import PrecompressedPayload
+from typing import Optional
 
+import asyncio
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -10,6 +15,35 @@ logger = logging.getLogger(__name__)
 class FieldCRUD(BaseCRUD):
     def __init__(self):
             super().__init__(settings.FIELDS_COLLECTION)
+            # The whole catalog as served by /records/fields, with the collection
+            # version it was built from
+            self._catalog: Optional[PrecompressedPayload] = None
+            self._catalog_version = None
+            self._catalog_checked = 0.0
+
+    async def catalog_async(self) -> PrecompressedPayload:
+        """
+        The full field list, serialized and compressed once per change to the collection.
+
+        The collection's version signature is checked at most every
+        ``FIELDS_CATALOG_CHECK_INTERVAL`` seconds; writes through the API drop the
+        payload right away.
+        """
+        if self._catalog is not None and time.monotonic() - self._catalog_checked < settings.FIELDS_CATALOG_CHECK_INTERVAL:
+            return self._catalog
+        version = await collection_signature_async(self.async_collection)
+        if self._catalog is None or version != self._catalog_version:
+            fields = await self.get_all_async(limit=0)
+            self._catalog = await asyncio.to_thread(PrecompressedPayload.from_json, fields)
+            self._catalog_version = version
+            logger.info(f"Rebuilt field catalog: {self._catalog.stats()['bytes']} bytes")
+        self._catalog_checked = time.monotonic()
+        return self._catalog
+
+    def invalidate_cache(self) -> None:
+        """Also drop the prebuilt catalog after a write"""
+        super().invalidate_cache()
+        self._catalog = None
         
     def create(self, data: dict) -> dict:
         """
@@ -73,6 +107,15 @@ class FieldCRUD(BaseCRUD):
         """
         base_result = super().get_all(skip, limit)
         return base_result.get("ResultData", [])
+
+    async def get_all_async(self, skip: int = 0, limit: int = 10) -> list:
+        """
+        Get multiple fields with pagination without blocking the event loop.
+
+        Returns the same list of field dicts as ``get_all``.
+        """
+        base_result = await super().get_all_async(skip, limit)
+        return base_result.get("ResultData", [])
         
     def search(self, **kwargs) -> dict:
         """
@@ -105,5 +148,14 @@ class FieldCRUD(BaseCRUD):
         base_result = super().search(**kwargs)
         return base_result.get("ResultData", [])
 
+    async def search_async(self, **kwargs) -> list:
+        """
+        Search for fields without blocking the event loop.
+
+        Takes the same parameters and returns the same list as ``search``.
+        """
+        base_result = await super().search_async(**kwargs)
+        return base_result.get("ResultData", [])
+
 # Create singleton instance
 field_crud = FieldCRUD()
\ No newline at end of file
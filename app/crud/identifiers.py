@@ -0,0 +1,96 @@
+"""
+Identifier normalization for record lookups.
+
+A record can be addressed by its full ARK (``ark:/88434/mds0052gnp``), the ARK
+without its label (``88434/mds0052gnp``), the bare MDS id (``mds0052gnp``), its
+``ediid`` or its DOI. Rather than matching these forms with suffix regexes at
+query time, every form is derived once and stored on the document in the
+indexed ``_lookup_keys`` array, so a lookup is a single indexed ``$in``.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+LOOKUP_KEYS_FIELD = "_lookup_keys"
+
+# Document fields whose values identify a record
+RECORD_ID_FIELDS = ("@id", "ediid", "doi")
+
+# Fields identifying the record a recordMetrics/fileMetrics document belongs to
+METRICS_ID_FIELDS = ("pdrid", "ediid", "@id")
+
+_ARK_RE = re.compile(r"^ark:/*(?P<naan>\d+)/(?P<name>[^/]+)(?P<rest>/.*)?$", re.IGNORECASE)
+_DOI_RE = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:)?(?P<doi>10\.\d+/\S+)$", re.IGNORECASE)
+
+def canonical_id(value: Any) -> Optional[str]:
+    """
+    Reduce an identifier to the canonical key used at query time.
+
+    ARKs are given the ``ark:/`` label, DOIs are reduced to a lower-cased
+    ``doi:10.x/y`` form and anything else is returned trimmed. A leading slash on
+    a NAAN-qualified id (``/88434/mds0052gnp``) is dropped so that it matches the
+    ``88434/mds0052gnp`` key.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+
+    doi = _DOI_RE.match(text)
+    if doi:
+        return f"doi:{doi.group('doi').lower()}"
+
+    ark = _ARK_RE.match(text)
+    if ark:
+        return f"ark:/{ark.group('naan')}/{ark.group('name')}{ark.group('rest') or ''}"
+
+    return text.lstrip("/") if re.match(r"^/+\d+/", text) else text
+
+def identifier_keys(value: Any) -> List[str]:
+    """
+    All keys under which a single identifier value should be found.
+
+    ``ark:/88434/mds0052gnp`` yields the full ARK, ``88434/mds0052gnp`` and
+    ``mds0052gnp``; other identifiers yield their canonical form only.
+    """
+    key = canonical_id(value)
+    if key is None:
+        return []
+
+    keys = [key]
+    ark = _ARK_RE.match(key)
+    if ark and not ark.group("rest"):
+        keys.append(f"{ark.group('naan')}/{ark.group('name')}")
+        keys.append(ark.group("name"))
+    return keys
+
+def lookup_keys(doc: Dict[str, Any], fields: Iterable[str] = RECORD_ID_FIELDS) -> List[str]:
+    """Derive the sorted, de-duplicated ``_lookup_keys`` array for a document"""
+    keys = set()
+    for field in fields:
+        value = doc.get(field)
+        for item in value if isinstance(value, list) else [value]:
+            keys.update(identifier_keys(item))
+    return sorted(keys)
+
+def with_lookup_keys(doc: Dict[str, Any], fields: Iterable[str] = RECORD_ID_FIELDS) -> Dict[str, Any]:
+    """Set ``_lookup_keys`` on a document before it is written; returns the document"""
+    doc[LOOKUP_KEYS_FIELD] = lookup_keys(doc, fields)
+    return doc
+
+def lookup_query(record_id: str, fields: Iterable[str] = ("ediid", "@id")) -> Dict[str, Any]:
+    """
+    Build the query that resolves an already URL-decoded ``record_id`` to a document.
+
+    The ``_lookup_keys`` branch covers every normalized form. Exact equality on the
+    raw identifier fields keeps documents that have not been backfilled yet
+    resolvable by their stored id; every branch is served by an index.
+    """
+    keys = [record_id]
+    key = canonical_id(record_id)
+    if key and key != record_id:
+        keys.append(key)
+
+    conditions = [{LOOKUP_KEYS_FIELD: {"$in": keys}}]
+    conditions.extend({field: record_id} for field in fields)
+    return {"$or": conditions}
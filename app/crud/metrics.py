@@ -1,11 +1,45 @@
+import json
 from datetime import datetime
+from app.config import settings
 from app.database import db, metrics_db
+from app.crud.identifiers import canonical_id, lookup_query
+from app.crud.metrics_ingest import download_recorder
+from app.crud.metrics_rollups import RollupStore, parse_granularity, parse_period
+from app.crud.pagination import START_CURSOR, decode_cursor, encode_cursor, keyset_filter, keyset_sort
+from app.crud.user_sketches import RECORD_SCOPE, REPO_KEY, REPO_SCOPE, UserSketchStore
+from app.middleware.exceptions import IllegalArgumentException
 from pymongo import ASCENDING, DESCENDING
 import logging
 import math
 
 logger = logging.getLogger(__name__)
 
+# Sort options of the file metrics list -> indexed field
+FILE_SORT_FIELDS = {
+    "downloads": "success_get",
+    "success_get": "success_get",
+    "total_size_download": "total_size_download",
+    "users": "number_users",
+    "number_users": "number_users",
+    "filepath": "filepath",
+}
+
+FILE_METRICS_FIELDS = ("pdrid", "ediid", "filepath", "downloadURL", "success_get", "failure_get",
+                       "datacart_or_client", "number_users", "total_size_download",
+                       "first_time_logged", "last_time_logged")
+
+# Page size of keyset pages requested without a size
+DEFAULT_FILES_PAGE_SIZE = 100
+
+def _sanitize_number(value, default=0):
+    """Numbers that are not JSON compliant (NaN, inf) and missing values become ``default``"""
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return default
+    return value or default
+
+def _encode(doc):
+    return json.dumps(doc, ensure_ascii=False, default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v))
+
 class MetricsCRUD:
     def __init__(self):
         """Initialize metrics collections"""
@@ -14,6 +48,22 @@ class MetricsCRUD:
         self.file_metrics = metrics_db.fileMetrics
         self.repo_metrics = metrics_db.repoMetrics
         self.unique_users = metrics_db.uniqueUsers
+        # HyperLogLog sketches of users per record and month, see app.crud.user_sketches
+        self.user_sketches = UserSketchStore(metrics_db[settings.USER_SKETCHES_COLLECTION],
+                                             settings.METRICS_HLL_PRECISION)
+        # Daily/monthly/yearly download counts, see app.crud.metrics_rollups
+        self.rollups = RollupStore(metrics_db[settings.METRICS_ROLLUPS_COLLECTION])
+
+    def record_download(self, pdrid, ediid=None, ip_address=None, user_agent="", referrer="", timestamp=None,
+                        download_size=0):
+        """
+        Record a download of a record.
+
+        The event is only queued here; it reaches ``recordMetrics`` with the next
+        batched flush (see ``app.crud.metrics_ingest``); the user agent and referrer
+        are not stored. Returns False if the queue was full and the event was dropped.
+        """
+        return download_recorder.record(pdrid, ediid, ip_address, download_size, timestamp)
 
     def _sanitize_float_for_json(self, value, default_if_non_finite=0):
         """Sanitizes float values that are not JSON compliant (NaN, inf, -inf)."""
@@ -23,21 +73,8 @@ class MetricsCRUD:
     
     def get_record_metrics(self, record_id):
         """Get metrics for a specific record"""
-        query_conditions = [
-            {"pdrid": record_id}, 
-            {"ediid": record_id},
-            {"@id": record_id}
-        ]
-        
-        if not record_id.startswith("ark:"):
-            # Try as MDS value
-            query_conditions.extend([
-                {"pdrid": {"$regex": f".*{record_id}$"}},  # Match MDS at end of pdrid
-                {"ediid": {"$regex": f".*{record_id}$"}},  # Match MDS at end of ediid
-                {"@id": {"$regex": f".*{record_id}$"}}     # Match MDS at end of @id
-            ])
-        
-        result = self.metrics.find_one({"$or": query_conditions})
+        # Indexed equality on the normalized ids, see app.crud.identifiers
+        result = self.metrics.find_one(lookup_query(record_id, fields=("pdrid", "ediid")))
         if not result:
             return None
         
@@ -132,24 +169,69 @@ class MetricsCRUD:
             "RepoMetrics": results
         }
     
+    def get_usage_series(self, scope, key, from_date=None, to_date=None, granularity=None):
+        """
+        Downloads of ``key`` per day, month or year between ``from_date`` and
+        ``to_date`` (inclusive), read from the rollups by an indexed range scan.
+
+        Monthly and yearly periods also carry ``number_users``, estimated from the
+        HyperLogLog sketches of their months. Periods without downloads are left out.
+
+        Raises:
+            IllegalArgumentException: If a date or the granularity is invalid
+        """
+        granularity = parse_granularity(granularity)
+        first = parse_period(from_date, granularity)
+        last = parse_period(to_date, granularity, end=True)
+        periods = self.rollups.series(scope, key, granularity, first, last)
+
+        if granularity != "day" and periods:
+            months = (parse_period(from_date, "month") or "0000-01",
+                      parse_period(to_date, "month", end=True) or "9999-12")
+            users = self.user_sketches.period_counts(scope, key, months, 4 if granularity == "year" else 7)
+            for period in periods:
+                period["number_users"] = users.get(period["period"], 0)
+
+        return {
+            "Granularity": granularity,
+            "From": first,
+            "To": last,
+            "UsageMetricsCount": len(periods),
+            "PageSize": 0,
+            "UsageMetrics": periods
+        }
+
+    def get_record_usage(self, record_id, from_date=None, to_date=None, granularity=None):
+        """Downloads of a record over time (see ``get_usage_series``), or None if it has no metrics"""
+        result = self.metrics.find_one(lookup_query(record_id, fields=("pdrid", "ediid")), {"pdrid": 1})
+        if not result:
+            return None
+        # Rollups are keyed by the canonical pdrid the download flush records
+        key = canonical_id(result.get("pdrid")) or result.get("pdrid")
+        return self.get_usage_series(RECORD_SCOPE, key, from_date, to_date, granularity)
+
+    def get_repo_usage(self, from_date=None, to_date=None, granularity=None):
+        """Repository downloads over time, see ``get_usage_series``"""
+        return self.get_usage_series(REPO_SCOPE, REPO_KEY, from_date, to_date, granularity)
+
+    def get_total_unique_users(self):
+        """
+        Get the total number of unique users of the repository.
+
+        Estimated from the repository's all-time HyperLogLog sketch (a few KB);
+        until one has been written, the documents in ``uniqueUsers`` are counted.
+        """
+        total = self.user_sketches.count(REPO_SCOPE, REPO_KEY)
+        if total is None:
+            total = self.unique_users.count_documents({})
+        return {"total_unique_users": total}
+
     def get_file_metrics(self, file_path, recordid=None):
         """Get metrics for a specific file or all files for a record"""
         
         if not file_path:
-            # Try multiple ways to find by record ID - return ALL files for this record
-            query_conditions = [
-                {"ediid": recordid},
-                {"pdrid": recordid}
-            ]
-            
-            # MDS-based lookups for record ID
-            if not recordid.startswith("ark:"):
-                query_conditions.extend([
-                    {"ediid": {"$regex": f".*{recordid}$"}},
-                    {"pdrid": {"$regex": f".*{recordid}$"}}
-                ])
-                
-            results = list(self.file_metrics.find({"$or": query_conditions}))
+            # Return ALL files for this record, found through the indexed normalized ids
+            results = list(self.file_metrics.find(lookup_query(recordid, fields=("ediid", "pdrid"))))
         else:
             # First try direct filepath lookup for a single file
             result = self.file_metrics.find_one({"filepath": file_path})
@@ -160,19 +242,7 @@ class MetricsCRUD:
                 # If not found and file_path doesn't look like a real filepath, 
                 # treat it as a record identifier and return ALL files for that record
                 if not ("/" in file_path or "." in file_path):
-                    query_conditions = [
-                        {"ediid": file_path},
-                        {"pdrid": file_path}
-                    ]
-                    
-                    # Add MDS-based lookups if it doesn't start with ark:
-                    if not file_path.startswith("ark:"):
-                        query_conditions.extend([
-                            {"ediid": {"$regex": f".*{file_path}$"}},
-                            {"pdrid": {"$regex": f".*{file_path}$"}}
-                        ])
-                        
-                    results = list(self.file_metrics.find({"$or": query_conditions}))
+                    results = list(self.file_metrics.find(lookup_query(file_path, fields=("ediid", "pdrid"))))
                 else:
                     results = []
         
@@ -202,50 +272,125 @@ class MetricsCRUD:
             "FilesMetrics": files_metrics
         }
     
-    def get_file_metrics_list(self, sort_by="total_size_download", sort_order=-1):
-        """Get metrics for all files with sorting"""
-        # Determine sort field
-        sort_field = "success_get" if sort_by == "total_size_download" else "filepath"
-        
-        # Get all results with sorting
-        results = list(self.file_metrics.find(
-            {},
-            {"_id": 0, "pdrid": 1, "ediid": 1, "filepath": 1, "downloadURL": 1, 
-            "success_get": 1, "failure_get": 1, "datacart_or_client": 1,
-            "number_users": 1, "total_size_download": 1, "first_time_logged": 1, "last_time_logged": 1}
-        ).sort(sort_field, sort_order))
-        
-        # Format results with sanitization
-        files_metrics = []
-        for result in results:
-            # Sanitize numeric values
-            def sanitize_number(value, default=0):
-                if isinstance(value, (int, float)):
-                    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
-                        return default
-                return value or default
-                
-            files_metrics.append({
-                "pdrid": result.get("pdrid"),
-                "ediid": result.get("ediid"),
-                "filepath": result.get("filepath"),
-                "downloadURL": result.get("downloadURL"),
-                "success_get": sanitize_number(result.get("success_get")),
-                "failure_get": sanitize_number(result.get("failure_get")),
-                "datacart_or_client": sanitize_number(result.get("datacart_or_client")),
-                "total_size_download": sanitize_number(result.get("total_size_download")),
-                "number_users": sanitize_number(result.get("number_users")),
-                "first_time_logged": result.get("first_time_logged"),
-                "last_time_logged": result.get("last_time_logged")
-            })
-        
-        total = len(files_metrics)
-        
+    def _file_metrics_query(self, sort_by, sort_order, record=None):
+        """
+        Query, projection and keyset sort for a list of file metrics.
+
+        Raises:
+            IllegalArgumentException: If ``sort_by`` is not a supported sort
+        """
+        if sort_by not in FILE_SORT_FIELDS:
+            raise IllegalArgumentException(
+                f"sort_by must be one of {', '.join(FILE_SORT_FIELDS)}, got '{sort_by}'")
+        direction = DESCENDING if sort_order == -1 or str(sort_order).lower() == "desc" else ASCENDING
+        query = lookup_query(record, fields=("ediid", "pdrid")) if record else {}
+        projection = {field: 1 for field in FILE_METRICS_FIELDS}
+        # _id breaks ties, so pages and keyset cursors follow the (field, _id) indexes
+        return query, projection, keyset_sort([(FILE_SORT_FIELDS[sort_by], direction)])
+
+    def _format_file_metrics(self, result):
+        """A fileMetrics document as returned by the list endpoint, with JSON-safe numbers"""
         return {
+            "pdrid": result.get("pdrid"),
+            "ediid": result.get("ediid"),
+            "filepath": result.get("filepath"),
+            "downloadURL": result.get("downloadURL"),
+            "success_get": _sanitize_number(result.get("success_get")),
+            "failure_get": _sanitize_number(result.get("failure_get")),
+            "datacart_or_client": _sanitize_number(result.get("datacart_or_client")),
+            "total_size_download": _sanitize_number(result.get("total_size_download")),
+            "number_users": _sanitize_number(result.get("number_users")),
+            "first_time_logged": result.get("first_time_logged"),
+            "last_time_logged": result.get("last_time_logged")
+        }
+
+    def get_file_metrics_list(self, sort_by="total_size_download", sort_order=-1, page=1, size=None,
+                              cursor=None, record=None):
+        """
+        Get metrics for files with sorting, optionally paged and filtered by record.
+
+        ``size`` gives pages of that many files, chosen by ``page`` or, with
+        ``cursor`` (``*`` for the first page, then the previous ``NextCursor``), by
+        keyset. Without ``size`` every matching file is returned; the endpoint
+        streams that case through ``stream_file_metrics`` instead.
+
+        Raises:
+            IllegalArgumentException: If the sort or the cursor is invalid
+        """
+        query, projection, sort = self._file_metrics_query(sort_by, sort_order, record)
+        if cursor and not size:
+            size = DEFAULT_FILES_PAGE_SIZE
+
+        find_query = query
+        if cursor and cursor != START_CURSOR:
+            after = keyset_filter(sort, decode_cursor(cursor, sort))
+            find_query = {"$and": [query, after]} if query else after
+        results = self.file_metrics.find(find_query, projection).sort(sort)
+        if size:
+            if not cursor:
+                results = results.skip((page - 1) * size)
+            results = results.limit(size)
+        results = list(results)
+
+        files_metrics = [self._format_file_metrics(result) for result in results]
+
+        if not size:
+            total = len(files_metrics)
+        elif query:
+            total = self.file_metrics.count_documents(query)
+        else:
+            total = self.file_metrics.estimated_document_count()
+
+        response = {
             "FilesMetricsCount": total,
-            "PageSize": 0,
+            "PageSize": size or 0,
             "FilesMetrics": files_metrics
         }
+        if cursor:
+            response["NextCursor"] = encode_cursor(results[-1], sort) if len(results) == size else None
+        return response
+
+    def stream_file_metrics(self, sort_by="total_size_download", sort_order=-1, record=None):
+        """
+        Return an iterator over the JSON envelope of every matching file's metrics.
+
+        The cursor is read and encoded in batches of ``STREAM_BATCH_SIZE``, so memory
+        stays bounded however many files there are. The first document is fetched
+        before returning so that query errors are raised before any response is
+        sent; ``FilesMetricsCount`` comes last, once it is known.
+
+        Raises:
+            IllegalArgumentException: If the sort is invalid
+        """
+        query, projection, sort = self._file_metrics_query(sort_by, sort_order, record)
+        cursor = self.file_metrics.find(query, projection).sort(sort).batch_size(settings.STREAM_BATCH_SIZE)
+        first = next(cursor, None)
+        return self._stream_file_metrics(first, cursor)
+
+    def _stream_file_metrics(self, first, cursor):
+        count = 0
+        try:
+            yield b'{"FilesMetrics":['
+            if first is not None:
+                batch = [_encode(self._format_file_metrics(first))]
+                count = 1
+                separator = ""
+                for result in cursor:
+                    batch.append(_encode(self._format_file_metrics(result)))
+                    count += 1
+                    if len(batch) >= settings.STREAM_BATCH_SIZE:
+                        yield (separator + ",".join(batch)).encode("utf-8")
+                        separator = ","
+                        batch = []
+                if batch:
+                    yield (separator + ",".join(batch)).encode("utf-8")
+            yield b'],' + json.dumps({"FilesMetricsCount": count, "PageSize": 0})[1:].encode("utf-8")
+        except Exception as e:
+            # Headers are already sent; all we can do is log and cut the response short
+            logger.error(f"Error while streaming file metrics: {e}")
+            raise
+        finally:
+            cursor.close()
 
 metrics_crud = MetricsCRUD()
 
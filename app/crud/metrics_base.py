@@ -4,17 +4,13 @@ from datetime import datetime
 from bson import ObjectId
 from app.database import metrics_db
 from app.middleware.exceptions import ResourceNotFoundException
-from app.middleware.request_processor import ProcessRequest
+from app.middleware.request_processor import process_search_params
 from pymongo import ASCENDING, DESCENDING
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MetricsBaseCRUD:
-    def __init__(self):
-        """Initialize metrics base functionality"""
-        self.request_processor = ProcessRequest()
-    
     def process_metrics_query(self, collection, params: Dict[str, Any], collection_name: str) -> Dict[str, Any]:
         """
         Process input parameters and retrieve metrics data
@@ -42,9 +38,7 @@ class MetricsBaseCRUD:
         params_copy["exclude"] = "_id,ip_list"
         
         # Process the search parameters to build MongoDB query
-        request = self.request_processor
-        request.reset_state()
-        query_data = request.process_search_params(params_copy)
+        query_data = process_search_params(params_copy)
         
         # Get count of total matching documents
         count = collection.count_documents(query_data["query"])
@@ -0,0 +1,181 @@
+"""
+Write-behind ingestion of record download metrics.
+
+Recording a download on the request path only appends an event to a bounded
+in-memory queue. A background task flushes the queue every
+``METRICS_FLUSH_INTERVAL`` seconds: events are aggregated per record and written
+to ``recordMetrics`` with one ``bulk_write`` of ``$inc``/``$min``/``$max``
+upserts per batch. When the queue is full new events are dropped and counted
+rather than slowing requests down, and a failed batch is counted and logged.
+
+The users behind the downloads are not kept as ``ip_list`` arrays: they are
+added to the record's and the repository's monthly HyperLogLog sketches (see
+``app.crud.user_sketches``) and the record's ``number_users`` is set from its
+all-time sketch. The downloads are also added to the record's and the
+repository's daily, monthly and yearly rollups (see ``app.crud.metrics_rollups``).
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.crud.identifiers import LOOKUP_KEYS_FIELD, METRICS_ID_FIELDS, canonical_id, lookup_keys
+from app.crud.metrics_rollups import RollupStore
+from app.crud.user_sketches import RECORD_SCOPE, REPO_KEY, REPO_SCOPE, UserSketchStore, month_of
+
+logger = logging.getLogger(__name__)
+
+class DownloadEvent:
+    """A single record download"""
+    __slots__ = ("pdrid", "ediid", "ip_address", "size", "timestamp")
+
+    def __init__(self, pdrid: str, ediid: str, ip_address: Optional[str], size: int, timestamp: datetime):
+        self.pdrid = pdrid
+        self.ediid = ediid
+        self.ip_address = ip_address
+        self.size = size
+        self.timestamp = timestamp
+
+def aggregate(events: List[DownloadEvent]) -> List[UpdateOne]:
+    """One upsert per record for a batch of events"""
+    records: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        record = records.get(event.pdrid)
+        if record is None:
+            record = records[event.pdrid] = {"ediid": event.ediid, "count": 0, "size": 0,
+                                             "first": event.timestamp, "last": event.timestamp}
+        record["count"] += 1
+        record["size"] += event.size
+        record["first"] = min(record["first"], event.timestamp)
+        record["last"] = max(record["last"], event.timestamp)
+
+    operations = []
+    for pdrid, record in records.items():
+        update = {
+            "$inc": {"record_download": record["count"], "total_size_download": record["size"]},
+            "$min": {"first_time_logged": record["first"]},
+            "$max": {"last_time_logged": record["last"]},
+            "$setOnInsert": {"ediid": record["ediid"]},
+            # Kept on every write so documents created before _lookup_keys existed gain them too
+            "$addToSet": {LOOKUP_KEYS_FIELD: {"$each": lookup_keys({"pdrid": pdrid, "ediid": record["ediid"]},
+                                                                   METRICS_ID_FIELDS)}},
+        }
+        operations.append(UpdateOne({"pdrid": pdrid}, update, upsert=True))
+    return operations
+
+class DownloadRecorder:
+    """Bounded queue of download events and the batched writes that drain it"""
+
+    def __init__(self, max_queue: int, batch_size: int):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        # deque appends and pops are atomic, so events can be recorded from any thread
+        self._events: deque = deque()
+        self._counters = {"accepted": 0, "dropped": 0, "flushed": 0, "failed": 0, "batches": 0, "upserts": 0,
+                          "user_failures": 0, "rollup_failures": 0}
+        self._last_flush_ms = 0.0
+
+    def record(self, pdrid: str, ediid: Optional[str] = None, ip_address: Optional[str] = None,
+               download_size: int = 0, timestamp: Optional[datetime] = None) -> bool:
+        """Queue a download; returns False if the queue is full and the event was dropped"""
+        if len(self._events) >= self.max_queue:
+            self._counters["dropped"] += 1
+            return False
+        pdrid = canonical_id(pdrid) or pdrid
+        self._events.append(DownloadEvent(pdrid, ediid or pdrid, ip_address, download_size,
+                                          timestamp or datetime.now()))
+        self._counters["accepted"] += 1
+        return True
+
+    def _take(self) -> List[DownloadEvent]:
+        batch = []
+        while self._events and len(batch) < self.batch_size:
+            batch.append(self._events.popleft())
+        return batch
+
+    def flush(self, collection, sketches: Optional[UserSketchStore] = None,
+              rollups: Optional[RollupStore] = None) -> int:
+        """
+        Write every queued event to ``collection``, and its users to ``sketches``
+        and time buckets to ``rollups`` if given; returns the number of events written
+        """
+        start = time.perf_counter()
+        written = 0
+        while self._events:
+            batch = self._take()
+            if collection is None:
+                self._counters["failed"] += len(batch)
+                continue
+            operations = aggregate(batch)
+            try:
+                result = collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                self._counters["failed"] += len(batch)
+                logger.error(f"Failed to write {len(batch)} download events: {e}")
+                continue
+            self._counters["batches"] += 1
+            self._counters["upserts"] += result.upserted_count
+            self._counters["flushed"] += len(batch)
+            written += len(batch)
+            if sketches is not None:
+                self._add_users(batch, collection, sketches)
+            if rollups is not None:
+                self._add_rollups(batch, rollups)
+        self._last_flush_ms = (time.perf_counter() - start) * 1000
+        return written
+
+    def _add_users(self, batch: List[DownloadEvent], collection, sketches: UserSketchStore) -> None:
+        """Add the batch's users to the monthly sketches and refresh ``number_users``"""
+        records = defaultdict(set)
+        repo = defaultdict(set)
+        for event in batch:
+            if event.ip_address:
+                month = month_of(event.timestamp)
+                records[event.pdrid, month].add(event.ip_address)
+                repo[month].add(event.ip_address)
+        try:
+            totals = []
+            for (pdrid, month), users in records.items():
+                count = sketches.add(RECORD_SCOPE, pdrid, month, users)
+                if count is not None:
+                    # $max: counts taken from ip_list before the sketches existed are never lowered
+                    totals.append(UpdateOne({"pdrid": pdrid}, {"$max": {"number_users": count}}))
+            for month, users in repo.items():
+                sketches.add(REPO_SCOPE, REPO_KEY, month, users)
+            if totals:
+                collection.bulk_write(totals, ordered=False)
+        except Exception as e:
+            self._counters["user_failures"] += 1
+            logger.error(f"Failed to update unique users for {len(batch)} download events: {e}")
+
+    def _add_rollups(self, batch: List[DownloadEvent], rollups: RollupStore) -> None:
+        """Add the batch to the record and repository time buckets"""
+        entries = [(RECORD_SCOPE, event.pdrid, event.timestamp, event.size) for event in batch]
+        entries += [(REPO_SCOPE, REPO_KEY, event.timestamp, event.size) for event in batch]
+        try:
+            rollups.add(entries)
+        except Exception as e:
+            self._counters["rollup_failures"] += 1
+            logger.error(f"Failed to update rollups for {len(batch)} download events: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "queued": len(self._events), "max_queue": self.max_queue,
+                "last_flush_ms": round(self._last_flush_ms, 3)}
+
+async def flush_downloads(recorder: DownloadRecorder, collection, interval: float,
+                          sketches: Optional[UserSketchStore] = None, rollups: Optional[RollupStore] = None) -> None:
+    """Background task: flush queued downloads every ``interval`` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(recorder.flush, collection, sketches, rollups)
+        except Exception as e:
+            logger.error(f"Error flushing download metrics: {e}")
+
+# Create singleton instance
+download_recorder = DownloadRecorder(settings.METRICS_QUEUE_SIZE, settings.METRICS_BATCH_SIZE)
@@ -0,0 +1,123 @@
+"""
+Time-bucketed rollups of usage metrics.
+
+Downloads are pre-aggregated per record, file and for the whole repository into
+daily, monthly and yearly buckets in ``METRICS_ROLLUPS_COLLECTION``, one
+document per ``(scope, key, granularity, period)``:
+
+    {"scope": "record", "key": "ark:/88434/mds2-2154", "granularity": "month",
+     "period": "2025-01", "downloads": 42, "total_size_download": 8123456}
+
+Periods are ``YYYY-MM-DD``, ``YYYY-MM`` and ``YYYY`` strings, so a ``from``/``to``
+range is an indexed range scan on the unique ``(scope, key, granularity,
+period)`` index. The buckets are kept up to date with ``$inc`` upserts by the
+download flush (see ``app.crud.metrics_ingest``); periods without downloads
+have no document and are left out of a series.
+"""
+import calendar
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.middleware.exceptions import IllegalArgumentException
+
+# Granularity -> period format
+GRANULARITIES = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+
+DEFAULT_GRANULARITY = "month"
+
+_PERIOD = re.compile(r"^(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?")
+
+def period_of(timestamp: datetime, granularity: str) -> str:
+    """The period of ``granularity`` a timestamp falls in"""
+    return timestamp.strftime(GRANULARITIES[granularity])
+
+def parse_granularity(granularity: Optional[str]) -> str:
+    """
+    Raises:
+        IllegalArgumentException: If the granularity is not day, month or year
+    """
+    granularity = (granularity or DEFAULT_GRANULARITY).lower()
+    if granularity not in GRANULARITIES:
+        raise IllegalArgumentException(f"granularity must be one of {', '.join(GRANULARITIES)}, got '{granularity}'")
+    return granularity
+
+def parse_period(value: Optional[str], granularity: str, end: bool = False) -> Optional[str]:
+    """
+    A ``from`` (or, with ``end``, ``to``) bound as a period of ``granularity``.
+
+    Bounds may be given as ``YYYY``, ``YYYY-MM``, ``YYYY-MM-DD`` or a full ISO
+    timestamp; a finer bound is truncated and a coarser one is extended to the
+    first (or last) period it covers, so ``to=2025`` by day ends at 2025-12-31.
+
+    Raises:
+        IllegalArgumentException: If the bound is not a valid date
+    """
+    if not value:
+        return None
+    match = _PERIOD.match(value.strip())
+    try:
+        if match is None:
+            raise ValueError(value)
+        year, month, day = match.groups()
+        if end:
+            month = month or "12"
+            day = day or str(calendar.monthrange(int(year), int(month))[1])
+        bound = date(int(year), int(month or 1), int(day or 1))
+    except ValueError:
+        raise IllegalArgumentException(f"Invalid date '{value}', expected YYYY, YYYY-MM or YYYY-MM-DD")
+    return bound.strftime(GRANULARITIES[granularity])
+
+def rollup_operations(entries: Iterable[Tuple[str, str, datetime, int]]) -> List[UpdateOne]:
+    """
+    ``$inc`` upserts adding ``(scope, key, timestamp, size)`` downloads to their
+    day, month and year buckets, one operation per bucket
+    """
+    buckets: Dict[Tuple[str, str, str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for scope, key, timestamp, size in entries:
+        for granularity in GRANULARITIES:
+            bucket = buckets[scope, key, granularity, period_of(timestamp, granularity)]
+            bucket[0] += 1
+            bucket[1] += size
+    return [UpdateOne({"scope": scope, "key": key, "granularity": granularity, "period": period},
+                      {"$inc": {"downloads": downloads, "total_size_download": size}}, upsert=True)
+            for (scope, key, granularity, period), (downloads, size) in buckets.items()]
+
+class RollupStore:
+    """Daily, monthly and yearly download counts per scope and key"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexes_ready = False
+
+    def ensure_indexes(self) -> None:
+        self.collection.create_index([("scope", ASCENDING), ("key", ASCENDING), ("granularity", ASCENDING),
+                                      ("period", ASCENDING)], unique=True)
+
+    def add(self, entries: Iterable[Tuple[str, str, datetime, int]]) -> int:
+        """Add downloads given as ``(scope, key, timestamp, size)``; returns the buckets written"""
+        operations = rollup_operations(entries)
+        if not operations:
+            return 0
+        if not self._indexes_ready:
+            # The unique index keeps concurrent upserts from creating duplicate buckets
+            self.ensure_indexes()
+            self._indexes_ready = True
+        self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def series(self, scope: str, key: str, granularity: str,
+               first: Optional[str] = None, last: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The buckets of ``key`` from ``first`` to ``last`` (inclusive periods), oldest first"""
+        selector = {"scope": scope, "key": key, "granularity": granularity}
+        if first or last:
+            selector["period"] = {}
+            if first:
+                selector["period"]["$gte"] = first
+            if last:
+                selector["period"]["$lte"] = last
+        cursor = self.collection.find(selector, {"_id": 0, "period": 1, "downloads": 1, "total_size_download": 1})
+        return list(cursor.sort("period", ASCENDING))
@@ -0,0 +1,60 @@
+"""
+Normalized shadow fields for exact-match filters.
+
+A plain field filter such as ``keyword=Neutron`` is matched case-insensitively,
+which as a ``^value$`` regex with the ``i`` option cannot use a B-tree index. For
+the searchable fields of a collection a lower-cased, trimmed copy of every value
+is stored at ingest time under ``_norm.<field>``, so the same filter becomes an
+indexed equality on the shadow field.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+NORMALIZED_FIELD = "_norm"
+
+def normalize_value(value: Any) -> Optional[str]:
+    """The normalized (trimmed, lower-cased) form of a scalar value, or None if it has none"""
+    if value is None or isinstance(value, (dict, list, bool)):
+        return None
+    text = str(value).strip().lower()
+    return text or None
+
+def shadow_field(field: str) -> str:
+    """Name of the shadow field holding the normalized values of ``field``"""
+    return f"{NORMALIZED_FIELD}.{field}"
+
+def searchable_fields(field_docs: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Names of the top-level fields marked searchable in the ``fields`` collection.
+
+    A field is searchable when it has ``searchable: true`` or a ``searchable`` tag.
+    Dotted names are skipped: nested fields are matched with partial regexes and
+    never turn into exact-match filters.
+    """
+    names = set()
+    for doc in field_docs:
+        name = doc.get("name")
+        if not name or "." in name:
+            continue
+        if doc.get("searchable") is True or "searchable" in (doc.get("tags") or []):
+            names.add(name)
+    return sorted(names)
+
+def normalized_values(doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Build the ``_norm`` subdocument for ``doc``: one normalized value, or a sorted list, per field"""
+    shadow = {}
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, list):
+            values = sorted({v for v in (normalize_value(item) for item in value) if v is not None})
+            if values:
+                shadow[field] = values
+        else:
+            normalized = normalize_value(value)
+            if normalized is not None:
+                shadow[field] = normalized
+    return shadow
+
+def with_normalized_fields(doc: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Set ``_norm`` on a document before it is written; returns the document"""
+    doc[NORMALIZED_FIELD] = normalized_values(doc, fields)
+    return doc
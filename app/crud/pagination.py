@@ -0,0 +1,156 @@
+"""
+Keyset (cursor-based) pagination.
+
+Deep pages with ``skip`` cost O(skip) on the server. A keyset page instead starts
+right after the last document of the previous page: the continuation token holds
+that document's sort key values plus its ``_id`` (the tiebreaker that makes the
+order total), and the next page adds a range filter on those values instead of a
+skip.
+
+A client starts with ``cursor=*`` and then passes back the ``NextCursor`` of each
+response until it is null. Tokens are opaque base64; they are tied to the sort
+they were issued for and are rejected if the sort changes.
+
+Sort keys must be single-valued. MongoDB sorts an array by its smallest (or
+largest) element and a range filter on the array does not follow that order, so
+pages on an array field would repeat or skip documents; such sorts are rejected.
+"""
+import base64
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import json_util
+from pymongo import ASCENDING
+
+from app.middleware.exceptions import IllegalArgumentException
+
+# Value of the ``cursor`` parameter that requests the first keyset page
+START_CURSOR = "*"
+
+def keyset_sort(sort: Optional[List[Tuple[str, int]]]) -> List[Tuple[str, int]]:
+    """The requested sort with ``_id`` appended as a tiebreaker in the direction of the last key"""
+    sort = [(field, direction) for field, direction in (sort or []) if field != "_id"]
+    direction = sort[-1][1] if sort else ASCENDING
+    return sort + [("_id", direction)]
+
+def check_sort_fields(sort: List[Tuple[str, int]], array_fields: Iterable[str]) -> None:
+    """
+    Raises:
+        IllegalArgumentException: If a sort key is, or is inside, one of ``array_fields``
+    """
+    array_fields = frozenset(array_fields)
+    for field, _ in sort:
+        parts = field.split(".")
+        if any(".".join(parts[:i]) in array_fields for i in range(1, len(parts) + 1)):
+            raise IllegalArgumentException(f"Cannot page with a cursor on the array field '{field}'; "
+                                           f"sort on a single-valued field")
+
+def get_path(doc: Dict[str, Any], path: str) -> Any:
+    """
+    Value at a dotted ``path`` in ``doc``, or None when any part is missing
+
+    Raises:
+        IllegalArgumentException: If the value is, or sits inside, an array
+    """
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            break
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    if isinstance(value, list):
+        raise IllegalArgumentException(f"Cannot page with a cursor on the array field '{path}'; "
+                                       f"sort on a single-valued field")
+    return value
+
+def encode_cursor(doc: Dict[str, Any], sort: List[Tuple[str, int]]) -> str:
+    """
+    Build the continuation token for the page that follows ``doc``
+
+    Raises:
+        IllegalArgumentException: If one of ``doc``'s sort keys is an array
+    """
+    payload = {
+        "s": [[field, direction] for field, direction in sort],
+        "v": [get_path(doc, field) for field, _ in sort]
+    }
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode("utf-8")).decode("ascii")
+
+def decode_cursor(token: str, sort: List[Tuple[str, int]]) -> List[Any]:
+    """Return the sort key values stored in ``token``; the token must match ``sort``"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        issued_sort = [(field, direction) for field, direction in payload["s"]]
+        values = payload["v"]
+    except Exception:
+        raise IllegalArgumentException("Invalid cursor")
+    if issued_sort != sort or len(values) != len(sort):
+        raise IllegalArgumentException("Cursor does not match the requested sort order")
+    return values
+
+def _after(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """Condition for ``field`` coming strictly after ``value`` in ``direction``; None if nothing can"""
+    # MongoDB sorts null/missing before every other value
+    if direction == ASCENDING:
+        return {field: {"$ne": None}} if value is None else {field: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """
+    Query matching the documents after the ones with sort key ``values``.
+
+    For keys k1..kn this is the usual expansion
+    ``k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...``, with ``>`` meaning "after" in each
+    key's own direction.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        equal = [{sort[j][0]: values[j]} for j in range(i)]
+        branches.append({"$and": equal + [after]} if equal else after)
+    if not branches:
+        # Nothing can follow the last document
+        return {"_id": {"$exists": False}}
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+def keyset_projection(projection: Dict[str, int], sort: List[Tuple[str, int]]) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Make sure the sort keys are returned so the next token can be built.
+
+    Returns the adjusted projection and the fields that were added for the token
+    only, which have to be stripped from the documents before they are returned.
+    """
+    projection = dict(projection)
+    inclusion = any(v == 1 for k, v in projection.items() if k != "_id")
+    added = []
+    for field, _ in sort:
+        if inclusion and field != "_id":
+            if not any(field == f or field.startswith(f + ".") for f, v in projection.items() if v == 1):
+                projection[field] = 1
+                added.append(field)
+        elif projection.get(field) == 0:
+            del projection[field]
+            added.append(field)
+    return projection, added
+
+def strip_fields(doc: Dict[str, Any], fields: List[str]) -> None:
+    """Remove fields (dotted paths allowed) from ``doc``, dropping parents left empty"""
+    for field in fields:
+        parts = field.split(".")
+        parents = [doc]
+        for part in parts[:-1]:
+            child = parents[-1].get(part) if isinstance(parents[-1], dict) else None
+            if not isinstance(child, dict):
+                break
+            parents.append(child)
+        else:
+            parents[-1].pop(parts[-1], None)
+            for depth in range(len(parents) - 1, 0, -1):
+                if not parents[depth]:
+                    parents[depth - 1].pop(parts[depth - 1], None)
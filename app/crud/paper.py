@@ -0,0 +1,166 @@
+"""
+Client for the NIST Papers (NPS) publication search API.
+
+Searches go through one pooled ``httpx.AsyncClient`` with connect and read
+timeouts, so a request never blocks the event loop and connections are reused.
+Upstream results are cached per ``(searchphrase, from_date)``: within
+``PAPERS_CACHE_TTL`` they are served from memory, and for ``PAPERS_CACHE_STALE_TTL``
+after that the stale copy is served while a single background request refreshes
+it. Identical searches arriving while an upstream request is in flight wait for
+that request instead of issuing their own.
+"""
+import asyncio
+import logging
+import ssl
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.crud.singleflight import SingleFlight
+from app.middleware.exceptions import InternalServerException
+
+logger = logging.getLogger(__name__)
+
+PAPERS_API_HEADERS = {
+    "accept": "application/json",
+    "Content-Type": "application/json; x-api-version=1.0"
+}
+CERT_PATH = Path(__file__).parent.parent / "certificates" / "nist_cert.crt"
+
+class PaperClient:
+    """Pooled, cached and coalescing client for the Papers API"""
+
+    def __init__(self, url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 verify: Any = None):
+        """
+        Args:
+            url: Search endpoint, defaults to ``PAPERS_API_URL``
+            transport: Transport to use instead of the network, such as an
+                ``httpx.ASGITransport`` around the stub server
+            verify: TLS verification; defaults to the NIST certificate bundle
+        """
+        self.url = url or settings.PAPERS_API_URL
+        self.transport = transport
+        self.verify = verify
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._flights = SingleFlight()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0,
+                          "refreshes": 0, "upstream_requests": 0, "upstream_errors": 0}
+
+    def _verify(self) -> Any:
+        if self.verify is not None:
+            return self.verify
+        if not CERT_PATH.exists():
+            logger.error(f"Certificate file not found: {CERT_PATH}")
+            raise InternalServerException("Certificate file not found")
+        return ssl.create_default_context(cafile=str(CERT_PATH))
+
+    def _http(self) -> httpx.AsyncClient:
+        """
+        The pooled client for the running event loop.
+
+        Connections belong to the loop they were opened on, so a client left over
+        from another loop is replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            kwargs = {"transport": self.transport} if self.transport is not None else {"verify": self._verify()}
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.PAPERS_API_TIMEOUT, connect=settings.PAPERS_API_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=settings.PAPERS_API_MAX_CONNECTIONS,
+                                    max_keepalive_connections=settings.PAPERS_API_MAX_CONNECTIONS),
+                headers=PAPERS_API_HEADERS,
+                **kwargs)
+            self._loop = loop
+        return self._client
+
+    async def search(self, searchphrase: Optional[str], from_date: str) -> List[Dict[str, Any]]:
+        """
+        All publications matching ``searchphrase`` since ``from_date``.
+
+        The returned list is shared with the cache and must not be modified.
+
+        Raises:
+            InternalServerException: If the Papers API cannot be reached or returns an error
+        """
+        key = (searchphrase or "", from_date)
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < settings.PAPERS_CACHE_TTL:
+                self._counters["hits"] += 1
+                self._cache.move_to_end(key)
+                return entry[1]
+            if age < settings.PAPERS_CACHE_TTL + settings.PAPERS_CACHE_STALE_TTL:
+                self._counters["stale_hits"] += 1
+                self._cache.move_to_end(key)
+                client = self._http()
+                if not self._flights.in_flight(key):
+                    self._counters["refreshes"] += 1
+                    self._flights.start(key, lambda: self._fetch(client, key)).add_done_callback(self._log_refresh_failure)
+                return entry[1]
+        self._counters["misses"] += 1
+        client = self._http()
+        return await self._flights.do(key, lambda: self._fetch(client, key))
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh of papers search failed, serving stale results: {task.exception()}")
+
+    async def _fetch(self, client: httpx.AsyncClient, key: Tuple[str, str]) -> List[Dict[str, Any]]:
+        """Run one upstream search and cache its result"""
+        papers = await self._post(client, *key)
+        self._store(key, papers)
+        return papers
+
+    async def fetch(self, searchphrase: str, from_date: str) -> List[Dict[str, Any]]:
+        """One upstream search, bypassing the cache (used by the mirror sync)"""
+        return await self._post(self._http(), searchphrase, from_date)
+
+    async def _post(self, client: httpx.AsyncClient, searchphrase: str, from_date: str) -> List[Dict[str, Any]]:
+        payload = {"searchString": searchphrase, "fromDate": f"{from_date}T00:00:00.000Z"}
+        self._counters["upstream_requests"] += 1
+        try:
+            response = await client.post(self.url, json=payload)
+        except httpx.HTTPError as e:
+            self._counters["upstream_errors"] += 1
+            logger.error(f"Failed to connect to Papers API: {e!r}")
+            raise InternalServerException(f"Failed to connect to Papers API: {e!r}")
+        if response.status_code != 200:
+            self._counters["upstream_errors"] += 1
+            logger.error(f"Papers API error: {response.status_code}")
+            raise InternalServerException(f"Error from Papers API: {response.status_code}")
+        return response.json() or []
+
+    def _store(self, key: Tuple[str, str], papers: List[Dict[str, Any]]) -> None:
+        if settings.PAPERS_CACHE_TTL <= 0:
+            return
+        self._cache[key] = (time.monotonic(), papers)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.PAPERS_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached search"""
+        self._cache.clear()
+
+    async def close(self) -> None:
+        """Close the pooled connections"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache and upstream counters"""
+        return {**self._counters, "coalesced": self._flights.coalesced, "entries": len(self._cache),
+                "inflight": len(self._flights)}
+
+# Create singleton instance
+paper_client = PaperClient()
@@ -0,0 +1,158 @@
+"""
+Local MongoDB mirror of the NIST Papers (NPS) publications.
+
+A sync copies publications from the Papers API into ``PAPERS_COLLECTION`` so
+``/papers`` can search and page them through the normal ``BaseCRUD.search``
+path instead of waiting on the external service. The API only takes a lower
+date bound, so a sync asks for everything published since the newest mirrored
+date, less ``PAPERS_MIRROR_OVERLAP_DAYS`` to pick up late additions and
+corrections, and upserts the results. The first sync starts at
+``PAPERS_MIRROR_START_DATE``; a full sync re-fetches from there and also drops
+publications the API no longer returns.
+
+Mirror bookkeeping is kept under ``_mirror`` in each document: a stable key, the
+publication date as ``YYYY-MM-DD`` and the time of the last sync that saw it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from app.config import settings
+from app.crud.base import BaseCRUD
+from app.crud.paper import PaperClient, paper_client
+from app.database import ensure_text_search_index, parse_text_weights
+
+logger = logging.getLogger(__name__)
+
+MIRROR_FIELD = "_mirror"
+
+# Field names the publication id and date may be returned under
+ID_FIELDS = ("id", "publicationId", "pubId", "doi")
+DATE_FIELDS = ("publishedDate", "publicationDate", "issueDate", "date")
+
+SYNC_BATCH_SIZE = 1000
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def mirror_key(paper: Dict[str, Any]) -> str:
+    """A stable key for a publication: its id, or a digest of its content when it has none"""
+    for field in ID_FIELDS:
+        value = paper.get(field)
+        if value not in (None, ""):
+            return f"{field}:{value}"
+    return "sha1:" + hashlib.sha1(json.dumps(paper, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def mirror_date(paper: Dict[str, Any]) -> str:
+    """The publication date as ``YYYY-MM-DD``, or an empty string"""
+    for field in DATE_FIELDS:
+        value = paper.get(field)
+        if isinstance(value, str) and _DATE.match(value):
+            return value[:10]
+    return ""
+
+class PaperMirrorCRUD(BaseCRUD):
+    internal_fields = (MIRROR_FIELD,)
+
+    def __init__(self):
+        super().__init__(settings.PAPERS_COLLECTION)
+        self._indexes_ready = False
+        # Outcome of the most recent sync, for the debug endpoint
+        self.last_sync: Optional[Dict[str, Any]] = None
+
+    def _process_search_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Search parameters of the ``/papers`` endpoint.
+
+        ``from_date`` filters on the publication date, and ``skip``/``limit`` are a
+        plain offset window like on the live API. Results are newest first.
+        """
+        rest = {key: value for key, value in kwargs.items() if key not in ("from_date", "skip")}
+        processed = super()._process_search_params(rest)
+        if kwargs.get("from_date"):
+            condition = {f"{MIRROR_FIELD}.date": {"$gte": str(kwargs["from_date"])}}
+            processed["query"] = {"$and": [processed["query"], condition]} if processed["query"] else condition
+        processed["skip"] = int(kwargs.get("skip") or 0)
+        if not processed["sort"]:
+            processed["sort"] = [(f"{MIRROR_FIELD}.date", DESCENDING), (f"{MIRROR_FIELD}.key", ASCENDING)]
+        return processed
+
+    async def document_count(self) -> int:
+        """Publications in the mirror (estimated)"""
+        return await self.async_collection.estimated_document_count()
+
+    def ensure_indexes(self) -> None:
+        """The weighted text index for ``searchphrase`` and the sync/sort indexes"""
+        ensure_text_search_index(self.collection, parse_text_weights(settings.PAPERS_MIRROR_TEXT_WEIGHTS))
+        self.collection.create_index([(f"{MIRROR_FIELD}.key", ASCENDING)], unique=True)
+        self.collection.create_index([(f"{MIRROR_FIELD}.date", DESCENDING), (f"{MIRROR_FIELD}.key", ASCENDING)])
+        self.collection.create_index([(f"{MIRROR_FIELD}.synced", ASCENDING)])
+
+    async def _sync_from(self) -> str:
+        """The lower date bound for an incremental sync"""
+        newest = await self.async_collection.find_one(
+            {f"{MIRROR_FIELD}.date": {"$gt": ""}}, {f"{MIRROR_FIELD}.date": 1},
+            sort=[(f"{MIRROR_FIELD}.date", DESCENDING)])
+        if not newest:
+            return settings.PAPERS_MIRROR_START_DATE
+        since = date.fromisoformat(newest[MIRROR_FIELD]["date"]) - timedelta(days=settings.PAPERS_MIRROR_OVERLAP_DAYS)
+        return max(since.isoformat(), settings.PAPERS_MIRROR_START_DATE)
+
+    async def sync(self, client: Optional[PaperClient] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Copy new and changed publications from the Papers API into the mirror.
+
+        Returns when the sync ran, the date it started from and the number of
+        publications fetched, upserted and (on a full sync) removed.
+        """
+        client = client or paper_client
+        if not self._indexes_ready:
+            await asyncio.to_thread(self.ensure_indexes)
+            self._indexes_ready = True
+
+        since = settings.PAPERS_MIRROR_START_DATE if full else await self._sync_from()
+        started = datetime.now(timezone.utc)
+        papers = await client.fetch("", since)
+
+        upserted = 0
+        for start in range(0, len(papers), SYNC_BATCH_SIZE):
+            upserted += await self._upsert(papers[start:start + SYNC_BATCH_SIZE], started)
+        removed = 0
+        # An empty answer is more likely an upstream problem than every publication withdrawn
+        if full and papers:
+            result = await self.async_collection.delete_many({f"{MIRROR_FIELD}.synced": {"$lt": started}})
+            removed = result.deleted_count
+        self.invalidate_cache()
+        logger.info(f"Synced papers mirror from {since}: {len(papers)} fetched, {upserted} upserted, {removed} removed")
+        self.last_sync = {"at": started.isoformat(), "from": since, "fetched": len(papers),
+                          "upserted": upserted, "removed": removed}
+        return self.last_sync
+
+    async def _upsert(self, papers: List[Dict[str, Any]], synced: datetime) -> int:
+        operations = []
+        for paper in papers:
+            key = mirror_key(paper)
+            doc = {k: v for k, v in paper.items() if k != "_id"}
+            doc[MIRROR_FIELD] = {"key": key, "date": mirror_date(paper), "synced": synced}
+            operations.append(ReplaceOne({f"{MIRROR_FIELD}.key": key}, doc, upsert=True))
+        if not operations:
+            return 0
+        result = await self.async_collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+async def maintain_paper_mirror(crud: PaperMirrorCRUD, client: PaperClient, interval: int) -> None:
+    """Background task: sync the mirror every ``interval`` seconds, starting right away"""
+    while True:
+        try:
+            await crud.sync(client)
+        except Exception as e:
+            logger.error(f"Error syncing papers mirror: {e}")
+        await asyncio.sleep(interval)
+
+# Create singleton instance
+paper_mirror_crud = PaperMirrorCRUD()
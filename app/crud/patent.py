@@ -46,6 +46,29 @@ class PatentCRUD(BaseCRUD):
                 }
             raise ValueError("Patent not found")
 
+    async def get_async(self, patent_id: str) -> dict:
+        """
+        Get a single patent by ID or patent number without blocking the event loop.
+
+        Args:
+            patent_id (str): The ID or patent number to retrieve
+
+        Returns:
+            dict: The patent data with metrics
+        """
+        try:
+            return await super().get_async(patent_id)
+        except:
+            result = await self.search_async(**{"Patent #": patent_id})
+            if result["ResultCount"] > 0:
+                return {
+
+                    "ResultCount": 1,
+                    "ResultData": result["ResultData"][0],
+                    "Metrics": result["Metrics"]
+                }
+            raise ValueError("Patent not found")
+
     def search(self, **kwargs) -> dict:
         """
         Search patents with various criteria.
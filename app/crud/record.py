@@ -1,62 +1,187 @@
 import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from app.crud.base import BaseCRUD
+from app.crud.taxonomy import taxonomy_crud
 from app.config import settings
 import logging
-import re
+from urllib.parse import unquote
+from app.crud.identifiers import LOOKUP_KEYS_FIELD, lookup_query, with_lookup_keys
+from app.crud.normalized import NORMALIZED_FIELD, searchable_fields, with_normalized_fields
 from app.middleware.exceptions import InternalServerException, ResourceNotFoundException
+from app.middleware.request_processor import ARRAY_FIELDS, expand_topics_requested, field_condition
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RecordCRUD(BaseCRUD):
+    internal_fields = (LOOKUP_KEYS_FIELD, NORMALIZED_FIELD)
+    array_fields = ARRAY_FIELDS + ("@context", "@type", "_extensionSchemas", "bureauCode", "description",
+                                   "inventory", "keyword", "language", "programCode", "theme")
+
     def __init__(self):
         super().__init__(settings.RECORDS_COLLECTION)
 
+    def searchable_fields(self) -> list:
+        """Names of the record fields marked searchable in the fields collection"""
+        fields = self.collection.database[settings.FIELDS_COLLECTION]
+        return searchable_fields(fields.find({}, {"_id": 0, "name": 1, "searchable": 1, "tags": 1}))
+
+    def load_normalized_fields(self) -> None:
+        """
+        Compile exact-match filters on the searchable fields to ``_norm`` equality.
+
+        Only enabled with ``NORMALIZED_FILTERS``, since records written before the
+        shadow fields existed need ``backfill_normalized_fields`` to be run first.
+        """
+        if not settings.NORMALIZED_FILTERS:
+            return
+        self.normalized_fields = frozenset(self.searchable_fields())
+        logger.info(f"Normalized exact-match filters enabled for: {sorted(self.normalized_fields)}")
+
+    def create(self, data: dict) -> dict:
+        """Insert a record along with its lookup keys and normalized shadow fields"""
+        with_lookup_keys(data)
+        with_normalized_fields(data, self.searchable_fields())
+        result = super().create(data)
+        if self.text_index is not None:
+            self.text_index.add(data)
+        for field in self.internal_fields:
+            result["ResultData"].pop(field, None)
+        return result
+
+    def _process_search_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        With ``expandTopics=true``, a ``topic.tag`` filter also matches records tagged
+        with any term below it in the taxonomy.
+
+        Each value is expanded through the taxonomy tree to the path labels of its
+        subtree and matched with a single ``$in``; values the taxonomy does not know
+        keep the usual partial match. The other parameters are compiled together with
+        ``topic.tag`` as usual, so they match exactly as they would without expansion;
+        only the ``topic.tag`` condition itself is swapped for the expanded one.
+        """
+        processed = super()._process_search_params(kwargs)
+        if not self._expands_topics(kwargs):
+            return processed
+        condition = self._expanded_topics(str(kwargs["topic.tag"]))
+        processed["query"] = self._replace_topic_condition(processed["query"], condition)
+        logger.info(f"Expanded topic query: {processed['query']}")
+        return processed
+
+    @classmethod
+    def _replace_topic_condition(cls, query: Any, condition: Dict[str, Any]) -> Any:
+        """A copy of ``query`` with its ``topic.tag`` condition replaced by ``condition``"""
+        if isinstance(query, dict):
+            if set(query) == {"topic.tag"}:
+                return condition
+            return {key: cls._replace_topic_condition(value, condition) if key in ("$and", "$or") else value
+                    for key, value in query.items()}
+        if isinstance(query, list):
+            return [cls._replace_topic_condition(item, condition) for item in query]
+        return query
+
+    @staticmethod
+    def _expands_topics(kwargs: Dict[str, Any]) -> bool:
+        return expand_topics_requested(kwargs) and bool(kwargs.get("topic.tag"))
+
+    def _expanded_topics(self, value: str) -> Dict[str, Any]:
+        """The ``topic.tag`` condition for comma-separated terms and all their descendants"""
+        # Validates the value (null bytes, list length) the same way as without expansion
+        field_condition("topic.tag", value)
+        # Refreshed by the search entry points (see _refresh_topics), only read here
+        tree = taxonomy_crud.current_tree()
+        tags, unknown = [], []
+        for term in (term.strip() for term in value.split(",")):
+            if term:
+                expanded = tree.descendant_tags(term)
+                if expanded:
+                    tags.extend(expanded)
+                else:
+                    unknown.append(term)
+        conditions = []
+        if tags:
+            conditions.append({"topic.tag": {"$in": list(dict.fromkeys(tags))}})
+        if unknown:
+            conditions.append(field_condition("topic.tag", ",".join(unknown)))
+        return conditions[0] if len(conditions) == 1 else {"$or": conditions}
+
+    async def _refresh_topics(self, kwargs: Dict[str, Any]) -> None:
+        """Bring the taxonomy tree up to date off the event loop before a search expands topics"""
+        if self._expands_topics(kwargs):
+            await taxonomy_crud.tree_async()
+
+    async def search_async(self, **kwargs) -> dict:
+        await self._refresh_topics(kwargs)
+        return await super().search_async(**kwargs)
+
+    async def cached_search_async(self, **kwargs) -> Optional[Dict[str, Any]]:
+        await self._refresh_topics(kwargs)
+        return await super().cached_search_async(**kwargs)
+
+    async def open_search_stream_async(self, **kwargs) -> Tuple[Optional[Dict[str, Any]], AsyncIterator[bytes]]:
+        await self._refresh_topics(kwargs)
+        return await super().open_search_stream_async(**kwargs)
+
+    async def export_async(self, after: Optional[str] = None, **kwargs) -> AsyncIterator[bytes]:
+        await self._refresh_topics(kwargs)
+        return await super().export_async(after, **kwargs)
+
     def get(self, record_id: str) -> dict:
         """Get a single record by @ID, EDIID, or ARK identifier"""
         start_time = time.time()
         print('Getting record with ID:', record_id)
         try:
-            # URL decode the record_id (convert %3A back to :)
-            from urllib.parse import unquote
-            decoded_id = unquote(record_id)
-            
-            # Build query conditions similar to metrics lookup
-            query_conditions = [
-                {"ediid": decoded_id},
-                {"@id": decoded_id}
-            ]
-            
-            # If the ID doesn't start with "ark:", try additional patterns
-            if not decoded_id.startswith("ark:"):
-                query_conditions.extend([
-                    {"@id": f"ark:{decoded_id}"},  # Try with ark: prefix
-                    {"ediid": {"$regex": f".*{re.escape(decoded_id)}$"}},  # Match at end of ediid
-                    {"@id": {"$regex": f".*{re.escape(decoded_id)}$"}}     # Match at end of @id
-                ])
-            
+            query, decoded_id = self._record_query(record_id)
+
             # Execute the query
             query_result = self.collection.find_one(
-                {"$or": query_conditions},
-                {"_id": 0}  # Use dict format for projection
+                query,
+                self._record_projection()
             )
-            
-            if query_result:
-                return {
-                    "ResultCount": 1,
-                    "ResultData": [query_result],
-                    "Metrics": {"ElapsedTime": time.time() - start_time}
-                }
-
-            raise ResourceNotFoundException(f"Record with ID {decoded_id} not found")
-                    
+            return self._record_result(query_result, decoded_id, start_time)
+
         except ResourceNotFoundException:
             raise
         except Exception as e:
             logger.error(f"Error retrieving record: {e}")
             raise InternalServerException(f"Failed to retrieve record: {str(e)}")
-        
+
+    async def get_async(self, record_id: str) -> dict:
+        """Get a single record by @ID, EDIID, or ARK identifier without blocking the event loop"""
+        start_time = time.time()
+        try:
+            query, decoded_id = self._record_query(record_id)
+            query_result = await self.async_collection.find_one(query, self._record_projection())
+            return self._record_result(query_result, decoded_id, start_time)
+
+        except ResourceNotFoundException:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving record: {e}")
+            raise InternalServerException(f"Failed to retrieve record: {str(e)}")
+
+    def _record_projection(self) -> dict:
+        """Projection for single-record lookups: no _id and no internal fields"""
+        return {"_id": 0, **{field: 0 for field in self.internal_fields}}
+
+    def _record_query(self, record_id: str) -> tuple:
+        """Build the lookup query for a record identifier; returns (query, decoded_id)"""
+        # URL decode the record_id (convert %3A back to :)
+        decoded_id = unquote(record_id)
+        return lookup_query(decoded_id), decoded_id
+
+    def _record_result(self, query_result, decoded_id: str, start_time: float) -> dict:
+        """Wrap a found record in the result envelope or raise if nothing matched"""
+        if query_result:
+            return {
+                "ResultCount": 1,
+                "ResultData": [query_result],
+                "Metrics": {"ElapsedTime": time.time() - start_time}
+            }
+
+        raise ResourceNotFoundException(f"Record with ID {decoded_id} not found")
+
     def get_all(self, skip: int = 0, limit: int = 10) -> dict:
         """
         Get multiple records with pagination.
@@ -80,6 +205,8 @@ class RecordCRUD(BaseCRUD):
         Returns:
             dict: Search results with metrics
         """
+        if self._expands_topics(kwargs):
+            taxonomy_crud.tree()
         return super().search(**kwargs)
 
 # Create singleton instance
@@ -0,0 +1,187 @@
+"""
+Response cache for search results.
+
+Identical searches are answered from memory instead of re-running the MongoDB
+query. Entries are keyed on the collection name and the normalized search
+parameters, so ``?include=title,doi&size=10`` and ``?size=10&include=doi,title``
+share one entry. Since the key ignores parameter order, searches are still
+validated by the request processor (cheap with the plan cache) before the lookup.
+
+``ResponseCache`` is the interface ``BaseCRUD`` talks to. ``MemoryResponseCache``
+is the in-process implementation; another backend (e.g. Redis) can be plugged in
+with ``set_response_cache``.
+"""
+import abc
+import json
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from bson import json_util
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Parameters holding comma-separated field lists whose order does not change the result
+UNORDERED_LIST_PARAMS = ("include", "exclude")
+
+# Parameters that never affect the result body (``stream`` only changes how it is sent)
+IGNORED_PARAMS = ("", "stream")
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """
+    Normalize search parameters into a cache key.
+
+    Parameter order is ignored, empty parameters are dropped and the tokens of
+    ``include``/``exclude`` are de-duplicated and sorted. Everything else,
+    including the order of ``sort.asc``/``sort.desc`` fields, is kept as given.
+    """
+    items = []
+    for key, value in params.items():
+        if key in IGNORED_PARAMS or value is None or value == "":
+            continue
+        value = str(value).strip()
+        if key in UNORDERED_LIST_PARAMS:
+            value = ",".join(sorted({token.strip() for token in value.split(",") if token.strip()}))
+        items.append((key, value))
+    return json.dumps(sorted(items), separators=(",", ":"))
+
+class ResponseCache(abc.ABC):
+    """Interface for search response caches; backends must implement every method"""
+
+    @abc.abstractmethod
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for ``key`` in ``collection``, or None; the caller owns the copy"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, collection: str, key: str, value: Dict[str, Any]) -> None:
+        """Store a copy of a response for ``key`` in ``collection``; later changes to ``value`` are not seen"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        """Drop every entry for ``collection``, or all entries when it is None"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        raise NotImplementedError
+
+class NullResponseCache(ResponseCache):
+    """Cache that stores nothing; used when caching is disabled"""
+
+    def get(self, collection, key):
+        return None
+
+    def set(self, collection, key, value):
+        pass
+
+    def invalidate(self, collection=None):
+        pass
+
+    def stats(self):
+        return {"enabled": False}
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Thread-safe in-process LRU cache with a TTL and a memory budget.
+
+    Entries are stored as their Extended JSON encoding (``bson.json_util``, so
+    ObjectIds and dates survive) and decoded on every hit. Callers therefore
+    always get their own copy and can never alter a cached response, and the
+    size of an entry is exactly its encoded length. Least recently used entries
+    are evicted once ``max_bytes`` is exceeded, and entries larger than
+    ``max_entry_bytes`` are not cached at all.
+    """
+
+    def __init__(self, ttl: float = 60, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: Optional[int] = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, collection: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get((collection, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, encoded = entry
+            if time.monotonic() >= expires_at:
+                self._remove((collection, key))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end((collection, key))
+            self.hits += 1
+        return json_util.loads(encoded)
+
+    def set(self, collection: str, key: str, value: Dict[str, Any]) -> None:
+        encoded = json_util.dumps(value)
+        size = len(encoded)
+        if size > self.max_entry_bytes:
+            logger.debug(f"Not caching {collection} response of {size} bytes")
+            return
+        with self._lock:
+            if (collection, key) in self._entries:
+                self._remove((collection, key))
+            self._entries[(collection, key)] = (time.monotonic() + self.ttl, size, encoded)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        with self._lock:
+            if collection is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for entry_key in [k for k in self._entries if k[0] == collection]:
+                self._remove(entry_key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes
+            }
+
+    def _remove(self, entry_key: Tuple[str, str]) -> None:
+        _, size, _ = self._entries.pop(entry_key)
+        self._bytes -= size
+
+def _create_default_cache() -> ResponseCache:
+    if settings.RESPONSE_CACHE_TTL <= 0:
+        return NullResponseCache()
+    return MemoryResponseCache(settings.RESPONSE_CACHE_TTL, settings.RESPONSE_CACHE_MAX_BYTES)
+
+_response_cache: ResponseCache = _create_default_cache()
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    return _response_cache
+
+def set_response_cache(cache: ResponseCache) -> None:
+    """Replace the process-wide response cache, e.g. with a shared backend"""
+    global _response_cache
+    _response_cache = cache
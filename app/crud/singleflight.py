@@ -0,0 +1,57 @@
+"""
+Coalescing of identical concurrent calls ("singleflight").
+
+While a call for a key is in flight, further calls for the same key wait for it
+and share its result (or exception) instead of starting their own. The call runs
+as its own task, so a caller that goes away (e.g. a client disconnecting) does
+not cancel it for the others. Nothing is kept once the call finishes; caching
+results is left to the caller.
+"""
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class SingleFlight:
+    """In-flight calls by key, with counters of executions and coalesced callers"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def _running(self, key: Hashable) -> Optional[asyncio.Task]:
+        task = self._calls.get(key)
+        # Tasks belong to their event loop; one left over from another loop cannot be joined
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for ``key`` is running on the current event loop"""
+        return self._running(key) is not None
+
+    def start(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """The task running the call for ``key``; ``call`` is only invoked when none is in flight"""
+        task = self._running(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        self.executions += 1
+        task = asyncio.ensure_future(call())
+        self._calls[key] = task
+        task.add_done_callback(partial(self._finished, key))
+        return task
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``call`` for ``key``, or wait for the identical call already in flight"""
+        return await asyncio.shield(self.start(key, call))
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,401 @@
+"""
+In-memory snapshots of small, nearly static collections.
+
+``fields``, ``taxonomy``, ``apis``, ``versions``, ``releasesets`` and ``patents``
+hold at most a few thousand documents and rarely change, so each worker keeps a
+full copy of them and answers searches by evaluating the compiled query plan
+(filter, projection, sort, skip/limit) locally instead of going to MongoDB.
+
+The evaluator covers the operators the request processor generates. Anything
+else (``$text`` searches, ``$meta`` projections, keyset pages, unknown operators)
+raises ``UnsupportedQuery`` and the search goes to MongoDB as before, as does
+every search while a snapshot is not loaded.
+
+The evaluator only approximates MongoDB, so snapshots are off by default
+(``MEMORY_SNAPSHOTS_ENABLED``). Known differences:
+
+- Regexes run on Python's ``re`` instead of PCRE. The processor's escaped
+  literals behave the same, but case-insensitive matching of non-ASCII letters
+  and PCRE-only syntax can differ.
+- String sorts approximate the ``en`` collation used by ``BaseCRUD``
+  (case-insensitive first, numbers by value, punctuation ignored). ICU can order
+  ligatures, non-Latin scripts, ignorable characters and ties differently.
+- Embedded documents sort by their string form, not field by field as in BSON,
+  and types without a BSON rank here (e.g. ``Decimal128``) sort last.
+
+Results may therefore come back in a different order, or a borderline document
+may match differently, than from MongoDB.
+
+A snapshot is reloaded when the collection's version signature (document count
+and newest ``_id``) changes, on a fixed schedule to catch in-place updates, and
+after every write through the API, which also drops it until it is reloaded.
+"""
+import asyncio
+import copy
+import logging
+import re
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from bson.regex import Regex
+
+logger = logging.getLogger(__name__)
+
+class UnsupportedQuery(Exception):
+    """A query the snapshot cannot evaluate; the caller should ask MongoDB instead"""
+
+_REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+def _compile(pattern: Any, options: str = "") -> "re.Pattern":
+    """A Python pattern for a bson Regex, a compiled pattern or a ``$regex`` string"""
+    if isinstance(pattern, Regex):
+        return pattern.try_compile()
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option in options or "":
+        flags |= _REGEX_FLAGS.get(option, 0)
+    return re.compile(pattern, flags)
+
+def _is_regex(value: Any) -> bool:
+    return isinstance(value, (Regex, re.Pattern))
+
+def _resolve(doc: Any, path: str) -> List[Any]:
+    """Values at a dotted ``path``, descending into arrays of documents like MongoDB does"""
+    head, _, rest = path.partition(".")
+    if isinstance(doc, list):
+        return [value for item in doc for value in _resolve(item, path)]
+    if not isinstance(doc, dict) or head not in doc:
+        return []
+    value = doc[head]
+    return _resolve(value, rest) if rest else [value]
+
+def _candidates(values: List[Any]) -> Iterable[Any]:
+    """Each value, and each element of array values, as compared by query operators"""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+def _equals(candidate: Any, expected: Any) -> bool:
+    if _is_regex(expected):
+        return isinstance(candidate, str) and _compile(expected).search(candidate) is not None
+    if isinstance(expected, bool) or isinstance(candidate, bool):
+        return type(candidate) is type(expected) and candidate == expected
+    return candidate == expected
+
+def _comparable(candidate: Any, bound: Any) -> bool:
+    """Range operators only compare values of the same kind"""
+    numbers = (int, float)
+    if isinstance(bound, bool) or isinstance(candidate, bool):
+        return False
+    if isinstance(bound, numbers):
+        return isinstance(candidate, numbers)
+    for kind in (str, datetime, ObjectId):
+        if isinstance(bound, kind):
+            return isinstance(candidate, kind)
+    return False
+
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+def _is_operator_doc(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(str(k).startswith("$") for k in condition)
+
+def _apply(operator: str, argument: Any, values: List[Any], condition: Dict[str, Any]) -> bool:
+    """Whether the resolved ``values`` of a field satisfy one operator"""
+    if operator == "$eq":
+        return _matches_value(values, argument)
+    if operator == "$ne":
+        return not _matches_value(values, argument)
+    if operator == "$in":
+        return any(_matches_value(values, expected) for expected in argument)
+    if operator == "$nin":
+        return not any(_matches_value(values, expected) for expected in argument)
+    if operator in _COMPARISONS:
+        compare = _COMPARISONS[operator]
+        return any(_comparable(c, argument) and compare(c, argument) for c in _candidates(values))
+    if operator == "$exists":
+        return bool(values) == bool(argument)
+    if operator == "$regex":
+        pattern = _compile(argument, condition.get("$options", ""))
+        return any(isinstance(c, str) and pattern.search(c) for c in _candidates(values))
+    if operator == "$options":
+        return True
+    if operator == "$not":
+        if _is_regex(argument):
+            return not _matches_value(values, argument)
+        return not all(_apply(op, arg, values, argument) for op, arg in argument.items())
+    if operator == "$elemMatch":
+        for value in values:
+            if not isinstance(value, list):
+                continue
+            for element in value:
+                if _is_operator_doc(argument):
+                    if all(_apply(op, arg, [element], argument) for op, arg in argument.items()):
+                        return True
+                elif isinstance(element, dict) and match(element, argument):
+                    return True
+        return False
+    raise UnsupportedQuery(f"Operator {operator} is not supported in memory")
+
+def _matches_value(values: List[Any], expected: Any) -> bool:
+    """Equality (or regex) match against any value or array element; None also matches a missing field"""
+    if expected is None and not values:
+        return True
+    return any(_equals(candidate, expected) for candidate in _candidates(values))
+
+def match(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Whether ``doc`` matches a MongoDB ``query``; raises UnsupportedQuery for what is not covered"""
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(match(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(match(doc, sub) for sub in condition):
+                return False
+        elif key.startswith("$"):
+            raise UnsupportedQuery(f"Operator {key} is not supported in memory")
+        else:
+            values = _resolve(doc, key)
+            if _is_operator_doc(condition):
+                if not all(_apply(op, arg, values, condition) for op, arg in condition.items()):
+                    return False
+            elif not _matches_value(values, condition):
+                return False
+    return True
+
+def _path_tree(paths: Iterable[str]) -> Dict[str, Any]:
+    """Nest dotted paths: ``["a.b", "c"]`` -> ``{"a": {"b": {}}, "c": {}}``"""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+def _include(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_include(item, tree) for item in value if isinstance(item, (dict, list))]
+    result = {}
+    for key, subtree in tree.items():
+        if key in value:
+            if not subtree:
+                result[key] = value[key]
+            elif isinstance(value[key], (dict, list)):
+                result[key] = _include(value[key], subtree)
+    return result
+
+def _exclude(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_exclude(item, tree) if isinstance(item, (dict, list)) else item for item in value]
+    result = {}
+    for key, item in value.items():
+        subtree = tree.get(key)
+        if subtree is None:
+            result[key] = item
+        elif subtree and isinstance(item, (dict, list)):
+            result[key] = _exclude(item, subtree)
+        elif subtree:
+            result[key] = item
+    return result
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply an inclusion or exclusion ``projection``; returns a new top-level document"""
+    if not projection:
+        return dict(doc)
+    if any(not isinstance(v, (int, bool)) for v in projection.values()):
+        raise UnsupportedQuery("Only plain inclusion/exclusion projections are supported in memory")
+    keep_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if any(fields.values()):
+        result = _include(doc, _path_tree(k for k, v in fields.items() if v))
+        if keep_id and "_id" in doc:
+            result = {"_id": doc["_id"], **result}
+    else:
+        result = _exclude(doc, _path_tree(fields))
+        if not keep_id:
+            result.pop("_id", None)
+    return result
+
+# BSON comparison order of types, for sorting mixed values
+_TYPE_RANK = {type(None): 1, int: 2, float: 2, str: 3, dict: 4, list: 5, ObjectId: 6, bool: 7, datetime: 8}
+
+_CHUNK_RE = re.compile(r"\d+|[^\W\d_]")
+
+def _string_key(value: str) -> Tuple:
+    """
+    Approximate the ``en`` collation (strength 3, numeric ordering, punctuation
+    ignored): base letters first, then accents, then case with lower case first.
+    """
+    chunks = _CHUNK_RE.findall(value)
+    primary, secondary, tertiary = [], [], []
+    for chunk in chunks:
+        if chunk.isdigit():
+            primary.append((0, int(chunk), ""))
+            continue
+        folded = chunk.casefold()
+        base = "".join(c for c in unicodedata.normalize("NFD", folded) if not unicodedata.combining(c))
+        primary.append((1, 0, base))
+        secondary.append(folded)
+        tertiary.append(1 if chunk.isupper() else 0)
+    return tuple(primary), tuple(secondary), tuple(tertiary)
+
+def _value_key(value: Any) -> Tuple:
+    rank = _TYPE_RANK.get(type(value), 9)
+    if value is None:
+        return rank, ""
+    if isinstance(value, str):
+        return rank, _string_key(value)
+    if isinstance(value, (int, float, datetime, ObjectId, bool)):
+        return rank, value
+    # Documents (and anything else) compare by their string form as a last resort
+    return rank, str(value)
+
+def _sort_key(doc: Dict[str, Any], field: str, descending: bool) -> Tuple:
+    """The key MongoDB sorts ``doc`` by for one field: arrays by their smallest (or largest) element"""
+    values = _resolve(doc, field)
+    if not values:
+        # A missing field sorts like null
+        return _value_key(None)
+    keys = []
+    for value in values:
+        if isinstance(value, list):
+            if not value:
+                keys.append((0, ""))
+            keys.extend(_value_key(item) for item in value)
+        else:
+            keys.append(_value_key(value))
+    return max(keys) if descending else min(keys)
+
+def sort_documents(docs: List[Dict[str, Any]], sort: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort by several keys with their own directions (stable, least significant key first)"""
+    ordered = list(docs)
+    for field, direction in reversed(sort):
+        if isinstance(direction, dict):
+            raise UnsupportedQuery("$meta sorts are not supported in memory")
+        descending = direction in (-1, "desc", "descending")
+        ordered.sort(key=lambda doc: _sort_key(doc, field, descending), reverse=descending)
+    return ordered
+
+def collection_signature(collection) -> Tuple:
+    """A cheap version of a collection: its document count and newest ``_id``"""
+    newest = collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return collection.estimated_document_count(), newest["_id"] if newest else None
+
+async def collection_signature_async(collection) -> Tuple:
+    """Async variant of ``collection_signature`` for an async collection"""
+    newest = await collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return await collection.estimated_document_count(), newest["_id"] if newest else None
+
+class CollectionSnapshot:
+    """A full in-memory copy of a small collection, searchable with processed query plans"""
+
+    def __init__(self, name: str, max_documents: int):
+        self.name = name
+        self.max_documents = max_documents
+        self._docs: Optional[List[Dict[str, Any]]] = None
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self.version: Optional[Tuple] = None
+        self.loaded_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._docs is not None
+
+    @property
+    def document_count(self) -> int:
+        return len(self._docs) if self._docs is not None else 0
+
+    def load(self, collection) -> bool:
+        """Replace the snapshot with the current contents of ``collection``"""
+        version = collection_signature(collection)
+        if version[0] > self.max_documents:
+            logger.warning(f"{self.name} has {version[0]} documents, more than the {self.max_documents} "
+                           f"kept in memory; serving it from MongoDB")
+            self._docs, self._by_id, self.version = None, {}, version
+            return False
+        docs = list(collection.find({}))
+        self._docs, self._by_id = docs, {doc.get("_id"): doc for doc in docs}
+        self.version = version
+        self.loaded_at = time.time()
+        logger.info(f"Loaded {len(docs)} {self.name} documents into memory")
+        return True
+
+    def refresh(self, collection, force: bool = False) -> bool:
+        """Reload if forced, never loaded, or the collection's version signature changed"""
+        if force or self.version is None or collection_signature(collection) != self.version:
+            return self.load(collection)
+        return False
+
+    def invalidate(self) -> None:
+        """Drop the snapshot after a write; searches use MongoDB until the next refresh"""
+        self._docs, self._by_id, self.version = None, {}, None
+
+    def get(self, doc_id: Any) -> Optional[Dict[str, Any]]:
+        """A copy of the document with ``_id``, or None"""
+        doc = self._by_id.get(doc_id)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def search(self, processed: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Evaluate a processed search (query, projection, sort, skip, limit).
+
+        Returns the page of projected copies and the total number of matches.
+        Raises UnsupportedQuery when MongoDB has to answer instead.
+        """
+        docs = self._docs
+        if docs is None:
+            raise UnsupportedQuery(f"{self.name} is not loaded")
+        if "keyset_strip" in processed:
+            # The next page is read from MongoDB, so the whole walk is left to it
+            raise UnsupportedQuery("Keyset pages are not supported in memory")
+
+        query = processed["query"] or {}
+        matches = [doc for doc in docs if match(doc, query)] if query else list(docs)
+        if processed["sort"]:
+            matches = sort_documents(matches, processed["sort"])
+
+        skip = processed["skip"] or 0
+        limit = processed["limit"]
+        page = matches[skip:skip + limit] if limit and limit > 0 else matches[skip:]
+        return [project(copy.deepcopy(doc), processed["projection"]) for doc in page], len(matches)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "documents": self.document_count,
+            "loadedAt": self.loaded_at
+        }
+
+async def maintain_snapshots(cruds: List[Any], refresh_interval: int, reload_interval: int) -> None:
+    """
+    Load the snapshots of ``cruds`` and keep them current until cancelled.
+
+    Every ``refresh_interval`` seconds each snapshot is reloaded if its version
+    signature changed (or it was dropped by a write), and every ``reload_interval``
+    seconds unconditionally. Loading runs in a thread off the event loop.
+    """
+    last_reload = 0.0
+    while True:
+        force = time.time() - last_reload >= reload_interval
+        for crud in cruds:
+            try:
+                await asyncio.to_thread(crud.snapshot.refresh, crud.collection, force)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing in-memory {crud.collection_name}: {e}")
+        if force:
+            last_reload = time.time()
+        await asyncio.sleep(refresh_interval)
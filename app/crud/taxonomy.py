@@ -1,7 +1,13 @@
 from app.config import settings
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from app.crud.base import BaseCRUD
+from app.crud.response_cache import get_response_cache
+from app.crud.snapshot import collection_signature
+from app.crud.taxonomy_tree import TaxonomyNode, TaxonomyTree
+from app.middleware.exceptions import ResourceNotFoundException
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +15,74 @@ class TaxonomyCRUD(BaseCRUD):
     def __init__(self):
         """Initialize taxonomy collection"""
         super().__init__(settings.TAXONOMY_COLLECTION)
+        # Hierarchy built from the collection, with the collection version it was built from
+        self._tree: Optional[TaxonomyTree] = None
+        self._tree_version = None
+        self._tree_checked = 0.0
+
+    def tree(self) -> TaxonomyTree:
+        """
+        The taxonomy hierarchy, rebuilt when the collection changes.
+
+        The collection's version signature is checked at most every
+        ``TAXONOMY_TREE_CHECK_INTERVAL`` seconds; writes through the API drop the
+        tree right away. Cached record searches are dropped whenever the tree is
+        rebuilt, since ``expandTopics`` responses depend on it.
+        """
+        if self._tree is not None and time.monotonic() - self._tree_checked < settings.TAXONOMY_TREE_CHECK_INTERVAL:
+            return self._tree
+        version = collection_signature(self.collection)
+        if self._tree is None or version != self._tree_version:
+            if self._tree_version is not None:
+                get_response_cache().invalidate(settings.RECORDS_COLLECTION)
+            self._tree = TaxonomyTree(self.collection.find({}))
+            self._tree_version = version
+            logger.info(f"Built taxonomy tree with {len(self._tree)} terms")
+        self._tree_checked = time.monotonic()
+        return self._tree
+
+    async def tree_async(self) -> TaxonomyTree:
+        """``tree`` in a worker thread, so checking and rebuilding it does not block the event loop"""
+        return await asyncio.to_thread(self.tree)
+
+    def current_tree(self) -> TaxonomyTree:
+        """The last built tree without checking the collection, built only if there is none yet"""
+        return self._tree if self._tree is not None else self.tree()
+
+    def invalidate_cache(self) -> None:
+        """Also drop the taxonomy tree after a write"""
+        super().invalidate_cache()
+        self._tree = None
+
+    def subtree(self, term: str) -> Dict[str, Any]:
+        """A term and every term below it, in depth-first order"""
+        start_time = time.time()
+        tree = self.tree()
+        if not tree.find(term):
+            raise ResourceNotFoundException(f"Taxonomy term {term} not found")
+        return self._tree_result(tree.subtree(term), start_time)
+
+    def ancestors(self, term: str) -> Dict[str, Any]:
+        """The terms above a term, from the root down"""
+        start_time = time.time()
+        tree = self.tree()
+        if not tree.find(term):
+            raise ResourceNotFoundException(f"Taxonomy term {term} not found")
+        return self._tree_result(tree.ancestors(term), start_time)
+
+    def _tree_result(self, nodes: List[TaxonomyNode], start_time: float) -> Dict[str, Any]:
+        """Wrap taxonomy nodes in the standard result envelope, with their path and depth"""
+        docs = []
+        for node in nodes:
+            doc = {**node.doc, "path": node.path, "depth": node.depth}
+            if "_id" in doc:
+                doc["_id"] = str(doc["_id"])
+            docs.append(doc)
+        return {
+            "ResultCount": len(docs),
+            "ResultData": docs,
+            "Metrics": {"ElapsedTime": time.time() - start_time}
+        }
         
     def create(self, data: dict) -> dict:
         """Create a new taxonomy entry in the database."""
@@ -18,11 +92,21 @@ class TaxonomyCRUD(BaseCRUD):
         """Get a single taxonomy entry by ID."""
         base_result = super().get(taxonomy_id)
         return base_result.get("ResultData", [{}])[0]  # Return just the document
+
+    async def get_async(self, taxonomy_id: str) -> dict:
+        """Get a single taxonomy entry by ID without blocking the event loop."""
+        base_result = await super().get_async(taxonomy_id)
+        return base_result.get("ResultData", [{}])[0]
         
     def search(self, **kwargs) -> list:
         """Search taxonomies based on parameters."""
         base_result = super().search(**kwargs)
         return base_result.get("ResultData", [])  # Return just the list of documents
 
+    async def search_async(self, **kwargs) -> list:
+        """Search taxonomies without blocking the event loop."""
+        base_result = await super().search_async(**kwargs)
+        return base_result.get("ResultData", [])
+
 # Create a singleton instance
 taxonomy_crud = TaxonomyCRUD()
\ No newline at end of file
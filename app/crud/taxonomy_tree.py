@@ -0,0 +1,172 @@
+"""
+In-memory hierarchy of the research taxonomy.
+
+Taxonomy documents are flat (``{"term": "Environmental metrology", "parent":
+"Metrology", "level": 2}``) while record ``topic.tag`` values spell out the whole
+path (``"Metrology: Environmental metrology"``). The tree links every term to its
+parent and children, precomputes each node's ancestor path and path label, and
+numbers the nodes in depth-first order with Euler-tour intervals, so a subtree
+is a contiguous slice and "is X below Y" is two integer comparisons.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PATH_SEPARATOR = ": "
+
+# Field names a term and its parent may be stored under
+TERM_FIELDS = ("term", "label", "tag", "name")
+PARENT_FIELDS = ("parent", "parentTerm")
+
+def _first(doc: Dict[str, Any], fields: Tuple[str, ...]) -> str:
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+class TaxonomyNode:
+    """A term in the tree; ``tin``/``tout`` bound its subtree in depth-first order"""
+    __slots__ = ("term", "doc", "parent", "children", "depth", "path", "tin", "tout")
+
+    def __init__(self, term: str, doc: Dict[str, Any]):
+        self.term = term
+        self.doc = doc
+        self.parent: Optional["TaxonomyNode"] = None
+        self.children: List["TaxonomyNode"] = []
+        self.depth = 0
+        self.path = term
+        self.tin = self.tout = 0
+
+    def contains(self, other: "TaxonomyNode") -> bool:
+        """Whether ``other`` is this node or one of its descendants"""
+        return self.tin <= other.tin < self.tout
+
+class TaxonomyTree:
+    """Parent/child adjacency, ancestor paths and Euler-tour intervals over taxonomy documents"""
+
+    def __init__(self, docs: Iterable[Dict[str, Any]]):
+        self.nodes: List[TaxonomyNode] = []       # in depth-first (pre)order after building
+        self._by_term: Dict[str, List[TaxonomyNode]] = {}
+        self._by_path: Dict[str, TaxonomyNode] = {}
+        self._build(docs)
+
+    def _build(self, docs: Iterable[Dict[str, Any]]) -> None:
+        nodes, parents = [], []
+        for doc in docs:
+            term = _first(doc, TERM_FIELDS)
+            if term:
+                nodes.append(TaxonomyNode(term, doc))
+                parents.append(_first(doc, PARENT_FIELDS))
+
+        by_term: Dict[str, List[TaxonomyNode]] = {}
+        for node in nodes:
+            by_term.setdefault(node.term.lower(), []).append(node)
+
+        parent_of = {id(node): parent_term for node, parent_term in zip(nodes, parents)}
+        roots = []
+        for node, parent_term in zip(nodes, parents):
+            parent = self._resolve_parent(parent_term, by_term, parent_of) if parent_term else None
+            if parent is None or parent is node:
+                roots.append(node)
+            else:
+                node.parent = parent
+                parent.children.append(node)
+
+        # Depth-first numbering; nodes on a parent cycle are never reached from a
+        # root and are kept as roots of their own
+        order: List[TaxonomyNode] = []
+        seen = set()
+        pending = sorted(roots, key=lambda n: n.term.lower())
+        pending += sorted((n for n in nodes if n.parent is not None), key=lambda n: n.term.lower())
+        for root in pending:
+            if id(root) in seen:
+                continue
+            if root.parent is not None and id(root.parent) not in seen:
+                # Part of a cycle: cut it here
+                root.parent.children.remove(root)
+                root.parent = None
+            self._number(root, order, seen)
+
+        self.nodes = order
+        for node in order:
+            self._by_term.setdefault(node.term.lower(), []).append(node)
+            self._by_path[node.path.lower()] = node
+
+    @staticmethod
+    def _resolve_parent(parent_term: str, by_term: Dict[str, List[TaxonomyNode]],
+                        parent_of: Dict[int, str]) -> Optional[TaxonomyNode]:
+        """
+        The node a ``parent`` value refers to. It may be a bare term or a full path;
+        with a path, a term used under several parents is told apart by the
+        segment above it.
+        """
+        segments = parent_term.split(PATH_SEPARATOR)
+        candidates = by_term.get(parent_term.lower()) or by_term.get(segments[-1].strip().lower())
+        if not candidates:
+            return None
+        if len(segments) > 1:
+            above = segments[-2].strip().lower()
+            for candidate in candidates:
+                if parent_of[id(candidate)].split(PATH_SEPARATOR)[-1].strip().lower() == above:
+                    return candidate
+        return candidates[0]
+
+    def _number(self, root: TaxonomyNode, order: List[TaxonomyNode], seen: set) -> None:
+        """Iterative depth-first walk setting depth, path and the Euler-tour interval"""
+        stack: List[Tuple[TaxonomyNode, bool]] = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                node.tout = len(order)
+                continue
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.parent is not None:
+                node.depth = node.parent.depth + 1
+                node.path = node.parent.path + PATH_SEPARATOR + node.term
+            node.tin = len(order)
+            order.append(node)
+            stack.append((node, True))
+            node.children.sort(key=lambda n: n.term.lower())
+            stack.extend((child, False) for child in reversed(node.children) if id(child) not in seen)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def find(self, term: str) -> List[TaxonomyNode]:
+        """Nodes named by a full path (``"A: B"``) or, failing that, by a bare term; case-insensitive"""
+        key = term.strip().lower()
+        node = self._by_path.get(key)
+        if node is not None:
+            return [node]
+        return list(self._by_term.get(key, []))
+
+    def subtree(self, term: str) -> List[TaxonomyNode]:
+        """The nodes for ``term`` and all their descendants, in depth-first order"""
+        result, last = [], -1
+        for node in sorted(self.find(term), key=lambda n: n.tin):
+            # A node already inside an earlier subtree adds nothing new
+            if node.tin < last:
+                continue
+            result.extend(self.nodes[node.tin:node.tout])
+            last = node.tout
+        return result
+
+    def ancestors(self, term: str) -> List[TaxonomyNode]:
+        """The ancestors of the nodes for ``term``, root first"""
+        result, seen = [], set()
+        for node in self.find(term):
+            chain = []
+            parent = node.parent
+            while parent is not None:
+                chain.append(parent)
+                parent = parent.parent
+            for ancestor in reversed(chain):
+                if id(ancestor) not in seen:
+                    seen.add(id(ancestor))
+                    result.append(ancestor)
+        return result
+
+    def descendant_tags(self, term: str) -> List[str]:
+        """The ``topic.tag`` path labels of ``term`` and every term below it"""
+        return [node.path for node in self.subtree(term)]
@@ -0,0 +1,291 @@
+"""
+In-process BM25 index for ``searchphrase`` queries.
+
+For a catalog of tens of thousands of records, ranking matches in process is
+faster and more precise than MongoDB's ``$text`` over a wildcard index. The index
+covers a few weighted fields, keeps its postings in typed arrays with interned
+terms, and only maps a phrase to ranked ``_id`` values; the documents themselves
+are then fetched from MongoDB by ``_id``.
+
+Documents are added as they are written through the API and picked up by ``_id``
+order on each refresh. Updates and deletions made outside the API are caught by
+a periodic full rebuild. Replaced documents leave tombstones in the postings,
+which are compacted away once they make up a quarter of the index.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import re
+import sys
+import threading
+import time
+from array import array
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in into is it its of on or that the this to was were with".split()
+)
+
+# Fraction of dead entries in the index that triggers a compaction
+COMPACT_RATIO = 0.25
+
+def _stem(token: str) -> str:
+    """Strip plural endings so "neutrons" finds "neutron", as $text stemming would"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "zes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Split text into interned, lower-cased and stemmed terms, without stop words"""
+    return [sys.intern(_stem(token)) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+def field_values(doc: Any, path: str) -> Iterable[str]:
+    """String values at a dotted ``path``, descending into arrays (e.g. ``topic.tag``)"""
+    if isinstance(doc, list):
+        for item in doc:
+            yield from field_values(item, path)
+        return
+    if not isinstance(doc, dict):
+        return
+    head, _, rest = path.partition(".")
+    value = doc.get(head)
+    if rest:
+        yield from field_values(value, rest)
+    elif isinstance(value, list):
+        yield from (item for item in value if isinstance(item, str))
+    elif isinstance(value, str):
+        yield value
+
+class _Postings:
+    """Documents containing a term and the weighted term frequency in each"""
+    __slots__ = ("docs", "freqs")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.freqs = array("f")
+
+class TextIndex:
+    """Weighted BM25 inverted index over selected fields of a collection"""
+
+    def __init__(self, weights: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.weights = dict(weights)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ids: List[Any] = []              # document number -> _id
+        self._docnos: Dict[Any, int] = {}      # _id -> document number, live documents only
+        self._lengths = array("f")             # weighted length per document number
+        self._alive = bytearray()              # 1 for live document numbers, 0 for tombstones
+        self._postings: Dict[str, _Postings] = {}
+        self._total_length = 0.0
+        self._norms: Optional[List[float]] = None  # BM25 length normalization per document, cached
+        self.last_id = None                    # highest _id indexed, where a refresh resumes
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the initial build has completed"""
+        return self.built_at is not None
+
+    @property
+    def document_count(self) -> int:
+        return len(self._docnos)
+
+    def projection(self) -> Dict[str, int]:
+        """Projection fetching just what the index needs from a document"""
+        return {field: 1 for field in self.weights}
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        """Index (or re-index) a document; it must carry its ``_id``"""
+        doc_id = doc["_id"]
+        frequencies: Dict[str, float] = {}
+        for field, weight in self.weights.items():
+            for text in field_values(doc, field):
+                for term in tokenize(text):
+                    frequencies[term] = frequencies.get(term, 0.0) + weight
+        length = sum(frequencies.values())
+
+        with self._lock:
+            self._remove(doc_id)
+            docno = len(self._ids)
+            self._ids.append(doc_id)
+            self._docnos[doc_id] = docno
+            self._lengths.append(length)
+            self._alive.append(1)
+            self._total_length += length
+            self._norms = None
+            for term, frequency in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                postings.docs.append(docno)
+                postings.freqs.append(frequency)
+            if self.last_id is None or doc_id > self.last_id:
+                self.last_id = doc_id
+
+    def remove(self, doc_id: Any) -> None:
+        """Drop a document from the index"""
+        with self._lock:
+            self._remove(doc_id)
+            if len(self._ids) - len(self._docnos) > COMPACT_RATIO * len(self._ids):
+                self._compact()
+
+    def _remove(self, doc_id: Any) -> None:
+        docno = self._docnos.pop(doc_id, None)
+        if docno is not None:
+            self._alive[docno] = 0
+            self._total_length -= self._lengths[docno]
+            self._norms = None
+
+    def _compact(self) -> None:
+        """Renumber the live documents and rewrite the postings without tombstones"""
+        renumber = {}
+        ids, lengths = [], array("f")
+        for docno, doc_id in enumerate(self._ids):
+            if self._alive[docno]:
+                renumber[docno] = len(ids)
+                ids.append(doc_id)
+                lengths.append(self._lengths[docno])
+
+        postings = {}
+        for term, old in self._postings.items():
+            new = _Postings()
+            for docno, frequency in zip(old.docs, old.freqs):
+                if docno in renumber:
+                    new.docs.append(renumber[docno])
+                    new.freqs.append(frequency)
+            if new.docs:
+                postings[term] = new
+
+        self._ids = ids
+        self._docnos = {doc_id: docno for docno, doc_id in enumerate(ids)}
+        self._lengths = lengths
+        self._alive = bytearray(b"\x01" * len(ids))
+        self._postings = postings
+        self._norms = None
+        logger.info(f"Compacted text index to {len(ids)} documents and {len(postings)} terms")
+
+    def search(self, phrase: str, limit: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """
+        Rank the documents matching any term of ``phrase`` by BM25 score.
+
+        Terms prefixed with ``-`` exclude the documents containing them, as with
+        ``$text``. Returns ``(_id, score)`` pairs, best first.
+        """
+        include, exclude = [], []
+        for word in phrase.replace('"', " ").split():
+            (exclude if word.startswith("-") else include).extend(tokenize(word))
+
+        with self._lock:
+            count = len(self._docnos)
+            if not count:
+                return []
+            norms = self._length_norms()
+            k1 = self.k1
+            scores: Dict[int, float] = {}
+            for term in set(include):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                frequency_of_term = len(postings.docs)
+                boost = math.log(1 + (count - frequency_of_term + 0.5) / (frequency_of_term + 0.5)) * (k1 + 1)
+                for docno, frequency in zip(postings.docs, postings.freqs):
+                    scores[docno] = scores.get(docno, 0.0) + boost * frequency / (frequency + norms[docno])
+            for term in set(exclude):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    for docno in postings.docs:
+                        scores.pop(docno, None)
+            alive = self._alive
+            if len(self._docnos) < len(self._ids):
+                scores = {docno: score for docno, score in scores.items() if alive[docno]}
+
+            ranked = sorted(scores.items(), key=itemgetter(1), reverse=True) if limit is None \
+                else heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+            return [(self._ids[docno], score) for docno, score in ranked]
+
+    def _length_norms(self) -> List[float]:
+        """``k1 * (1 - b + b * length / average length)`` for every document number"""
+        if self._norms is None:
+            average_length = self._total_length / len(self._docnos) or 1.0
+            k1, b = self.k1, self.b
+            self._norms = [k1 * (1 - b + b * length / average_length) for length in self._lengths]
+        return self._norms
+
+    def build(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """Replace the contents of the index with ``docs``"""
+        fresh = TextIndex(self.weights, self.k1, self.b)
+        for doc in docs:
+            fresh.add(doc)
+        with self._lock:
+            self._ids, self._docnos, self._lengths = fresh._ids, fresh._docnos, fresh._lengths
+            self._alive, self._postings = fresh._alive, fresh._postings
+            self._total_length, self.last_id = fresh._total_length, fresh.last_id
+            self._norms = None
+            self.built_at = time.time()
+
+    def rebuild(self, collection) -> None:
+        """Build the index from every document in ``collection``"""
+        start = time.time()
+        self.build(collection.find({}, self.projection(), batch_size=1000))
+        logger.info(f"Built text index over {self.document_count} documents "
+                    f"and {len(self._postings)} terms in {time.time() - start:.1f}s")
+
+    def refresh(self, collection) -> int:
+        """Index the documents added to ``collection`` since the last build or refresh"""
+        query = {"_id": {"$gt": self.last_id}} if self.last_id is not None else {}
+        added = 0
+        for doc in collection.find(query, self.projection()).sort("_id", 1):
+            self.add(doc)
+            added += 1
+        if added:
+            logger.info(f"Added {added} documents to the text index")
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        """Size of the index"""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "documents": len(self._docnos),
+                "tombstones": len(self._ids) - len(self._docnos),
+                "terms": len(self._postings),
+                "postings": sum(len(postings.docs) for postings in self._postings.values()),
+                "builtAt": self.built_at
+            }
+
+async def maintain_text_index(index: TextIndex, collection, refresh_interval: int, rebuild_interval: int) -> None:
+    """
+    Build ``index`` from ``collection`` and keep it current until cancelled.
+
+    The index picks up new documents every ``refresh_interval`` seconds and is
+    rebuilt from scratch every ``rebuild_interval`` seconds. The work runs in a
+    thread so the event loop keeps serving requests (which use ``$text`` until the
+    first build completes).
+    """
+    last_build = 0.0
+    while True:
+        try:
+            if time.time() - last_build >= rebuild_interval or not index.ready:
+                await asyncio.to_thread(index.rebuild, collection)
+                last_build = time.time()
+            else:
+                await asyncio.to_thread(index.refresh, collection)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error maintaining text index: {e}")
+        await asyncio.sleep(refresh_interval)
@@ -0,0 +1,128 @@
+"""
+Unique-user sketches for record, file and repository metrics.
+
+Instead of growing ``ip_list`` arrays, the users seen for a record, a file or
+the whole repository are kept as HyperLogLog sketches (see ``app.crud.hll``) in
+``USER_SKETCHES_COLLECTION``, one document per ``(scope, key, month)``:
+
+    {"scope": "record", "key": "ark:/88434/mds2-2154", "month": "2025-01",
+     "registers": <4KB binary>, "version": 3}
+
+Every update also goes to the all-time bucket (``month: "all"``), so a total is
+a single read, while any range of months is the merge of its monthly sketches.
+Sketches are merged into the stored ones with a compare-and-set on ``version``,
+so concurrent writers from several workers never lose each other's users.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from bson import Binary
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.crud.hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+RECORD_SCOPE = "record"
+FILE_SCOPE = "file"
+REPO_SCOPE = "repo"
+
+# The single key of the repository-wide sketches
+REPO_KEY = "repo"
+
+# Month of the bucket holding the all-time sketch
+ALL_TIME = "all"
+
+MAX_MERGE_ATTEMPTS = 5
+
+def month_of(timestamp: datetime) -> str:
+    """The ``YYYY-MM`` bucket of a timestamp"""
+    return timestamp.strftime("%Y-%m")
+
+class UserSketchStore:
+    """HyperLogLog sketches of users per scope, key and month"""
+
+    def __init__(self, collection, precision: int = 12):
+        self.collection = collection
+        self.precision = precision
+        self._indexes_ready = False
+
+    def ensure_indexes(self) -> None:
+        self.collection.create_index([("scope", ASCENDING), ("key", ASCENDING), ("month", ASCENDING)], unique=True)
+
+    def add(self, scope: str, key: str, month: str, users: Iterable[str]) -> Optional[int]:
+        """
+        Add ``users`` to the ``month`` and all-time sketches of ``key``.
+
+        Returns the estimated number of users of ``key`` over all time, or None if
+        there was nobody to add.
+        """
+        sketch = HyperLogLog(self.precision).update(users)
+        if not any(sketch.registers):
+            return None
+        if not self._indexes_ready:
+            # The unique index is what makes concurrent first inserts safe
+            self.ensure_indexes()
+            self._indexes_ready = True
+        self._merge(scope, key, month, sketch)
+        return self._merge(scope, key, ALL_TIME, sketch).count()
+
+    def _merge(self, scope: str, key: str, month: str, sketch: HyperLogLog) -> HyperLogLog:
+        """Merge ``sketch`` into the stored one and return the result"""
+        selector = {"scope": scope, "key": key, "month": month}
+        merged = sketch
+        for _ in range(MAX_MERGE_ATTEMPTS):
+            doc = self.collection.find_one(selector, {"registers": 1, "version": 1})
+            if doc is None:
+                try:
+                    self.collection.insert_one({**selector, "registers": Binary(sketch.to_bytes()), "version": 1})
+                    return sketch
+                except DuplicateKeyError:
+                    continue
+            stored = bytes(doc["registers"])
+            merged = HyperLogLog.from_bytes(stored).merge(sketch)
+            if merged.registers == stored:
+                return merged
+            result = self.collection.update_one(
+                {"_id": doc["_id"], "version": doc.get("version")},
+                {"$set": {"registers": Binary(merged.to_bytes())}, "$inc": {"version": 1}})
+            if result.modified_count:
+                return merged
+        logger.warning(f"Gave up merging users into {scope} {key} {month} after {MAX_MERGE_ATTEMPTS} attempts")
+        return merged
+
+    def sketch(self, scope: str, key: str, months: Optional[Tuple[str, str]] = None) -> Optional[HyperLogLog]:
+        """
+        The users of ``key``: over all time, or over the inclusive ``(first, last)``
+        range of ``YYYY-MM`` months. None if nothing was recorded.
+        """
+        if months is None:
+            selector = {"scope": scope, "key": key, "month": ALL_TIME}
+        else:
+            selector = {"scope": scope, "key": key, "month": {"$gte": months[0], "$lte": months[1], "$ne": ALL_TIME}}
+        union = None
+        for doc in self.collection.find(selector, {"registers": 1}):
+            sketch = HyperLogLog.from_bytes(doc["registers"])
+            union = sketch if union is None else union.merge(sketch)
+        return union
+
+    def count(self, scope: str, key: str, months: Optional[Tuple[str, str]] = None) -> Optional[int]:
+        """Estimated users of ``key``, see ``sketch``"""
+        sketch = self.sketch(scope, key, months)
+        return sketch.count() if sketch is not None else None
+
+    def period_counts(self, scope: str, key: str, months: Tuple[str, str], period_length: int = 7) -> Dict[str, int]:
+        """
+        Estimated users of ``key`` per period over the inclusive ``(first, last)``
+        range of months; a period is the first ``period_length`` characters of the
+        month, so 7 gives months and 4 years (the merge of their months).
+        """
+        selector = {"scope": scope, "key": key, "month": {"$gte": months[0], "$lte": months[1], "$ne": ALL_TIME}}
+        periods: Dict[str, HyperLogLog] = {}
+        for doc in self.collection.find(selector, {"month": 1, "registers": 1}):
+            sketch = HyperLogLog.from_bytes(doc["registers"])
+            period = doc["month"][:period_length]
+            periods[period] = periods[period].merge(sketch) if period in periods else sketch
+        return {period: sketch.count() for period, sketch in periods.items()}
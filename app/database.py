@@ -1,9 +1,11 @@
 import time
-from pymongo import MongoClient, ASCENDING, TEXT
+import asyncio
+from pymongo import MongoClient, AsyncMongoClient, ASCENDING, DESCENDING, TEXT
 from pymongo.errors import OperationFailure
 from app.config import settings
 import logging
 from app.middleware.exceptions import InternalServerException
+from app.crud.normalized import searchable_fields, shadow_field
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +16,11 @@ client = None
 db = None
 metrics_client = None
 metrics_db = None
+async_client = None
+async_db = None
+_async_loop = None
+# Closes of async clients replaced after an event loop change, kept until they finish
+_closing_clients = set()
 
 # Define collection names from settings for easier access
 main_collections = [
@@ -91,6 +98,50 @@ def connect_metrics_db():
                 logger.warning(f"Metrics database unavailable. Continuing without metrics support.")
                 return None 
 
+def get_async_db():
+    """
+    Return the async database handle used by the request handlers.
+
+    The async client is created lazily from inside the running event loop, since an
+    AsyncMongoClient is bound to the loop it was first used on. If the loop changes
+    (e.g. a new test client), a fresh client is created for the new loop and the
+    previous one is closed in the background, so its connection pool is released.
+    """
+    global async_client, async_db, _async_loop
+
+    loop = asyncio.get_running_loop()
+    if async_db is None or _async_loop is not loop:
+        if async_client is not None:
+            task = loop.create_task(_close_async_client(async_client))
+            _closing_clients.add(task)
+            task.add_done_callback(_closing_clients.discard)
+        async_client = AsyncMongoClient(settings.MONGO_URI)
+        async_db = async_client[settings.DB_NAME]
+        _async_loop = loop
+        logger.info(f"Created async MongoDB client for: {settings.DB_NAME}")
+    return async_db
+
+async def _close_async_client(client) -> None:
+    """Close a replaced async client, logging instead of raising"""
+    try:
+        await client.close()
+        logger.info("Closed async MongoDB client of a previous event loop")
+    except Exception as e:
+        logger.error(f"Error closing async MongoDB client: {e}")
+
+async def close_async_db():
+    """Close the async MongoDB client if one was created"""
+    global async_client, async_db, _async_loop
+
+    if async_client is not None:
+        try:
+            await async_client.close()
+        except Exception as e:
+            logger.error(f"Error closing async MongoDB client: {e}")
+    async_client = None
+    async_db = None
+    _async_loop = None
+
 def create_text_index(collection_name, database=None):
     """Create text index for a collection with error handling"""
     try:
@@ -108,6 +159,41 @@ def create_text_index(collection_name, database=None):
         logger.error(f"Error creating text index for {collection_name}: {e}")
         return False
 
+# Name of the weighted text index on the records collection
+TEXT_SEARCH_INDEX = "text_search_idx"
+
+def parse_text_weights(spec: str) -> dict:
+    """Parse ``field:weight`` pairs (e.g. ``title:10,keyword:5``) into text index weights"""
+    weights = {}
+    for item in (part.strip() for part in spec.split(",")):
+        if not item:
+            continue
+        field, _, weight = item.rpartition(":") if ":" in item else (item, "", "1")
+        weights[field.strip()] = int(weight)
+    return weights
+
+def ensure_text_search_index(collection, weights: dict) -> bool:
+    """
+    Make ``text_search_idx`` the text index of ``collection``, with ``weights``.
+
+    The index covers every string field (``$**``) like the other collections' text
+    indexes, and the weights rank matches in the listed fields higher. A collection
+    can only have one text index, so any other text index, or one with outdated
+    weights, is dropped first. Returns True if the index was (re)created.
+    """
+    expected = {"$**": 1, **weights}
+    for index in collection.list_indexes():
+        if "weights" not in index:
+            continue
+        if index["name"] == TEXT_SEARCH_INDEX and dict(index["weights"]) == expected:
+            return False
+        logger.info(f"Dropping text index {index['name']} on {collection.name} to replace it with {TEXT_SEARCH_INDEX}")
+        collection.drop_index(index["name"])
+
+    collection.create_index([("$**", TEXT)], name=TEXT_SEARCH_INDEX, weights=weights)
+    logger.info(f"Created {TEXT_SEARCH_INDEX} on {collection.name} with weights {weights}")
+    return True
+
 def create_collection_indexes():
     """
     Create indexes for all collections with improved error handling.
@@ -118,9 +204,10 @@ def create_collection_indexes():
     try:
         success = True
         
-        # Create text indexes for all collections
+        # Create text indexes for all collections; records get their weighted index below
         for collection in main_collections:
-            success = create_text_index(collection) and success
+            if collection != settings.RECORDS_COLLECTION:
+                success = create_text_index(collection) and success
             
             try:
                 if collection == settings.FIELDS_COLLECTION:
@@ -132,16 +219,15 @@ def create_collection_indexes():
                     db[settings.RESOURCES_COLLECTION].create_index([("apiUrl", ASCENDING)])
                     logger.info("Created specific indexes for APIs collection")
                 elif collection == settings.RECORDS_COLLECTION:
-                    db[settings.RECORDS_COLLECTION].create_index([
-                    ("title", TEXT), 
-                    ("description", TEXT), 
-                    ("keyword", TEXT),
-                    ("topic.tag", TEXT)
-                    ], name="text_search_idx")
-                
+                    ensure_text_search_index(db[settings.RECORDS_COLLECTION], parse_text_weights(settings.TEXT_SEARCH_WEIGHTS))
+
                     db[settings.RECORDS_COLLECTION].create_index([("ediid", ASCENDING)])
                     db[settings.RECORDS_COLLECTION].create_index([("doi", ASCENDING)])
                     db[settings.RECORDS_COLLECTION].create_index([("@id", ASCENDING)])
+                    db[settings.RECORDS_COLLECTION].create_index([("_lookup_keys", ASCENDING)])
+                    # Normalized shadow fields backing exact-match filters
+                    for field in searchable_fields(db[settings.FIELDS_COLLECTION].find({}, {"name": 1, "searchable": 1, "tags": 1})):
+                        db[settings.RECORDS_COLLECTION].create_index([(shadow_field(field), ASCENDING)])
                     logger.info("Created specific indexes for records collection")
                     
             except Exception as e:
@@ -155,6 +241,7 @@ def create_collection_indexes():
             if settings.RECORD_METRICS_COLLECTION in metrics_db.list_collection_names():
                 metrics_db[settings.RECORD_METRICS_COLLECTION].create_index([("pdrid", ASCENDING)], background=True)
                 metrics_db[settings.RECORD_METRICS_COLLECTION].create_index([("ediid", ASCENDING)], background=True)
+                metrics_db[settings.RECORD_METRICS_COLLECTION].create_index([("_lookup_keys", ASCENDING)], background=True)
                 metrics_db[settings.RECORD_METRICS_COLLECTION].create_index([("first_time_logged", ASCENDING)], background=True)
                 metrics_db[settings.RECORD_METRICS_COLLECTION].create_index([("last_time_logged", ASCENDING)], background=True)
                 logger.info(f"Created indexes for {settings.RECORD_METRICS_COLLECTION} collection")
@@ -164,8 +251,14 @@ def create_collection_indexes():
             # fileMetrics collection indexes
             if settings.FILE_METRICS_COLLECTION in metrics_db.list_collection_names():
                 metrics_db[settings.FILE_METRICS_COLLECTION].create_index([("ediid", ASCENDING)], background=True)
-                metrics_db[settings.FILE_METRICS_COLLECTION].create_index([("filepath", ASCENDING)], background=True)
+                metrics_db[settings.FILE_METRICS_COLLECTION].create_index([("pdrid", ASCENDING)], background=True)
+                metrics_db[settings.FILE_METRICS_COLLECTION].create_index([("_lookup_keys", ASCENDING)], background=True)
                 metrics_db[settings.FILE_METRICS_COLLECTION].create_index([("last_time_logged", ASCENDING)], background=True)
+                # Sorts of /usagemetrics/files, with _id as the keyset tiebreaker; the
+                # filepath one also serves filepath lookups
+                for field in ("total_size_download", "success_get", "number_users"):
+                    metrics_db[settings.FILE_METRICS_COLLECTION].create_index([(field, DESCENDING), ("_id", DESCENDING)], background=True)
+                metrics_db[settings.FILE_METRICS_COLLECTION].create_index([("filepath", ASCENDING), ("_id", ASCENDING)], background=True)
                 logger.info(f"Created indexes for {settings.FILE_METRICS_COLLECTION} collection")
             else:
                 logger.warning(f"{settings.FILE_METRICS_COLLECTION} collection doesn't exist yet. Indexes will be created when data is added.")
@@ -185,6 +278,15 @@ def create_collection_indexes():
                 logger.info(f"Created indexes for {settings.UNIQUE_USERS_COLLECTION} collection")
             else:
                 logger.warning(f"{settings.UNIQUE_USERS_COLLECTION} collection doesn't exist yet. Indexes will be created when data is added.")
+
+            # userSketches and metricsRollups are written by this service, so their unique indexes are always created
+            metrics_db[settings.USER_SKETCHES_COLLECTION].create_index(
+                [("scope", ASCENDING), ("key", ASCENDING), ("month", ASCENDING)], unique=True, background=True)
+            logger.info(f"Created indexes for {settings.USER_SKETCHES_COLLECTION} collection")
+            metrics_db[settings.METRICS_ROLLUPS_COLLECTION].create_index(
+                [("scope", ASCENDING), ("key", ASCENDING), ("granularity", ASCENDING), ("period", ASCENDING)],
+                unique=True, background=True)
+            logger.info(f"Created indexes for {settings.METRICS_ROLLUPS_COLLECTION} collection")
                 
         except Exception as e:
             logger.error(f"Error creating metrics indexes: {e}")
@@ -3,9 +3,25 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from contextlib import asynccontextmanager
-from app.database import connect_db, create_collection_indexes
-from app.routers import paper, record, field, code, patent, api, releaseset, taxonomy, usagemetrics, version
+from contextlib import asynccontextmanager, suppress
+from app.database import connect_db, create_collection_indexes, close_async_db, parse_text_weights
+from app.crud.response_cache import get_response_cache
+from app.crud.base import search_flights
+from app.crud.record import record_crud
+from app.crud.text_index import TextIndex, maintain_text_index
+from app.crud.snapshot import CollectionSnapshot, maintain_snapshots
+from app.crud.field import field_crud
+from app.crud.taxonomy import taxonomy_crud
+from app.crud.api import api_crud
+from app.crud.version import version_crud
+from app.crud.releaseset import releaseset_crud
+from app.crud.patent import patent_crud
+from app.crud.paper import paper_client
+from app.crud.paper_mirror import paper_mirror_crud, maintain_paper_mirror
+from app.crud.metrics import metrics_crud
+from app.crud.metrics_ingest import download_recorder, flush_downloads
+from app.middleware.request_processor import plan_cache
+from app.routers import paper, record, field, code, patent, api, releaseset, taxonomy, usagemetrics, version, export
 from app.config import settings
 from app.middleware.metrics_middleware import MetricsMiddleware
 from app.middleware.exceptions import (
@@ -15,6 +31,7 @@ from app.middleware.exceptions import (
 
 from pymongo.errors import OperationFailure
 import os
+import asyncio
 import logging
 import time
 from colorama import init, Fore, Style
@@ -23,12 +40,49 @@ init()
 
 logger = logging.getLogger(__name__)
 
+# Small, nearly static collections served from in-memory snapshots
+SNAPSHOT_CRUDS = [field_crud, taxonomy_crud, api_crud, version_crud, releaseset_crud, patent_crud]
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     startup_event()
+    text_index_task = None
+    if settings.TEXT_INDEX_ENABLED:
+        # Built in the background: searches use $text until the index is ready
+        record_crud.text_index = TextIndex(parse_text_weights(settings.TEXT_SEARCH_WEIGHTS))
+        text_index_task = asyncio.create_task(maintain_text_index(
+            record_crud.text_index, record_crud.collection,
+            settings.TEXT_INDEX_REFRESH_INTERVAL, settings.TEXT_INDEX_REBUILD_INTERVAL))
+    snapshot_task = None
+    if settings.MEMORY_SNAPSHOTS_ENABLED:
+        # Searches go to MongoDB until a collection's snapshot is loaded
+        for crud in SNAPSHOT_CRUDS:
+            crud.snapshot = CollectionSnapshot(crud.collection_name, settings.MEMORY_SNAPSHOT_MAX_DOCUMENTS)
+        snapshot_task = asyncio.create_task(maintain_snapshots(
+            SNAPSHOT_CRUDS, settings.MEMORY_SNAPSHOT_REFRESH_INTERVAL, settings.MEMORY_SNAPSHOT_RELOAD_INTERVAL))
+    paper_mirror_task = None
+    if settings.PAPERS_SOURCE == "mirror" and settings.PAPERS_MIRROR_SYNC_INTERVAL > 0:
+        paper_mirror_task = asyncio.create_task(maintain_paper_mirror(
+            paper_mirror_crud, paper_client, settings.PAPERS_MIRROR_SYNC_INTERVAL))
+    metrics_task = None
+    if settings.METRICS_RECORDING_ENABLED:
+        metrics_task = asyncio.create_task(flush_downloads(
+            download_recorder, metrics_crud.metrics, settings.METRICS_FLUSH_INTERVAL,
+            metrics_crud.user_sketches, metrics_crud.rollups))
     yield
     logger.info("NIST Resource Metadata Management API shutting down...")
+    for task in (text_index_task, snapshot_task, paper_mirror_task, metrics_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    if metrics_task is not None:
+        # Write out downloads still queued
+        await asyncio.to_thread(download_recorder.flush, metrics_crud.metrics, metrics_crud.user_sketches,
+                                metrics_crud.rollups)
+    await paper_client.close()
+    await close_async_db()
 
 app = FastAPI(
     title="NIST Resource Metadata Management API",
@@ -66,9 +120,11 @@ app.include_router(releaseset.router)
 app.include_router(taxonomy.router)
 app.include_router(version.router)
 app.include_router(usagemetrics.router, tags=["Metrics"])
+app.include_router(export.router)
 
-# Metrics middleware to record API calls
-# app.add_middleware(MetricsMiddleware)
+# Metrics middleware to record record lookups; downloads are written in batches by the lifespan task
+if settings.METRICS_RECORDING_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 @app.exception_handler(ResourceNotFoundException)
 async def resource_not_found_exception_handler(request: Request, exc: ResourceNotFoundException):
@@ -202,6 +258,7 @@ def startup_event():
     try:
         db = connect_db()
         print(f"{Fore.YELLOW}    🗄️  Database:{Style.RESET_ALL} {Fore.GREEN}Connected{Style.RESET_ALL} ({db.name})")
+        record_crud.load_normalized_fields()
         
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
@@ -209,7 +266,7 @@ def startup_event():
         print(f"{Fore.RED}    ⚠️  Error: {str(e)}{Style.RESET_ALL}")
     
     # Endpoints
-    print(f"{Fore.YELLOW}    🛣️  Routes:{Style.RESET_ALL} {Fore.CYAN}/papers, /records, /fields, /code, /patents, /apis, /releasesets, /taxonomy, /versions{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}    🛣️  Routes:{Style.RESET_ALL} {Fore.CYAN}/papers, /records, /fields, /code, /patents, /apis, /releasesets, /taxonomy, /versions, /export{Style.RESET_ALL}")
     
     # Footer
     print(f"\n{Fore.BLUE}    📝 {time.strftime('%Y-%m-%d %H:%M:%S')} - NIST RMM API Started{Style.RESET_ALL}")
@@ -248,6 +305,44 @@ async def debug_record_collection():
     except Exception as e:
         return {"error": str(e)}
     
+@app.get("/debug/response-cache")
+async def debug_response_cache():
+    """Debug endpoint reporting response cache hit/miss counters and size"""
+    return get_response_cache().stats()
+
+@app.get("/debug/search-coalescing")
+async def debug_search_coalescing():
+    """Debug endpoint reporting how many searches ran and how many shared an identical in-flight search"""
+    return search_flights.stats()
+
+@app.get("/debug/query-plan-cache")
+async def debug_query_plan_cache():
+    """Debug endpoint reporting compiled query plan cache hit/miss counters and size"""
+    return plan_cache.stats()
+
+@app.get("/debug/text-index")
+async def debug_text_index():
+    """Debug endpoint reporting the size and state of the in-process record text index"""
+    if record_crud.text_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **record_crud.text_index.stats()}
+
+@app.get("/debug/snapshots")
+async def debug_snapshots():
+    """Debug endpoint reporting which collections are served from memory and their size"""
+    return {crud.collection_name: crud.snapshot.stats() if crud.snapshot is not None else {"enabled": False}
+            for crud in SNAPSHOT_CRUDS}
+
+@app.get("/debug/metrics-ingest")
+async def debug_metrics_ingest():
+    """Debug endpoint reporting queued, dropped and written download events"""
+    return {"enabled": settings.METRICS_RECORDING_ENABLED, **download_recorder.stats()}
+
+@app.get("/debug/papers")
+async def debug_papers():
+    """Debug endpoint reporting Papers API cache and upstream counters and the last mirror sync"""
+    return {**paper_client.stats(), "source": settings.PAPERS_SOURCE, "last_mirror_sync": paper_mirror_crud.last_sync}
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Root endpoint that returns HTML page"""
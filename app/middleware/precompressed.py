@@ -0,0 +1,88 @@
+"""
+Prebuilt, precompressed JSON responses.
+
+A payload that changes rarely but is requested often (such as the field catalog
+behind ``/records/fields``) is serialized once and compressed once per encoding,
+so serving it is a matter of picking the variant the client accepts. Every
+variant carries a strong ETag derived from the JSON body, and a matching
+``If-None-Match`` is answered with ``304 Not Modified``.
+
+Brotli is used when the optional ``brotli`` package is installed; otherwise only
+gzip and identity variants are built.
+"""
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Mapping, Optional
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Codings in an ``Accept-Encoding`` header with their quality values"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+class PrecompressedPayload:
+    """A JSON body serialized once, with gzip (and brotli) variants and strong ETags"""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        self.etags = {coding: f'"{digest}"' if coding == "identity" else f'"{digest}-{coding}"'
+                      for coding in self.variants}
+
+    @classmethod
+    def from_json(cls, content: Any) -> "PrecompressedPayload":
+        """Serialize ``content`` the way FastAPI's JSON responses do"""
+        body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                          default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v))
+        return cls(body.encode("utf-8"))
+
+    def choose(self, accept_encoding: Optional[str]) -> str:
+        """The variant to send for an ``Accept-Encoding`` header: brotli, then gzip, then identity"""
+        accepted = _accepted(accept_encoding or "")
+        for coding in ("br", "gzip"):
+            quality = accepted.get(coding, accepted.get("*", 0.0) if coding != "br" else 0.0)
+            if coding in self.variants and quality > 0:
+                return coding
+        return "identity"
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """Whether ``If-None-Match`` names any variant of this payload"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or any(etag in tags for etag in self.etags.values())
+
+    def response(self, headers: Mapping[str, str]) -> Response:
+        """The response for a request with ``headers``: the chosen variant, or a 304"""
+        coding = self.choose(headers.get("accept-encoding"))
+        response_headers = {"ETag": self.etags[coding], "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if self.not_modified(headers.get("if-none-match")):
+            return Response(status_code=304, headers=response_headers)
+        if coding != "identity":
+            response_headers["Content-Encoding"] = coding
+        return Response(content=self.variants[coding], media_type=self.media_type, headers=response_headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"etag": self.etags["identity"], "bytes": {coding: len(body) for coding, body in self.variants.items()}}
@@ -0,0 +1,109 @@
+"""
+Compiled query plans for search requests.
+
+Turning request parameters into a MongoDB filter means validating them, grouping
+fields by logical operator and building escaped regex conditions. The outcome
+depends only on the parameters, so it is compiled once into an immutable
+``QueryPlan`` and kept in a bounded LRU ``QueryPlanCache`` shared by all requests.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    The compiled form of a set of search parameters.
+
+    Plans are shared between requests and threads, so their fields must be treated
+    as read-only; ``to_dict`` hands out fresh copies that callers may change.
+    Slots keep the many cached plans small.
+    """
+    __slots__ = ("query", "projection", "sort", "skip", "limit")
+
+    query: Dict[str, Any]
+    projection: Optional[Dict[str, Any]]
+    sort: Optional[Tuple[Tuple[str, Any], ...]]
+    skip: int
+    limit: Optional[int]
+
+    def to_dict(self, start_time: Optional[float] = None) -> Dict[str, Any]:
+        """The plan in the ``process_search_params`` result format"""
+        return {
+            "query": copy.deepcopy(self.query),
+            "projection": dict(self.projection) if self.projection is not None else None,
+            "sort": list(self.sort) if self.sort is not None else None,
+            "skip": self.skip,
+            "limit": self.limit,
+            "metrics": {"elapsed_time": time.time() - start_time if start_time else 0.0}
+        }
+
+def plan_key(params: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Normalize request parameters into a plan cache key.
+
+    The order of parameters is kept: ``logicalOp`` applies to the fields around it,
+    and ``searchphrase`` has to come first.
+    """
+    return tuple((str(key), "" if value is None else str(value)) for key, value in params.items())
+
+class QueryPlanCache:
+    """Thread-safe bounded LRU cache of compiled query plans"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._plans: "OrderedDict[Tuple[Any, ...], QueryPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compile(self, params: Dict[str, Any], compile_plan: Callable[..., QueryPlan], *args: Hashable) -> QueryPlan:
+        """
+        Return the cached plan for ``params``, compiling and caching it on a miss.
+
+        Extra ``args`` are passed on to ``compile_plan`` and are part of the key.
+        Compilation errors propagate and nothing is cached for those parameters.
+        """
+        if self.maxsize <= 0:
+            return compile_plan(params, *args)
+
+        key = (plan_key(params),) + args
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        # Compile outside the lock; two threads racing on the same key just both compile
+        plan = compile_plan(params, *args)
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+        return plan
+
+    def clear(self) -> None:
+        """Drop every cached plan"""
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._plans),
+                "maxSize": self.maxsize
+            }
@@ -1,584 +1,414 @@
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+"""
+Translation of search request parameters into MongoDB queries.
+
+Everything here is a pure function of the request parameters: there is no
+per-request state, so the functions can be called concurrently from any thread
+and the compiled ``QueryPlan`` objects can be shared freely.
+"""
+from typing import Dict, Any, FrozenSet, List, Optional
 import re
 import logging
 import time
+from bson.regex import Regex
 from pymongo import ASCENDING, DESCENDING
+from app.config import settings
+from app.crud.normalized import normalize_value, shadow_field
+from app.middleware.query_plan import QueryPlan, QueryPlanCache
 from app.middleware.exceptions import (
-    IllegalArgumentException, 
-    ResourceNotFoundException,
+    IllegalArgumentException,
     InternalServerException
 )
 
 logger = logging.getLogger(__name__)
 
-class ProcessRequest:
-    def __init__(self):
-        self.reset_state()
-
-    def reset_state(self):
-        """Reset all instance variables to their default states"""
-        self.filter = None
-        self.projections = None
-        self.sort = None
-        self.page_number = 0
-        self.page_size = 0
-        self.page = 1
-        self.logical_ops = []
-        self.bson_objs = []
-        self.query_list = []
-        self.adv_map = {}
-        self.include = ""
-        self.exclude = ""
-        self.filters_list = []
-        self.search_phrase_filter = None
-        self.filter_gte = None
-        self.filter_lt = None
-        self.logical_query = {}
-        # Reset any advanced query conditions
-        if hasattr(self, 'array_conditions'):
-            delattr(self, 'array_conditions')
-        if hasattr(self, 'field_or_conditions'):
-            delattr(self, 'field_or_conditions')
-
-    def validate_input(self, params: Dict[str, Any]) -> None:
-        """Validate request input parameters"""
-        # Validate searchphrase
-        if "searchphrase" in params and isinstance(params["searchphrase"], list):
-            raise IllegalArgumentException("Only one 'searchphrase' parameter allowed per request")
-
-        # Validate parameter sequence
-        param_keys = list(params.keys())
-        if "searchphrase" in param_keys and param_keys.index("searchphrase") != 0:
-            raise IllegalArgumentException("searchphrase must be the first parameter")
-
-        # Check searchphrase and logicalOp sequence
-        if len(param_keys) > 1:
-            if param_keys[0] == "searchphrase" and param_keys[1] == "logicalOp":
-                raise IllegalArgumentException("'searchphrase' cannot be followed by 'logicalOp'")
-            
-        restricted_pattern = re.compile(r"[^a-z0-9.,@_]", re.IGNORECASE)
-        # Check for null bytes and path traversal attempts in all parameters
-        for key, value in params.items():
-            if not value:
-                continue
-                
-            # Convert value to string if it's not already
-            str_value = str(value)
-            
-            # Check for null bytes
-            if '\x00' in str_value or '%00' in str_value:
-                logger.warning(f"Null byte detected in parameter {key}: {str_value}")
-                raise IllegalArgumentException(f"Invalid character in parameter {key}: null bytes are not allowed")
-                
-            # Check for path traversal attempts
-            if '../' in str_value or '..%2f' in str_value.lower():
-                logger.warning(f"Path traversal attempt detected in parameter {key}: {str_value}")
-                raise IllegalArgumentException(f"Invalid character sequence in parameter {key}")
-            
-            if key == "logicalOp":
-                valid_logical_ops = ["AND", "OR", "and", "or"]
-                if str_value not in valid_logical_ops:
-                    raise IllegalArgumentException(f"Invalid logical operator: {str_value}. Must be 'AND' or 'OR'")                
-            # Existing validation
-            if key in ["exclude", "include", "sort_desc", "sort_asc"]:
-                if isinstance(value, str) and restricted_pattern.search(value):
-                    raise IllegalArgumentException(f"Invalid characters in {key}")
-            elif key in ["skip", "limit"]:
-                try:
-                    int(value)
-                except ValueError:
-                    raise IllegalArgumentException(f"{key} must be an integer")
-
-    
-    
-    def process_search_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Process and build MongoDB query from request parameters"""
-        self.reset_state()
-        start_time = time.time()
-        search_input = False
-
-        # Define known pagination/control parameters
-        control_params = {
-            "searchphrase", "exclude", "include",
-            "skip", "limit", "size", "page",
-            "sort.desc", "sort.asc",
-            "datefrom", "dateto", "logicalOp"
-        }
-
-        try:
-            self.validate_input(params)
-            
-            # Check if we have multiple field parameters (indicating potential logical operations)
-            field_params = {k: v for k, v in params.items() 
-                        if k not in control_params and v}
-            
-            # Handle logical operations and field grouping
-            has_logical_ops = "logicalOp" in params
-            has_multiple_fields = len(field_params) > 1
-            logical_query = {}
-            
-            # Use logical processing if we have logicalOp OR multiple field parameters
-            if has_logical_ops or has_multiple_fields:
-                # Group fields by their logical operators
-                field_groups = self._group_fields_by_logical_op(params)
-                logical_query = self._build_logical_query(field_groups)
-                
-                # Set a flag to skip individual field processing
-                use_logical_processing = True
-            else:
-                use_logical_processing = False
-            
-            # Process regular parameters
-            page_specified = False
-            size_specified = False
-            
-            for key, value in params.items():
-                if not value or key == "logicalOp":
-                    continue
-
-                if key == "searchphrase":
-                    search_input = True
-                    self.search_phrase_filter = {
-                        "$text": {
-                            "$search": f'\\{value}\\' if value.startswith('"') and value.endswith('"') else value
-                        }
-                    }
-                elif key == "exclude":
-                    self.exclude = value
-                elif key == "include":
-                    self.include = value
-                elif key == "skip":
-                    self.page_number = int(value)
-                elif key == "page":
-                    self.page = int(value)
-                    page_specified = True
-                    if size_specified:
-                        self.page_number = (self.page - 1) * self.page_size
-                elif key == "size" or key == "limit":
-                    self.page_size = int(value)
-                    size_specified = True
-                    if page_specified and self.page > 1:
-                        self.page_number = (self.page - 1) * self.page_size
-                elif key == "sort.desc":
-                    self._parse_sorting([(field, DESCENDING) for field in value.split(",")])
-                elif key == "sort.asc":
-                    self._parse_sorting([(field, ASCENDING) for field in value.split(",")])
-                elif key == "datefrom":
-                    self.filter_gte = {"timestamp": {"$gte": value}}
-                elif key == "dateto":
-                    self.filter_lt = {"timestamp": {"$lt": value}}
-                elif key not in control_params and not use_logical_processing:
-                    # Only process individual fields if not using logical operations
-                    self._update_map(key, value)
-
-            # Handle pagination defaults
-            if not page_specified and not size_specified:
-                self.page_size = 0
-                self.page_number = 0
-            elif page_specified and not size_specified:
-                self.page_size = 10
-                self.page_number = (self.page - 1) * self.page_size
-            elif size_specified and not page_specified:
-                self.page = 1
-                self.page_number = 0
-
-            # If using logical operations, set the logical query
-            if logical_query:
-                self.logical_query = logical_query
-
-            self._validate_projections()
-            if self.adv_map or hasattr(self, 'array_conditions') or hasattr(self, 'field_or_conditions') or hasattr(self, 'logical_query'):
-                self._process_advanced_filters()
-
-            return self._build_query(search_input, start_time)
-
-        except IllegalArgumentException as e:
-            logger.error(f"Illegal argument error: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Error processing request: {str(e)}")
-            raise InternalServerException(f"Error processing request: {str(e)}")
-
-    def _parse_sorting(self, sort_items: List[tuple]) -> None:
-        """Process sorting parameters"""
-        try:
-            self.sort = sort_items
-        except Exception as e:
-            logger.error(f"Error parsing sort parameters: {e}")
-            raise IllegalArgumentException(f"Invalid sort parameters: {str(e)}")
-
-    def _validate_projections(self) -> None:
-        """Validate and process field projections"""
-        try:
-            self.projections = {}
-            
-            # Include fields
-            if self.include:
-                for field in [f.strip() for f in self.include.split(",") if f.strip()]:
-                    self.projections[field] = 1
-
-            # Exclude fields
-            if self.exclude:
-                for field in [f.strip() for f in self.exclude.split(",") if f.strip()]:
-                    self.projections[field] = 0
-
-            logger.info(f"Built projection: {self.projections}")
-        except Exception as e:
-            logger.error(f"Error building projections: {e}")
-            self.projections = None
-
-    def _update_map(self, key: str, value: str) -> None:
-        """Update advanced query map with validation"""
-        # Security check
-        if '\x00' in value:
-            raise IllegalArgumentException(f"Invalid character in {key}: null bytes are not allowed")
-        
-        # Handle logical operators
+# Accepted values for the ``count`` parameter: how ResultCount is computed when the
+# returned page alone does not determine it
+COUNT_POLICIES = ("exact", "estimated", "none")
+
+# Pagination/control parameters that are never turned into field conditions
+CONTROL_PARAMS = frozenset({
+    "searchphrase", "exclude", "include",
+    "skip", "limit", "size", "page",
+    "sort.desc", "sort.asc",
+    "datefrom", "dateto", "logicalOp", "count", "cursor", "relevance", "expandTopics",
+    "stream"
+})
+
+# Field that carries the text score of each result in relevance mode
+SCORE_FIELD = "_score"
+TEXT_SCORE = {"$meta": "textScore"}
+
+_TRUE_VALUES = ("true", "1", "yes")
+_BOOLEAN_VALUES = _TRUE_VALUES + ("false", "0", "no")
+
+# Object-array fields matched with $elemMatch (contactPoint is a single object, not an array)
+ARRAY_FIELDS = ("components", "references", "topic", "authors")
+
+_RESTRICTED_PATTERN = re.compile(r"[^a-z0-9.,@_]", re.IGNORECASE)
+
+# Compiled plans shared by every request in the process
+plan_cache = QueryPlanCache(settings.QUERY_PLAN_CACHE_SIZE)
+
+def validate_input(params: Dict[str, Any]) -> None:
+    """Validate request input parameters"""
+    # Validate searchphrase
+    if "searchphrase" in params and isinstance(params["searchphrase"], list):
+        raise IllegalArgumentException("Only one 'searchphrase' parameter allowed per request")
+
+    # Validate parameter sequence
+    param_keys = list(params.keys())
+    if "searchphrase" in param_keys and param_keys.index("searchphrase") != 0:
+        raise IllegalArgumentException("searchphrase must be the first parameter")
+
+    # Check searchphrase and logicalOp sequence
+    if len(param_keys) > 1:
+        if param_keys[0] == "searchphrase" and param_keys[1] == "logicalOp":
+            raise IllegalArgumentException("'searchphrase' cannot be followed by 'logicalOp'")
+
+    # Check for null bytes and path traversal attempts in all parameters
+    for key, value in params.items():
+        if not value:
+            continue
+
+        # Convert value to string if it's not already
+        str_value = str(value)
+
+        # Check for null bytes
+        if '\x00' in str_value or '%00' in str_value:
+            logger.warning(f"Null byte detected in parameter {key}: {str_value}")
+            raise IllegalArgumentException(f"Invalid character in parameter {key}: null bytes are not allowed")
+
+        # Check for path traversal attempts
+        if '../' in str_value or '..%2f' in str_value.lower():
+            logger.warning(f"Path traversal attempt detected in parameter {key}: {str_value}")
+            raise IllegalArgumentException(f"Invalid character sequence in parameter {key}")
+
         if key == "logicalOp":
-            if value.lower() not in ["and", "or", "not"]:
-                raise IllegalArgumentException(f"Invalid logical operator: {value}")
-            self.logical_ops.append(value.lower())
-            return
-        
-        # Special handling for topic.tag
-        if key == 'topic.tag':
-            import re
-            values = [v.strip() for v in value.split(',') if v.strip()] if ',' in value else [value.strip()]
-            
-            # Create case-insensitive regex patterns for topic.tag field only
-            if len(values) == 1:
-                condition = {"topic.tag": {"$regex": f"{re.escape(values[0])}", "$options": "i"}}
-            else:
-                or_conditions = []
-                for val in values:
-                    or_conditions.append({"topic.tag": {"$regex": f"{re.escape(val)}", "$options": "i"}})
-                condition = {"$or": or_conditions}
-            
-            if not hasattr(self, 'field_or_conditions'):
-                self.field_or_conditions = []
-            
-            self.field_or_conditions.append(condition)
-            logger.info(f"Created topic.tag match condition: {condition}")
-            return
-        
-        # Handle array fields with dot notation (like components.@type) 
-        # @Mehdi: contactPoint is NOT an array, so handle it separately
-        if '.' in key:
-            base_key, sub_key = key.split('.', 1)
-            
-            # For array fields that contain objects (contactPoint is NOT an array)
-            if base_key in ['components', 'references', 'topic', 'authors']:
-                import re
-                
-                if ',' in value and not (value.startswith('"') and value.endswith('"')):
-                    # Handle comma-separated values for OR logic
-                    values = [val.strip() for val in value.split(',') if val.strip()]
-                    
-                    # Create individual conditions for each value
-                    or_conditions = []
-                    for val in values:
-                        if sub_key == '@type':
-                            # Use partial match for @type fields to handle prefixes
-                            pattern = {"$regex": f"{re.escape(val)}", "$options": "i"}
-                        else:
-                            # Use partial match for other fields
-                            pattern = {"$regex": f"{re.escape(val)}", "$options": "i"}
-                        
-                        or_conditions.append({
-                            base_key: {
-                                "$elemMatch": {
-                                    sub_key: pattern
-                                }
-                            }
-                        })
-                    
-                    # Create a single OR condition
-                    condition = {"$or": or_conditions}
-                else:
-                    # Handle single value
-                    if sub_key == '@type':
-                        # Use partial match for @type to handle prefixes
-                        pattern = {"$regex": f"{re.escape(value)}", "$options": "i"}
-                    else:
-                        pattern = {"$regex": f"{re.escape(value)}", "$options": "i"}
-                    
-                    condition = {
-                        base_key: {
-                            "$elemMatch": {
-                                sub_key: pattern
-                            }
-                        }
-                    }
-                
-                if not hasattr(self, 'array_conditions'):
-                    self.array_conditions = []
-                self.array_conditions.append(condition)
-                logger.info(f"Created array condition for {base_key}.{sub_key}: {condition}")
-                return
-            
-            # Handle contactPoint (single object, not array) and other dot notation fields
-            if ',' in value and not (value.startswith('"') and value.endswith('"')):
-                import re
-                values = [val.strip() for val in value.split(',') if val.strip()]
-                
-                # For comma-separated values, create individual regex conditions
-                or_conditions = []
-                for val in values:
-                    or_conditions.append({key: {"$regex": f"{re.escape(val)}", "$options": "i"}})
-                
-                # Create a single OR condition for this field
-                condition = {"$or": or_conditions}
-                
-                if not hasattr(self, 'field_or_conditions'):
-                    self.field_or_conditions = []
-                self.field_or_conditions.append(condition)
-                logger.info(f"Created OR field condition for {key}: {condition}")
-                return
-            else:
-                # Handle single dot notation field (like contactPoint.fn)
-                import re
-                pattern = {"$regex": f"{re.escape(value)}", "$options": "i"}
-                
-                # Build nested dictionary structure for dot notation
-                parts = key.split('.')
-                current = self.adv_map
-                
-                for part in parts[:-1]:
-                    if part not in current:
-                        current[part] = {}
-                    current = current[part]
-                
-                current[parts[-1]] = pattern
-                return
-        
-        # Handle direct field queries (like @type=DataPublication)
-        if ',' in value and not (value.startswith('"') and value.endswith('"')):
-            import re
-            values = [val.strip() for val in value.split(',') if val.strip()]
-            
-            # For comma-separated values, create individual regex conditions
-            or_conditions = []
-            for val in values:
-                # Use partial match for @type fields to handle prefixes like "nrdp:DataPublication"
-                if key == '@type':
-                    or_conditions.append({key: {"$regex": f"{re.escape(val)}", "$options": "i"}})
-                else:
-                    # Use exact match for other fields
-                    or_conditions.append({key: {"$regex": f"^{re.escape(val)}$", "$options": "i"}})
-            
-            # Create a single OR condition for this field
-            condition = {"$or": or_conditions}
-            
-            if not hasattr(self, 'field_or_conditions'):
-                self.field_or_conditions = []
-            self.field_or_conditions.append(condition)
-            logger.info(f"Created OR field condition for {key}: {condition}")
-            return
-        
-        # Handle single values for direct fields
-        import re
-        if key == '@type':
-            # Use partial match for @type to handle prefixes like "nrdp:DataPublication"
-            pattern = {"$regex": f"{re.escape(value)}", "$options": "i"}
-        else:
-            # Use exact match for other single values
-            pattern = {"$regex": f"^{re.escape(value)}$", "$options": "i"}
-        
-        # Build nested dictionary structure for dot notation
-        parts = key.split('.')
-        current = self.adv_map
-        
-        for part in parts[:-1]:
-            if part not in current:
-                current[part] = {}
-            current = current[part]
-        
-        current[parts[-1]] = pattern
-
-    def _process_advanced_filters(self) -> None:
-        """Process advanced query filters"""
-        search_conditions = []
-
-        # Add array conditions (these can be either AND or OR depending on the field)
-        if hasattr(self, 'array_conditions'):
-            search_conditions.extend(self.array_conditions)
-        
-        # Add field OR conditions
-        if hasattr(self, 'field_or_conditions'):
-            search_conditions.extend(self.field_or_conditions)
-        
-        # Add regular field conditions
-        def process_nested_dict(prefix, nested_dict):
-            for key, value in nested_dict.items():
-                full_key = f"{prefix}.{key}" if prefix else key
-                
-                if isinstance(value, dict):
-                    # Check if this is a MongoDB operator dict (like $in)
-                    if any(k.startswith('$') for k in value.keys()):
-                        search_conditions.append({full_key: value})
-                    else:
-                        # Recurse into nested dictionary
-                        process_nested_dict(full_key, value)
-                else:
-                    # Handle single string values
-                    search_conditions.append({
-                        full_key: {"$regex": value, "$options": "i"}
-                    })
-        
-        # Process the entire adv_map
-        process_nested_dict("", self.adv_map)
-        
-        if not search_conditions:
-            return
-
-        logger.info(f"Processing filters - Conditions: {search_conditions}")
-        
-        self.bson_objs = search_conditions 
-
-    def _build_query(self, search_input: bool, start_time: float) -> Dict[str, Any]:
-        """Build final MongoDB query"""
-        query = {}
-        
-        # Combine all conditions properly
-        conditions = []
-        
-        # Add text search if present
-        if self.search_phrase_filter:
-            conditions.append(self.search_phrase_filter)
+            valid_logical_ops = ["AND", "OR", "and", "or"]
+            if str_value not in valid_logical_ops:
+                raise IllegalArgumentException(f"Invalid logical operator: {str_value}. Must be 'AND' or 'OR'")
+        if key == "relevance" and str_value.lower() not in _BOOLEAN_VALUES:
+            raise IllegalArgumentException(f"Invalid relevance flag: {str_value}. Must be true or false")
+        if key == "expandTopics" and str_value.lower() not in _BOOLEAN_VALUES:
+            raise IllegalArgumentException(f"Invalid expandTopics flag: {str_value}. Must be true or false")
+        if key == "stream" and str_value.lower() not in _BOOLEAN_VALUES:
+            raise IllegalArgumentException(f"Invalid stream flag: {str_value}. Must be true or false")
+        if key == "count" and str_value.lower() not in COUNT_POLICIES:
+            raise IllegalArgumentException(f"Invalid count policy: {str_value}. Must be one of {', '.join(COUNT_POLICIES)}")
+        # Existing validation
+        if key in ["exclude", "include", "sort_desc", "sort_asc"]:
+            if isinstance(value, str) and _RESTRICTED_PATTERN.search(value):
+                raise IllegalArgumentException(f"Invalid characters in {key}")
+        elif key in ["skip", "limit"]:
+            try:
+                int(value)
+            except ValueError:
+                raise IllegalArgumentException(f"{key} must be an integer")
+
+def relevance_requested(params: Dict[str, Any]) -> bool:
+    """Whether the parameters ask for results ranked by text score"""
+    return str(params.get("relevance") or "").lower() in _TRUE_VALUES
+
+def stream_requested(params: Dict[str, Any]) -> bool:
+    """Whether the client asked for the results to be streamed from the cursor"""
+    return str(params.get("stream") or "").lower() in _TRUE_VALUES
+
+def expand_topics_requested(params: Dict[str, Any]) -> bool:
+    """Whether ``topic.tag`` filters should also match every term below them in the taxonomy"""
+    return str(params.get("expandTopics") or "").lower() in _TRUE_VALUES
+
+def process_search_params(params: Dict[str, Any], normalized_fields: FrozenSet[str] = frozenset()) -> Dict[str, Any]:
+    """Process and build MongoDB query from request parameters, reusing a compiled plan when possible"""
+    start_time = time.time()
+    plan = plan_cache.get_or_compile(params, compile_search_params, normalized_fields)
+    return plan.to_dict(start_time)
+
+def compile_search_params(params: Dict[str, Any], normalized_fields: FrozenSet[str] = frozenset()) -> QueryPlan:
+    """
+    Compile request parameters into an immutable QueryPlan, bypassing the plan cache.
+
+    Exact-match filters on ``normalized_fields`` are compiled to equality on their
+    indexed ``_norm`` shadow fields instead of case-insensitive regexes.
+
+    With ``relevance=true`` the results of a ``searchphrase`` are ranked by text
+    score, which is returned as ``_score``. Any requested sort breaks ties, and an
+    unpaged request is capped at ``RELEVANCE_DEFAULT_LIMIT`` so MongoDB only has to
+    keep the top matches instead of sorting the full match set.
+    """
+    try:
+        validate_input(params)
+        relevance = relevance_requested(params)
+        if relevance and not params.get("searchphrase"):
+            raise IllegalArgumentException("relevance ranking requires a searchphrase")
+        if relevance and params.get("cursor"):
+            raise IllegalArgumentException("relevance ranking cannot be combined with cursor pagination")
+        if expand_topics_requested(params) and "logicalOp" in params:
+            raise IllegalArgumentException("expandTopics cannot be combined with logicalOp")
+
+        # Use logical processing if we have logicalOp OR multiple field parameters
+        field_params = [k for k, v in params.items() if k not in CONTROL_PARAMS and v]
+        use_logical_processing = "logicalOp" in params or len(field_params) > 1
+
+        field_conditions = []
+        if use_logical_processing:
+            logical_query = _build_logical_query(_group_fields_by_logical_op(params))
+            if logical_query:
+                field_conditions.append(logical_query)
 
-        # Add logical query if present
-        if hasattr(self, 'logical_query') and self.logical_query:
-            conditions.append(self.logical_query)
+        include = exclude = ""
+        sort = None
+        search_phrase_filter = filter_gte = filter_lt = None
+        skip = page_size = 0
+        page = 1
+        page_specified = False
+        size_specified = False
 
-        # Add field conditions
-        if self.bson_objs:
-            conditions.extend(self.bson_objs)
+        for key, value in params.items():
+            if not value or key == "logicalOp":
+                continue
 
-        # Add date filters if present
-        if self.filter_gte:
-            conditions.append(self.filter_gte)
-        if self.filter_lt:
-            conditions.append(self.filter_lt)
+            if key == "searchphrase":
+                search_phrase_filter = {
+                    "$text": {
+                        "$search": f'\\{value}\\' if value.startswith('"') and value.endswith('"') else value
+                    }
+                }
+            elif key == "exclude":
+                exclude = value
+            elif key == "include":
+                include = value
+            elif key == "skip":
+                skip = int(value)
+            elif key == "page":
+                page = int(value)
+                page_specified = True
+                if size_specified:
+                    skip = (page - 1) * page_size
+            elif key == "size" or key == "limit":
+                page_size = int(value)
+                size_specified = True
+                if page_specified and page > 1:
+                    skip = (page - 1) * page_size
+            elif key == "sort.desc":
+                sort = tuple((field, DESCENDING) for field in value.split(","))
+            elif key == "sort.asc":
+                sort = tuple((field, ASCENDING) for field in value.split(","))
+            elif key == "datefrom":
+                filter_gte = {"timestamp": {"$gte": value}}
+            elif key == "dateto":
+                filter_lt = {"timestamp": {"$lt": value}}
+            elif key not in CONTROL_PARAMS and not use_logical_processing:
+                # A single field without logical operators
+                field_conditions.append(field_condition(key, value, normalized_fields))
+
+        # Handle pagination defaults
+        if not page_specified and not size_specified:
+            page_size = 0
+            skip = 0
+        elif page_specified and not size_specified:
+            page_size = 10
+            skip = (page - 1) * page_size
+        elif size_specified and not page_specified:
+            skip = 0
+
+        projection = _build_projection(include, exclude)
+        if relevance:
+            projection[SCORE_FIELD] = TEXT_SCORE
+            sort = ((SCORE_FIELD, TEXT_SCORE),) + tuple(item for item in sort or () if item[0] != SCORE_FIELD)
+            if page_size <= 0:
+                page_size = settings.RELEVANCE_DEFAULT_LIMIT
+
+        conditions = []
+        if search_phrase_filter:
+            conditions.append(search_phrase_filter)
+        conditions.extend(field_conditions)
+        if filter_gte:
+            conditions.append(filter_gte)
+        if filter_lt:
+            conditions.append(filter_lt)
 
         # Combine all conditions with $and
+        query = {}
         if len(conditions) == 1:
             query = conditions[0]
         elif len(conditions) > 1:
             query = {"$and": conditions}
 
-        logger.info(f"Final MongoDB Query: {query}")
-        logger.info(f"Query conditions count: {len(conditions)}")
-        logger.info(f"Individual conditions: {conditions}")  
-
-        return {
-            "query": query,
-            "projection": self.projections,
-            "sort": self.sort,
-            "skip": self.page_number,
-            "limit": self.page_size if self.page_size > 0 else None,  # This is correct!
-            "metrics": {"elapsed_time": time.time() - start_time}
-        }
-
-    
-    def _group_fields_by_logical_op(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Group fields by their associated logical operators"""
-        field_groups = []
-        current_group = {"fields": {}, "logicalOp": "AND"}  # Default to AND
-        
-        # Define control parameters to exclude from field processing
-        control_params = {
-            "exclude", "include", "skip", "limit", "size", "page", 
-            "sort.desc", "sort.asc", "datefrom", "dateto", "searchphrase"
-        }
-        
-        # If no logicalOp is specified, treat all fields as a single AND group
-        if "logicalOp" not in params:
-            for key, value in params.items():
-                if key not in control_params and value:
-                    current_group["fields"][key] = value
-            
-            if current_group["fields"]:
-                field_groups.append(current_group)
-            
-            return field_groups
-        
-        # Handle explicit logicalOp parameters
-        param_order = list(params.keys())
-        
-        # Collect all fields first
-        fields_before_logical_op = {}
-        fields_after_logical_op = {}
-        logical_op_found = False
-        logical_operator = "AND"
-        
-        for key in param_order:
-            value = params[key]
-            
-            if key == "logicalOp":
-                logical_op_found = True
-                logical_operator = value.upper()
-            elif key not in control_params and value:
-                if not logical_op_found:
-                    fields_before_logical_op[key] = value
-                else:
-                    fields_after_logical_op[key] = value
-        
-        # Create a single group with all fields and the specified logical operator
-        all_fields = {}
-        all_fields.update(fields_before_logical_op)
-        all_fields.update(fields_after_logical_op)
-        
-        if all_fields:
-            field_groups.append({
-                "fields": all_fields,
-                "logicalOp": logical_operator
-            })
-        
-        return field_groups
-
-    
-    def _build_logical_query(self, field_groups: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Build MongoDB query with proper logical operations"""
-        if not field_groups:
-            return {}
-        
-        if len(field_groups) == 1:
-            # Single group - build based on its logical operator
-            group = field_groups[0]
-            conditions = []
-            
-            for field, value in group["fields"].items():
-                # Handle comma-separated values for OR within same field
-                if "," in str(value):
-                    field_conditions = []
-                    for val in str(value).split(","):
-                        val = val.strip()
-                        if val:
-                            # Use partial match for better search results
-                            field_conditions.append({field: {"$regex": f"{re.escape(val)}", "$options": "i"}})
-                    if field_conditions:
-                        conditions.append({"$or": field_conditions})
-                else:
-                    # Use partial match instead of exact match for better search results
-                    conditions.append({field: {"$regex": f"{re.escape(str(value))}", "$options": "i"}})
-            
-            if len(conditions) == 1:
-                return conditions[0]
-            elif group["logicalOp"] == "OR":
-                return {"$or": conditions}
+        logger.debug(f"Final MongoDB Query: {query}")
+        logger.debug(f"Query conditions count: {len(conditions)}")
+
+        return QueryPlan(
+            query=query,
+            projection=projection,
+            sort=sort,
+            skip=skip,
+            limit=page_size if page_size > 0 else None
+        )
+
+    except IllegalArgumentException as e:
+        logger.error(f"Illegal argument error: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        raise InternalServerException(f"Error processing request: {str(e)}")
+
+def _build_projection(include: str, exclude: str) -> Dict[str, Any]:
+    """Build the field projection from the include and exclude lists"""
+    projection = {}
+    for field in [f.strip() for f in include.split(",") if f.strip()]:
+        projection[field] = 1
+    for field in [f.strip() for f in exclude.split(",") if f.strip()]:
+        projection[field] = 0
+    logger.debug(f"Built projection: {projection}")
+    return projection
+
+def _regex(value: str, exact: bool = False) -> Dict[str, str]:
+    """Case-insensitive regex condition on ``value``, anchored when ``exact``"""
+    pattern = re.escape(value)
+    return {"$regex": f"^{pattern}$" if exact else pattern, "$options": "i"}
+
+def _check_list_length(key: str, values: List[str]) -> List[str]:
+    """Reject value lists longer than ``MAX_FILTER_VALUES``; returns ``values``"""
+    if len(values) > settings.MAX_FILTER_VALUES:
+        raise IllegalArgumentException(f"Too many values for {key}: {len(values)} "
+                                       f"(at most {settings.MAX_FILTER_VALUES} allowed)")
+    return values
+
+def _split_values(key: str, value: str) -> Optional[List[str]]:
+    """The values of a comma-separated list, or None for a single (or quoted) value"""
+    if ',' in value and not (value.startswith('"') and value.endswith('"')):
+        return _check_list_length(key, [val.strip() for val in value.split(',') if val.strip()])
+    return None
+
+def _exact(key: str, value: str, normalized_fields: FrozenSet[str]) -> Dict[str, Any]:
+    """Case-insensitive exact match on ``key``: shadow field equality when available, else an anchored regex"""
+    normalized = normalize_value(value) if key in normalized_fields else None
+    if normalized is not None:
+        return {shadow_field(key): normalized}
+    return {key: _regex(value, exact=True)}
+
+def _exact_any(key: str, values: List[str], normalized_fields: FrozenSet[str]) -> Dict[str, Any]:
+    """
+    Case-insensitive exact match on ``key`` against any of ``values``, as one predicate.
+
+    On a normalized field this is a single indexed ``$in`` on the shadow field;
+    otherwise a ``$in`` of anchored regexes, evaluated in one pass instead of an
+    ``$or`` branch per value.
+    """
+    if key in normalized_fields:
+        normalized = list(dict.fromkeys(v for v in map(normalize_value, values) if v is not None))
+        if len(normalized) == 1:
+            return {shadow_field(key): normalized[0]}
+        if normalized:
+            return {shadow_field(key): {"$in": normalized}}
+
+    patterns = list(dict.fromkeys(f"^{re.escape(val)}$" for val in values))
+    if len(patterns) == 1:
+        return {key: {"$regex": patterns[0], "$options": "i"}}
+    return {key: {"$in": [Regex(pattern, "i") for pattern in patterns]}}
+
+def _partial_any(values: List[str]) -> Dict[str, Any]:
+    """
+    Case-insensitive partial match against any of ``values``: a single regex, or one
+    ``$in`` of regexes evaluated in a single pass instead of an ``$or`` branch per value
+    """
+    patterns = list(dict.fromkeys(re.escape(val) for val in values))
+    if len(patterns) == 1:
+        return {"$regex": patterns[0], "$options": "i"}
+    return {"$in": [Regex(pattern, "i") for pattern in patterns]}
+
+def field_condition(key: str, value: str, normalized_fields: FrozenSet[str] = frozenset()) -> Dict[str, Any]:
+    """
+    Build the condition for a single field parameter.
+
+    Comma-separated values are alternatives and become a single ``$in``: of shadow
+    field values or anchored regexes on exact-match fields, of unanchored regexes
+    where partial matching is needed. ``components``, ``references``, ``topic`` and ``authors`` hold arrays
+    of objects and are matched with ``$elemMatch``. Exact matches on
+    ``normalized_fields`` use their shadow fields.
+    """
+    # Security check
+    if '\x00' in value:
+        raise IllegalArgumentException(f"Invalid character in {key}: null bytes are not allowed")
+
+    # Special handling for topic.tag: partial, case-insensitive matches
+    if key == 'topic.tag':
+        values = _check_list_length(key, [v.strip() for v in value.split(',') if v.strip()]) if ',' in value else [value.strip()]
+        condition = {"topic.tag": _partial_any(values)}
+        logger.info(f"Created topic.tag match condition: {condition}")
+        return condition
+
+    values = _split_values(key, value)
+
+    # Handle array fields with dot notation (like components.@type)
+    if '.' in key:
+        base_key, sub_key = key.split('.', 1)
+        if base_key in ARRAY_FIELDS:
+            if values is not None:
+                condition = {base_key: {"$elemMatch": {sub_key: _partial_any(values)}}}
             else:
-                return {"$and": conditions}
-        
-        # Multiple groups - combine them
-        group_conditions = []
-        for group in field_groups:
-            group_query = self._build_logical_query([group])
-            if group_query:
-                group_conditions.append(group_query)
-        
-        if len(group_conditions) == 1:
-            return group_conditions[0]
+                condition = {base_key: {"$elemMatch": {sub_key: _regex(value)}}}
+            logger.info(f"Created array condition for {base_key}.{sub_key}: {condition}")
+            return condition
+
+        # contactPoint (single object, not array) and other dot notation fields
+        if values is not None:
+            condition = {key: _partial_any(values)}
+            logger.info(f"Created multi-value condition for {key}: {condition}")
+            return condition
+        return {key: _regex(value)}
+
+    # Direct field queries: partial match for @type to handle prefixes like
+    # "nrdp:DataPublication", exact match for everything else
+    if key == '@type':
+        if values is None:
+            return {key: _regex(value)}
+        condition = {key: _partial_any(values)}
+    elif values is not None:
+        condition = _exact_any(key, values, normalized_fields)
+    else:
+        return _exact(key, value, normalized_fields)
+    logger.info(f"Created multi-value condition for {key}: {condition}")
+    return condition
+
+def _group_fields_by_logical_op(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Group fields by their associated logical operators"""
+    fields = {key: value for key, value in params.items() if key not in CONTROL_PARAMS and value}
+    if not fields:
+        return []
+    # Without an explicit logicalOp all fields form a single AND group
+    logical_operator = str(params.get("logicalOp", "AND")).upper()
+    return [{"fields": fields, "logicalOp": logical_operator}]
+
+def _build_logical_query(field_groups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build MongoDB query with proper logical operations"""
+    if not field_groups:
+        return {}
+
+    if len(field_groups) == 1:
+        # Single group - build based on its logical operator
+        group = field_groups[0]
+        conditions = []
+
+        for field, value in group["fields"].items():
+            # Handle comma-separated values for OR within same field
+            if "," in str(value):
+                values = _check_list_length(field, [val.strip() for val in str(value).split(",") if val.strip()])
+                if values:
+                    conditions.append({field: _partial_any(values)})
+            else:
+                # Use partial match instead of exact match for better search results
+                conditions.append({field: _regex(str(value))})
+
+        if len(conditions) == 1:
+            return conditions[0]
+        elif group["logicalOp"] == "OR":
+            return {"$or": conditions}
         else:
-            # Multiple groups are combined with AND by default
-            return {"$and": group_conditions}
+            return {"$and": conditions}
+
+    # Multiple groups are combined with AND
+    group_conditions = [query for query in (_build_logical_query([group]) for group in field_groups) if query]
+    if len(group_conditions) == 1:
+        return group_conditions[0]
+    return {"$and": group_conditions}
@@ -28,7 +28,7 @@ async def search_apis(request: Request, params: Dict[str, Any] = Depends(validat
             "Metrics": Query execution metrics
         }
     """
-    return api_crud.search(**params)
+    return await api_crud.search_async(**params)
 
 @router.get("/apis/{api_id}")
 async def get_api(request: Request, api_id: str):
@@ -41,4 +41,4 @@ async def get_api(request: Request, api_id: str):
     Returns:
         Dict: The API data with metadata
     """
-    return api_crud.get(api_id)
\ No newline at end of file
+    return await api_crud.get_async(api_id)
\ No newline at end of file
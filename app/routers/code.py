@@ -26,11 +26,11 @@ async def search_code(request: Request, params: Dict[str, Any] = Depends(validat
             "Metrics": Query execution metrics
         }
     """
-    return code_crud.search(**params)
+    return await code_crud.search_async(**params)
 
 @router.get("/code/{code_id}")
 async def get_code(request: Request, code_id: str):
     """
     Get a single code entry by ID
     """
-    return code_crud.get(code_id)
\ No newline at end of file
+    return await code_crud.get_async(code_id)
\ No newline at end of file
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator
+from app.crud.record import record_crud
+from app.crud.code import code_crud
+from app.crud.patent import patent_crud
+from app.crud.taxonomy import taxonomy_crud
+from app.crud.version import version_crud
+from app.crud.releaseset import releaseset_crud
+from app.middleware.dependencies import validate_search_params
+from app.middleware.exceptions import ResourceNotFoundException
+import zlib
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"]
+)
+
+# Collections available for bulk export, by URL name
+EXPORTABLE = {
+    "records": record_crud,
+    "code": code_crud,
+    "patents": patent_crud,
+    "taxonomy": taxonomy_crud,
+    "versions": version_crud,
+    "releasesets": releaseset_crud,
+}
+
+# Parameters consumed by the export itself rather than passed on as search filters
+EXPORT_PARAMS = ("after", "gzip", "page", "size", "skip", "limit", "sort.asc", "sort.desc", "cursor", "relevance")
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream, flushing after every chunk so a cut-off download stays readable"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+@router.get("/{collection}")
+async def export_collection(request: Request, collection: str, params: Dict[str, Any] = Depends(validate_search_params)):
+    """
+    Export a whole collection as NDJSON (one JSON document per line).
+
+    The documents are streamed straight from a single cursor in ``_id`` order, so a
+    full dump is one linear scan however large the collection is.
+
+    Args:
+        collection: One of records, code, patents, taxonomy, versions, releasesets
+        params (Dict[str, Any]): Export parameters including:
+            - include/exclude (str, optional): Fields to include/exclude
+            - after (str, optional): ``_id`` of the last document received; the export
+              resumes right after it
+            - gzip (bool, optional): Compress the stream (``Content-Encoding: gzip``)
+            - any search filter accepted by the collection's search endpoint
+
+    Returns:
+        StreamingResponse: ``application/x-ndjson`` body
+    """
+    crud = EXPORTABLE.get(collection)
+    if crud is None:
+        raise ResourceNotFoundException(f"Collection {collection} cannot be exported. "
+                                        f"Available: {', '.join(EXPORTABLE)}")
+
+    after = params.get("after")
+    compress = str(params.get("gzip", "")).lower() in ("true", "1", "yes")
+    filters = {k: v for k, v in params.items() if k not in EXPORT_PARAMS}
+
+    body = await crud.export_async(after=after, **filters)
+    headers = {}
+    if compress:
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
@@ -15,10 +15,15 @@ router = APIRouter(
 @router.get("/fields/")
 @router.get("/fields")
 async def search_fields(request: Request):
-    # Fetch all fields directly without pagination
-    fields = field_crud.get_all(limit=0)
-    # Return just the list, no extra metadata
-    return fields
+    """
+    Return the full field list, without pagination or extra metadata.
+
+    The list is served from a prebuilt payload in the encoding the client accepts
+    (brotli, gzip or identity), with a strong ETag: a matching ``If-None-Match``
+    gets ``304 Not Modified``.
+    """
+    catalog = await field_crud.catalog_async()
+    return catalog.response(request.headers)
 
 # async def search_fields(request: Request, params: Dict[str, Any] = Depends(validate_search_params)):
 #     """
@@ -86,7 +91,7 @@ async def get_field(request: Request, field_id: str):
         InternalServerException: If there is an error processing the request
     """
     try:
-        result = field_crud.get(field_id)
+        result = await field_crud.get_async(field_id)
         if not result.get('ResultData'):
             raise KeyWordNotFoundException(f"Field with ID {field_id} not found")
         return result
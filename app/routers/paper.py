@@ -1,21 +1,14 @@
-from pathlib import Path
-import certifi
-import requests
 from fastapi import APIRouter, Query, Request
 from typing import Optional, List, Dict, Any
 import logging
 import time
+from app.config import settings
+from app.crud.paper import paper_client
+from app.crud.paper_mirror import paper_mirror_crud
 from app.middleware.exceptions import KeyWordNotFoundException, InternalServerException, IllegalArgumentException
 
 logger = logging.getLogger(__name__)
 
-PAPERS_API_URL = "https://tsapps-d.nist.gov/nps/nps_public_api/api/Publication/search"
-PAPERS_API_HEADERS = {
-    "accept": "application/json",
-    "Content-Type": "application/json; x-api-version=1.0"
-}
-CERT_PATH = Path(__file__).parent.parent / "certificates" / "nist_cert.crt"
-
 router = APIRouter()
 
 def filter_fields(doc: Dict[str, Any], include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> Dict[str, Any]:
@@ -26,6 +19,31 @@ def filter_fields(doc: Dict[str, Any], include: Optional[List[str]] = None, excl
         return {k: v for k, v in doc.items() if k not in exclude}
     return doc
 
+async def search_mirror(request: Request, searchphrase: Optional[str], from_date: Optional[str], skip: int, limit: int,
+                        include: Optional[List[str]], exclude: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Search the local mirror of the Papers API.
+
+    Returns None when the live API should answer instead: with
+    ``PAPERS_MIRROR_FALLBACK`` set, when the mirror is empty or cannot be queried.
+    """
+    params = {"searchphrase": searchphrase, "from_date": from_date, "skip": skip, "limit": limit,
+              "include": ",".join(include or []), "exclude": ",".join(exclude or [])}
+    params = {key: value for key, value in params.items() if value not in (None, "")}
+    try:
+        if settings.PAPERS_MIRROR_FALLBACK and await paper_mirror_crud.document_count() == 0:
+            logger.warning("Papers mirror is empty, searching the Papers API")
+            return None
+        result = await paper_mirror_crud.search_async(**params)
+    except (KeyWordNotFoundException, InternalServerException) as e:
+        if not settings.PAPERS_MIRROR_FALLBACK:
+            raise
+        logger.warning(f"Papers mirror unavailable, searching the Papers API: {e}")
+        return None
+    if not result["ResultData"]:
+        raise KeyWordNotFoundException(str(request.url))
+    return result
+
 @router.get("/papers/")
 @router.get("/papers")
 async def search_papers(
@@ -39,6 +57,9 @@ async def search_papers(
 ):
     """
     Search papers from the NIST Papers API.
+
+    With ``PAPERS_SOURCE=mirror`` the papers are searched in the local mirror kept
+    by ``app.crud.paper_mirror`` instead.
     
     Args:
         searchphrase (str, optional): Text to search for in papers
@@ -71,56 +92,34 @@ async def search_papers(
         if skip < 0 or limit <= 0:
             raise IllegalArgumentException("Skip must be non-negative and limit must be positive")
         
-        # Check if certificate exists
-        if not CERT_PATH.exists():
-            logger.error(f"Certificate file not found: {CERT_PATH}")
-            raise InternalServerException("Certificate file not found")
-            
-        verify = str(CERT_PATH)
-        
-        payload = {
-            "searchString": searchphrase if searchphrase else "",
-            "fromDate": f"{from_date}T00:00:00.000Z"
-        }
+        if settings.PAPERS_SOURCE == "mirror":
+            result = await search_mirror(request, searchphrase, from_date, skip, limit, include, exclude)
+            if result is not None:
+                return result
 
-        try:
-            response = requests.post(
-                PAPERS_API_URL,
-                json=payload,
-                headers=PAPERS_API_HEADERS,
-                verify=verify
-            )
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to connect to Papers API: {str(e)}")
-            raise InternalServerException(f"Failed to connect to Papers API: {str(e)}")
+        # Upstream results are cached per search, so later pages are sliced from memory
+        papers_data = await paper_client.search(searchphrase, from_date)
 
-        if response.status_code == 200:
-            papers_data = response.json()
-            
-            # If no results were found
-            if not papers_data:
-                raise KeyWordNotFoundException(str(request.url))
-            
-            # Filter fields and apply pagination
-            filtered_data = [
-                filter_fields(paper, include, exclude) 
-                for paper in papers_data
-            ][skip:skip + limit] if papers_data else []
-            
-            # If pagination results in empty results
-            if not filtered_data:
-                raise KeyWordNotFoundException(str(request.url))
-            
-            return {
+        # If no results were found
+        if not papers_data:
+            raise KeyWordNotFoundException(str(request.url))
 
-                "ResultCount": len(papers_data),
-                "ResultData": filtered_data,
-                "PageSize": limit,
-                "Metrics": {"ElapsedTime": time.time() - start_time}
-            }
-        else:
-            logger.error(f"Papers API error: {response.status_code}")
-            raise InternalServerException(f"Error from Papers API: {response.status_code}")
+        # Apply pagination, then filter fields of the page only
+        filtered_data = [
+            filter_fields(paper, include, exclude)
+            for paper in papers_data[skip:skip + limit]
+        ]
+
+        # If pagination results in empty results
+        if not filtered_data:
+            raise KeyWordNotFoundException(str(request.url))
+
+        return {
+            "ResultCount": len(papers_data),
+            "ResultData": filtered_data,
+            "PageSize": limit,
+            "Metrics": {"ElapsedTime": time.time() - start_time}
+        }
 
     except (KeyWordNotFoundException, IllegalArgumentException, InternalServerException):
         # Re-raise these exceptions for the global exception handlers
@@ -38,9 +38,9 @@ async def search_patents(
     if file_date:
         search_params["File Date"] = file_date
         
-    return patent_crud.search(**search_params)
+    return await patent_crud.search_async(**search_params)
 
 @router.get("/patents/{patent_id}")
 async def get_patent(patent_id: str):
     """Get a patent by ID or patent number"""
-    return patent_crud.get(patent_id)
\ No newline at end of file
+    return await patent_crud.get_async(patent_id)
\ No newline at end of file
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Query, Depends, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any
 from app.crud.record import record_crud
 from app.middleware.dependencies import validate_search_params
@@ -7,7 +8,7 @@ router = APIRouter()
 
 @router.get("/records/")
 @router.get("/records")
-async def search_records(reqest: Request, params: Dict[str, Any] = Depends(validate_search_params)):
+async def search_records(request: Request, params: Dict[str, Any] = Depends(validate_search_params)):
     """
     Search record entries in the database.
     
@@ -17,16 +18,40 @@ async def search_records(reqest: Request, params: Dict[str, Any] = Depends(valid
             - skip (int, optional): Number of records to skip
             - limit (int, optional): Maximum records to return
             - include/exclude (List[str], optional): Fields to include/exclude
+            - cursor (str, optional): ``*`` for the first keyset page, then the
+              ``NextCursor`` of the previous response
+            - relevance (bool, optional): Rank ``searchphrase`` matches by text score,
+              returned as ``_score`` on each record
+            - stream (bool, optional): Stream an unpaginated result set from the cursor
+            - expandTopics (bool, optional): Also match records tagged with any
+              taxonomy term below each ``topic.tag`` value
             
     Returns:
         Dict: {
             "ResultData": List of matched records,
             "ResultCount": Total number of matches,
             "PageSize": Number of records per page,
-            "Metrics": Query execution metrics
+            "Metrics": Query execution metrics,
+            "NextCursor": Token for the next page (only when ``cursor`` was given)
         }
+
+        With ``stream=true``, unpaginated searches (no ``page``, ``size``, ``limit``,
+        ``skip`` or ``cursor``) that are not already cached are streamed straight from
+        the cursor, with ``ResultCount`` following ``ResultData`` in the body.
     """
-    return record_crud.search(**params)
+    result = None
+    if record_crud.should_stream(params):
+        result = await record_crud.cached_search_async(**params)
+        if result is None:
+            first, body = await record_crud.open_search_stream_async(**params)
+            if "@id" in params and first:
+                request.state.metrics_record = first
+            return StreamingResponse(body, media_type="application/json")
+    if result is None:
+        result = await record_crud.search_async(**params)
+    if "@id" in params and result.get("ResultData"):
+        request.state.metrics_record = result["ResultData"][0]
+    return result
 
 
 @router.get("/records/{record_id:path}")
@@ -42,4 +67,7 @@ async def get_record(request: Request, record_id: str):
     Returns:
         dict: The record data without wrapper
     """
-    return record_crud.get(record_id)
\ No newline at end of file
+    result = await record_crud.get_async(record_id)
+    # Identifies the record to the metrics middleware without it re-parsing the response
+    request.state.metrics_record = result["ResultData"][0]
+    return result
\ No newline at end of file
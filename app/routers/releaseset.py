@@ -28,7 +28,7 @@ async def search_releasesets(request: Request, params: Dict[str, Any] = Depends(
             "Metrics": Query execution metrics
         }
     """
-    return releaseset_crud.search(**params)
+    return await releaseset_crud.search_async(**params)
 
 @router.get("/releasesets/{releaseset_id}")
 async def get_releaseset(request: Request, releaseset_id: str):
@@ -41,4 +41,4 @@ async def get_releaseset(request: Request, releaseset_id: str):
     Returns:
         Dict: The release set data with metadata
     """
-    return releaseset_crud.get(releaseset_id)
\ No newline at end of file
+    return await releaseset_crud.get_async(releaseset_id)
\ No newline at end of file
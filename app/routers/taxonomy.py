@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Query, Body, Depends, Request
 from typing import List, Optional, Dict, Any
 from app.crud.taxonomy import taxonomy_crud
@@ -28,7 +29,33 @@ async def search_taxonomy(request: Request, params: Dict[str, Any] = Depends(val
             "Metrics": Query execution metrics
         }
     """
-    return taxonomy_crud.search(**params)
+    return await taxonomy_crud.search_async(**params)
+
+@router.get("/taxonomy/subtree")
+async def get_taxonomy_subtree(request: Request, term: str = Query(..., description="Term or full path, such as \"Physics: Optical physics\"")):
+    """
+    Get a taxonomy term and every term below it.
+
+    Args:
+        term (str): The term, or its full path to tell apart terms used under several parents
+
+    Returns:
+        Dict: The matching entries in depth-first order, each with its ``path`` and ``depth``
+    """
+    return await asyncio.to_thread(taxonomy_crud.subtree, term)
+
+@router.get("/taxonomy/ancestors")
+async def get_taxonomy_ancestors(request: Request, term: str = Query(..., description="Term or full path")):
+    """
+    Get the terms above a taxonomy term.
+
+    Args:
+        term (str): The term, or its full path
+
+    Returns:
+        Dict: The ancestor entries from the root down, each with its ``path`` and ``depth``
+    """
+    return await asyncio.to_thread(taxonomy_crud.ancestors, term)
 
 @router.get("/taxonomy/{taxonomy_id}")
 async def get_taxonomy(request: Request, taxonomy_id: str):
@@ -41,4 +68,4 @@ async def get_taxonomy(request: Request, taxonomy_id: str):
     Returns:
         Dict: The taxonomy data with metadata
     """
-    return taxonomy_crud.get(taxonomy_id)
\ No newline at end of file
+    return await taxonomy_crud.get_async(taxonomy_id)
\ No newline at end of file
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Path, Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 from app.crud.metrics import metrics_crud
+import asyncio
 import math
 
 router = APIRouter(
@@ -28,10 +29,21 @@ def sanitize_response(data: dict) -> dict:
         
     return sanitize_value(data)
 
+def _time_range_requested(from_date: Optional[str], to_date: Optional[str], granularity: Optional[str]) -> bool:
+    return any(value is not None for value in (from_date, to_date, granularity))
+
 @router.get("/records/{record_id:path}")
-async def get_record_metrics(record_id: str = Path(..., description="Record ID to get metrics for")):
-    """Get metrics for a specific record/dataset"""
-    metrics = metrics_crud.get_record_metrics(record_id)
+async def get_record_metrics(
+    record_id: str = Path(..., description="Record ID to get metrics for"),
+    from_date: Optional[str] = Query(None, alias="from", description="First day, month or year (YYYY[-MM[-DD]])"),
+    to_date: Optional[str] = Query(None, alias="to", description="Last day, month or year (YYYY[-MM[-DD]])"),
+    granularity: Optional[str] = Query(None, description="Time buckets: day, month (default) or year")
+):
+    """Get metrics for a specific record/dataset, or its downloads over time if a time range is given"""
+    if _time_range_requested(from_date, to_date, granularity):
+        metrics = metrics_crud.get_record_usage(record_id, from_date, to_date, granularity)
+    else:
+        metrics = metrics_crud.get_record_metrics(record_id)
     if not metrics:
         raise HTTPException(status_code=404, detail=f"Metrics for record {record_id} not found")
     return JSONResponse(content=sanitize_response(metrics))
@@ -76,20 +88,39 @@ async def get_file_metrics(file_path: str = Path(..., description="File path to
 
 @router.get("/files")
 async def get_files_metrics(
-    sort_by: str = Query("downloads", description="Sort by field (downloads or filepath)"),
-    sort_order: str = Query("desc", description="Sort order (asc or desc)")
+    sort_by: str = Query("downloads", description="Sort by downloads, total_size_download, users or filepath"),
+    sort_order: str = Query("desc", description="Sort order (asc or desc)"),
+    record: Optional[str] = Query(None, description="Only the files of this record (any form of its id)"),
+    page: int = Query(1, ge=1, description="Page number, with size"),
+    size: Optional[int] = Query(None, ge=1, le=1000, description="Page size; all files are streamed if omitted"),
+    cursor: Optional[str] = Query(None, description="'*' for the first keyset page, then the previous NextCursor")
 ):
-    """Get metrics for all files with sorting"""
-    metrics = metrics_crud.get_file_metrics_list(
-        sort_by=sort_by,
-        sort_order=-1 if sort_order.lower() == "desc" else 1
-    )
-    return JSONResponse(content=sanitize_response(metrics))
+    """
+    Get metrics for files with sorting.
+
+    With ``size`` (or ``cursor``) one page is returned, with ``cursor`` paging by
+    keyset and returning a ``NextCursor`` until the last page. Without them every
+    matching file is streamed.
+    """
+    order = -1 if sort_order.lower() == "desc" else 1
+    if size or cursor:
+        metrics = metrics_crud.get_file_metrics_list(
+            sort_by=sort_by, sort_order=order, page=page, size=size, cursor=cursor, record=record)
+        return JSONResponse(content=sanitize_response(metrics))
+    body = await asyncio.to_thread(metrics_crud.stream_file_metrics, sort_by=sort_by, sort_order=order, record=record)
+    return StreamingResponse(body, media_type="application/json")
 
 @router.get("/repo")
-async def get_repo_metrics():
-    """Get repository-level metrics"""
-    metrics = metrics_crud.get_repo_metrics()
+async def get_repo_metrics(
+    from_date: Optional[str] = Query(None, alias="from", description="First day, month or year (YYYY[-MM[-DD]])"),
+    to_date: Optional[str] = Query(None, alias="to", description="Last day, month or year (YYYY[-MM[-DD]])"),
+    granularity: Optional[str] = Query(None, description="Time buckets: day, month (default) or year")
+):
+    """Get repository-level metrics, or downloads over time if a time range is given"""
+    if _time_range_requested(from_date, to_date, granularity):
+        metrics = metrics_crud.get_repo_usage(from_date, to_date, granularity)
+    else:
+        metrics = metrics_crud.get_repo_metrics()
     return JSONResponse(content=sanitize_response(metrics))
 
 @router.get("/totalusers")
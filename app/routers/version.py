@@ -28,7 +28,7 @@ async def search_versions(request: Request, params: Dict[str, Any] = Depends(val
             "Metrics": Query execution metrics
         }
     """
-    return version_crud.search(**params)
+    return await version_crud.search_async(**params)
 
 @router.get("/versions/{version_id}")
 async def get_version(request: Request, version_id: str):
@@ -41,4 +41,4 @@ async def get_version(request: Request, version_id: str):
     Returns:
         Dict: The version data with metadata
     """
-    return version_crud.get(version_id)
\ No newline at end of file
+    return await version_crud.get_async(version_id)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Backfill the indexed ``_lookup_keys`` array on existing documents.
+
+Records and record/file metrics written before identifier normalization was
+introduced have no ``_lookup_keys`` and can only be resolved by their exact
+stored ids. This command derives the keys for every document, writes only the ones that
+changed, and makes sure the supporting index exists. It is safe to re-run.
+
+Usage:
+    python -m app.scripts.backfill_lookup_keys [--target records] [--target fileMetrics] \
+        [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import settings
+from app.crud.identifiers import LOOKUP_KEYS_FIELD, METRICS_ID_FIELDS, RECORD_ID_FIELDS, lookup_keys
+from app.database import db, metrics_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collections to backfill: name -> (database, collection name, identifier fields)
+TARGETS = {
+    "records": (db, settings.RECORDS_COLLECTION, RECORD_ID_FIELDS),
+    "recordMetrics": (metrics_db, settings.RECORD_METRICS_COLLECTION, METRICS_ID_FIELDS),
+    "fileMetrics": (metrics_db, settings.FILE_METRICS_COLLECTION, METRICS_ID_FIELDS),
+}
+
+def backfill(collection, fields, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """
+    Recompute ``_lookup_keys`` for every document in ``collection``.
+
+    Returns a summary with the number of documents scanned and updated.
+    """
+    projection = {field: 1 for field in fields}
+    projection[LOOKUP_KEYS_FIELD] = 1
+
+    scanned = updated = 0
+    batch = []
+    for doc in collection.find({}, projection, no_cursor_timeout=True, batch_size=batch_size):
+        scanned += 1
+        keys = lookup_keys(doc, fields)
+        if doc.get(LOOKUP_KEYS_FIELD) == keys:
+            continue
+        updated += 1
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {LOOKUP_KEYS_FIELD: keys}}))
+        if len(batch) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(batch, ordered=False)
+            batch = []
+
+    if batch and not dry_run:
+        collection.bulk_write(batch, ordered=False)
+
+    if not dry_run:
+        collection.create_index([(LOOKUP_KEYS_FIELD, ASCENDING)])
+
+    return {"scanned": scanned, "updated": updated}
+
+def main(args):
+    targets = args.target or list(TARGETS)
+    for name in targets:
+        database, collection_name, fields = TARGETS[name]
+        summary = backfill(database[collection_name], fields, args.batch_size, args.dry_run)
+        action = "would update" if args.dry_run else "updated"
+        logger.info(f"{collection_name}: scanned {summary['scanned']}, {action} {summary['updated']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill _lookup_keys for identifier lookups")
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="Collection to backfill (repeatable, default: all)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    main(parser.parse_args())
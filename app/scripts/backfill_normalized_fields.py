@@ -0,0 +1,82 @@
+"""
+Backfill the normalized ``_norm`` shadow fields on existing records.
+
+Exact-match filters on searchable fields can only be compiled to indexed
+equality (``NORMALIZED_FILTERS=true``) once every record carries the lower-cased,
+trimmed copies of those fields. This command derives them for every record,
+writes only the ones that changed, and creates an index per shadow field. It is
+safe to re-run, e.g. after a field is marked searchable.
+
+Usage:
+    python -m app.scripts.backfill_normalized_fields [--field keyword] [--field doi] \
+        [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import settings
+from app.crud.normalized import NORMALIZED_FIELD, normalized_values, searchable_fields, shadow_field
+from app.database import db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill(collection, fields, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """
+    Recompute the ``_norm`` shadows of ``fields`` for every document in ``collection``.
+
+    Shadows of other fields are left alone. Returns a summary with the number of
+    documents scanned and updated.
+    """
+    projection = {field: 1 for field in fields}
+    projection[NORMALIZED_FIELD] = 1
+
+    scanned = updated = 0
+    batch = []
+    for doc in collection.find({}, projection, no_cursor_timeout=True, batch_size=batch_size):
+        scanned += 1
+        shadow = normalized_values(doc, fields)
+        current = doc.get(NORMALIZED_FIELD) or {}
+        changes = {"$set": {}, "$unset": {}}
+        for field in fields:
+            if field in shadow and current.get(field) != shadow[field]:
+                changes["$set"][shadow_field(field)] = shadow[field]
+            elif field not in shadow and field in current:
+                changes["$unset"][shadow_field(field)] = ""
+        changes = {op: values for op, values in changes.items() if values}
+        if not changes:
+            continue
+        updated += 1
+        batch.append(UpdateOne({"_id": doc["_id"]}, changes))
+        if len(batch) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(batch, ordered=False)
+            batch = []
+
+    if batch and not dry_run:
+        collection.bulk_write(batch, ordered=False)
+
+    if not dry_run:
+        for field in fields:
+            collection.create_index([(shadow_field(field), ASCENDING)])
+
+    return {"scanned": scanned, "updated": updated}
+
+def main(args):
+    fields = args.field or searchable_fields(db[settings.FIELDS_COLLECTION].find({}, {"name": 1, "searchable": 1, "tags": 1}))
+    if not fields:
+        logger.warning(f"No searchable fields found in {settings.FIELDS_COLLECTION}; nothing to backfill")
+        return
+    logger.info(f"Normalizing fields: {', '.join(fields)}")
+    summary = backfill(db[settings.RECORDS_COLLECTION], fields, args.batch_size, args.dry_run)
+    action = "would update" if args.dry_run else "updated"
+    logger.info(f"{settings.RECORDS_COLLECTION}: scanned {summary['scanned']}, {action} {summary['updated']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill normalized shadow fields for exact-match filters")
+    parser.add_argument("--field", action="append", help="Field to normalize (repeatable, default: searchable fields)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    main(parser.parse_args())
@@ -0,0 +1,68 @@
+"""
+Seed the monthly and yearly repository rollups from ``repoMetrics``.
+
+The download flush only adds new downloads to the rollups, so the history before
+it was enabled is missing. ``repoMetrics`` holds one document per month with
+``year``, ``month``, ``success_download`` and, when available,
+``total_size_download``; this command writes those months, and the years they
+add up to, into ``METRICS_ROLLUPS_COLLECTION``. Buckets that already exist are
+left alone, so it is safe to re-run but should be run before download recording
+is enabled to get complete years. Records and files have no per-period history
+to seed from.
+
+Usage:
+    python -m app.scripts.backfill_rollups [--dry-run]
+"""
+import argparse
+import logging
+from collections import defaultdict
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.crud.metrics import metrics_crud
+from app.crud.user_sketches import REPO_KEY, REPO_SCOPE
+from app.database import metrics_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def repo_buckets(docs) -> dict:
+    """``(granularity, period) -> [downloads, bytes]`` for the months in ``docs`` and their years"""
+    buckets = defaultdict(lambda: [0, 0])
+    for doc in docs:
+        try:
+            year, month = int(doc["year"]), int(doc["month"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        downloads = int(doc.get("success_download") or 0)
+        size = int(doc.get("total_size_download") or 0)
+        for bucket in (buckets["month", f"{year:04d}-{month:02d}"], buckets["year", f"{year:04d}"]):
+            bucket[0] += downloads
+            bucket[1] += size
+    return buckets
+
+def backfill(dry_run: bool = False) -> dict:
+    """Write the missing repository buckets; returns the number of buckets derived and inserted"""
+    docs = metrics_db[settings.REPO_METRICS_COLLECTION].find({}, {"year": 1, "month": 1, "success_download": 1,
+                                                                   "total_size_download": 1})
+    buckets = repo_buckets(docs)
+    operations = [UpdateOne({"scope": REPO_SCOPE, "key": REPO_KEY, "granularity": granularity, "period": period},
+                            {"$setOnInsert": {"downloads": downloads, "total_size_download": size}}, upsert=True)
+                  for (granularity, period), (downloads, size) in sorted(buckets.items())]
+    inserted = 0
+    if operations and not dry_run:
+        metrics_crud.rollups.ensure_indexes()
+        inserted = metrics_crud.rollups.collection.bulk_write(operations, ordered=False).upserted_count
+    return {"buckets": len(operations), "inserted": inserted}
+
+def main(args):
+    summary = backfill(args.dry_run)
+    action = "would write up to" if args.dry_run else "inserted"
+    count = summary["buckets"] if args.dry_run else summary["inserted"]
+    logger.info(f"{settings.METRICS_ROLLUPS_COLLECTION}: {summary['buckets']} repository buckets, {action} {count}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed repository rollups from repoMetrics")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be written without writing")
+    main(parser.parse_args())
@@ -0,0 +1,107 @@
+"""
+Seed the unique-user sketches from the stored ``ip_list`` arrays.
+
+Record, file and repository metrics written before the HyperLogLog sketches
+existed only have their users as ``ip_list`` arrays. This command adds each
+document's users to the matching sketch in ``USER_SKETCHES_COLLECTION`` and
+raises ``number_users`` on record and file metrics to the sketch's estimate
+where that is higher. Repository documents are bucketed by their ``year`` and
+``month``; record and file documents, whose lists cover all time, by the month
+of ``last_time_logged``. Sketches only ever grow, so it is safe to re-run.
+
+With ``--unset-ip-lists`` the arrays are removed once they have been sketched.
+
+Usage:
+    python -m app.scripts.backfill_user_sketches [--target recordMetrics] [--target repoMetrics] \
+        [--batch-size 1000] [--unset-ip-lists]
+"""
+import argparse
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.config import settings
+from app.crud.identifiers import canonical_id
+from app.crud.metrics import metrics_crud
+from app.crud.user_sketches import FILE_SCOPE, RECORD_SCOPE, REPO_KEY, REPO_SCOPE, month_of
+from app.database import metrics_db
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Collections to backfill: name -> (collection name, sketch scope)
+TARGETS = {
+    "recordMetrics": (settings.RECORD_METRICS_COLLECTION, RECORD_SCOPE),
+    "fileMetrics": (settings.FILE_METRICS_COLLECTION, FILE_SCOPE),
+    "repoMetrics": (settings.REPO_METRICS_COLLECTION, REPO_SCOPE),
+}
+
+def _month(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        return month_of(value)
+    if isinstance(value, str) and len(value) >= 7 and value[4] == "-":
+        return value[:7]
+    return None
+
+def bucket(doc: Dict[str, Any], scope: str) -> Optional[Tuple[str, str]]:
+    """The sketch key and month a metrics document's users belong to"""
+    if scope == REPO_SCOPE:
+        if doc.get("year") and doc.get("month"):
+            return REPO_KEY, f"{int(doc['year']):04d}-{int(doc['month']):02d}"
+        month = _month(doc.get("timestamp"))
+        return (REPO_KEY, month) if month else None
+    key = doc.get("filepath") if scope == FILE_SCOPE else canonical_id(doc.get("pdrid"))
+    month = _month(doc.get("last_time_logged")) or _month(doc.get("first_time_logged"))
+    return (key, month) if key and month else None
+
+def backfill(collection, scope: str, batch_size: int = 1000, unset_ip_lists: bool = False) -> dict:
+    """
+    Add the ``ip_list`` of every document in ``collection`` to the ``scope`` sketches.
+
+    Returns a summary with the number of documents scanned, sketched and skipped.
+    """
+    projection = {"ip_list": 1, "pdrid": 1, "filepath": 1, "year": 1, "month": 1,
+                  "timestamp": 1, "first_time_logged": 1, "last_time_logged": 1}
+    scanned = sketched = skipped = 0
+    batch = []
+    for doc in collection.find({"ip_list.0": {"$exists": True}}, projection,
+                               no_cursor_timeout=True, batch_size=batch_size):
+        scanned += 1
+        target = bucket(doc, scope)
+        if target is None:
+            skipped += 1
+            continue
+        count = metrics_crud.user_sketches.add(scope, *target, (str(ip) for ip in doc["ip_list"] if ip))
+        sketched += 1
+        update = {}
+        if count is not None and scope != REPO_SCOPE:
+            update["$max"] = {"number_users": count}
+        if unset_ip_lists:
+            update["$unset"] = {"ip_list": ""}
+        if update:
+            batch.append(UpdateOne({"_id": doc["_id"]}, update))
+        if len(batch) >= batch_size:
+            collection.bulk_write(batch, ordered=False)
+            batch = []
+
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+
+    return {"scanned": scanned, "sketched": sketched, "skipped": skipped}
+
+def main(args):
+    targets = args.target or list(TARGETS)
+    for name in targets:
+        collection_name, scope = TARGETS[name]
+        summary = backfill(metrics_db[collection_name], scope, args.batch_size, args.unset_ip_lists)
+        logger.info(f"{collection_name}: scanned {summary['scanned']}, sketched {summary['sketched']}, "
+                    f"skipped {summary['skipped']} without a usable id or date")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed unique-user sketches from stored ip_list arrays")
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="Collection to backfill (repeatable, default: all)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    parser.add_argument("--unset-ip-lists", action="store_true", help="Remove ip_list from documents once sketched")
+    main(parser.parse_args())
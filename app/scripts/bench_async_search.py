@@ -0,0 +1,67 @@
+"""
+Benchmark concurrent search throughput within a single worker's event loop.
+
+The same search is issued N times at a fixed concurrency, first through the blocking
+``BaseCRUD.search`` called from an ``async def`` (how the routers used to run) and
+then through ``BaseCRUD.search_async``. Requires a reachable MongoDB.
+
+Usage:
+    python -m app.scripts.bench_async_search --collection record \
+        --requests 200 --concurrency 20 --param include=ediid,title --param size=50
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from app.crud.base import BaseCRUD
+from app.database import close_async_db
+
+logger = logging.getLogger(__name__)
+
+async def _run(label, call, total, concurrency):
+    """Issue ``total`` calls with at most ``concurrency`` in flight and report throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"{label:>6}: {total / elapsed:8.1f} req/s  "
+          f"median {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms")
+
+async def main(args):
+    crud = BaseCRUD(args.collection)
+    params = dict(p.split("=", 1) for p in args.param)
+
+    async def blocking_call():
+        # What an ``async def`` handler calling the sync CRUD method does: the
+        # event loop is blocked for the full duration of the query.
+        crud.search(**params)
+
+    async def async_call():
+        await crud.search_async(**params)
+
+    print(f"collection={args.collection} requests={args.requests} concurrency={args.concurrency} params={params}")
+    await _run("sync", blocking_call, args.requests, args.concurrency)
+    await _run("async", async_call, args.requests, args.concurrency)
+    await close_async_db()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Compare blocking and async search throughput")
+    parser.add_argument("--collection", default="record", help="Collection to search")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of searches")
+    parser.add_argument("--concurrency", type=int, default=20, help="Searches in flight at once")
+    parser.add_argument("--param", action="append", default=[], help="Search parameter as key=value (repeatable)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""
+Benchmark the request latency added by download metrics recording.
+
+Serves a record lookup (``GET /records/{id}``, a ~20KB record) from a minimal
+app in process and times N requests three ways: without the metrics middleware,
+with the old approach of draining and re-parsing the body and writing one
+upsert per request (``--db`` given) or only draining and parsing (no ``--db``),
+and with ``MetricsMiddleware`` queueing the download for the batched writer.
+With ``--db`` the queued events are then flushed to ``recordMetrics`` in that
+scratch database, which is dropped afterwards.
+
+Usage:
+    python -m app.scripts.bench_metrics_ingest [--requests 2000] [--db rmm_metrics_bench]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from pymongo import MongoClient
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.config import settings
+from app.crud.metrics_ingest import download_recorder
+from app.middleware.metrics_middleware import MetricsMiddleware
+
+RECORD = {"@id": "ark:/88434/mds2-2154", "ediid": "ark:/88434/mds2-2154", "title": "Benchmark record",
+          "components": [{"filepath": f"data/file{i}.csv", "size": i, "mediaType": "text/csv"} for i in range(250)]}
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/records/{record_id:path}")
+    async def get_record(request: Request, record_id: str):
+        result = {"ResultCount": 1, "ResultData": [RECORD], "Metrics": {"ElapsedTime": 0}}
+        request.state.metrics_record = RECORD
+        return result
+
+    return app
+
+class DrainingMiddleware(BaseHTTPMiddleware):
+    """The previous middleware: buffer the body, re-parse it and write before responding"""
+
+    def __init__(self, app, collection=None):
+        super().__init__(app)
+        self.collection = collection
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        body = b""
+        async for chunk in response.body_iterator:
+            body += chunk
+        data = json.loads(body.decode())
+        ediid = data["ResultData"][0].get("ediid")
+        if self.collection is not None:
+            self.collection.update_one({"pdrid": RECORD["@id"]},
+                                       {"$inc": {"record_download": 1, "total_size_download": len(body)},
+                                        "$set": {"ediid": ediid}}, upsert=True)
+        return Response(content=body, status_code=response.status_code, headers=dict(response.headers),
+                        media_type=response.media_type)
+
+async def _run(label: str, app, requests: int) -> None:
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get("/records/mds2-2154")
+            response.read()
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label:>10}: median {statistics.median(latencies) * 1000:7.3f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.3f} ms")
+
+def main(args):
+    client = MongoClient(settings.MONGO_URI) if args.db else None
+    collection = client[args.db][settings.RECORD_METRICS_COLLECTION] if client else None
+    download_recorder.max_queue = max(download_recorder.max_queue, args.requests)
+    try:
+        plain = _app()
+        asyncio.run(_run("none", plain, args.requests))
+
+        draining = _app()
+        draining.add_middleware(DrainingMiddleware, collection=collection)
+        asyncio.run(_run("draining", draining, args.requests))
+
+        queued = _app()
+        queued.add_middleware(MetricsMiddleware)
+        asyncio.run(_run("queued", queued, args.requests))
+
+        stats = download_recorder.stats()
+        print(f"queued {stats['accepted']} events, dropped {stats['dropped']}")
+        if collection is not None:
+            start = time.perf_counter()
+            download_recorder.flush(collection)
+            print(f"flushed in {(time.perf_counter() - start) * 1000:.1f} ms: {download_recorder.stats()}")
+    finally:
+        if client is not None:
+            client.drop_database(args.db)
+            client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark request latency added by metrics recording")
+    parser.add_argument("--requests", type=int, default=2000, help="Record lookups per mode")
+    parser.add_argument("--db", default=None, help="Scratch database to write metrics to, dropped afterwards")
+    main(parser.parse_args())
@@ -0,0 +1,125 @@
+"""
+Benchmark the per-request overhead of the middleware stack.
+
+Serves a record lookup (``GET /records/{id}``, a ~20KB record) and a search that
+is not a lookup (``GET /records?title=...``) from a minimal app in process, and
+times alternating rounds of N requests of each through successively fuller
+stacks: no middleware, ``GZipMiddleware`` alone, and ``GZipMiddleware`` with
+metrics recording, once as a ``BaseHTTPMiddleware`` doing the same counting
+(the previous implementation) and once as the ASGI ``MetricsMiddleware``
+registered in ``app/main.py``. Requests ask for gzip like a browser would. Recorded
+downloads are only queued; nothing is written to MongoDB.
+
+Usage:
+    python -m app.scripts.bench_middleware [--requests 500] [--rounds 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import urllib.parse
+from datetime import datetime
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+from app.crud.metrics import metrics_crud
+from app.crud.metrics_ingest import download_recorder
+from app.middleware.metrics_middleware import MetricsMiddleware
+
+RECORD = {"@id": "ark:/88434/mds2-2154", "ediid": "ark:/88434/mds2-2154", "title": "Benchmark record",
+          "components": [{"filepath": f"data/file{i}.csv", "size": i, "mediaType": "text/csv"} for i in range(250)]}
+
+PATHS = {"lookup": "/records/mds2-2154", "search": "/records?title=benchmark"}
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/records/{record_id:path}")
+    async def get_record(request: Request, record_id: str):
+        request.state.metrics_record = RECORD
+        return {"ResultCount": 1, "ResultData": [RECORD], "Metrics": {"ElapsedTime": 0}}
+
+    @app.get("/records")
+    async def search_records(request: Request):
+        return {"ResultCount": 1, "ResultData": [RECORD], "Metrics": {"ElapsedTime": 0}}
+
+    return app
+
+class BaseHTTPMetricsMiddleware(BaseHTTPMiddleware):
+    """The previous implementation: the same counting through ``call_next``"""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        path = request.url.path
+        if not (path.startswith("/records/") and path.count("/") == 2 and not request.query_params) \
+                or response.status_code != 200:
+            return response
+        record = getattr(request.state, "metrics_record", None) or {}
+        pdrid = record.get("@id") or urllib.parse.unquote(path.split("/")[2])
+        body = response.body_iterator
+
+        async def counted_body():
+            size = 0
+            async for chunk in body:
+                size += len(chunk)
+                yield chunk
+            metrics_crud.record_download(pdrid=pdrid, ediid=record.get("ediid") or pdrid,
+                                         timestamp=datetime.now(), download_size=size)
+
+        response.body_iterator = counted_body()
+        return response
+
+def _stack(metrics=None) -> FastAPI:
+    """The benchmark app with middleware added in the order ``app/main.py`` adds it"""
+    app = _app()
+    app.add_middleware(GZipMiddleware, minimum_size=int(settings.GZIP_MINIMUM_SIZE))
+    if metrics is not None:
+        app.add_middleware(metrics)
+    return app
+
+async def _median(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.read()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+async def _run(stacks, requests: int, rounds: int) -> None:
+    """Time the stacks in alternating rounds and report each one's best median"""
+    clients = {label: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                        headers={"Accept-Encoding": "gzip"}) for label, app in stacks.items()}
+    best = {}
+    for _ in range(rounds):
+        for label, client in clients.items():
+            for name, path in PATHS.items():
+                median = await _median(client, path, requests)
+                best[label, name] = min(best.get((label, name), median), median)
+    for client in clients.values():
+        await client.aclose()
+    for (label, name), median in best.items():
+        overhead = median - best["none", name]
+        print(f"{label:>14} {name:>6}: median {median * 1000:7.3f} ms  ({overhead * 1e6:+7.1f} us over none)")
+
+def main(args):
+    download_recorder.max_queue = max(download_recorder.max_queue, 2 * args.requests * args.rounds)
+    stacks = {
+        "none": _app(),
+        "gzip": _stack(),
+        "gzip+basehttp": _stack(BaseHTTPMetricsMiddleware),
+        "gzip+asgi": _stack(MetricsMiddleware),
+    }
+    asyncio.run(_run(stacks, args.requests, args.rounds))
+    stats = download_recorder.stats()
+    print(f"queued {stats['accepted']} downloads, dropped {stats['dropped']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-request overhead of the middleware stack")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per path, stack and round")
+    parser.add_argument("--rounds", type=int, default=5, help="Alternating rounds over the stacks")
+    main(parser.parse_args())
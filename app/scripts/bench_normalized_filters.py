@@ -0,0 +1,115 @@
+"""
+Benchmark exact-match filters as case-insensitive regexes vs normalized shadow fields.
+
+Builds a synthetic records collection (100k documents by default) in a scratch
+database, with the same B-tree indexes on the raw fields as production plus the
+``_norm`` shadow field indexes. For each field, the same filters are then compiled
+by ``compile_search_params`` without and with normalized fields and run against
+it. Reports the median/p95 latency and the documents examined per query (from
+``explain``). Requires a reachable MongoDB; the scratch database is dropped
+afterwards unless ``--keep`` is given.
+
+Usage:
+    python -m app.scripts.bench_normalized_filters [--records 100000] [--queries 50] \
+        [--db rmm_bench] [--keep]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from pymongo import ASCENDING, MongoClient
+
+from app.config import settings
+from app.crud.normalized import shadow_field, with_normalized_fields
+from app.middleware.request_processor import compile_search_params
+
+FIELDS = ("ediid", "doi", "keyword")
+
+KEYWORDS = ["neutron scattering", "Graphene", "mass spectrometry", "Thermodynamics", "Polymers",
+            "SRD", "Interatomic Potentials", "Calibration", "Metrology", "Fire Research"]
+
+def _record(i: int, rng: random.Random) -> dict:
+    """A synthetic record with identifiers and mixed-case keywords"""
+    keywords = rng.sample(KEYWORDS, 3) + [f"Topic-{i % 5000}"]
+    return {
+        "@id": f"ark:/88434/mds{i:07d}",
+        "ediid": f"ark:/88434/mds{i:07d}",
+        "doi": f"doi:10.18434/M3{i:06X}",
+        "title": f"Synthetic record {i}",
+        "keyword": [kw.upper() if rng.random() < 0.2 else kw for kw in keywords],
+    }
+
+def populate(collection, count: int, batch_size: int = 5000) -> None:
+    """Insert ``count`` synthetic records with their shadow fields and create the indexes"""
+    rng = random.Random(42)
+    batch = []
+    for i in range(count):
+        batch.append(with_normalized_fields(_record(i, rng), FIELDS))
+        if len(batch) >= batch_size:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    for field in FIELDS:
+        collection.create_index([(field, ASCENDING)])
+        collection.create_index([(shadow_field(field), ASCENDING)])
+
+def _values(field: str, count: int, queries: int) -> list:
+    """Filter values for ``field`` as a client would type them (any case)"""
+    rng = random.Random(7)
+    if field == "keyword":
+        return [rng.choice([f"topic-{rng.randrange(5000)}", f"TOPIC-{rng.randrange(5000)}"]) for _ in range(queries)]
+    values = []
+    for _ in range(queries):
+        doc = _record(rng.randrange(count), rng)
+        values.append(doc[field].swapcase() if rng.random() < 0.5 else doc[field])
+    return values
+
+def run(collection, field: str, values: list, normalized: frozenset) -> dict:
+    """Run one filter per value and collect latency, matches and documents examined"""
+    latencies = []
+    matched = 0
+    for value in values:
+        query = compile_search_params({field: value}, normalized).query
+        start = time.perf_counter()
+        matched += len(list(collection.find(query, {"_id": 0, "ediid": 1})))
+        latencies.append(time.perf_counter() - start)
+
+    explain = collection.find(compile_search_params({field: values[0]}, normalized).query).explain()
+    latencies.sort()
+    return {
+        "median": statistics.median(latencies) * 1000,
+        "p95": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        "matched": matched,
+        "examined": explain["executionStats"]["totalDocsExamined"],
+    }
+
+def main(args):
+    client = MongoClient(settings.MONGO_URI)
+    collection = client[args.db]["records"]
+    collection.drop()
+    try:
+        start = time.perf_counter()
+        populate(collection, args.records)
+        print(f"populated {args.records} records in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'field':>8}  {'mode':>10}  {'median':>10}  {'p95':>10}  {'docs examined':>14}  matched")
+        for field in FIELDS:
+            values = _values(field, args.records, args.queries)
+            for mode, normalized in (("regex", frozenset()), ("normalized", frozenset(FIELDS))):
+                result = run(collection, field, values, normalized)
+                print(f"{field:>8}  {mode:>10}  {result['median']:7.2f} ms  {result['p95']:7.2f} ms  "
+                      f"{result['examined']:>14}  {result['matched']}")
+    finally:
+        if not args.keep:
+            client.drop_database(args.db)
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark regex vs normalized exact-match filters")
+    parser.add_argument("--records", type=int, default=100000, help="Synthetic records to generate")
+    parser.add_argument("--queries", type=int, default=50, help="Filters to run per field and mode")
+    parser.add_argument("--db", default="rmm_bench", help="Scratch database, dropped afterwards")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    main(parser.parse_args())
@@ -0,0 +1,88 @@
+"""
+Benchmark the ``/papers`` upstream client against the local Papers API stub.
+
+Starts ``papers_stub`` on a local port and issues N searches, drawn from a few
+distinct phrases, at a fixed concurrency: first with a blocking ``requests.post``
+per search from a coroutine (how the router used to call the API), then through
+``PaperClient`` with its cache disabled (pooling and coalescing only), and then
+with the cache on. Reports throughput, latency and how many requests reached
+the stub.
+
+Usage:
+    python -m app.scripts.bench_papers [--requests 200] [--concurrency 20] [--phrases 5] \
+        [--latency 0.2] [--port 8099]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import threading
+import time
+
+import requests
+import uvicorn
+
+from app.config import settings
+from app.crud.paper import PAPERS_API_HEADERS, PaperClient
+from app.scripts.papers_stub import WORDS, create_app
+
+async def _run(label, call, phrases, total, concurrency, stub):
+    """Issue ``total`` searches with at most ``concurrency`` in flight and report throughput"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    before = stub.state.requests
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(phrases[i % len(phrases)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(f"{label:>9}: {total / elapsed:8.1f} req/s  median {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p95 {p95 * 1000:7.1f} ms  upstream {stub.state.requests - before}")
+
+async def main(args, stub, url):
+    phrases = [WORDS[i % len(WORDS)] for i in range(args.phrases)]
+
+    async def blocking_call(phrase):
+        requests.post(url, json={"searchString": phrase, "fromDate": "2010-01-01T00:00:00.000Z"},
+                      headers=PAPERS_API_HEADERS).json()
+
+    print(f"requests={args.requests} concurrency={args.concurrency} phrases={args.phrases} latency={args.latency}s")
+    await _run("blocking", blocking_call, phrases, args.requests, args.concurrency, stub)
+
+    for label, ttl in (("pooled", 0), ("cached", 300)):
+        settings.PAPERS_CACHE_TTL = ttl
+        client = PaperClient(url=url, verify=True)
+        await _run(label, lambda phrase: client.search(phrase, "2010-01-01"),
+                   phrases, args.requests, args.concurrency, stub)
+        await client.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmark the Papers API client against the local stub")
+    parser.add_argument("--requests", type=int, default=200, help="Total number of searches")
+    parser.add_argument("--concurrency", type=int, default=20, help="Searches in flight at once")
+    parser.add_argument("--phrases", type=int, default=5, help="Distinct search phrases")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the stub waits per search")
+    parser.add_argument("--publications", type=int, default=2000, help="Synthetic publications in the stub")
+    parser.add_argument("--port", type=int, default=8099, help="Port for the stub")
+    args = parser.parse_args()
+
+    stub = create_app(args.publications, args.latency)
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        asyncio.run(main(args, stub, f"http://127.0.0.1:{args.port}/api/Publication/search"))
+    finally:
+        server.should_exit = True
+        thread.join()
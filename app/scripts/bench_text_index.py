@@ -0,0 +1,118 @@
+"""
+Benchmark ``searchphrase`` queries on MongoDB ``$text`` vs the in-process BM25 index.
+
+Builds a synthetic records collection (30k documents by default) in a scratch
+database with the weighted ``text_search_idx`` used in production, and a
+``TextIndex`` over the same fields. Every phrase is then searched through
+``BaseCRUD.search`` twice, first on the ``$text`` path and then ranked by the
+index and fetched by ``_id``, both with and without ``relevance=true``. Reports
+the index build time and the median/p95 latency per mode. Requires a reachable
+MongoDB; the scratch database is dropped afterwards unless ``--keep`` is given.
+
+Usage:
+    python -m app.scripts.bench_text_index [--records 30000] [--queries 50] [--size 20] \
+        [--db rmm_bench] [--keep]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from pymongo import MongoClient
+
+from app.config import settings
+from app.crud.base import BaseCRUD
+from app.crud.text_index import TextIndex
+from app.database import ensure_text_search_index, parse_text_weights
+
+WORDS = ["neutron", "scattering", "graphene", "spectrometry", "thermodynamic", "polymer", "calibration",
+         "metrology", "fire", "laser", "quantum", "material", "standard", "reference", "measurement",
+         "interatomic", "potential", "microscopy", "alloy", "catalysis", "nanoparticle", "optical",
+         "chemistry", "physics", "semiconductor", "crystal", "diffraction", "isotope", "uncertainty", "sensor"]
+
+TAGS = ["Physics", "Chemistry", "Materials", "Bioscience", "Information Technology", "Fire"]
+
+# Descriptions draw from a larger vocabulary with Zipf-distributed frequencies, like real text
+VOCABULARY = WORDS + [f"term{n}" for n in range(5000)]
+VOCABULARY_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+def _record(i: int, rng: random.Random) -> dict:
+    """A synthetic record with text in every indexed field"""
+    return {
+        "ediid": f"ark:/88434/mds{i:07d}",
+        "title": " ".join(rng.sample(WORDS, 4)) + f" dataset {i}",
+        "description": [" ".join(rng.choices(VOCABULARY, VOCABULARY_WEIGHTS, k=80))],
+        "keyword": rng.sample(WORDS, 3),
+        "topic": [{"tag": tag} for tag in rng.sample(TAGS, 2)],
+    }
+
+def populate(collection, count: int, batch_size: int = 5000) -> None:
+    """Insert ``count`` synthetic records and create the weighted text index"""
+    rng = random.Random(42)
+    batch = []
+    for i in range(count):
+        batch.append(_record(i, rng))
+        if len(batch) >= batch_size:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+    ensure_text_search_index(collection, parse_text_weights(settings.TEXT_SEARCH_WEIGHTS))
+
+def _phrases(queries: int) -> list:
+    """Search phrases of one to three words"""
+    rng = random.Random(7)
+    return [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(queries)]
+
+def run(crud: BaseCRUD, phrases: list, params: dict) -> dict:
+    """Run one search per phrase and collect latency"""
+    latencies = []
+    for phrase in phrases:
+        start = time.perf_counter()
+        crud.search(searchphrase=phrase, **params)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "median": statistics.median(latencies) * 1000,
+        "p95": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+    }
+
+def main(args):
+    client = MongoClient(settings.MONGO_URI)
+    collection = client[args.db]["records"]
+    collection.drop()
+    try:
+        start = time.perf_counter()
+        populate(collection, args.records)
+        print(f"populated {args.records} records in {time.perf_counter() - start:.1f}s")
+
+        index = TextIndex(parse_text_weights(settings.TEXT_SEARCH_WEIGHTS))
+        start = time.perf_counter()
+        index.rebuild(collection)
+        stats = index.stats()
+        print(f"built text index in {time.perf_counter() - start:.1f}s: "
+              f"{stats['terms']} terms, {stats['postings']} postings")
+
+        crud = BaseCRUD("records")
+        crud.collection = collection
+        phrases = _phrases(args.queries)
+        print(f"{'search':>10}  {'mode':>6}  {'median':>10}  {'p95':>10}")
+        for label, params in (("page", {"size": str(args.size)}),
+                              ("relevance", {"size": str(args.size), "relevance": "true"})):
+            for mode, text_index in (("$text", None), ("bm25", index)):
+                crud.text_index = text_index
+                result = run(crud, phrases, params)
+                print(f"{label:>10}  {mode:>6}  {result['median']:7.2f} ms  {result['p95']:7.2f} ms")
+    finally:
+        if not args.keep:
+            client.drop_database(args.db)
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark $text vs in-process BM25 searchphrase queries")
+    parser.add_argument("--records", type=int, default=30000, help="Synthetic records to generate")
+    parser.add_argument("--queries", type=int, default=50, help="Phrases to search per mode")
+    parser.add_argument("--size", type=int, default=20, help="Page size of each search")
+    parser.add_argument("--db", default="rmm_bench", help="Scratch database, dropped afterwards")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    main(parser.parse_args())
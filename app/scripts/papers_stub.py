@@ -0,0 +1,65 @@
+"""
+Local stand-in for the NIST Papers (NPS) publication search API.
+
+Serves ``POST /api/Publication/search`` over a synthetic set of publications,
+with a configurable delay per request, so the ``/papers`` endpoint and
+``PaperClient`` can be tested and benchmarked without the real service. A
+publication matches when every word of ``searchString`` occurs in its title or
+abstract and it was published on or after ``fromDate``. The number of searches
+served is kept in ``app.state.requests``.
+
+Usage:
+    python -m app.scripts.papers_stub [--port 8099] [--publications 2000] [--latency 0.2]
+
+    PAPERS_API_URL=http://127.0.0.1:8099/api/Publication/search uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+from typing import Any, Dict, List
+
+from fastapi import Body, FastAPI
+
+WORDS = ["neutron", "scattering", "graphene", "spectrometry", "thermodynamic", "polymer", "calibration",
+         "metrology", "fire", "laser", "quantum", "material", "standard", "reference", "measurement"]
+
+def publications(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Synthetic publications shaped like the Papers API results"""
+    rng = random.Random(seed)
+    return [{
+        "id": i,
+        "title": " ".join(rng.sample(WORDS, 4)).capitalize(),
+        "abstract": " ".join(rng.choices(WORDS, k=40)),
+        "authors": [f"Author {rng.randint(1, 500)}" for _ in range(rng.randint(1, 6))],
+        "publishedDate": f"{rng.randint(2005, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00",
+    } for i in range(count)]
+
+def create_app(count: int = 2000, latency: float = 0.0) -> FastAPI:
+    """A stub app serving ``count`` publications, waiting ``latency`` seconds per search"""
+    app = FastAPI(title="Papers API stub")
+    app.state.requests = 0
+    corpus = publications(count)
+
+    @app.post("/api/Publication/search")
+    async def search(payload: Dict[str, Any] = Body(...)):
+        app.state.requests += 1
+        if latency:
+            await asyncio.sleep(latency)
+        words = str(payload.get("searchString") or "").lower().split()
+        from_date = str(payload.get("fromDate") or "")[:10]
+        return [paper for paper in corpus
+                if paper["publishedDate"][:10] >= from_date
+                and all(word in paper["title"].lower() or word in paper["abstract"] for word in words)]
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local stub of the Papers API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8099, help="Port to listen on")
+    parser.add_argument("--publications", type=int, default=2000, help="Synthetic publications to serve")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to wait before answering each search")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.publications, args.latency), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,35 @@
+"""
+Sync the local mirror of NIST publications from the Papers API.
+
+Runs one sync of ``PAPERS_COLLECTION``, for deployments that keep syncing out of
+the API workers (``PAPERS_MIRROR_SYNC_INTERVAL=0``), e.g. from cron. By default
+only publications since the newest mirrored date (less
+``PAPERS_MIRROR_OVERLAP_DAYS``) are fetched; ``--full`` re-fetches everything
+since ``PAPERS_MIRROR_START_DATE`` and removes publications the API no longer
+returns.
+
+Usage:
+    python -m app.scripts.sync_papers [--full]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.crud.paper import paper_client
+from app.crud.paper_mirror import paper_mirror_crud
+from app.database import close_async_db
+
+async def main(args):
+    try:
+        result = await paper_mirror_crud.sync(paper_client, full=args.full)
+        print(f"synced from {result['from']}: {result['fetched']} fetched, "
+              f"{result['upserted']} upserted, {result['removed']} removed")
+    finally:
+        await paper_client.close()
+        await close_async_db()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Sync the local papers mirror from the Papers API")
+    parser.add_argument("--full", action="store_true", help="Re-fetch every publication and drop removed ones")
+    asyncio.run(main(parser.parse_args()))
@@ -1,9 +1,13 @@
 # tests/crud/test_crud_base.py
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock, PropertyMock
+import asyncio
+import json
 import time
 from bson import ObjectId
 from app.crud.base import BaseCRUD
+from app.crud.singleflight import SingleFlight
+from app.crud.response_cache import NullResponseCache
 from app.middleware.exceptions import ResourceNotFoundException, IllegalArgumentException, KeyWordNotFoundException
 
 class TestBaseCRUD(unittest.TestCase):
@@ -131,9 +135,8 @@ class TestBaseCRUD(unittest.TestCase):
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "test"},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -141,7 +144,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             result = self.crud.search(name="test")
             
@@ -166,9 +168,8 @@ class TestBaseCRUD(unittest.TestCase):
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "nonexistent"},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -176,7 +177,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             result = self.crud.search(name="nonexistent")
             
@@ -202,9 +202,8 @@ class TestBaseCRUD(unittest.TestCase):
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "test"},
                 "projection": {"name": 1, "_id": 0},
                 "sort": None,
@@ -212,7 +211,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             result = self.crud.search(include="name")
             
@@ -241,9 +239,8 @@ class TestBaseCRUD(unittest.TestCase):
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "test"},
                 "projection": {"_id": 0},
                 "sort": [("name", 1)],  # Ascending sort
@@ -251,7 +248,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             result = self.crud.search(name="test")
             
@@ -305,9 +301,8 @@ class TestBaseCRUD(unittest.TestCase):
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "test"},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -315,7 +310,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             with self.assertRaises(Exception):
                 self.crud.search(name="test")
@@ -352,15 +346,14 @@ class TestBaseCRUD(unittest.TestCase):
         """Test search when collection is empty"""
         mock_collection = MagicMock()
         # Mock the empty collection check to return 0 (empty collection)
-        mock_collection.count_documents.return_value = 0
+        mock_collection.estimated_document_count.return_value = 0
         mock_db.__getitem__.return_value = mock_collection
         
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "test"},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -368,7 +361,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             with self.assertRaises(KeyWordNotFoundException):
                 self.crud.search(name="test")
@@ -391,9 +383,8 @@ class TestBaseCRUD(unittest.TestCase):
         # Patch the collection directly on the crud instance
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"name": "test"},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -401,7 +392,6 @@ class TestBaseCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             result = self.crud.search(name="test", skip=5, limit=10)
             
@@ -456,5 +446,400 @@ class TestBaseCRUD(unittest.TestCase):
         result = self.crud.get_all()
         self.assertIsNotNone(result)
 
+    def test_search_async_with_valid_params(self):
+        """Test async search awaits the collection and returns the standard envelope"""
+        mock_cursor = MagicMock()
+        mock_cursor.skip.return_value = mock_cursor
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.to_list = AsyncMock(return_value=[{"name": "test_result"}])
+
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        mock_collection.count_documents = AsyncMock(side_effect=[1, 1])
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop:
+            mock_prop.return_value = mock_collection
+            result = asyncio.run(self.crud.search_async(name="test", size="10"))
+
+        self.assertEqual(result["ResultCount"], 1)
+        self.assertEqual(result["ResultData"], [{"name": "test_result"}])
+        self.assertEqual(result["PageSize"], 10)
+        mock_cursor.limit.assert_called_with(10)
+
+    def test_search_async_coalesces_identical_searches(self):
+        """Test concurrent identical searches share one find and count, distinct ones do not"""
+        async def slow_page(length):
+            await asyncio.sleep(0.05)
+            return [{"name": f"doc{i}"} for i in range(10)]
+
+        mock_cursor = MagicMock()
+        mock_cursor.skip.return_value = mock_cursor
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.to_list = AsyncMock(side_effect=slow_page)
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        mock_collection.count_documents = AsyncMock(return_value=42)
+
+        async def burst():
+            searches = [self.crud.search_async(name="test", size="10") for _ in range(5)]
+            # Spelled differently, compiles to the same query
+            searches.append(self.crud.search_async(name="test", limit="10"))
+            searches.append(self.crud.search_async(name="other", size="10"))
+            return await asyncio.gather(*searches)
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop, \
+             patch('app.crud.base.search_flights', SingleFlight()) as flights:
+            mock_prop.return_value = mock_collection
+            results = asyncio.run(burst())
+
+        self.assertEqual(mock_collection.find.call_count, 2)
+        self.assertEqual(mock_collection.count_documents.await_count, 2)
+        self.assertTrue(all(result["ResultCount"] == 42 for result in results))
+        self.assertEqual(flights.stats(), {"executions": 2, "coalesced": 5, "in_flight": 0})
+
+    def test_search_async_coalesced_results_are_independent(self):
+        """Test callers sharing one execution each get their own ResultData"""
+        async def slow_page(length):
+            await asyncio.sleep(0.05)
+            return [{"name": "doc"}]
+
+        mock_cursor = MagicMock()
+        mock_cursor.skip.return_value = mock_cursor
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.to_list = AsyncMock(side_effect=slow_page)
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+
+        async def burst():
+            return await asyncio.gather(*(self.crud.search_async(name="test", size="10") for _ in range(3)))
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop, \
+             patch('app.crud.base.search_flights', SingleFlight()) as flights, \
+             patch('app.crud.base.get_response_cache', return_value=NullResponseCache()):
+            mock_prop.return_value = mock_collection
+            results = asyncio.run(burst())
+
+        self.assertEqual(flights.stats()["coalesced"], 2)
+        results[0]["ResultData"][0]["name"] = "changed"
+        results[1]["ResultData"].clear()
+        self.assertEqual(results[2]["ResultData"], [{"name": "doc"}])
+
+    def _full_page_collection(self, size):
+        """Collection mock whose find() returns exactly one full page of ``size`` docs"""
+        mock_cursor = MagicMock()
+        mock_cursor.skip.return_value = mock_cursor
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.__iter__.return_value = iter([{"name": f"doc{i}"} for i in range(size)])
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        mock_collection.count_documents.return_value = 42
+        mock_collection.estimated_document_count.return_value = 100
+        return mock_collection
+
+    def test_search_short_page_skips_count(self):
+        """A page shorter than the limit already gives the total; no count query is issued"""
+        mock_collection = self._full_page_collection(2)
+        self.crud.collection = mock_collection
+
+        result = self.crud.search(name="test", page="3", size="10")
+
+        self.assertEqual(result["ResultCount"], 22)
+        mock_collection.count_documents.assert_not_called()
+        mock_collection.estimated_document_count.assert_not_called()
+
+    def test_search_count_policies(self):
+        """count=exact|estimated|none decides how a full page is counted"""
+        mock_collection = self._full_page_collection(2)
+        self.crud.collection = mock_collection
+        result = self.crud.search(name="test", size="2")
+        self.assertEqual(result["ResultCount"], 42)
+        mock_collection.count_documents.assert_called_once()
+
+        mock_collection = self._full_page_collection(2)
+        self.crud.collection = mock_collection
+        result = self.crud.search(size="2", count="estimated")
+        self.assertEqual(result["ResultCount"], 100)
+        mock_collection.count_documents.assert_not_called()
+
+        # An estimate can't describe a filtered subset, so it falls back to an exact count
+        mock_collection = self._full_page_collection(2)
+        self.crud.collection = mock_collection
+        result = self.crud.search(name="test", size="2", count="estimated")
+        self.assertEqual(result["ResultCount"], 42)
+
+        mock_collection = self._full_page_collection(2)
+        self.crud.collection = mock_collection
+        result = self.crud.search(name="test", size="2", count="none")
+        self.assertIsNone(result["ResultCount"])
+        mock_collection.count_documents.assert_not_called()
+
+    def test_search_empty_page_uses_cached_stats(self):
+        """The emptiness check only runs on empty pages and is cached between searches"""
+        mock_collection = self._full_page_collection(0)
+        mock_collection.find.return_value.__iter__.side_effect = lambda: iter([])
+        self.crud.collection = mock_collection
+
+        for _ in range(3):
+            result = self.crud.search(name="nothing")
+            self.assertEqual(result["ResultData"], [])
+
+        mock_collection.estimated_document_count.assert_called_once()
+        mock_collection.count_documents.assert_not_called()
+
+    def test_search_relevance_sorts_by_text_score(self):
+        """Test relevance searches sort by text score with the limit pushed down and are not streamed"""
+        mock_cursor = MagicMock()
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.sort.return_value = mock_cursor
+        mock_cursor.__iter__.return_value = iter([{"title": "a", "_score": 2.5}])
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        self.crud.collection = mock_collection
+
+        params = {"searchphrase": "neutron", "relevance": "true", "stream": "true"}
+        self.assertFalse(self.crud.should_stream(params))
+        with patch('app.crud.base.settings.RELEVANCE_DEFAULT_LIMIT', 25):
+            result = self.crud.search(**params)
+
+        self.assertEqual(mock_collection.find.call_args.kwargs["projection"]["_score"], {"$meta": "textScore"})
+        mock_cursor.limit.assert_called_once_with(25)
+        mock_cursor.sort.assert_called_once_with([("_score", {"$meta": "textScore"})])
+        mock_cursor.collation.assert_not_called()
+        self.assertEqual(result["ResultData"][0]["_score"], 2.5)
+
+    def _text_index(self, ranked):
+        index = MagicMock()
+        index.ready = True
+        index.document_count = 10
+        index.search.return_value = ranked
+        return index
+
+    def test_search_ranked_by_text_index(self):
+        """Test searchphrase queries page the index ranking and fetch the page by _id in rank order"""
+        ids = [ObjectId() for _ in range(3)]
+        self.crud.text_index = self._text_index([(ids[0], 3.0), (ids[1], 2.0), (ids[2], 1.0)])
+        mock_collection = MagicMock()
+        # MongoDB returns the page in its own order
+        mock_collection.find.return_value = iter([{"_id": ids[2], "title": "c"}, {"_id": ids[1], "title": "b"}])
+        self.crud.collection = mock_collection
+
+        result = self.crud.search(searchphrase="neutron", page="2", size="2", relevance="true")
+
+        self.crud.text_index.search.assert_called_once_with("neutron")
+        query, projection = mock_collection.find.call_args.args
+        self.assertEqual(query, {"_id": {"$in": [ids[2]]}})
+        self.assertNotIn("_id", projection or {})
+        self.assertEqual(result["ResultData"], [{"title": "c", "_score": 1.0}])
+        self.assertEqual(result["ResultCount"], 3)
+        self.assertEqual(result["PageSize"], 2)
+
+    def test_search_ranked_with_filters(self):
+        """Test other filters are applied by MongoDB to the ranked matches before paging"""
+        ids = [ObjectId() for _ in range(3)]
+        self.crud.text_index = self._text_index([(ids[0], 3.0), (ids[1], 2.0), (ids[2], 1.0)])
+        mock_collection = MagicMock()
+        mock_collection.find.side_effect = [
+            iter([{"_id": ids[2]}, {"_id": ids[0]}]),
+            iter([{"_id": ids[0], "title": "a"}, {"_id": ids[2], "title": "c"}]),
+        ]
+        self.crud.collection = mock_collection
+
+        result = self.crud.search(searchphrase="neutron", ediid="x")
+
+        filter_query = mock_collection.find.call_args_list[0].args[0]
+        self.assertEqual(filter_query["$and"][1], {"_id": {"$in": ids}})
+        self.assertEqual([doc["title"] for doc in result["ResultData"]], ["a", "c"])
+        self.assertNotIn("_score", result["ResultData"][0])
+        self.assertEqual(result["ResultCount"], 2)
+
+    def test_search_ranked_explicit_sort_uses_mongo(self):
+        """Test an explicit sort runs in MongoDB over the ranked _ids"""
+        ids = [ObjectId(), ObjectId()]
+        self.crud.text_index = self._text_index([(ids[0], 2.0), (ids[1], 1.0)])
+        mock_cursor = MagicMock()
+        mock_cursor.sort.return_value = mock_cursor
+        mock_cursor.collation.return_value = mock_cursor
+        mock_cursor.__iter__.return_value = iter([{"title": "a"}, {"title": "b"}])
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        self.crud.collection = mock_collection
+
+        result = self.crud.search(searchphrase="neutron", **{"sort.asc": "title"})
+
+        self.assertEqual(mock_collection.find.call_args.kwargs["filter"], {"_id": {"$in": ids}})
+        mock_cursor.sort.assert_called_once()
+        self.assertEqual(result["ResultCount"], 2)
+
+    def test_search_uses_text_until_index_ready(self):
+        """Test searches fall back to $text while the index is building"""
+        self.crud.text_index = self._text_index([])
+        self.crud.text_index.ready = False
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter([{"title": "a"}])
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        self.crud.collection = mock_collection
+
+        self.crud.search(searchphrase="neutron")
+
+        self.crud.text_index.search.assert_not_called()
+        self.assertIn("$text", mock_collection.find.call_args.kwargs["filter"])
+
+    def test_search_ranked_async(self):
+        """Test the async search uses the text index the same way"""
+        ids = [ObjectId(), ObjectId()]
+        self.crud.text_index = self._text_index([(ids[0], 2.0), (ids[1], 1.0)])
+        mock_cursor = MagicMock()
+        mock_cursor.to_list = AsyncMock(return_value=[{"_id": ids[1], "title": "b"}, {"_id": ids[0], "title": "a"}])
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock, return_value=mock_collection):
+            result = asyncio.run(self.crud.search_async(searchphrase="neutron"))
+
+        self.assertEqual([doc["title"] for doc in result["ResultData"]], ["a", "b"])
+        self.assertEqual(result["ResultCount"], 2)
+
+    def test_search_stream_async(self):
+        """Test streamed search output is one valid envelope across batch boundaries"""
+        docs = [{"name": f"doc{i}"} for i in range(5)]
+
+        class Cursor:
+            def __init__(self):
+                self.docs = iter(docs)
+                self.close = AsyncMock()
+            def batch_size(self, size):
+                return self
+            def __aiter__(self):
+                return self
+            async def __anext__(self):
+                try:
+                    return next(self.docs)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        cursor = Cursor()
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = cursor
+
+        async def collect():
+            chunks = []
+            async for chunk in await self.crud.search_stream_async(name="test"):
+                chunks.append(chunk)
+            return chunks
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop, \
+                patch('app.crud.base.settings.STREAM_BATCH_SIZE', 2):
+            mock_prop.return_value = mock_collection
+            chunks = asyncio.run(collect())
+
+        result = json.loads(b"".join(chunks))
+        self.assertEqual(result["ResultData"], docs)
+        self.assertEqual(result["ResultCount"], 5)
+        self.assertEqual(result["PageSize"], 0)
+        self.assertGreater(len(chunks), 3)
+        cursor.close.assert_awaited_once()
+
+    def test_search_stream_async_empty_collection(self):
+        """Test an empty collection is reported before streaming starts"""
+        mock_cursor = MagicMock()
+        mock_cursor.batch_size.return_value = mock_cursor
+        mock_cursor.__anext__ = AsyncMock(side_effect=StopAsyncIteration)
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        mock_collection.estimated_document_count = AsyncMock(return_value=0)
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop:
+            mock_prop.return_value = mock_collection
+            with self.assertRaises(KeyWordNotFoundException):
+                asyncio.run(self.crud.search_stream_async(name="test"))
+
+    def test_should_stream_only_unpaginated(self):
+        """Test only searches that ask for it without any paging parameter are streamed"""
+        self.assertFalse(self.crud.should_stream({"name": "test"}))
+        self.assertTrue(self.crud.should_stream({"name": "test", "stream": "true"}))
+        self.assertTrue(self.crud.should_stream({"name": "test", "size": "0", "stream": "true"}))
+        for paging in ({"page": "2"}, {"skip": "5"}, {"size": "10"}, {"limit": "10"}, {"cursor": "*"}):
+            self.assertFalse(self.crud.should_stream({"name": "test", "stream": "true", **paging}), paging)
+
+    def test_search_page_without_size_counts_matches(self):
+        """Test page=2 without a size pages at the default size and counts all matches"""
+        mock_collection = self._full_page_collection(10)
+        self.crud.collection = mock_collection
+
+        result = self.crud.search(name="test", page="2")
+
+        mock_collection.find.return_value.skip.assert_called_once_with(10)
+        self.assertEqual(result["ResultCount"], 42)
+        mock_collection.count_documents.assert_called_once()
+
+        mock_collection = self._full_page_collection(10)
+        self.crud.collection = mock_collection
+        result = self.crud.search(name="test", page="2", count="none")
+        self.assertIsNone(result["ResultCount"])
+
+    def test_search_skip_without_size_counts_page_window(self):
+        """Test skip=5 without a size is counted from the processed page window"""
+        mock_collection = self._full_page_collection(3)
+        self.crud.collection = mock_collection
+
+        processed = self.crud._process_search_params({"name": "test", "skip": "5"})
+        result = self.crud.search(name="test", skip="5")
+
+        self.assertEqual(result["ResultCount"], self.crud._page_count(3, processed["skip"], processed["limit"]))
+        mock_collection.count_documents.assert_not_called()
+
+    def test_export_async_resumes_after_checkpoint(self):
+        """Test export scans in _id order, keeps _id and resumes after the checkpoint"""
+        checkpoint = ObjectId()
+        docs = [{"_id": ObjectId(), "name": "a"}, {"_id": ObjectId(), "name": "b"}]
+
+        class Cursor:
+            def __init__(self):
+                self.docs = iter(docs)
+                self.close = AsyncMock()
+            def sort(self, *args):
+                return self
+            def batch_size(self, size):
+                return self
+            def __aiter__(self):
+                return self
+            async def __anext__(self):
+                try:
+                    return next(self.docs)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = Cursor()
+
+        async def collect():
+            return b"".join([chunk async for chunk in await self.crud.export_async(after=str(checkpoint), include="name")])
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop:
+            mock_prop.return_value = mock_collection
+            body = asyncio.run(collect())
+
+        query, projection = mock_collection.find.call_args[0]
+        self.assertEqual(query, {"_id": {"$gt": checkpoint}})
+        self.assertEqual(projection, {"name": 1})
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([line["_id"] for line in lines], [str(d["_id"]) for d in docs])
+
+    def test_export_async_invalid_checkpoint(self):
+        """Test a malformed checkpoint is rejected"""
+        with self.assertRaises(IllegalArgumentException):
+            asyncio.run(self.crud.export_async(after="not-an-id"))
+
+    def test_get_async_not_found(self):
+        """Test async get raises when no document matches"""
+        mock_collection = MagicMock()
+        mock_collection.find_one = AsyncMock(return_value=None)
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock) as mock_prop:
+            mock_prop.return_value = mock_collection
+            with self.assertRaises(ResourceNotFoundException):
+                asyncio.run(self.crud.get_async(str(ObjectId())))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
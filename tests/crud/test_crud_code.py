@@ -12,9 +12,8 @@ class TestCodeCRUDComprehensive(unittest.TestCase):
         mock_db.__getitem__.return_value = mock_collection
         code_crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"language": "Python"},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -22,7 +21,6 @@ class TestCodeCRUDComprehensive(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             mock_collection.count_documents.side_effect = [1, 1]
             
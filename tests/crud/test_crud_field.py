@@ -1,7 +1,9 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import json
 from bson import ObjectId
-from app.crud.field import field_crud
+from app.crud.field import FieldCRUD, field_crud
 
 class TestFieldCRUD(unittest.TestCase):
     def setUp(self):
@@ -58,9 +60,8 @@ class TestFieldCRUD(unittest.TestCase):
         mock_db.__getitem__.return_value = mock_collection
         self.crud.collection = mock_collection
         
-        with patch('app.crud.base.ProcessRequest') as mock_processor_class:
-            mock_processor = MagicMock()
-            mock_processor.process_search_params.return_value = {
+        with patch('app.crud.base.process_search_params') as mock_process:
+            mock_process.return_value = {
                 "query": {"searchable": True},
                 "projection": {"_id": 0},
                 "sort": None,
@@ -68,7 +69,6 @@ class TestFieldCRUD(unittest.TestCase):
                 "limit": 10,
                 "metrics": {"elapsed_time": 0.001}
             }
-            mock_processor_class.return_value = mock_processor
             
             mock_collection.count_documents.side_effect = [1, 1]
             
@@ -139,6 +139,33 @@ class TestFieldCRUD(unittest.TestCase):
         with self.assertRaises(KeyWordNotFoundException):
             self.crud.get_all()
 
+    def test_catalog_rebuilt_only_when_fields_change(self):
+        """Test the prebuilt field catalog is reused until the collection version changes"""
+        crud = FieldCRUD()
+        fields = [{"name": "title", "type": "string"}]
+        versions = iter([(1, "a"), (1, "a"), (2, "b")])
+        with patch('app.crud.field.collection_signature_async', new=AsyncMock(side_effect=lambda _: next(versions))), \
+             patch.object(FieldCRUD, 'get_all_async', new=AsyncMock(return_value=fields)) as mock_get_all, \
+             patch('app.crud.field.settings.FIELDS_CATALOG_CHECK_INTERVAL', 0), \
+             patch.object(FieldCRUD, 'async_collection', new=MagicMock()):
+            first = asyncio.run(crud.catalog_async())
+            second = asyncio.run(crud.catalog_async())
+            self.assertIs(first, second)
+            self.assertEqual(mock_get_all.await_count, 1)
+            self.assertEqual(json.loads(first.variants["identity"]), fields)
+
+            third = asyncio.run(crud.catalog_async())
+            self.assertIsNot(third, first)
+            self.assertEqual(mock_get_all.await_count, 2)
+
+    def test_catalog_dropped_on_write(self):
+        """Test a write through the API drops the prebuilt catalog"""
+        crud = FieldCRUD()
+        crud._catalog = MagicMock()
+        crud.collection = MagicMock()
+        crud.create({"name": "new"})
+        self.assertIsNone(crud._catalog)
+
     def test_field_crud_initialization(self):
         """Test that field_crud is properly initialized"""
         self.assertIsNotNone(self.crud)
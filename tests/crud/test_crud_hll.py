@@ -0,0 +1,39 @@
+# tests/crud/test_crud_hll.py
+import unittest
+from app.crud.hll import HyperLogLog
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimates(self):
+        """Test estimates stay within a few standard errors of the true count"""
+        self.assertEqual(HyperLogLog().count(), 0)
+        self.assertEqual(HyperLogLog().update(["10.0.0.1", "10.0.0.2", "10.0.0.1"]).count(), 2)
+        for n in (500, 20000):
+            estimate = HyperLogLog(12).update(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(n)).count()
+            self.assertLess(abs(estimate - n) / n, 0.05)
+
+    def test_merge_is_union(self):
+        """Test merging gives the same registers as sketching the union"""
+        first = HyperLogLog().update(str(i) for i in range(3000))
+        second = HyperLogLog().update(str(i) for i in range(2000, 6000))
+        union = HyperLogLog().update(str(i) for i in range(6000))
+        self.assertEqual(first.merge(second).registers, union.registers)
+
+    def test_serialization(self):
+        """Test a sketch round-trips through its compact binary form"""
+        sketch = HyperLogLog(10).update(["a", "b", "c"])
+        data = sketch.to_bytes()
+        self.assertEqual(len(data), 1024)
+        restored = HyperLogLog.from_bytes(data)
+        self.assertEqual((restored.precision, restored.count()), (10, 3))
+
+    def test_invalid(self):
+        """Test mismatched precisions and bad register arrays are rejected"""
+        with self.assertRaises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
+        with self.assertRaises(ValueError):
+            HyperLogLog(10, b"\x00" * 100)
+        with self.assertRaises(ValueError):
+            HyperLogLog(20)
+
+if __name__ == '__main__':
+    unittest.main()
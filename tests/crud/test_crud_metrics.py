@@ -1,7 +1,10 @@
+import json
 import unittest
 import math
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 from app.crud.metrics import metrics_crud
+from app.middleware.exceptions import IllegalArgumentException
 
 class TestMetricsCRUDComprehensive(unittest.TestCase):
 
@@ -36,6 +39,17 @@ class TestMetricsCRUDComprehensive(unittest.TestCase):
         data_set_metrics = result["DataSetMetrics"][0]
         self.assertIn("success_get", data_set_metrics)
 
+    @patch('app.crud.metrics.metrics_crud.metrics')
+    def test_get_record_metrics_uses_lookup_keys(self, mock_collection):
+        """Test record metrics are resolved by indexed equality, never by regex"""
+        mock_collection.find_one.return_value = None
+
+        metrics_crud.get_record_metrics("mds2-2154")
+
+        query = mock_collection.find_one.call_args[0][0]
+        self.assertIn({"_lookup_keys": {"$in": ["mds2-2154"]}}, query["$or"])
+        self.assertNotIn("$regex", str(query))
+
     @patch('app.crud.metrics.metrics_crud.metrics')
     def test_get_record_metrics_not_found(self, mock_collection):
         """Test get record metrics when not found"""
@@ -102,6 +116,9 @@ class TestMetricsCRUDComprehensive(unittest.TestCase):
         
         self.assertIsNotNone(result)
         self.assertEqual(result["FilesMetricsCount"], 2)
+        query = mock_collection.find.call_args[0][0]
+        self.assertIn({"_lookup_keys": {"$in": ["record123"]}}, query["$or"])
+        self.assertNotIn("$regex", str(query))
 
     @patch('app.crud.metrics.metrics_crud.file_metrics')
     def test_get_file_metrics_list_success(self, mock_collection):
@@ -129,5 +146,77 @@ class TestMetricsCRUDComprehensive(unittest.TestCase):
         
         self.assertEqual(count, 500)
 
+    @patch('app.crud.metrics.metrics_crud.file_metrics')
+    def test_get_file_metrics_page(self, mock_collection):
+        """Test a page is an indexed sort with skip/limit, filtered by record"""
+        chain = mock_collection.find.return_value.sort.return_value.skip.return_value.limit
+        chain.return_value = [{"_id": 1, "filepath": "a.csv", "total_size_download": float('nan')}]
+        mock_collection.count_documents.return_value = 12
+
+        result = metrics_crud.get_file_metrics_list(sort_by="total_size_download", page=3, size=5,
+                                                    record="mds2-2154")
+
+        query, projection = mock_collection.find.call_args.args
+        self.assertIn({"_lookup_keys": {"$in": ["mds2-2154"]}}, query["$or"])
+        self.assertNotIn("ip_list", projection)
+        mock_collection.find.return_value.sort.assert_called_once_with(
+            [("total_size_download", -1), ("_id", -1)])
+        mock_collection.find.return_value.sort.return_value.skip.assert_called_once_with(10)
+        self.assertEqual((result["FilesMetricsCount"], result["PageSize"]), (12, 5))
+        self.assertEqual(result["FilesMetrics"][0]["total_size_download"], 0)
+
+    @patch('app.crud.metrics.metrics_crud.file_metrics')
+    def test_get_file_metrics_keyset(self, mock_collection):
+        """Test keyset pages continue after the cursor and stop with a null NextCursor"""
+        limit = mock_collection.find.return_value.sort.return_value.limit
+        limit.return_value = [{"_id": 1, "success_get": 9}, {"_id": 2, "success_get": 7}]
+
+        first = metrics_crud.get_file_metrics_list(sort_by="downloads", size=2, cursor="*")
+        self.assertIsNotNone(first["NextCursor"])
+        self.assertEqual(mock_collection.find.call_args.args[0], {})
+
+        limit.return_value = [{"_id": 3, "success_get": 7}]
+        last = metrics_crud.get_file_metrics_list(sort_by="downloads", size=2, cursor=first["NextCursor"])
+        after = mock_collection.find.call_args.args[0]
+        self.assertIn({"success_get": {"$lt": 7}}, after["$or"][0]["$or"])
+        self.assertIsNone(last["NextCursor"])
+
+        with self.assertRaises(IllegalArgumentException):
+            metrics_crud.get_file_metrics_list(sort_by="filepath", size=2, cursor=first["NextCursor"])
+        with self.assertRaises(IllegalArgumentException):
+            metrics_crud.get_file_metrics_list(sort_by="popularity")
+
+    @patch('app.crud.metrics.settings')
+    @patch('app.crud.metrics.metrics_crud.file_metrics')
+    def test_stream_file_metrics(self, mock_collection, mock_settings):
+        """Test the streamed envelope is valid JSON, written in batches"""
+        mock_settings.STREAM_BATCH_SIZE = 2
+        docs = iter([{"_id": i, "filepath": f"f{i}.csv", "first_time_logged": datetime(2025, 1, i + 1)}
+                     for i in range(5)])
+        cursor = mock_collection.find.return_value.sort.return_value.batch_size.return_value
+        cursor.__next__.side_effect = lambda: next(docs)
+        cursor.__iter__.return_value = docs
+
+        chunks = list(metrics_crud.stream_file_metrics(sort_by="filepath", sort_order="asc"))
+
+        body = json.loads(b"".join(chunks))
+        self.assertEqual(body["FilesMetricsCount"], 5)
+        self.assertEqual([f["filepath"] for f in body["FilesMetrics"]], [f"f{i}.csv" for i in range(5)])
+        self.assertEqual(body["FilesMetrics"][0]["first_time_logged"], "2025-01-01T00:00:00")
+        self.assertEqual(len(chunks), 5)
+        cursor.close.assert_called_once()
+
+    @patch('app.crud.metrics.metrics_crud.unique_users')
+    @patch('app.crud.metrics.metrics_crud.user_sketches')
+    def test_get_total_unique_users(self, mock_sketches, mock_collection):
+        """Test total users come from the repository sketch, else from uniqueUsers"""
+        mock_sketches.count.return_value = 1234
+        self.assertEqual(metrics_crud.get_total_unique_users(), {"total_unique_users": 1234})
+        mock_collection.count_documents.assert_not_called()
+
+        mock_sketches.count.return_value = None
+        mock_collection.count_documents.return_value = 500
+        self.assertEqual(metrics_crud.get_total_unique_users(), {"total_unique_users": 500})
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
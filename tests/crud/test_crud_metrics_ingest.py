@@ -0,0 +1,104 @@
+# tests/crud/test_crud_metrics_ingest.py
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+from app.crud.metrics_ingest import DownloadEvent, DownloadRecorder, aggregate
+
+T1 = datetime(2025, 1, 1, 12, 0)
+T2 = datetime(2025, 1, 2, 8, 30)
+
+class TestAggregate(unittest.TestCase):
+    def test_one_upsert_per_record(self):
+        """Test events are summed per record into $inc/$min/$max upserts"""
+        operations = aggregate([
+            DownloadEvent("ark:/88434/mds2-2154", "mds2-2154", "10.0.0.1", 100, T2),
+            DownloadEvent("ark:/88434/mds2-2154", "mds2-2154", "10.0.0.2", 50, T1),
+            DownloadEvent("ark:/88434/mds2-2154", "mds2-2154", "10.0.0.1", 25, T1),
+            DownloadEvent("mds9-0001", "mds9-0001", None, 10, T1),
+        ])
+        self.assertEqual(len(operations), 2)
+        self.assertEqual(operations[0]._filter, {"pdrid": "ark:/88434/mds2-2154"})
+        self.assertTrue(operations[0]._upsert)
+        update = operations[0]._doc
+        self.assertEqual(update["$inc"], {"record_download": 3, "total_size_download": 175})
+        self.assertEqual(update["$min"], {"first_time_logged": T1})
+        self.assertEqual(update["$max"], {"last_time_logged": T2})
+        self.assertEqual(update["$addToSet"]["_lookup_keys"],
+                         {"$each": ["88434/mds2-2154", "ark:/88434/mds2-2154", "mds2-2154"]})
+        self.assertNotIn("ip_list", update["$addToSet"])
+
+class TestDownloadRecorder(unittest.TestCase):
+    def test_full_queue_drops(self):
+        """Test events beyond the queue bound are dropped and counted"""
+        recorder = DownloadRecorder(max_queue=2, batch_size=10)
+        self.assertTrue(recorder.record("ark:/88434/mds1"))
+        self.assertTrue(recorder.record("ark:/88434/mds2"))
+        self.assertFalse(recorder.record("ark:/88434/mds3"))
+        stats = recorder.stats()
+        self.assertEqual((stats["accepted"], stats["dropped"], stats["queued"]), (2, 1, 2))
+
+    def test_flush_in_batches(self):
+        """Test a flush drains the queue with one bulk write per batch"""
+        recorder = DownloadRecorder(max_queue=100, batch_size=2)
+        for i in range(5):
+            recorder.record(f"ark:/88434/mds{i % 2}", download_size=10, timestamp=T1)
+        collection = MagicMock()
+        collection.bulk_write.return_value = MagicMock(upserted_count=1)
+
+        self.assertEqual(recorder.flush(collection), 5)
+        self.assertEqual(collection.bulk_write.call_count, 3)
+        self.assertEqual(collection.bulk_write.call_args.kwargs, {"ordered": False})
+        stats = recorder.stats()
+        self.assertEqual((stats["flushed"], stats["batches"], stats["queued"]), (5, 3, 0))
+
+    def test_users_added_to_sketches(self):
+        """Test users go to the record and repository sketches and set number_users"""
+        recorder = DownloadRecorder(max_queue=100, batch_size=10)
+        recorder.record("ark:/88434/mds1", ip_address="10.0.0.1", timestamp=T1)
+        recorder.record("ark:/88434/mds1", ip_address="10.0.0.2", timestamp=T2)
+        recorder.record("ark:/88434/mds2", timestamp=T1)
+        collection = MagicMock()
+        collection.bulk_write.return_value = MagicMock(upserted_count=0)
+        sketches = MagicMock()
+        sketches.add.return_value = 7
+
+        recorder.flush(collection, sketches)
+
+        added = {call.args[:3]: call.args[3] for call in sketches.add.call_args_list}
+        self.assertEqual(added, {("record", "ark:/88434/mds1", "2025-01"): {"10.0.0.1", "10.0.0.2"},
+                                 ("repo", "repo", "2025-01"): {"10.0.0.1", "10.0.0.2"}})
+        totals = collection.bulk_write.call_args.args[0]
+        self.assertEqual([op._doc for op in totals], [{"$max": {"number_users": 7}}])
+
+    def test_downloads_added_to_rollups(self):
+        """Test each download goes to its record's and the repository's rollups"""
+        recorder = DownloadRecorder(max_queue=100, batch_size=10)
+        recorder.record("ark:/88434/mds1", download_size=10, timestamp=T1)
+        collection = MagicMock()
+        collection.bulk_write.return_value = MagicMock(upserted_count=1)
+        rollups = MagicMock()
+
+        recorder.flush(collection, rollups=rollups)
+
+        rollups.add.assert_called_once_with([("record", "ark:/88434/mds1", T1, 10), ("repo", "repo", T1, 10)])
+        rollups.add.side_effect = Exception("down")
+        recorder.record("ark:/88434/mds1", timestamp=T1)
+        recorder.flush(collection, rollups=rollups)
+        self.assertEqual(recorder.stats()["rollup_failures"], 1)
+
+    def test_failed_batch_counted(self):
+        """Test a failing write is counted without stopping the flush"""
+        recorder = DownloadRecorder(max_queue=100, batch_size=1)
+        recorder.record("ark:/88434/mds1")
+        recorder.record("ark:/88434/mds2")
+        collection = MagicMock()
+        collection.bulk_write.side_effect = [Exception("down"), MagicMock(upserted_count=0)]
+
+        self.assertEqual(recorder.flush(collection), 1)
+        self.assertEqual(recorder.stats()["failed"], 1)
+        recorder.record("ark:/88434/mds3")
+        recorder.flush(None)
+        self.assertEqual(recorder.stats()["failed"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
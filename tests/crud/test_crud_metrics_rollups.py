@@ -0,0 +1,86 @@
+# tests/crud/test_crud_metrics_rollups.py
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from app.crud.metrics import metrics_crud
+from app.crud.metrics_rollups import RollupStore, parse_granularity, parse_period, rollup_operations
+from app.middleware.exceptions import IllegalArgumentException
+
+class TestPeriods(unittest.TestCase):
+    def test_parse_period(self):
+        """Test bounds are truncated or extended to periods of the granularity"""
+        self.assertEqual(parse_period("2025-03-04T10:00:00", "month"), "2025-03")
+        self.assertEqual(parse_period("2025", "day"), "2025-01-01")
+        self.assertEqual(parse_period("2024-02", "day", end=True), "2024-02-29")
+        self.assertEqual(parse_period("2025", "month", end=True), "2025-12")
+        self.assertIsNone(parse_period(None, "day"))
+
+    def test_invalid(self):
+        """Test invalid dates and granularities are rejected"""
+        for value in ("last week", "2025-13", "2025-02-30"):
+            with self.assertRaises(IllegalArgumentException):
+                parse_period(value, "day")
+        with self.assertRaises(IllegalArgumentException):
+            parse_granularity("hour")
+        self.assertEqual(parse_granularity(None), "month")
+
+    def test_rollup_operations(self):
+        """Test downloads are summed into one $inc upsert per bucket"""
+        operations = rollup_operations([
+            ("record", "ark:/88434/mds1", datetime(2025, 1, 1), 10),
+            ("record", "ark:/88434/mds1", datetime(2025, 1, 2), 5),
+        ])
+        buckets = {op._filter["period"]: op._doc["$inc"] for op in operations}
+        self.assertEqual(buckets, {
+            "2025-01-01": {"downloads": 1, "total_size_download": 10},
+            "2025-01-02": {"downloads": 1, "total_size_download": 5},
+            "2025-01": {"downloads": 2, "total_size_download": 15},
+            "2025": {"downloads": 2, "total_size_download": 15},
+        })
+        self.assertTrue(all(op._upsert for op in operations))
+
+class TestRollupStore(unittest.TestCase):
+    def test_series_is_range_scan(self):
+        """Test a series is one range query on the period, oldest first"""
+        collection = MagicMock()
+        RollupStore(collection).series("repo", "repo", "month", "2025-01", "2025-06")
+
+        selector = collection.find.call_args.args[0]
+        self.assertEqual(selector, {"scope": "repo", "key": "repo", "granularity": "month",
+                                    "period": {"$gte": "2025-01", "$lte": "2025-06"}})
+        collection.find.return_value.sort.assert_called_once_with("period", 1)
+
+class TestUsageSeries(unittest.TestCase):
+    @patch('app.crud.metrics.metrics_crud.user_sketches')
+    @patch('app.crud.metrics.metrics_crud.rollups')
+    def test_monthly_series_with_users(self, mock_rollups, mock_sketches):
+        """Test monthly periods carry user estimates from the sketches"""
+        mock_rollups.series.return_value = [{"period": "2025-01", "downloads": 3, "total_size_download": 30},
+                                            {"period": "2025-02", "downloads": 1, "total_size_download": 10}]
+        mock_sketches.period_counts.return_value = {"2025-01": 2}
+
+        result = metrics_crud.get_repo_usage("2025-01-15", "2025", None)
+
+        mock_rollups.series.assert_called_once_with("repo", "repo", "month", "2025-01", "2025-12")
+        mock_sketches.period_counts.assert_called_once_with("repo", "repo", ("2025-01", "2025-12"), 7)
+        self.assertEqual(result["UsageMetricsCount"], 2)
+        self.assertEqual([p["number_users"] for p in result["UsageMetrics"]], [2, 0])
+
+    @patch('app.crud.metrics.metrics_crud.user_sketches')
+    @patch('app.crud.metrics.metrics_crud.rollups')
+    @patch('app.crud.metrics.metrics_crud.metrics')
+    def test_record_series(self, mock_metrics, mock_rollups, mock_sketches):
+        """Test a record is resolved to its canonical pdrid; daily periods have no users"""
+        mock_metrics.find_one.return_value = {"pdrid": "ark:/88434/mds2-2154"}
+        mock_rollups.series.return_value = [{"period": "2025-01-01", "downloads": 1, "total_size_download": 1}]
+
+        result = metrics_crud.get_record_usage("mds2-2154", granularity="day")
+
+        self.assertEqual(mock_rollups.series.call_args.args[:3], ("record", "ark:/88434/mds2-2154", "day"))
+        mock_sketches.period_counts.assert_not_called()
+        self.assertNotIn("number_users", result["UsageMetrics"][0])
+        mock_metrics.find_one.return_value = None
+        self.assertIsNone(metrics_crud.get_record_usage("unknown"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from unittest.mock import MagicMock
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from app.crud.base import BaseCRUD
+from app.crud.record import RecordCRUD
+from app.crud import pagination
+from app.middleware.exceptions import IllegalArgumentException
+
+class TestKeysetPagination(unittest.TestCase):
+    def test_sort_gets_id_tiebreaker(self):
+        """Test _id is appended in the direction of the last sort key"""
+        self.assertEqual(pagination.keyset_sort([("title", DESCENDING)]), [("title", DESCENDING), ("_id", DESCENDING)])
+        self.assertEqual(pagination.keyset_sort(None), [("_id", ASCENDING)])
+
+    def test_cursor_round_trip(self):
+        """Test a token decodes back to the sort key values, preserving BSON types"""
+        sort = [("title", ASCENDING), ("_id", ASCENDING)]
+        oid = ObjectId()
+        token = pagination.encode_cursor({"title": "Zeta", "_id": oid}, sort)
+        self.assertEqual(pagination.decode_cursor(token, sort), ["Zeta", oid])
+
+    def test_cursor_rejected_for_other_sort(self):
+        """Test a token can't be reused with a different sort"""
+        token = pagination.encode_cursor({"title": "Zeta", "_id": ObjectId()}, [("title", ASCENDING), ("_id", ASCENDING)])
+        with self.assertRaises(IllegalArgumentException):
+            pagination.decode_cursor(token, [("title", DESCENDING), ("_id", DESCENDING)])
+        with self.assertRaises(IllegalArgumentException):
+            pagination.decode_cursor("not a token", [("_id", ASCENDING)])
+
+    def test_array_sort_keys_rejected(self):
+        """Test cursors are refused for array fields, declared or found in a returned document"""
+        sort = [("topic.tag", ASCENDING), ("_id", ASCENDING)]
+        with self.assertRaises(IllegalArgumentException):
+            pagination.check_sort_fields(sort, ("topic",))
+        pagination.check_sort_fields([("title", ASCENDING), ("_id", ASCENDING)], ("topic",))
+        with self.assertRaises(IllegalArgumentException):
+            pagination.encode_cursor({"_id": ObjectId(), "topic": [{"tag": "Physics"}]}, sort)
+        with self.assertRaises(IllegalArgumentException):
+            pagination.encode_cursor({"_id": ObjectId(), "keyword": ["a", "b"]}, [("keyword", ASCENDING), ("_id", ASCENDING)])
+
+    def test_keyset_filter(self):
+        """Test the filter expands to k1 > v1 OR (k1 = v1 AND k2 > v2)"""
+        oid = ObjectId()
+        query = pagination.keyset_filter([("title", ASCENDING), ("_id", ASCENDING)], ["Zeta", oid])
+        self.assertEqual(query, {"$or": [
+            {"title": {"$gt": "Zeta"}},
+            {"$and": [{"title": "Zeta"}, {"_id": {"$gt": oid}}]}
+        ]})
+
+    def test_keyset_filter_descending_includes_nulls(self):
+        """Test nulls, which sort last in descending order, still follow a non-null key"""
+        oid = ObjectId()
+        query = pagination.keyset_filter([("title", DESCENDING), ("_id", DESCENDING)], ["Zeta", oid])
+        self.assertEqual(query["$or"][0], {"$or": [{"title": {"$lt": "Zeta"}}, {"title": None}]})
+
+    def test_projection_returns_sort_keys(self):
+        """Test sort keys are added to the projection and reported for stripping"""
+        projection, strip = pagination.keyset_projection({"title": 1, "_id": 0}, [("doi", ASCENDING), ("_id", ASCENDING)])
+        self.assertEqual(projection, {"title": 1, "doi": 1})
+        self.assertEqual(strip, ["doi", "_id"])
+
+    def test_strip_nested_fields(self):
+        """Test stripped dotted fields don't leave empty parents behind"""
+        doc = {"title": "x", "contactPoint": {"fn": "Jane"}}
+        pagination.strip_fields(doc, ["contactPoint.fn"])
+        self.assertEqual(doc, {"title": "x"})
+
+class TestBaseCRUDKeyset(unittest.TestCase):
+    def setUp(self):
+        self.crud = BaseCRUD("test_collection")
+        self.mock_collection = MagicMock()
+        self.crud.collection = self.mock_collection
+
+    def _return_docs(self, docs):
+        mock_cursor = MagicMock()
+        mock_cursor.skip.return_value = mock_cursor
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.sort.return_value = mock_cursor
+        mock_cursor.collation.return_value = mock_cursor
+        mock_cursor.__iter__.side_effect = lambda: iter([dict(d) for d in docs])
+        self.mock_collection.find.return_value = mock_cursor
+        return mock_cursor
+
+    def test_first_and_next_page(self):
+        """Test cursor=* returns a token and the token turns into a range filter instead of a skip"""
+        ids = [ObjectId(), ObjectId()]
+        self._return_docs([{"_id": ids[0], "title": "A"}, {"_id": ids[1], "title": "B"}])
+        self.mock_collection.count_documents.return_value = 5
+
+        first = self.crud.search(**{"cursor": "*", "size": "2", "sort.asc": "title", "include": "title"})
+
+        self.assertEqual(first["ResultData"], [{"title": "A"}, {"title": "B"}])
+        self.assertEqual(first["ResultCount"], 5)
+        self.assertIsNotNone(first["NextCursor"])
+
+        cursor = self._return_docs([{"_id": ObjectId(), "title": "C"}])
+        second = self.crud.search(**{"cursor": first["NextCursor"], "size": "2", "sort.asc": "title", "include": "title"})
+
+        query = self.mock_collection.find.call_args.kwargs["filter"]
+        self.assertEqual(query["$or"][0], {"title": {"$gt": "B"}})
+        cursor.skip.assert_not_called()
+        self.assertIsNone(second["NextCursor"])
+        # A short keyset page can't tell how many documents came before it
+        self.assertEqual(second["ResultCount"], 5)
+
+    def test_record_array_sort_rejected(self):
+        """Test a record search can't page with a cursor sorted on topic.tag or keyword"""
+        crud = RecordCRUD()
+        crud.collection = self.mock_collection
+        for field in ("topic.tag", "keyword"):
+            with self.assertRaises(IllegalArgumentException):
+                crud.search(**{"cursor": "*", "size": "2", "sort.asc": field})
+        self.mock_collection.find.assert_not_called()
+
+    def test_no_cursor_field_without_cursor_param(self):
+        """Test the envelope is unchanged for regular paginated searches"""
+        self._return_docs([{"title": "A"}])
+        result = self.crud.search(size="2")
+        self.assertNotIn("NextCursor", result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# tests/crud/test_crud_paper.py
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from app.crud.paper import PaperClient
+from app.middleware.exceptions import InternalServerException
+from app.scripts.papers_stub import create_app
+
+URL = "http://papers.test/api/Publication/search"
+
+class TestPaperClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.stub = create_app(count=200, latency=0.05)
+        self.client = PaperClient(url=URL, transport=httpx.ASGITransport(app=self.stub))
+        patcher = patch.multiple('app.crud.paper.settings', PAPERS_CACHE_TTL=60, PAPERS_CACHE_STALE_TTL=600,
+                                 PAPERS_CACHE_MAX_ENTRIES=2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def _age(self, seconds):
+        """Make every cached search ``seconds`` older"""
+        for key, (fetched, papers) in self.client._cache.items():
+            self.client._cache[key] = (fetched - seconds, papers)
+
+    async def test_search_is_cached(self):
+        """Test a repeated search is answered from the cache"""
+        first = await self.client.search("laser", "2010-01-01")
+        second = await self.client.search("laser", "2010-01-01")
+        self.assertTrue(first)
+        self.assertIs(first, second)
+        self.assertEqual(self.stub.state.requests, 1)
+        await self.client.search("laser", "2020-01-01")
+        self.assertEqual(self.stub.state.requests, 2)
+        self.assertEqual(self.client.stats()["hits"], 1)
+
+    async def test_concurrent_searches_coalesced(self):
+        """Test identical searches in flight share one upstream request"""
+        results = await asyncio.gather(*(self.client.search("quantum", "2010-01-01") for _ in range(10)))
+        self.assertEqual(self.stub.state.requests, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.client.stats()["coalesced"], 9)
+
+    async def test_stale_while_revalidate(self):
+        """Test a stale search is served at once and refreshed by one background request"""
+        first = await self.client.search("fire", "2010-01-01")
+        self._age(120)
+        stale = await asyncio.gather(*(self.client.search("fire", "2010-01-01") for _ in range(3)))
+        self.assertTrue(all(result is first for result in stale))
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.stub.state.requests, 2)
+        self.assertEqual(self.client.stats()["refreshes"], 1)
+        self._age(-120)
+        self.assertIsNot(await self.client.search("fire", "2010-01-01"), first)
+        self._age(1000)
+        await self.client.search("fire", "2010-01-01")
+        self.assertEqual(self.client.stats()["misses"], 2)
+
+    async def test_failed_refresh_keeps_stale(self):
+        """Test an upstream error during a refresh leaves the stale results in place"""
+        first = await self.client.search("polymer", "2010-01-01")
+        self._age(120)
+        self.client.url = "http://papers.test/missing"
+        self.assertIs(await self.client.search("polymer", "2010-01-01"), first)
+        await asyncio.sleep(0.2)
+        self.assertIs(await self.client.search("polymer", "2010-01-01"), first)
+        self.assertEqual(self.client.stats()["upstream_errors"], 1)
+
+    async def test_upstream_errors(self):
+        """Test HTTP errors and timeouts are reported as internal server errors and not cached"""
+        self.client.url = "http://papers.test/missing"
+        with self.assertRaises(InternalServerException):
+            await self.client.search("laser", "2010-01-01")
+
+        def timeout(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        client = PaperClient(url=URL, transport=httpx.MockTransport(timeout))
+        with self.assertRaises(InternalServerException):
+            await client.search("laser", "2010-01-01")
+        self.assertEqual(client.stats()["entries"], 0)
+        await client.close()
+
+    async def test_cache_size_bounded(self):
+        """Test the least recently used search is evicted"""
+        for phrase in ("laser", "fire", "quantum"):
+            await self.client.search(phrase, "2010-01-01")
+        self.assertEqual(self.client.stats()["entries"], 2)
+        await self.client.search("laser", "2010-01-01")
+        self.assertEqual(self.stub.state.requests, 4)
+
+    async def test_missing_certificate(self):
+        """Test the real API is not called without the NIST certificate"""
+        client = PaperClient(url=URL)
+        with patch('app.crud.paper.CERT_PATH') as mock_cert_path:
+            mock_cert_path.exists.return_value = False
+            with self.assertRaises(InternalServerException):
+                await client.search("laser", "2010-01-01")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# tests/crud/test_crud_paper_mirror.py
+import unittest
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
+from pymongo import ASCENDING, DESCENDING
+from app.crud.paper_mirror import MIRROR_FIELD, PaperMirrorCRUD, mirror_date, mirror_key
+
+PAPERS = [
+    {"id": 7, "title": "Neutron scattering", "publishedDate": "2021-03-04T00:00:00"},
+    {"title": "No id", "issueDate": "2019-12-01"},
+]
+
+class TestMirrorFields(unittest.TestCase):
+    def test_mirror_key(self):
+        """Test publications are keyed by their id, or by a digest of their content"""
+        self.assertEqual(mirror_key(PAPERS[0]), "id:7")
+        self.assertTrue(mirror_key(PAPERS[1]).startswith("sha1:"))
+        self.assertEqual(mirror_key(PAPERS[1]), mirror_key(dict(reversed(list(PAPERS[1].items())))))
+
+    def test_mirror_date(self):
+        """Test the publication date is taken from the first date field present"""
+        self.assertEqual(mirror_date(PAPERS[0]), "2021-03-04")
+        self.assertEqual(mirror_date(PAPERS[1]), "2019-12-01")
+        self.assertEqual(mirror_date({"publishedDate": "unknown"}), "")
+
+class TestPaperMirrorSearch(unittest.TestCase):
+    def setUp(self):
+        self.crud = PaperMirrorCRUD()
+
+    def test_search_params(self):
+        """Test from_date filters on the mirrored date and skip is a plain offset"""
+        processed = self.crud._process_search_params(
+            {"searchphrase": "neutron", "from_date": "2015-01-01", "skip": 5, "limit": 10})
+        self.assertEqual(processed["query"], {"$and": [
+            {"$text": {"$search": "neutron"}}, {f"{MIRROR_FIELD}.date": {"$gte": "2015-01-01"}}]})
+        self.assertEqual((processed["skip"], processed["limit"]), (5, 10))
+        self.assertEqual(processed["sort"], [(f"{MIRROR_FIELD}.date", DESCENDING), (f"{MIRROR_FIELD}.key", ASCENDING)])
+        self.assertEqual(processed["projection"][MIRROR_FIELD], 0)
+
+    def test_include_leaves_out_bookkeeping(self):
+        """Test an inclusion projection is not mixed with the _mirror exclusion"""
+        processed = self.crud._process_search_params({"include": "title", "limit": 10})
+        self.assertNotIn(MIRROR_FIELD, processed["projection"])
+        self.assertEqual(processed["query"], {})
+
+class TestPaperMirrorSync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.crud = PaperMirrorCRUD()
+        self.crud._indexes_ready = True
+        self.collection = MagicMock()
+        self.collection.find_one = AsyncMock(return_value={MIRROR_FIELD: {"date": "2024-02-15"}})
+        self.collection.bulk_write = AsyncMock(return_value=MagicMock(upserted_count=1, modified_count=1))
+        self.collection.delete_many = AsyncMock(return_value=MagicMock(deleted_count=3))
+        patcher = patch.object(PaperMirrorCRUD, 'async_collection', new_callable=PropertyMock, return_value=self.collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = MagicMock()
+        self.client.fetch = AsyncMock(return_value=PAPERS)
+
+    async def test_incremental_sync(self):
+        """Test a sync fetches from the newest mirrored date less the overlap and upserts by key"""
+        with patch('app.crud.paper_mirror.settings.PAPERS_MIRROR_OVERLAP_DAYS', 30):
+            result = await self.crud.sync(self.client)
+        self.client.fetch.assert_awaited_once_with("", "2024-01-16")
+        operations = self.collection.bulk_write.await_args.args[0]
+        self.assertEqual([op._filter for op in operations], [{f"{MIRROR_FIELD}.key": "id:7"},
+                                                               {f"{MIRROR_FIELD}.key": mirror_key(PAPERS[1])}])
+        self.assertEqual(operations[0]._doc[MIRROR_FIELD]["date"], "2021-03-04")
+        self.collection.delete_many.assert_not_awaited()
+        self.assertEqual((result["fetched"], result["upserted"], result["removed"]), (2, 2, 0))
+        self.assertIs(self.crud.last_sync, result)
+
+    async def test_first_sync_starts_at_start_date(self):
+        """Test an empty mirror is filled from PAPERS_MIRROR_START_DATE"""
+        self.collection.find_one.return_value = None
+        with patch('app.crud.paper_mirror.settings.PAPERS_MIRROR_START_DATE', "2012-01-01"):
+            await self.crud.sync(self.client)
+        self.client.fetch.assert_awaited_once_with("", "2012-01-01")
+
+    async def test_full_sync_removes_withdrawn(self):
+        """Test a full sync drops publications not seen by it, unless the API returned nothing"""
+        result = await self.crud.sync(self.client, full=True)
+        self.assertEqual(result["removed"], 3)
+        self.client.fetch.return_value = []
+        result = await self.crud.sync(self.client, full=True)
+        self.assertEqual(result["removed"], 0)
+        self.assertEqual(self.collection.delete_many.await_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
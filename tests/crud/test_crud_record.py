@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 from app.crud.record import RecordCRUD
+from app.crud.identifiers import canonical_id, identifier_keys, lookup_keys
+from app.crud.normalized import normalized_values, searchable_fields
 from app.middleware.exceptions import ResourceNotFoundException, InternalServerException
 from app.main import app
 
@@ -179,5 +181,100 @@ class TestRecordCRUD(unittest.TestCase):
         response = self.client.get("/records/?title=test")  # Use a valid test first
         self.assertIn(response.status_code, [200, 400, 404])
 
+class TestRecordLookupKeys(unittest.TestCase):
+    def test_identifier_keys_for_ark(self):
+        """An ARK yields the full form, the NAAN-qualified name and the bare MDS id"""
+        self.assertEqual(
+            identifier_keys("ark:/88434/mds0052gnp"),
+            ["ark:/88434/mds0052gnp", "88434/mds0052gnp", "mds0052gnp"]
+        )
+
+    def test_canonical_id_forms(self):
+        """Request identifiers are reduced to the same form stored in _lookup_keys"""
+        self.assertEqual(canonical_id("ark:88434/mds0052gnp"), "ark:/88434/mds0052gnp")
+        self.assertEqual(canonical_id("/88434/mds0052gnp"), "88434/mds0052gnp")
+        self.assertEqual(canonical_id("https://doi.org/10.18434/M32095"), "doi:10.18434/m32095")
+        self.assertEqual(canonical_id("doi:10.18434/M32095"), "doi:10.18434/m32095")
+        self.assertEqual(canonical_id(" 1E0F15DAAEFB84E4E0531A5706813DD8 "), "1E0F15DAAEFB84E4E0531A5706813DD8")
+
+    def test_lookup_keys_for_record(self):
+        """All identifier fields of a record contribute to its lookup keys"""
+        keys = lookup_keys({
+            "@id": "ark:/88434/mds0052gnp",
+            "ediid": "1E0F15DAAEFB84E4E0531A5706813DD8",
+            "doi": "doi:10.18434/M32095"
+        })
+        for key in ("mds0052gnp", "88434/mds0052gnp", "ark:/88434/mds0052gnp",
+                    "1E0F15DAAEFB84E4E0531A5706813DD8", "doi:10.18434/m32095"):
+            self.assertIn(key, keys)
+
+    def test_record_query_uses_indexed_equality(self):
+        """The record lookup is an $in on _lookup_keys plus exact id matches, with no regex"""
+        crud = RecordCRUD()
+        query, decoded_id = crud._record_query("ark%3A%2F88434%2Fmds0052gnp")
+
+        self.assertEqual(decoded_id, "ark:/88434/mds0052gnp")
+        self.assertEqual(query["$or"][0], {"_lookup_keys": {"$in": ["ark:/88434/mds0052gnp"]}})
+        self.assertNotIn("$regex", str(query))
+
+    def test_lookup_keys_hidden_from_search(self):
+        """_lookup_keys is excluded from search results unless an inclusion projection is used"""
+        crud = RecordCRUD()
+        self.assertEqual(crud._process_search_params({"searchphrase": "x"})["projection"].get("_lookup_keys"), 0)
+        self.assertNotIn("_lookup_keys", crud._process_search_params({"include": "title"})["projection"])
+
+class TestRecordNormalizedFields(unittest.TestCase):
+    def test_searchable_fields(self):
+        """Fields flagged or tagged searchable are normalized, nested ones are not"""
+        fields = searchable_fields([
+            {"name": "keyword", "searchable": True},
+            {"name": "@type", "tags": ["searchable"]},
+            {"name": "contactPoint.fn", "searchable": True},
+            {"name": "description", "searchable": False},
+        ])
+        self.assertEqual(fields, ["@type", "keyword"])
+
+    def test_normalized_values(self):
+        """Values are trimmed and lower-cased; arrays are de-duplicated and sorted"""
+        shadow = normalized_values({
+            "doi": " doi:10.18434/M32095 ",
+            "keyword": ["Neutron", "neutron ", "Graphene", 3],
+            "title": "",
+            "components": [{"@type": "nrdp:DataFile"}]
+        }, ["doi", "keyword", "title", "components", "missing"])
+        self.assertEqual(shadow, {"doi": "doi:10.18434/m32095", "keyword": ["3", "graphene", "neutron"]})
+
+    def test_create_adds_shadow_fields(self):
+        """Records are stored with their shadow fields and lookup keys, which are not echoed back"""
+        crud = RecordCRUD()
+        crud.collection = MagicMock()
+        crud.collection.database.__getitem__.return_value.find.return_value = [{"name": "keyword", "searchable": True}]
+        crud.collection.insert_one.return_value.inserted_id = "abc"
+
+        result = crud.create({"ediid": "ABC", "keyword": ["Neutron"]})
+
+        stored = crud.collection.insert_one.call_args[0][0]
+        self.assertEqual(stored["_norm"], {"keyword": ["neutron"]})
+        self.assertIn("_lookup_keys", stored)
+        self.assertNotIn("_norm", result["ResultData"])
+        self.assertNotIn("_lookup_keys", result["ResultData"])
+
+    def test_search_uses_shadow_fields_when_enabled(self):
+        """Exact-match filters become shadow field equality once normalized fields are loaded"""
+        crud = RecordCRUD()
+        crud.collection = MagicMock()
+        crud.collection.database.__getitem__.return_value.find.return_value = [{"name": "keyword", "searchable": True}]
+
+        with patch('app.crud.record.settings.NORMALIZED_FILTERS', False):
+            crud.load_normalized_fields()
+        self.assertEqual(crud.normalized_fields, frozenset())
+
+        with patch('app.crud.record.settings.NORMALIZED_FILTERS', True):
+            crud.load_normalized_fields()
+        processed = crud._process_search_params({"keyword": " Neutron "})
+        self.assertEqual(processed["query"], {"_norm.keyword": "neutron"})
+        self.assertEqual(processed["projection"].get("_norm"), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,179 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+from bson import ObjectId
+from app.crud.base import BaseCRUD
+from app.middleware.exceptions import IllegalArgumentException
+from app.crud.response_cache import MemoryResponseCache, NullResponseCache, ResponseCache, cache_key
+
+class TestCacheKey(unittest.TestCase):
+    def test_parameter_order_is_ignored(self):
+        """Test the same parameters in a different order give the same key"""
+        self.assertEqual(
+            cache_key({"include": "title,doi", "size": "10"}),
+            cache_key({"size": "10", "include": "doi, title"})
+        )
+
+    def test_empty_parameters_are_dropped(self):
+        """Test empty parameters (e.g. a stray ``?=``) don't split the cache"""
+        self.assertEqual(cache_key({"": "", "include": "title"}), cache_key({"include": "title"}))
+
+    def test_stream_flag_is_ignored(self):
+        """Test streamed and buffered requests for the same search share one key"""
+        self.assertEqual(cache_key({"include": "title", "stream": "true"}), cache_key({"include": "title"}))
+
+    def test_sort_order_is_significant(self):
+        """Test the order of sort fields is part of the key"""
+        self.assertNotEqual(
+            cache_key({"sort.asc": "title,doi"}),
+            cache_key({"sort.asc": "doi,title"})
+        )
+
+class TestResponseCacheInterface(unittest.TestCase):
+    def test_incomplete_backend_rejected(self):
+        """Test a backend missing part of the interface cannot be created"""
+        class GetOnlyCache(ResponseCache):
+            def get(self, collection, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            GetOnlyCache()
+
+class TestMemoryResponseCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        """Test hits and misses are counted"""
+        cache = MemoryResponseCache(ttl=60)
+        self.assertIsNone(cache.get("record", "k"))
+        cache.set("record", "k", {"ResultCount": 1})
+        self.assertEqual(cache.get("record", "k"), {"ResultCount": 1})
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    @patch('app.crud.response_cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        """Test entries are dropped once their TTL has passed"""
+        mock_monotonic.return_value = 100.0
+        cache = MemoryResponseCache(ttl=10)
+        cache.set("record", "k", {"ResultCount": 1})
+
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get("record", "k"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_lru_eviction_by_memory(self):
+        """Test least recently used entries are evicted when over the memory budget"""
+        value = {"ResultData": ["x" * 80]}
+        cache = MemoryResponseCache(ttl=60, max_bytes=250, max_entry_bytes=250)
+        cache.set("record", "a", value)
+        cache.set("record", "b", value)
+        cache.get("record", "a")  # "b" is now least recently used
+        cache.set("record", "c", value)
+
+        self.assertIsNotNone(cache.get("record", "a"))
+        self.assertIsNone(cache.get("record", "b"))
+        self.assertIsNotNone(cache.get("record", "c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_oversized_entries_not_cached(self):
+        """Test a single response larger than the entry limit is not stored"""
+        cache = MemoryResponseCache(ttl=60, max_bytes=1000, max_entry_bytes=10)
+        cache.set("record", "k", {"ResultData": ["x" * 100]})
+        self.assertIsNone(cache.get("record", "k"))
+
+    def test_invalidate_collection(self):
+        """Test invalidation only drops entries of the given collection"""
+        cache = MemoryResponseCache(ttl=60)
+        cache.set("record", "k", {"ResultCount": 1})
+        cache.set("fields", "k", {"ResultCount": 2})
+
+        cache.invalidate("record")
+
+        self.assertIsNone(cache.get("record", "k"))
+        self.assertEqual(cache.get("fields", "k"), {"ResultCount": 2})
+
+    def test_hits_are_independent_copies(self):
+        """Test changing a stored or returned response does not change the cached one"""
+        value = {"ResultData": [{"_id": ObjectId(), "modified": datetime(2024, 1, 2, 3, 4, 5)}]}
+        cache = MemoryResponseCache(ttl=60)
+        cache.set("record", "k", value)
+        value["ResultData"].append({"title": "added after set"})
+
+        hit = cache.get("record", "k")
+        hit["ResultData"][0]["title"] = "changed"
+        again = cache.get("record", "k")
+
+        self.assertEqual(len(again["ResultData"]), 1)
+        self.assertNotIn("title", again["ResultData"][0])
+        self.assertIsInstance(again["ResultData"][0]["_id"], ObjectId)
+        self.assertEqual(again["ResultData"][0]["modified"], datetime(2024, 1, 2, 3, 4, 5))
+
+class TestBaseCRUDResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.crud = BaseCRUD("test_collection")
+        mock_cursor = MagicMock()
+        mock_cursor.skip.return_value = mock_cursor
+        mock_cursor.limit.return_value = mock_cursor
+        mock_cursor.__iter__.side_effect = lambda: iter([{"name": "test_result"}])
+        self.mock_collection = MagicMock()
+        self.mock_collection.find.return_value = mock_cursor
+        self.crud.collection = self.mock_collection
+
+    def test_repeated_search_served_from_cache(self):
+        """Test an identical search does not reach MongoDB again"""
+        cache = MemoryResponseCache(ttl=60)
+        with patch('app.crud.base.get_response_cache', return_value=cache):
+            first = self.crud.search(include="name,title", size="10")
+            second = self.crud.search(size="10", include="title,name")
+
+        self.assertEqual(first["ResultData"], second["ResultData"])
+        self.assertEqual(self.mock_collection.find.call_count, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_changing_a_result_does_not_change_the_cache(self):
+        """Test a caller editing its search response does not affect later hits"""
+        cache = MemoryResponseCache(ttl=60)
+        with patch('app.crud.base.get_response_cache', return_value=cache):
+            first = self.crud.search(size="10")
+            first["ResultData"][0]["name"] = "changed"
+            first["ResultData"].clear()
+            second = self.crud.search(size="10")
+
+        self.assertEqual(second["ResultData"], [{"name": "test_result"}])
+
+    def test_invalid_order_not_served_from_cache(self):
+        """Test a cached search in a valid order does not answer the same parameters in an invalid one"""
+        cache = MemoryResponseCache(ttl=60)
+        with patch('app.crud.base.get_response_cache', return_value=cache):
+            self.crud.search(searchphrase="test", title="x")
+            with self.assertRaises(IllegalArgumentException):
+                self.crud.search(title="x", searchphrase="test")
+            with self.assertRaises(IllegalArgumentException):
+                asyncio.run(self.crud.search_async(title="x", searchphrase="test"))
+
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_create_invalidates_collection(self):
+        """Test writing to a collection drops its cached responses"""
+        cache = MemoryResponseCache(ttl=60)
+        with patch('app.crud.base.get_response_cache', return_value=cache):
+            self.crud.search(size="10")
+            self.crud.create({"name": "new"})
+            self.crud.search(size="10")
+
+        self.assertEqual(self.mock_collection.find.call_count, 2)
+
+    def test_disabled_cache(self):
+        """Test searches always reach MongoDB when caching is disabled"""
+        with patch('app.crud.base.get_response_cache', return_value=NullResponseCache()):
+            self.crud.search(size="10")
+            self.crud.search(size="10")
+
+        self.assertEqual(self.mock_collection.find.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
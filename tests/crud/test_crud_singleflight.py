@@ -0,0 +1,56 @@
+# tests/crud/test_crud_singleflight.py
+import asyncio
+import unittest
+from app.crud.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test callers with the same key wait for the one call in flight"""
+        flights = SingleFlight()
+        calls = []
+
+        async def call(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return {"value": value}
+
+        results = await asyncio.gather(*(flights.do("a", lambda: call(1)) for _ in range(4)),
+                                       flights.do("b", lambda: call(2)))
+        self.assertEqual(calls, [1, 2])
+        self.assertIs(results[0], results[3])
+        self.assertEqual(results[4], {"value": 2})
+        self.assertEqual(flights.stats(), {"executions": 2, "coalesced": 3, "in_flight": 0})
+
+        # Nothing is kept once the call is done
+        await flights.do("a", lambda: call(3))
+        self.assertEqual(calls, [1, 2, 3])
+
+    async def test_exception_shared(self):
+        """Test every waiter sees the exception of the shared call"""
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flights.do("a", fail) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(flights.executions, 1)
+
+    async def test_cancelled_caller_does_not_cancel_call(self):
+        """Test the call keeps running for the others when one waiter is cancelled"""
+        flights = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("a", call))
+        second = asyncio.ensure_future(flights.do("a", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        self.assertEqual(await second, "done")
+        self.assertTrue(first.cancelled())
+
+if __name__ == '__main__':
+    unittest.main()
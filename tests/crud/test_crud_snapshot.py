@@ -0,0 +1,159 @@
+# tests/crud/test_crud_snapshot.py
+import unittest
+from unittest.mock import MagicMock
+from bson import ObjectId
+from app.crud.base import BaseCRUD
+from app.crud.snapshot import CollectionSnapshot, UnsupportedQuery, match, project, sort_documents
+from app.middleware.request_processor import process_search_params
+
+DOCS = [
+    {"_id": ObjectId(), "name": "title", "type": "String", "tags": ["searchable", "filterable"],
+     "components": [{"@type": ["nrdp:DataFile"], "title": "a.csv"}]},
+    {"_id": ObjectId(), "name": "Keyword", "type": "Array", "tags": ["searchable"], "version": 2},
+    {"_id": ObjectId(), "name": "doi", "type": "String", "version": 10,
+     "components": [{"@type": ["nrdp:AccessPage"], "title": "landing"}]},
+    {"_id": ObjectId(), "name": "item 2", "type": None},
+]
+
+def _snapshot(docs=DOCS):
+    collection = MagicMock()
+    collection.estimated_document_count.return_value = len(docs)
+    collection.find_one.return_value = {"_id": docs[-1]["_id"]} if docs else None
+    collection.find.return_value = iter([dict(doc) for doc in docs])
+    snapshot = CollectionSnapshot("fields", 1000)
+    snapshot.load(collection)
+    return snapshot, collection
+
+def _names(docs):
+    return [doc["name"] for doc in docs]
+
+class TestMatch(unittest.TestCase):
+    def test_equality_and_arrays(self):
+        """Test equality matches scalars, array elements and null for missing fields"""
+        self.assertTrue(match(DOCS[0], {"tags": "filterable"}))
+        self.assertFalse(match(DOCS[1], {"tags": "filterable"}))
+        self.assertTrue(match(DOCS[3], {"type": None}))
+        self.assertTrue(match(DOCS[0], {"version": None}))
+
+    def test_operators(self):
+        """Test the operators the request processor generates"""
+        self.assertTrue(match(DOCS[1], {"name": {"$regex": "^keyword$", "$options": "i"}}))
+        self.assertTrue(match(DOCS[2], {"version": {"$gte": 5, "$lt": 20}}))
+        self.assertFalse(match(DOCS[2], {"version": {"$gt": "5"}}))
+        self.assertTrue(match(DOCS[2], {"name": {"$in": ["title", "doi"]}}))
+        self.assertTrue(match(DOCS[0], {"components": {"$elemMatch": {"@type": {"$regex": "datafile", "$options": "i"}}}}))
+        self.assertFalse(match(DOCS[2], {"components": {"$elemMatch": {"@type": {"$regex": "datafile", "$options": "i"}}}}))
+        self.assertTrue(match(DOCS[1], {"$or": [{"name": "x"}, {"version": 2}]}))
+        self.assertFalse(match(DOCS[1], {"$and": [{"name": "Keyword"}, {"version": 3}]}))
+        self.assertTrue(match(DOCS[0], {"components.title": "a.csv"}))
+
+    def test_unsupported(self):
+        """Test queries outside the evaluator are refused"""
+        with self.assertRaises(UnsupportedQuery):
+            match(DOCS[0], {"$text": {"$search": "title"}})
+        with self.assertRaises(UnsupportedQuery):
+            match(DOCS[0], {"name": {"$where": "true"}})
+
+class TestProjectAndSort(unittest.TestCase):
+    def test_project(self):
+        """Test inclusion and exclusion projections, including dotted paths into arrays"""
+        self.assertEqual(project(DOCS[0], {"name": 1, "components.title": 1, "_id": 0}),
+                         {"name": "title", "components": [{"title": "a.csv"}]})
+        projected = project(DOCS[0], {"_id": 0, "tags": 0, "components.@type": 0})
+        self.assertEqual(projected, {"name": "title", "type": "String", "components": [{"title": "a.csv"}]})
+        self.assertIn("@type", DOCS[0]["components"][0])
+        with self.assertRaises(UnsupportedQuery):
+            project(DOCS[0], {"_score": {"$meta": "textScore"}})
+
+    def test_sort_collation(self):
+        """Test strings sort case-insensitively with numbers by value, missing values first"""
+        docs = [{"n": "b"}, {"n": "A"}, {"n": "item 10"}, {"n": "item 9"}, {}, {"n": "a"}]
+        self.assertEqual([d.get("n") for d in sort_documents(docs, [("n", 1)])],
+                         [None, "a", "A", "b", "item 9", "item 10"])
+        self.assertEqual([d.get("n") for d in sort_documents(docs, [("n", -1)])],
+                         ["item 10", "item 9", "b", "A", "a", None])
+
+    def test_sort_multiple_keys(self):
+        """Test secondary keys break ties with their own direction"""
+        docs = [{"t": "x", "v": 1}, {"t": "y", "v": 2}, {"t": "x", "v": 3}]
+        self.assertEqual([d["v"] for d in sort_documents(docs, [("t", 1), ("v", -1)])], [3, 1, 2])
+
+class TestCollectionSnapshot(unittest.TestCase):
+    def test_search_processed_params(self):
+        """Test a processed search is filtered, sorted, paged and projected locally"""
+        snapshot, _ = _snapshot()
+        processed = process_search_params({"type": "string", "sort.desc": "name", "size": "1", "page": "2"})
+        processed["projection"] = {"_id": 0}
+        docs, total = snapshot.search(processed)
+        self.assertEqual(total, 2)
+        self.assertEqual(docs, [{k: v for k, v in DOCS[2].items() if k != "_id"}])
+
+    def test_search_text_unsupported(self):
+        """Test searchphrase queries are left to MongoDB"""
+        snapshot, _ = _snapshot()
+        with self.assertRaises(UnsupportedQuery):
+            snapshot.search(process_search_params({"searchphrase": "title"}))
+
+    def test_results_are_copies(self):
+        """Test callers cannot change the snapshot through results"""
+        snapshot, _ = _snapshot()
+        docs, _ = snapshot.search({"query": {"name": "title"}, "projection": None, "sort": None, "skip": 0, "limit": 0})
+        docs[0]["tags"].append("changed")
+        self.assertEqual(snapshot.get(DOCS[0]["_id"])["tags"], ["searchable", "filterable"])
+
+    def test_refresh_on_version_change(self):
+        """Test a refresh only reloads when the version signature changes"""
+        snapshot, collection = _snapshot()
+        self.assertFalse(snapshot.refresh(collection))
+        collection.estimated_document_count.return_value = 5
+        collection.find.return_value = iter(DOCS + [{"_id": ObjectId(), "name": "new"}])
+        self.assertTrue(snapshot.refresh(collection))
+        self.assertEqual(snapshot.document_count, 5)
+
+    def test_too_large_is_not_loaded(self):
+        """Test collections over the size limit stay in MongoDB"""
+        snapshot, collection = _snapshot()
+        snapshot.max_documents = 2
+        self.assertFalse(snapshot.load(collection))
+        self.assertFalse(snapshot.ready)
+
+class TestBaseCRUDSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.crud = BaseCRUD("fields")
+        self.crud.snapshot, _ = _snapshot()
+        self.crud.collection = MagicMock()
+
+    def test_search_served_from_memory(self):
+        """Test searches are answered without MongoDB"""
+        result = self.crud.search(type="String", **{"sort.asc": "name"})
+        self.crud.collection.find.assert_not_called()
+        self.assertEqual(_names(result["ResultData"]), ["doi", "title"])
+        self.assertEqual(result["ResultCount"], 2)
+        self.assertNotIn("_id", result["ResultData"][0])
+
+    def test_search_falls_back_to_mongo(self):
+        """Test queries the snapshot cannot evaluate go to MongoDB"""
+        cursor = MagicMock()
+        cursor.__iter__.return_value = iter([{"name": "title"}])
+        self.crud.collection.find.return_value = cursor
+        result = self.crud.search(searchphrase="title")
+        self.crud.collection.find.assert_called_once()
+        self.assertEqual(_names(result["ResultData"]), ["title"])
+
+    def test_get_and_get_all_served_from_memory(self):
+        """Test lookups by _id and plain listings use the snapshot"""
+        result = self.crud.get(str(DOCS[1]["_id"]))
+        self.assertEqual(result["ResultData"][0]["name"], "Keyword")
+        result = self.crud.get_all(skip=1, limit=2)
+        self.assertEqual(_names(result["ResultData"]), ["Keyword", "doi"])
+        self.assertEqual(result["ResultCount"], 4)
+        self.crud.collection.find_one.assert_not_called()
+        self.crud.collection.find.assert_not_called()
+
+    def test_write_drops_snapshot(self):
+        """Test a write through the API sends searches back to MongoDB until the next refresh"""
+        self.crud.create({"name": "new"})
+        self.assertFalse(self.crud.snapshot.ready)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# tests/crud/test_crud_taxonomy_tree.py
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from bson import ObjectId
+from app.config import settings
+from app.crud.record import RecordCRUD
+from app.crud.taxonomy import TaxonomyCRUD
+from app.crud.taxonomy_tree import TaxonomyTree
+from app.middleware.exceptions import IllegalArgumentException, ResourceNotFoundException
+
+DOCS = [
+    {"_id": ObjectId(), "term": "Physics", "level": 1},
+    {"_id": ObjectId(), "term": "Optical physics", "parent": "Physics", "level": 2},
+    {"_id": ObjectId(), "term": "Lasers", "parent": "Physics: Optical physics", "level": 3},
+    {"_id": ObjectId(), "term": "Atomic physics", "parent": "Physics", "level": 2},
+    {"_id": ObjectId(), "term": "Chemistry", "level": 1},
+    {"_id": ObjectId(), "term": "Spectroscopy", "parent": "Chemistry", "level": 2},
+    {"_id": ObjectId(), "term": "Spectroscopy", "parent": "Physics", "level": 2},
+]
+
+def _paths(nodes):
+    return [node.path for node in nodes]
+
+class TestTaxonomyTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = TaxonomyTree(DOCS)
+
+    def test_paths_and_order(self):
+        """Test nodes get full paths and are numbered depth-first with sorted children"""
+        self.assertEqual(_paths(self.tree.nodes), [
+            "Chemistry", "Chemistry: Spectroscopy",
+            "Physics", "Physics: Atomic physics", "Physics: Optical physics",
+            "Physics: Optical physics: Lasers", "Physics: Spectroscopy",
+        ])
+        lasers = self.tree.find("lasers")[0]
+        self.assertEqual(lasers.depth, 2)
+        self.assertTrue(self.tree.find("Physics")[0].contains(lasers))
+        self.assertFalse(self.tree.find("Chemistry")[0].contains(lasers))
+
+    def test_subtree(self):
+        """Test a subtree is the term and everything below it"""
+        self.assertEqual(self.tree.descendant_tags("Physics: Optical physics"),
+                         ["Physics: Optical physics", "Physics: Optical physics: Lasers"])
+        self.assertEqual(len(self.tree.subtree("Physics")), 5)
+        self.assertEqual(self.tree.subtree("unknown"), [])
+
+    def test_repeated_terms(self):
+        """Test a term used under several parents is found by name or told apart by path"""
+        self.assertEqual(_paths(self.tree.subtree("Spectroscopy")),
+                         ["Chemistry: Spectroscopy", "Physics: Spectroscopy"])
+        self.assertEqual(_paths(self.tree.ancestors("Chemistry: Spectroscopy")), ["Chemistry"])
+
+    def test_ancestors(self):
+        """Test ancestors are returned root first"""
+        self.assertEqual(_paths(self.tree.ancestors("Lasers")), ["Physics", "Physics: Optical physics"])
+        self.assertEqual(self.tree.ancestors("Physics"), [])
+
+    def test_orphans_and_cycles(self):
+        """Test unknown parents and parent cycles leave every term reachable"""
+        tree = TaxonomyTree([
+            {"term": "A", "parent": "B"},
+            {"term": "B", "parent": "A"},
+            {"term": "C", "parent": "Missing"},
+            {"label": "D"},
+            {"parent": "A"},
+        ])
+        self.assertEqual(sorted(node.term for node in tree.nodes), ["A", "B", "C", "D"])
+        self.assertEqual(_paths(tree.subtree("A")), ["A", "A: B"])
+
+class TestTaxonomyCRUDTree(unittest.TestCase):
+    def setUp(self):
+        self.crud = TaxonomyCRUD()
+        self.crud.collection = MagicMock()
+        self.crud.collection.estimated_document_count.return_value = len(DOCS)
+        self.crud.collection.find_one.return_value = {"_id": DOCS[-1]["_id"]}
+        self.crud.collection.find.side_effect = lambda *args, **kwargs: iter([dict(doc) for doc in DOCS])
+
+    def test_subtree_and_ancestors(self):
+        """Test the endpoints' results carry path and depth with string ids"""
+        result = self.crud.subtree("Optical physics")
+        self.assertEqual(result["ResultCount"], 2)
+        self.assertEqual(result["ResultData"][1]["path"], "Physics: Optical physics: Lasers")
+        self.assertEqual(result["ResultData"][1]["depth"], 2)
+        self.assertEqual(result["ResultData"][0]["_id"], str(DOCS[1]["_id"]))
+        result = self.crud.ancestors("Lasers")
+        self.assertEqual([doc["term"] for doc in result["ResultData"]], ["Physics", "Optical physics"])
+
+    def test_unknown_term(self):
+        """Test an unknown term is reported as not found"""
+        with self.assertRaises(ResourceNotFoundException):
+            self.crud.subtree("Astrology")
+
+    def test_tree_reused_until_invalidated(self):
+        """Test the tree is built once and rebuilt after a write"""
+        self.crud.tree()
+        self.crud.tree()
+        self.assertEqual(self.crud.collection.find.call_count, 1)
+        self.crud.invalidate_cache()
+        self.crud.tree()
+        self.assertEqual(self.crud.collection.find.call_count, 2)
+
+    def test_rebuild_drops_cached_record_searches(self):
+        """Test cached record searches are dropped when the tree is rebuilt, not on the first build"""
+        cache = MagicMock()
+        with patch('app.crud.taxonomy.get_response_cache', return_value=cache), \
+                patch('app.crud.taxonomy.settings.TAXONOMY_TREE_CHECK_INTERVAL', 0):
+            self.crud.tree()
+            cache.invalidate.assert_not_called()
+            self.crud.tree()
+            cache.invalidate.assert_not_called()
+            self.crud.collection.find_one.return_value = {"_id": ObjectId()}
+            self.crud.tree()
+        cache.invalidate.assert_called_once_with(settings.RECORDS_COLLECTION)
+
+class TestExpandTopics(unittest.TestCase):
+    def setUp(self):
+        self.crud = RecordCRUD()
+        patcher = patch('app.crud.record.taxonomy_crud')
+        self.taxonomy = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.taxonomy.tree.return_value = TaxonomyTree(DOCS)
+        self.taxonomy.current_tree.return_value = self.taxonomy.tree.return_value
+        self.taxonomy.tree_async = AsyncMock(return_value=self.taxonomy.tree.return_value)
+
+    def test_expands_to_descendants(self):
+        """Test a topic.tag filter becomes one $in over the term's subtree"""
+        processed = self.crud._process_search_params({"topic.tag": "Optical physics", "expandTopics": "true"})
+        self.assertEqual(processed["query"], {"topic.tag": {"$in": [
+            "Physics: Optical physics", "Physics: Optical physics: Lasers"]}})
+
+    def test_combines_with_other_filters(self):
+        """Test the expanded condition is ANDed with the rest of the query, unknown terms stay partial"""
+        processed = self.crud._process_search_params(
+            {"keyword": "laser", "topic.tag": "Lasers,Astrology", "expandTopics": "true"})
+        condition = processed["query"]["$and"][1]
+        self.assertEqual(condition["$or"][0], {"topic.tag": {"$in": ["Physics: Optical physics: Lasers"]}})
+        self.assertEqual(condition["$or"][1], {"topic.tag": {"$regex": "Astrology", "$options": "i"}})
+
+    def test_other_fields_match_as_without_expansion(self):
+        """Test expanding topics does not change how the other fields are matched"""
+        params = {"keyword": "x", "topic.tag": "Lasers"}
+        plain = self.crud._process_search_params(params)["query"]["$and"]
+        expanded = self.crud._process_search_params({**params, "expandTopics": "true"})["query"]["$and"]
+        self.assertEqual(expanded[0], plain[0])
+        self.assertEqual(expanded[1], {"topic.tag": {"$in": ["Physics: Optical physics: Lasers"]}})
+
+    def test_not_expanded_by_default(self):
+        """Test topic.tag keeps its partial match without expandTopics"""
+        processed = self.crud._process_search_params({"topic.tag": "Optical physics"})
+        self.assertEqual(processed["query"], {"topic.tag": {"$regex": "Optical\\ physics", "$options": "i"}})
+        self.taxonomy.current_tree.assert_not_called()
+
+    def test_search_async_refreshes_tree_off_loop(self):
+        """Test async searches refresh the tree in a worker thread and only read it when compiling"""
+        with patch('app.crud.base.BaseCRUD.search_async', new_callable=AsyncMock) as mock_search:
+            asyncio.run(self.crud.search_async(**{"topic.tag": "Lasers", "expandTopics": "true"}))
+            self.taxonomy.tree_async.assert_awaited_once()
+            mock_search.assert_awaited_once()
+
+            asyncio.run(self.crud.search_async(**{"topic.tag": "Lasers"}))
+            self.taxonomy.tree_async.assert_awaited_once()
+
+        self.crud._process_search_params({"topic.tag": "Lasers", "expandTopics": "true"})
+        self.taxonomy.tree.assert_not_called()
+
+    def test_tree_async_runs_in_thread(self):
+        """Test tree_async builds the tree through asyncio.to_thread"""
+        crud = TaxonomyCRUD()
+        with patch('app.crud.taxonomy.asyncio.to_thread', new_callable=AsyncMock) as mock_thread:
+            asyncio.run(crud.tree_async())
+        mock_thread.assert_awaited_once_with(crud.tree)
+
+    def test_invalid_flag(self):
+        """Test expandTopics must be a boolean and cannot be combined with logicalOp"""
+        with self.assertRaises(IllegalArgumentException):
+            self.crud._process_search_params({"topic.tag": "Lasers", "expandTopics": "maybe"})
+        with self.assertRaises(IllegalArgumentException):
+            self.crud._process_search_params({"topic.tag": "Lasers", "logicalOp": "OR", "expandTopics": "true"})
+
+if __name__ == '__main__':
+    unittest.main()
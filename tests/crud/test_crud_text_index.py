@@ -0,0 +1,97 @@
+# tests/crud/test_crud_text_index.py
+import unittest
+from unittest.mock import MagicMock
+from bson import ObjectId
+from app.crud.text_index import TextIndex, field_values, tokenize
+
+WEIGHTS = {"title": 10, "keyword": 5, "topic.tag": 3, "description": 1}
+
+def _record(title, description="", keyword=(), tags=()):
+    return {
+        "_id": ObjectId(),
+        "title": title,
+        "description": [description],
+        "keyword": list(keyword),
+        "topic": [{"tag": tag} for tag in tags],
+    }
+
+class TestTokenize(unittest.TestCase):
+    def test_tokenize(self):
+        """Test terms are lower-cased, stemmed and stop words dropped"""
+        self.assertEqual(tokenize("The Neutrons of Graphene-based Properties"),
+                         ["neutron", "graphene", "based", "property"])
+
+    def test_field_values_descends_into_arrays(self):
+        """Test dotted paths reach values inside arrays of objects"""
+        doc = {"topic": [{"tag": "Physics"}, {"tag": "Chemistry"}, {"scheme": "x"}], "keyword": ["a", 1]}
+        self.assertEqual(list(field_values(doc, "topic.tag")), ["Physics", "Chemistry"])
+        self.assertEqual(list(field_values(doc, "keyword")), ["a"])
+        self.assertEqual(list(field_values(doc, "missing.path")), [])
+
+class TestTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.docs = [
+            _record("Neutron scattering data", "Measurements of neutron scattering", ["neutron"]),
+            _record("Graphene properties", "A graphene study that mentions neutron once"),
+            _record("Fire research", "Fire dynamics", tags=["Fire"]),
+        ]
+        self.index = TextIndex(WEIGHTS)
+        self.index.build(self.docs)
+
+    def test_build(self):
+        """Test a build indexes every document and marks the index ready"""
+        self.assertTrue(self.index.ready)
+        self.assertEqual(self.index.document_count, 3)
+        self.assertEqual(self.index.last_id, self.docs[-1]["_id"])
+
+    def test_search_ranks_weighted_fields_first(self):
+        """Test a title and keyword match outranks a description match"""
+        ranked = self.index.search("neutrons")
+        self.assertEqual([doc_id for doc_id, _ in ranked], [self.docs[0]["_id"], self.docs[1]["_id"]])
+        self.assertGreater(ranked[0][1], ranked[1][1])
+
+    def test_search_matches_any_term_and_excludes(self):
+        """Test terms are ORed and a leading minus excludes documents"""
+        ids = {doc_id for doc_id, _ in self.index.search("graphene fire")}
+        self.assertEqual(ids, {self.docs[1]["_id"], self.docs[2]["_id"]})
+        ids = {doc_id for doc_id, _ in self.index.search("neutron -graphene")}
+        self.assertEqual(ids, {self.docs[0]["_id"]})
+        self.assertEqual(self.index.search("unknownterm"), [])
+
+    def test_search_limit(self):
+        """Test a limit keeps the top ranked documents"""
+        self.assertEqual(self.index.search("neutron", limit=1), self.index.search("neutron")[:1])
+
+    def test_add_replaces_document(self):
+        """Test re-adding a document reindexes it instead of duplicating it"""
+        doc = dict(self.docs[2], title="Neutron fire")
+        self.index.add(doc)
+        self.assertEqual(self.index.document_count, 3)
+        ids = [doc_id for doc_id, _ in self.index.search("neutron")]
+        self.assertEqual(ids.count(doc["_id"]), 1)
+        self.assertEqual(self.index.stats()["tombstones"], 1)
+
+    def test_remove_and_compact(self):
+        """Test removed documents stop matching and tombstones are compacted away"""
+        self.index.remove(self.docs[0]["_id"])
+        self.assertEqual([doc_id for doc_id, _ in self.index.search("neutron")], [self.docs[1]["_id"]])
+        # One tombstone out of three exceeds the compaction ratio
+        stats = self.index.stats()
+        self.assertEqual(stats["tombstones"], 0)
+        self.assertEqual(stats["documents"], 2)
+        self.assertEqual([doc_id for doc_id, _ in self.index.search("fire")], [self.docs[2]["_id"]])
+
+    def test_refresh_adds_new_documents(self):
+        """Test a refresh only asks for documents after the last indexed _id"""
+        new = _record("Neutron imaging")
+        collection = MagicMock()
+        collection.find.return_value.sort.return_value = iter([new])
+
+        self.assertEqual(self.index.refresh(collection), 1)
+
+        self.assertEqual(collection.find.call_args.args[0], {"_id": {"$gt": self.docs[-1]["_id"]}})
+        self.assertIn(new["_id"], [doc_id for doc_id, _ in self.index.search("imaging")])
+        self.assertEqual(self.index.last_id, new["_id"])
+
+if __name__ == '__main__':
+    unittest.main()
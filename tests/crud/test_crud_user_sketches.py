@@ -0,0 +1,66 @@
+# tests/crud/test_crud_user_sketches.py
+import unittest
+from unittest.mock import MagicMock
+from bson import ObjectId
+from app.crud.hll import HyperLogLog
+from app.crud.user_sketches import ALL_TIME, RECORD_SCOPE, UserSketchStore
+
+def _doc(users, version=1):
+    return {"_id": ObjectId(), "registers": HyperLogLog(10).update(users).to_bytes(), "version": version}
+
+class TestUserSketchStore(unittest.TestCase):
+    def setUp(self):
+        self.collection = MagicMock()
+        self.store = UserSketchStore(self.collection, precision=10)
+
+    def test_first_add_inserts(self):
+        """Test the month and all-time buckets are created on first use"""
+        self.collection.find_one.return_value = None
+
+        self.assertEqual(self.store.add(RECORD_SCOPE, "ark:/88434/mds1", "2025-01", ["a", "b"]), 2)
+        months = [call.args[0]["month"] for call in self.collection.insert_one.call_args_list]
+        self.assertEqual(months, ["2025-01", ALL_TIME])
+        self.collection.create_index.assert_called_once()
+
+    def test_merge_with_compare_and_set(self):
+        """Test a concurrent write is retried against the newer sketch"""
+        self.collection.find_one.side_effect = [_doc(["a"]), _doc(["a", "b"], version=2), _doc(["a"])]
+        self.collection.update_one.side_effect = [MagicMock(modified_count=0), MagicMock(modified_count=1),
+                                                  MagicMock(modified_count=1)]
+
+        self.assertEqual(self.store.add(RECORD_SCOPE, "ark:/88434/mds1", "2025-01", ["c"]), 2)
+        retried = self.collection.update_one.call_args_list[1]
+        self.assertEqual(retried.args[0]["version"], 2)
+        merged = HyperLogLog.from_bytes(retried.args[1]["$set"]["registers"])
+        self.assertEqual(merged.count(), 3)
+
+    def test_nothing_new_is_not_written(self):
+        """Test users already in the sketch cause no write"""
+        self.collection.find_one.return_value = _doc(["a", "b"])
+
+        self.store.add(RECORD_SCOPE, "ark:/88434/mds1", "2025-01", ["b"])
+        self.collection.update_one.assert_not_called()
+        self.assertIsNone(self.store.add(RECORD_SCOPE, "ark:/88434/mds1", "2025-01", []))
+
+    def test_range_is_union_of_months(self):
+        """Test a range of months merges the monthly sketches"""
+        self.collection.find.return_value = [_doc(["a", "b"]), _doc(["b", "c"])]
+
+        self.assertEqual(self.store.count(RECORD_SCOPE, "ark:/88434/mds1", ("2025-01", "2025-03")), 3)
+        selector = self.collection.find.call_args.args[0]
+        self.assertEqual(selector["month"]["$gte"], "2025-01")
+        self.collection.find.return_value = []
+        self.assertIsNone(self.store.count(RECORD_SCOPE, "unknown"))
+
+    def test_period_counts(self):
+        """Test months are merged into the periods they belong to"""
+        self.collection.find.return_value = [
+            {"month": "2024-12", "registers": _doc(["a"])["registers"]},
+            {"month": "2025-01", "registers": _doc(["a", "b"])["registers"]},
+            {"month": "2025-02", "registers": _doc(["c"])["registers"]},
+        ]
+        self.assertEqual(self.store.period_counts(RECORD_SCOPE, "k", ("2024-01", "2025-12"), 4),
+                         {"2024": 1, "2025": 3})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.middleware.metrics_middleware import MetricsMiddleware
+
+RECORD = {"@id": "ark:/88434/mds2-2154", "ediid": "ark:/88434/mds2-2154", "title": "Test"}
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=10)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/records/{record_id:path}")
+    async def get_record(request: Request, record_id: str):
+        if record_id == "missing":
+            return JSONResponse({"message": "not found"}, status_code=404)
+        if record_id == "streamed":
+            async def chunks():
+                yield b'{"ResultData":'
+                yield b'[]}'
+            return StreamingResponse(chunks(), media_type="application/json")
+        request.state.metrics_record = RECORD
+        return {"ResultCount": 1, "ResultData": [RECORD]}
+
+    @app.get("/records")
+    async def search_records(request: Request):
+        return {"ResultCount": 0, "ResultData": []}
+
+    return app
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(_app())
+
+    @patch('app.middleware.metrics_middleware.metrics_crud.record_download')
+    def test_record_lookup_queued(self, mock_record):
+        """Test a record lookup is queued with the record's ids and the body size"""
+        response = self.client.get("/records/mds2-2154")
+
+        self.assertEqual(response.json()["ResultData"], [RECORD])
+        mock_record.assert_called_once()
+        kwargs = mock_record.call_args.kwargs
+        self.assertEqual((kwargs["pdrid"], kwargs["ediid"]), (RECORD["@id"], RECORD["ediid"]))
+        self.assertEqual(kwargs["download_size"], int(response.headers["content-length"]))
+
+    @patch('app.middleware.metrics_middleware.metrics_crud.record_download')
+    def test_query_lookup_without_state(self, mock_record):
+        """Test an @id search falls back to the requested id"""
+        self.client.get("/records", params={"@id": "ark:/88434/mds007zd70"})
+
+        self.assertEqual(mock_record.call_args.kwargs["pdrid"], "ark:/88434/mds007zd70")
+
+    @patch('app.middleware.metrics_middleware.metrics_crud.record_download')
+    def test_failed_lookup_not_recorded(self, mock_record):
+        """Test lookups that do not return the record are not counted"""
+        self.client.get("/records/missing")
+        self.client.get("/records", params={"title": "x"})
+
+        mock_record.assert_not_called()
+
+    @patch('app.middleware.metrics_middleware.metrics_crud.record_download')
+    def test_size_is_bytes_sent(self, mock_record):
+        """Test the recorded size is the compressed body as sent"""
+        response = self.client.get("/records/mds2-2154", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(mock_record.call_args.kwargs["download_size"],
+                         int(response.headers["content-length"]))
+
+    @patch('app.middleware.metrics_middleware.metrics_crud.record_download')
+    def test_streamed_body_recorded_once(self, mock_record):
+        """Test a body sent in chunks is recorded once, after the last chunk"""
+        self.client.get("/records/streamed", headers={"Accept-Encoding": "identity"})
+
+        mock_record.assert_called_once()
+        self.assertEqual(mock_record.call_args.kwargs["download_size"], len(b'{"ResultData":[]}'))
+        self.assertEqual(mock_record.call_args.kwargs["pdrid"], "streamed")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+from app.middleware import precompressed
+from app.middleware.precompressed import PrecompressedPayload
+
+class TestPrecompressedPayload(unittest.TestCase):
+    def setUp(self):
+        self.content = [{"name": "title", "label": "Título"}] * 50
+        self.payload = PrecompressedPayload.from_json(self.content)
+
+    def test_variants(self):
+        """Test every variant decodes to the same JSON body"""
+        identity = self.payload.variants["identity"]
+        self.assertEqual(json.loads(identity), self.content)
+        self.assertEqual(gzip.decompress(self.payload.variants["gzip"]), identity)
+        self.assertLess(len(self.payload.variants["gzip"]), len(identity))
+        # Identical content always produces identical bytes and ETags
+        self.assertEqual(PrecompressedPayload.from_json(self.content).etags, self.payload.etags)
+
+    def test_choose(self):
+        """Test the encoding follows Accept-Encoding, preferring brotli when available"""
+        self.assertEqual(self.payload.choose(None), "identity")
+        self.assertEqual(self.payload.choose("gzip, deflate"), "gzip")
+        self.assertEqual(self.payload.choose("gzip;q=0, deflate"), "identity")
+        self.assertEqual(self.payload.choose("*"), "gzip")
+        self.payload.variants["br"] = b"br"
+        self.assertEqual(self.payload.choose("gzip, br"), "br")
+        self.assertEqual(self.payload.choose("br;q=0, gzip"), "gzip")
+
+    def test_without_brotli(self):
+        """Test only gzip and identity are built when brotli is not installed"""
+        with patch.object(precompressed, "brotli", None):
+            payload = PrecompressedPayload(b"{}")
+        self.assertEqual(set(payload.variants), {"identity", "gzip"})
+
+    def test_response_and_not_modified(self):
+        """Test responses carry the variant's ETag and matching If-None-Match gives a 304"""
+        response = self.payload.response({"accept-encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["etag"], self.payload.etags["gzip"])
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+
+        # Any variant's tag revalidates, weak or not
+        response = self.payload.response({"if-none-match": f'W/{self.payload.etags["gzip"]}'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], self.payload.etags["identity"])
+        self.assertEqual(self.payload.response({"if-none-match": '"other"'}).status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
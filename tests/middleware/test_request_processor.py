@@ -1,13 +1,16 @@
+import dataclasses
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
-from app.middleware.request_processor import ProcessRequest
+from bson.regex import Regex
+from app.middleware.request_processor import (
+    validate_input, process_search_params, compile_search_params, field_condition
+)
+from app.middleware.query_plan import QueryPlanCache
 from app.middleware.exceptions import IllegalArgumentException, InternalServerException
 
 
 class TestProcessRequest(unittest.TestCase):
-    def setUp(self):
-        self.processor = ProcessRequest()
-
     def test_validate_input_valid_params(self):
         """Test validation with valid parameters"""
         params = {
@@ -17,57 +20,59 @@ class TestProcessRequest(unittest.TestCase):
             "include": "title,description"
         }
         # Should not raise any exceptions
-        self.processor.validate_input(params)
+        validate_input(params)
 
     def test_validate_input_null_bytes(self):
         """Test validation rejects null bytes"""
         params = {"searchphrase": "test\x00malicious"}
         with self.assertRaises(IllegalArgumentException):
-            self.processor.validate_input(params)
+            validate_input(params)
 
     def test_validate_input_path_traversal(self):
         """Test validation rejects path traversal attempts"""
         params = {"include": "../../../etc/passwd"}
         with self.assertRaises(IllegalArgumentException):
-            self.processor.validate_input(params)
+            validate_input(params)
+
+    def test_validate_input_count_policy(self):
+        """Test validation accepts known count policies and rejects others"""
+        for policy in ("exact", "estimated", "none", "EXACT"):
+            validate_input({"count": policy})
+        with self.assertRaises(IllegalArgumentException):
+            validate_input({"count": "approximate"})
+
+    def test_count_is_not_a_query_field(self):
+        """Test the count policy is not turned into a query condition"""
+        result = process_search_params({"count": "none"})
+        self.assertEqual(result["query"], {})
 
     def test_topic_tag_single_value(self):
         """Test topic.tag handling with single value"""
-        self.processor._update_map("topic.tag", "Chemistry")
-        self.assertTrue(hasattr(self.processor, 'field_or_conditions'))
-        condition = self.processor.field_or_conditions[0]
+        condition = field_condition("topic.tag", "Chemistry")
         self.assertIn("topic.tag", condition)
 
     def test_topic_tag_multiple_values(self):
         """Test topic.tag handling with comma-separated values"""
-        self.processor._update_map("topic.tag", "Chemistry,Physics")
-        self.assertTrue(hasattr(self.processor, 'field_or_conditions'))
-        condition = self.processor.field_or_conditions[0]
-        self.assertIn("$or", condition)
+        condition = field_condition("topic.tag", "Chemistry,Physics")
+        self.assertEqual(condition, {"topic.tag": {"$in": [Regex("Chemistry", "i"), Regex("Physics", "i")]}})
 
     def test_components_type_handling(self):
         """Test components.@type field handling"""
-        self.processor._update_map("components.@type", "DataFile,AccessPage")
-        self.assertTrue(hasattr(self.processor, 'array_conditions'))
-        condition = self.processor.array_conditions[0]
-        self.assertIn("$or", condition)
+        condition = field_condition("components.@type", "DataFile,AccessPage")
+        self.assertEqual(condition, {"components": {"$elemMatch": {
+            "@type": {"$in": [Regex("DataFile", "i"), Regex("AccessPage", "i")]}}}})
 
     def test_direct_type_field(self):
         """Test direct @type field handling"""
-        self.processor._update_map("@type", "DataPublication,Dataset")
-        self.assertTrue(hasattr(self.processor, 'field_or_conditions'))
-        condition = self.processor.field_or_conditions[0]
-        self.assertIn("$or", condition)
+        condition = field_condition("@type", "DataPublication,Dataset")
+        self.assertEqual(condition, {"@type": {"$in": [Regex("DataPublication", "i"), Regex("Dataset", "i")]}})
 
     def test_contactpoint_fn_handling(self):
         """Test contactPoint.fn field handling"""
-        self.processor._update_map("contactPoint.fn", "John Doe,Jane Smith")
-        
-        # ContactPoint.fn goes into field_or_conditions, not array_conditions
-        # because contactPoint is NOT an array in your implementation
-        self.assertTrue(hasattr(self.processor, 'field_or_conditions'))
-        condition = self.processor.field_or_conditions[0]
-        self.assertIn("$or", condition)
+        condition = field_condition("contactPoint.fn", "John Doe,Jane Smith")
+
+        # contactPoint is a single object, not an array, so no $elemMatch
+        self.assertEqual(condition, {"contactPoint.fn": {"$in": [Regex("John\\ Doe", "i"), Regex("Jane\\ Smith", "i")]}})
 
     def test_build_query_with_text_search(self):
         """Test query building with text search"""
@@ -77,7 +82,7 @@ class TestProcessRequest(unittest.TestCase):
             "page": "1",
             "size": "10"
         }
-        result = self.processor.process_search_params(params)
+        result = process_search_params(params)
         
         self.assertIn("query", result)
         query = result["query"]
@@ -87,7 +92,7 @@ class TestProcessRequest(unittest.TestCase):
     def test_pagination_handling(self):
         """Test pagination parameter processing"""
         params = {"page": "2", "size": "20"}
-        result = self.processor.process_search_params(params)
+        result = process_search_params(params)
         
         self.assertEqual(result["skip"], 20)  # (page-1) * size
         self.assertEqual(result["limit"], 20)
@@ -98,7 +103,7 @@ class TestProcessRequest(unittest.TestCase):
             "include": "title,description,@type",
             "exclude": "_id"
         }
-        result = self.processor.process_search_params(params)
+        result = process_search_params(params)
         
         projection = result["projection"]
         self.assertEqual(projection["title"], 1)
@@ -107,5 +112,190 @@ class TestProcessRequest(unittest.TestCase):
         self.assertEqual(projection["_id"], 0)
 
 
+class TestQueryPlanCache(unittest.TestCase):
+    def test_cached_plan_matches_compiled(self):
+        """Test a cache hit gives the same result as compiling from scratch"""
+        params = {"searchphrase": "test", "topic.tag": "Chemistry,Physics", "page": "2", "size": "5", "sort.asc": "title"}
+        first = process_search_params(params)
+        second = process_search_params(dict(params))
+
+        for key in ("query", "projection", "sort", "skip", "limit"):
+            self.assertEqual(first[key], second[key])
+        self.assertEqual(compile_search_params(params).to_dict()["query"], first["query"])
+
+    def test_returned_projection_is_a_copy(self):
+        """Test callers can adjust the projection without touching the cached plan"""
+        params = {"include": "title"}
+        process_search_params(params)["projection"]["_id"] = 0
+        self.assertEqual(process_search_params(params)["projection"], {"title": 1})
+
+    def test_returned_query_is_a_copy(self):
+        """Test callers can adjust the query without touching the cached plan"""
+        params = {"keyword": "x,y", "title": "t"}
+        query = process_search_params(params)["query"]
+        query["$and"][0].clear()
+        query["$and"].append({"_id": 0})
+        self.assertEqual(process_search_params(params)["query"], compile_search_params(params).query)
+
+    def test_parameter_order_is_part_of_key(self):
+        """Test parameter order is significant since logicalOp depends on it"""
+        cache = QueryPlanCache(maxsize=10)
+        cache.get_or_compile({"a": "1", "b": "2"}, compile_search_params)
+        cache.get_or_compile({"b": "2", "a": "1"}, compile_search_params)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_bounded_size_and_stats(self):
+        """Test the cache evicts the least recently used plan beyond its size"""
+        cache = QueryPlanCache(maxsize=2)
+        for title in ("a", "b", "a", "c"):
+            cache.get_or_compile({"title": title}, compile_search_params)
+
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_errors_are_not_cached(self):
+        """Test invalid parameters keep raising and are never cached"""
+        cache = QueryPlanCache(maxsize=10)
+        for _ in range(2):
+            with self.assertRaises(IllegalArgumentException):
+                cache.get_or_compile({"logicalOp": "XOR"}, compile_search_params)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class TestNormalizedFilters(unittest.TestCase):
+    normalized = frozenset({"keyword", "doi", "@type"})
+
+    def test_exact_match_uses_shadow_field(self):
+        """Test exact-match filters on normalized fields become equality on the shadow field"""
+        plan = compile_search_params({"doi": "DOI:10.18434/M32095"}, self.normalized)
+        self.assertEqual(plan.query, {"_norm.doi": "doi:10.18434/m32095"})
+
+    def test_comma_list_uses_shadow_field(self):
+        """Test a comma-separated filter is a single $in on the shadow field"""
+        condition = field_condition("keyword", "Neutron, Graphene,neutron", self.normalized)
+        self.assertEqual(condition, {"_norm.keyword": {"$in": ["neutron", "graphene"]}})
+
+    def test_partial_matches_are_unchanged(self):
+        """Test @type, nested fields and other fields keep their regex conditions"""
+        self.assertIn("$regex", field_condition("@type", "DataPublication", self.normalized)["@type"])
+        self.assertIn("$regex", field_condition("title", "x", self.normalized)["title"])
+        self.assertIn("$elemMatch", field_condition("components.@type", "DataFile", self.normalized)["components"])
+
+    def test_blank_value_is_not_normalized(self):
+        """Test a value with nothing left after trimming is not matched against missing shadows"""
+        self.assertIn("$regex", field_condition("keyword", "  ", self.normalized)["keyword"])
+
+    def test_plans_are_cached_per_field_set(self):
+        """Test the same parameters compile separately with and without normalized fields"""
+        cache = QueryPlanCache(maxsize=10)
+        plain = cache.get_or_compile({"keyword": "a"}, compile_search_params, frozenset())
+        shadow = cache.get_or_compile({"keyword": "a"}, compile_search_params, self.normalized)
+        self.assertEqual(plain.query["keyword"]["$regex"], "^a$")
+        self.assertEqual(shadow.query, {"_norm.keyword": "a"})
+        self.assertEqual(cache.stats()["misses"], 2)
+
+
+class TestValueListPlans(unittest.TestCase):
+    def test_exact_list_without_shadow_is_single_in(self):
+        """Test an exact-match list on a plain field is one $in of anchored regexes"""
+        plan = compile_search_params({"keyword": "x,y,z"})
+        self.assertEqual(plan.query, {"keyword": {"$in": [Regex("^x$", "i"), Regex("^y$", "i"), Regex("^z$", "i")]}})
+
+    def test_exact_list_with_shadow_is_indexed_in(self):
+        """Test an exact-match list on a normalized field is one $in on the shadow field"""
+        plan = compile_search_params({"keyword": "X,y,Z"}, frozenset({"keyword"}))
+        self.assertEqual(plan.query, {"_norm.keyword": {"$in": ["x", "y", "z"]}})
+
+    def test_duplicate_values_collapse(self):
+        """Test a list that reduces to one value is a plain equality"""
+        plan = compile_search_params({"doi": "A,a, A"}, frozenset({"doi"}))
+        self.assertEqual(plan.query, {"_norm.doi": "a"})
+
+    def test_partial_match_lists_are_single_in(self):
+        """Test lists that need partial matching are one $in of unanchored regexes"""
+        self.assertEqual(compile_search_params({"@type": "a,b,c"}, frozenset({"@type"})).query,
+                         {"@type": {"$in": [Regex("a", "i"), Regex("b", "i"), Regex("c", "i")]}})
+        self.assertEqual(compile_search_params({"topic.tag": "a,b,a"}).query,
+                         {"topic.tag": {"$in": [Regex("a", "i"), Regex("b", "i")]}})
+        self.assertEqual(compile_search_params({"components.@type": "a,b"}).query,
+                         {"components": {"$elemMatch": {"@type": {"$in": [Regex("a", "i"), Regex("b", "i")]}}}})
+
+    def test_logical_op_lists_are_single_in(self):
+        """Test value lists in logicalOp and multi-field queries are one $in per field"""
+        plan = compile_search_params({"title": "a,b", "logicalOp": "OR", "keyword": "x"})
+        self.assertEqual(plan.query, {"$or": [
+            {"title": {"$in": [Regex("a", "i"), Regex("b", "i")]}},
+            {"keyword": {"$regex": "x", "$options": "i"}}]})
+        plan = compile_search_params({"@type": "a,b", "title": "t"})
+        self.assertEqual(plan.query, {"$and": [
+            {"@type": {"$in": [Regex("a", "i"), Regex("b", "i")]}},
+            {"title": {"$regex": "t", "$options": "i"}}]})
+
+    def test_list_length_is_capped(self):
+        """Test value lists longer than MAX_FILTER_VALUES are rejected"""
+        with patch('app.middleware.request_processor.settings.MAX_FILTER_VALUES', 3):
+            compile_search_params({"keyword": "a,b,c"})
+            for params in ({"keyword": "a,b,c,d"}, {"@type": "a,b,c,d"}, {"topic.tag": "a,b,c,d"},
+                           {"title": "a,b,c,d", "keyword": "x"}):
+                with self.assertRaises(IllegalArgumentException):
+                    compile_search_params(params)
+
+
+class TestRelevancePlans(unittest.TestCase):
+    def test_relevance_projects_and_sorts_by_score(self):
+        """Test relevance mode projects the text score and sorts on it first"""
+        plan = compile_search_params({"searchphrase": "neutron", "relevance": "true", "sort.desc": "annotated", "size": "20"})
+        self.assertEqual(plan.projection["_score"], {"$meta": "textScore"})
+        self.assertEqual(plan.sort, (("_score", {"$meta": "textScore"}), ("annotated", -1)))
+        self.assertEqual(plan.limit, 20)
+
+    def test_relevance_pushes_down_default_limit(self):
+        """Test an unpaged relevance search is capped so MongoDB can do a top-k sort"""
+        with patch('app.middleware.request_processor.settings.RELEVANCE_DEFAULT_LIMIT', 50):
+            plan = compile_search_params({"searchphrase": "neutron", "relevance": "yes"})
+        self.assertEqual(plan.limit, 50)
+        self.assertEqual(plan.skip, 0)
+
+    def test_relevance_off_keeps_plain_text_filter(self):
+        """Test searches without relevance are not ranked or capped"""
+        plan = compile_search_params({"searchphrase": "neutron", "relevance": "false"})
+        self.assertEqual(plan.projection, {})
+        self.assertIsNone(plan.sort)
+        self.assertIsNone(plan.limit)
+
+    def test_relevance_requires_searchphrase(self):
+        """Test relevance ranking is rejected without a text search or with a cursor"""
+        for params in ({"relevance": "true", "title": "x"},
+                       {"searchphrase": "x", "relevance": "true", "cursor": "*"},
+                       {"searchphrase": "x", "relevance": "maybe"}):
+            with self.assertRaises(IllegalArgumentException):
+                compile_search_params(params)
+
+
+class TestQueryPlan(unittest.TestCase):
+    def test_plan_is_frozen_and_slotted(self):
+        """Test compiled plans cannot be changed and carry no per-instance dict"""
+        plan = compile_search_params({"title": "test", "sort.desc": "annotated"})
+        self.assertFalse(hasattr(plan, "__dict__"))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            plan.skip = 10
+        self.assertEqual(plan.sort, (("annotated", -1),))
+
+    def test_concurrent_compilation(self):
+        """Test compiling from many threads gives the same plans as compiling serially"""
+        params_list = [
+            {"title": f"t{i}", "keyword": "a,b", "page": str(i % 5 + 1), "size": "10"} if i % 2
+            else {"components.@type": f"DataFile{i}", "include": "title"}
+            for i in range(200)
+        ]
+        expected = [compile_search_params(params) for params in params_list]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(compile_search_params, params_list))
+        self.assertEqual(results, expected)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,55 @@
+import json
+import unittest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.main import app
+
+
+def ndjson_body(docs):
+    """Async byte stream of ``docs`` as NDJSON, like ``BaseCRUD.export_async`` returns"""
+    async def body():
+        for doc in docs:
+            yield (json.dumps(doc) + "\n").encode("utf-8")
+    return body()
+
+
+class TestRouterExport(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.docs = [{"_id": "65f000000000000000000001", "ediid": "a"},
+                     {"_id": "65f000000000000000000002", "ediid": "b"}]
+
+    @patch('app.crud.record.record_crud.export_async')
+    def test_export_records_ndjson(self, mock_export):
+        """Test records are exported one JSON document per line"""
+        mock_export.return_value = ndjson_body(self.docs)
+
+        response = self.client.get("/export/records?include=ediid&topic.tag=Chemistry")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(lines, self.docs)
+        mock_export.assert_called_once_with(after=None, include="ediid", **{"topic.tag": "Chemistry"})
+
+    @patch('app.crud.code.code_crud.export_async')
+    def test_export_resume_and_gzip(self, mock_export):
+        """Test the checkpoint is passed through and the stream can be gzipped"""
+        mock_export.return_value = ndjson_body(self.docs[1:])
+
+        response = self.client.get("/export/code?after=65f000000000000000000001&gzip=true")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        # The test client transparently decompresses the body
+        self.assertEqual(json.loads(response.text.strip()), self.docs[1])
+        mock_export.assert_called_once_with(after="65f000000000000000000001")
+
+    def test_export_unknown_collection(self):
+        """Test exporting a collection that isn't exportable returns 404"""
+        response = self.client.get("/export/fields")
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 from app.main import app
+from app.middleware.precompressed import PrecompressedPayload
 
 class TestFieldRouter(unittest.TestCase):
     def setUp(self):
@@ -33,6 +34,21 @@ class TestFieldRouter(unittest.TestCase):
         # The field router might be configured differently
         self.assertIn(response.status_code, [200, 404, 500])
 
+    def test_records_fields_precompressed(self):
+        """Test /records/fields serves the prebuilt catalog with an ETag and revalidation"""
+        fields = [{"name": "title", "type": "string"}] * 100
+        payload = PrecompressedPayload.from_json(fields)
+        with patch('app.routers.field.field_crud.catalog_async', new=AsyncMock(return_value=payload)):
+            response = self.client.get("/records/fields", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["content-encoding"], "gzip")
+            self.assertEqual(response.json(), fields)
+            etag = response.headers["etag"]
+
+            response = self.client.get("/records/fields", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b"")
+
     def test_field_endpoint_exists(self):
         """Test that field endpoints exist"""
         # Just test that the endpoints don't return 404 for wrong route
@@ -1,24 +1,21 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock
 from fastapi.testclient import TestClient
-import requests
 from app.main import app
+from app.middleware.exceptions import InternalServerException
 from app.routers.paper import filter_fields
 
 class TestPaperRouter(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(app)
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_success(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_success(self, mock_search):
         """Test successful paper search"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = [
+        mock_search.return_value = [
             {"title": "Test Paper 1", "authors": ["Author 1"]},
             {"title": "Test Paper 2", "authors": ["Author 2"]}
         ]
-        mock_post.return_value = mock_response
         
         response = self.client.get("/papers/?searchphrase=chemistry")
         
@@ -26,56 +23,49 @@ class TestPaperRouter(unittest.TestCase):
         data = response.json()
         self.assertIn("ResultData", data)
         self.assertIn("Metrics", data)
+        mock_search.assert_awaited_once_with("chemistry", "2010-01-01")
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_with_filters(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_with_filters(self, mock_search):
         """Test paper search with include/exclude filters"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = [{"title": "Filtered Paper", "abstract": "Test"}]
-        mock_post.return_value = mock_response
+        mock_search.return_value = [{"title": "Filtered Paper", "abstract": "Test"}]
         
         response = self.client.get("/papers/?searchphrase=physics&include=title")
         
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ResultData"], [{"title": "Filtered Paper"}])
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_api_error(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_api_error(self, mock_search):
         """Test paper search when external API returns error"""
-        mock_post.side_effect = requests.RequestException("API unavailable")
+        mock_search.side_effect = InternalServerException("Failed to connect to Papers API")
         
         response = self.client.get("/papers/?searchphrase=test")
         
         self.assertEqual(response.status_code, 500)
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_timeout(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_timeout(self, mock_search):
         """Test paper search timeout handling"""
-        mock_post.side_effect = requests.Timeout("Request timeout")
+        mock_search.side_effect = InternalServerException("Failed to connect to Papers API: ReadTimeout")
         
         response = self.client.get("/papers/?searchphrase=test")
         
         self.assertEqual(response.status_code, 500)
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_http_error(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_http_error(self, mock_search):
         """Test paper search HTTP error handling"""
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_response.raise_for_status.side_effect = requests.HTTPError("Server error")
-        mock_post.return_value = mock_response
+        mock_search.side_effect = InternalServerException("Error from Papers API: 500")
         
         response = self.client.get("/papers/?searchphrase=test")
         
         self.assertEqual(response.status_code, 500)
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_no_results(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_no_results(self, mock_search):
         """Test paper search with no results"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = []
-        mock_post.return_value = mock_response
+        mock_search.return_value = []
         
         response = self.client.get("/papers/?searchphrase=nonexistent")
         
@@ -95,23 +85,21 @@ class TestPaperRouter(unittest.TestCase):
         response = self.client.get("/papers/?limit=0")
         self.assertEqual(response.status_code, 400)
 
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_with_pagination(self, mock_post):
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    def test_search_papers_with_pagination(self, mock_search):
         """Test paper search with pagination"""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = [{"title": f"Paper {i}"} for i in range(20)]
-        mock_post.return_value = mock_response
+        mock_search.return_value = [{"title": f"Paper {i}"} for i in range(20)]
         
         response = self.client.get("/papers/?searchphrase=test&skip=5&limit=10")
         
         self.assertEqual(response.status_code, 200)
         data = response.json()
         self.assertEqual(len(data["ResultData"]), 10)
+        self.assertEqual(data["ResultData"][0]["title"], "Paper 5")
+        self.assertEqual(data["ResultCount"], 20)
 
-    @patch('app.routers.paper.CERT_PATH')
-    @patch('app.routers.paper.requests.post')
-    def test_search_papers_cert_not_found(self, mock_post, mock_cert_path):
+    @patch('app.crud.paper.CERT_PATH')
+    def test_search_papers_cert_not_found(self, mock_cert_path):
         """Test certificate file not found"""
         mock_cert_path.exists.return_value = False
         
@@ -119,6 +107,49 @@ class TestPaperRouter(unittest.TestCase):
         
         self.assertEqual(response.status_code, 500)
 
+    @patch('app.routers.paper.settings.PAPERS_SOURCE', "mirror")
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    @patch('app.routers.paper.paper_mirror_crud.search_async', new_callable=AsyncMock)
+    def test_search_papers_from_mirror(self, mock_mirror, mock_search):
+        """Test mirror mode searches the local collection with the request's window"""
+        mock_mirror.return_value = {"ResultCount": 30, "ResultData": [{"title": "Paper 5"}], "PageSize": 1, "Metrics": {}}
+        
+        response = self.client.get("/papers/?searchphrase=laser&skip=5&limit=1&include=title")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ResultCount"], 30)
+        mock_mirror.assert_awaited_once_with(searchphrase="laser", from_date="2010-01-01", skip=5, limit=1, include="title")
+        mock_search.assert_not_awaited()
+
+    @patch('app.routers.paper.settings.PAPERS_SOURCE', "mirror")
+    @patch('app.routers.paper.paper_client.search', new_callable=AsyncMock)
+    @patch('app.routers.paper.paper_mirror_crud.search_async', new_callable=AsyncMock)
+    def test_search_papers_mirror_fallback(self, mock_mirror, mock_search):
+        """Test the live API answers for an unavailable mirror only when fallback is configured"""
+        mock_mirror.side_effect = InternalServerException("Error executing MongoDB query")
+        mock_search.return_value = [{"title": "Live Paper"}]
+        
+        with patch('app.routers.paper.settings.PAPERS_MIRROR_FALLBACK', False):
+            response = self.client.get("/papers/?searchphrase=laser")
+        self.assertEqual(response.status_code, 500)
+        mock_search.assert_not_awaited()
+        
+        with patch('app.routers.paper.settings.PAPERS_MIRROR_FALLBACK', True), \
+             patch('app.routers.paper.paper_mirror_crud.document_count', new=AsyncMock(return_value=10)):
+            response = self.client.get("/papers/?searchphrase=laser")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ResultData"], [{"title": "Live Paper"}])
+
+    @patch('app.routers.paper.settings.PAPERS_SOURCE', "mirror")
+    @patch('app.routers.paper.paper_mirror_crud.search_async', new_callable=AsyncMock)
+    def test_search_papers_mirror_no_results(self, mock_mirror):
+        """Test an empty page from the mirror is a 404 like on the live API"""
+        mock_mirror.return_value = {"ResultCount": 0, "ResultData": [], "PageSize": 10, "Metrics": {}}
+        
+        response = self.client.get("/papers/?searchphrase=nonexistent")
+        
+        self.assertEqual(response.status_code, 404)
+
     def test_filter_fields_include_only(self):
         """Test filter_fields function with include only"""
         doc = {"title": "Test", "abstract": "Content", "authors": ["A1"], "id": "123"}
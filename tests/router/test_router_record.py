@@ -1,14 +1,30 @@
+import json
 import unittest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 from app.main import app
+from app.crud.base import BaseCRUD
+from app.crud.record import record_crud
+from app.crud.response_cache import MemoryResponseCache
+from app.middleware.metrics_middleware import MetricsMiddleware
+from app.routers import record
 
 
 class TestRouterRecord(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(app)
 
-    @patch('app.crud.record.record_crud.search')
+    @staticmethod
+    def _streamed(*records):
+        """First record and body of a streamed search returning ``records``"""
+        async def body():
+            yield b'{"ResultData":['
+            yield json.dumps(list(records))[1:-1].encode("utf-8")
+            yield f'],"ResultCount": {len(records)}, "PageSize": 0, "Metrics": {{"ElapsedTime": 0.1}}}}'.encode("utf-8")
+        return (records[0] if records else None), body()
+
+    @patch('app.crud.record.record_crud.search_async')
     def test_search_records_basic(self, mock_search):
         """Test basic record search"""
         mock_search.return_value = {
@@ -25,7 +41,7 @@ class TestRouterRecord(unittest.TestCase):
         self.assertIn("ResultData", data)
         self.assertEqual(len(data["ResultData"]), 1)
 
-    @patch('app.crud.record.record_crud.search')
+    @patch('app.crud.record.record_crud.search_async')
     def test_search_records_with_filters(self, mock_search):
         """Test record search with advanced filters"""
         mock_search.return_value = {
@@ -43,7 +59,95 @@ class TestRouterRecord(unittest.TestCase):
         # Verify that the search was called with processed parameters
         mock_search.assert_called_once()
 
-    @patch('app.crud.record.record_crud.get')
+    @patch('app.crud.record.record_crud.search_async')
+    @patch('app.crud.record.record_crud.cached_search_async', new_callable=AsyncMock, return_value=None)
+    @patch('app.crud.record.record_crud.open_search_stream_async')
+    def test_search_records_streamed_on_request(self, mock_stream, mock_cached, mock_search):
+        """Test stream=true streams an uncached search as one result envelope"""
+        mock_stream.return_value = self._streamed({"ediid": "test-1", "title": "Test Dataset"})
+
+        response = self.client.get("/records/?searchphrase=test&stream=true")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        data = response.json()
+        self.assertEqual(data["ResultData"], [{"ediid": "test-1", "title": "Test Dataset"}])
+        self.assertEqual(data["ResultCount"], 1)
+        self.assertEqual(data["PageSize"], 0)
+        self.assertIn("Metrics", data)
+        mock_cached.assert_awaited_once()
+        mock_search.assert_not_called()
+
+    @patch('app.crud.record.record_crud.cached_search_async', new_callable=AsyncMock)
+    @patch('app.crud.record.record_crud.open_search_stream_async')
+    def test_search_records_stream_served_from_cache(self, mock_stream, mock_cached):
+        """Test stream=true returns a cached response instead of streaming"""
+        mock_cached.return_value = {"ResultData": [{"ediid": "test-1"}], "ResultCount": 1,
+                                    "PageSize": 0, "Metrics": {"ElapsedTime": 0.0}}
+
+        response = self.client.get("/records/?searchphrase=test&stream=true")
+
+        self.assertEqual(response.json()["ResultData"], [{"ediid": "test-1"}])
+        mock_stream.assert_not_called()
+
+    @patch('app.crud.record.record_crud.open_search_stream_async')
+    @patch('app.crud.record.record_crud.search_async')
+    def test_search_records_paged_not_streamed(self, mock_search, mock_stream):
+        """Test page or skip without a size use the buffered search and its count, even with stream=true"""
+        mock_search.return_value = {
+            "ResultData": [{"ediid": "test-11"}],
+            "ResultCount": 42,
+            "PageSize": 10,
+            "Metrics": {"ElapsedTime": 0.1}
+        }
+
+        for query in ("page=2", "skip=5"):
+            response = self.client.get(f"/records/?searchphrase=test&{query}&stream=true")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["ResultCount"], 42)
+        self.assertEqual(mock_search.call_count, 2)
+        mock_stream.assert_not_called()
+
+    def test_load_test_query_served_from_cache(self):
+        """Test the unpaginated load-test query is answered from the response cache the second time"""
+        mock_cursor = MagicMock()
+        mock_cursor.to_list = AsyncMock(return_value=[{"ediid": "test-1", "title": "Test Dataset"}])
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = mock_cursor
+        cache = MemoryResponseCache(ttl=60)
+        url = ("/records?=&include=ediid,description,title,keyword,topic.tag,contactPoint,components,"
+               "@type,doi,landingPage&exclude=_id")
+
+        with patch.object(BaseCRUD, 'async_collection', new_callable=PropertyMock, return_value=mock_collection), \
+                patch('app.crud.base.get_response_cache', return_value=cache), \
+                patch.object(record_crud, 'snapshot', None), patch.object(record_crud, 'text_index', None):
+            first = self.client.get(url)
+            second = self.client.get(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.json()["ResultData"], first.json()["ResultData"])
+        mock_collection.find.assert_called_once()
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @patch('app.middleware.metrics_middleware.metrics_crud.record_download')
+    @patch('app.crud.record.record_crud.open_search_stream_async')
+    def test_streamed_id_search_records_metrics(self, mock_stream, mock_record):
+        """Test a streamed @id search is counted with the ids of the record it returned"""
+        found = {"@id": "ark:/88434/mds2-2154", "ediid": "ark:/88434/mds2-2154", "title": "Test"}
+        mock_stream.return_value = self._streamed(found)
+        metrics_app = FastAPI()
+        metrics_app.add_middleware(MetricsMiddleware)
+        metrics_app.include_router(record.router)
+
+        with patch('app.crud.record.record_crud.cached_search_async', new_callable=AsyncMock, return_value=None):
+            response = TestClient(metrics_app).get("/records", params={"@id": "mds2-2154", "stream": "true"})
+
+        self.assertEqual(response.json()["ResultData"], [found])
+        mock_record.assert_called_once()
+        kwargs = mock_record.call_args.kwargs
+        self.assertEqual((kwargs["pdrid"], kwargs["ediid"]), (found["@id"], found["ediid"]))
+
+    @patch('app.crud.record.record_crud.get_async')
     def test_get_record_by_id(self, mock_get):
         """Test retrieving single record by ID"""
         mock_get.return_value = {
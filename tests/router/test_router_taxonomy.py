@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware.exceptions import ResourceNotFoundException
+
+class TestTaxonomyRouter(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    @patch('app.routers.taxonomy.taxonomy_crud')
+    def test_subtree(self, mock_crud):
+        """Test /taxonomy/subtree is routed ahead of /taxonomy/{taxonomy_id}"""
+        mock_crud.subtree.return_value = {"ResultCount": 1, "ResultData": [{"term": "Lasers"}], "Metrics": {}}
+        response = self.client.get("/taxonomy/subtree", params={"term": "Physics: Optical physics"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ResultCount"], 1)
+        mock_crud.subtree.assert_called_once_with("Physics: Optical physics")
+        mock_crud.get_async.assert_not_called()
+
+    @patch('app.routers.taxonomy.taxonomy_crud')
+    def test_ancestors_unknown_term(self, mock_crud):
+        """Test an unknown term is a 404"""
+        mock_crud.ancestors.side_effect = ResourceNotFoundException("Taxonomy term Astrology not found")
+        response = self.client.get("/taxonomy/ancestors", params={"term": "Astrology"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_term_required(self):
+        """Test the term parameter is required"""
+        response = self.client.get("/taxonomy/ancestors")
+        self.assertIn(response.status_code, [400, 422])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 from app.main import app
 from app.routers.usagemetrics import sanitize_response
+from app.middleware.exceptions import IllegalArgumentException
 
 class TestUsageMetricsRouter(unittest.TestCase):
     def setUp(self):
@@ -61,14 +62,29 @@ class TestUsageMetricsRouter(unittest.TestCase):
 
     @patch('app.routers.usagemetrics.metrics_crud')
     def test_get_files_metrics_list(self, mock_crud):
-        """Test get all files metrics with sorting"""
+        """Test all files metrics are streamed with sorting"""
+        mock_crud.stream_file_metrics.return_value = iter([b'{"FilesMetrics":[', b'],"FilesMetricsCount":0}'])
+        
+        response = self.client.get("/usagemetrics/files?sort_by=downloads&sort_order=desc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"FilesMetrics": [], "FilesMetricsCount": 0})
+        mock_crud.stream_file_metrics.assert_called_once_with(sort_by="downloads", sort_order=-1, record=None)
+
+    @patch('app.routers.usagemetrics.metrics_crud')
+    def test_get_files_metrics_page(self, mock_crud):
+        """Test size, cursor and record select one page of files"""
         mock_crud.get_file_metrics_list.return_value = {
             "FilesMetricsCount": 5,
-            "FilesMetrics": []
+            "PageSize": 2,
+            "FilesMetrics": [],
+            "NextCursor": None
         }
-        
-        response = self.client.get("/usagemetrics/files?sort_by=downloads&sort_order=desc")
+
+        response = self.client.get("/usagemetrics/files?size=2&cursor=*&record=mds2-2154&sort_by=users")
         self.assertEqual(response.status_code, 200)
+        mock_crud.get_file_metrics_list.assert_called_once_with(
+            sort_by="users", sort_order=-1, page=1, size=2, cursor="*", record="mds2-2154")
+        mock_crud.stream_file_metrics.assert_not_called()
 
     @patch('app.routers.usagemetrics.metrics_crud')
     def test_get_repo_metrics(self, mock_crud):
@@ -91,6 +107,29 @@ class TestUsageMetricsRouter(unittest.TestCase):
         response = self.client.get("/usagemetrics/totalusers")
         self.assertEqual(response.status_code, 200)
 
+    @patch('app.routers.usagemetrics.metrics_crud')
+    def test_time_range_served_from_rollups(self, mock_crud):
+        """Test from/to/granularity switch the repo and record endpoints to the rollups"""
+        mock_crud.get_repo_usage.return_value = {"UsageMetricsCount": 0, "UsageMetrics": []}
+        mock_crud.get_record_usage.return_value = {"UsageMetricsCount": 0, "UsageMetrics": []}
+
+        response = self.client.get("/usagemetrics/repo?from=2025-01&to=2025-06&granularity=month")
+        self.assertEqual(response.status_code, 200)
+        mock_crud.get_repo_usage.assert_called_once_with("2025-01", "2025-06", "month")
+        mock_crud.get_repo_metrics.assert_not_called()
+
+        response = self.client.get("/usagemetrics/records/ark:/88434/mds2-2154?granularity=day")
+        self.assertEqual(response.status_code, 200)
+        mock_crud.get_record_usage.assert_called_once_with("ark:/88434/mds2-2154", None, None, "day")
+
+    @patch('app.routers.usagemetrics.metrics_crud')
+    def test_invalid_time_range(self, mock_crud):
+        """Test an invalid range is a 400"""
+        mock_crud.get_repo_usage.side_effect = IllegalArgumentException("granularity must be one of day, month, year")
+
+        response = self.client.get("/usagemetrics/repo?granularity=hour")
+        self.assertEqual(response.status_code, 400)
+
     def test_sanitize_response(self):
         """Test response sanitization"""
         data = {
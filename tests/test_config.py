@@ -15,6 +15,8 @@ class TestConfigComprehensive(unittest.TestCase):
         self.assertEqual(settings.MONGO_PORT, 27017)
         self.assertEqual(settings.DB_NAME, "oar-rmm")
         self.assertEqual(settings.RECORDS_COLLECTION, "record")
+        # The in-memory evaluator only approximates MongoDB, so it is opt-in
+        self.assertFalse(settings.MEMORY_SNAPSHOTS_ENABLED)
 
     @patch.dict(os.environ, {
         'MONGO_URI': 'mongodb://test:27017',
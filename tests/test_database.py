@@ -1,8 +1,13 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 import warnings
 from pymongo.errors import DuplicateKeyError, OperationFailure
-from app.database import connect_db, connect_metrics_db, create_text_index, create_collection_indexes
+from pymongo import ASCENDING, DESCENDING
+from app.database import (
+    connect_db, connect_metrics_db, create_text_index, create_collection_indexes,
+    ensure_text_search_index, parse_text_weights, get_async_db, close_async_db
+)
 
 class TestDatabaseComprehensive(unittest.TestCase):
     
@@ -153,6 +158,10 @@ class TestDatabaseComprehensive(unittest.TestCase):
         result = create_collection_indexes()
         
         self.assertTrue(result)
+        # Every sortable /usagemetrics/files field has a (field, _id) index for keyset pages
+        keys = [c.args[0] for c in mock_collection.create_index.call_args_list]
+        self.assertIn([("filepath", ASCENDING), ("_id", ASCENDING)], keys)
+        self.assertIn([("success_get", DESCENDING), ("_id", DESCENDING)], keys)
 
     @patch('app.database.create_text_index')
     @patch('app.database.db')
@@ -184,6 +193,61 @@ class TestDatabaseComprehensive(unittest.TestCase):
         # Should still return some success even with errors
         self.assertIsInstance(result, bool)
 
+    def test_parse_text_weights(self):
+        """Test text index weights are read from field:weight pairs"""
+        self.assertEqual(parse_text_weights("title:10, topic.tag:3,description"),
+                         {"title": 10, "topic.tag": 3, "description": 1})
+        self.assertEqual(parse_text_weights(""), {})
+
+    def test_ensure_text_search_index_replaces_other_text_index(self):
+        """Test a wildcard text index is replaced, since a collection can only have one"""
+        mock_collection = MagicMock()
+        mock_collection.list_indexes.return_value = [
+            {"name": "_id_", "key": {"_id": 1}},
+            {"name": "$**_text", "key": {"_fts": "text", "_ftsx": 1}, "weights": {"$**": 1}},
+        ]
+
+        self.assertTrue(ensure_text_search_index(mock_collection, {"title": 10}))
+        mock_collection.drop_index.assert_called_once_with("$**_text")
+        mock_collection.create_index.assert_called_once()
+        self.assertEqual(mock_collection.create_index.call_args.kwargs["name"], "text_search_idx")
+        self.assertEqual(mock_collection.create_index.call_args.kwargs["weights"], {"title": 10})
+
+    def test_ensure_text_search_index_keeps_current_index(self):
+        """Test nothing is rebuilt when the index already has the configured weights"""
+        mock_collection = MagicMock()
+        mock_collection.list_indexes.return_value = [
+            {"name": "text_search_idx", "key": {"_fts": "text", "_ftsx": 1}, "weights": {"$**": 1, "title": 10}},
+        ]
+
+        self.assertFalse(ensure_text_search_index(mock_collection, {"title": 10}))
+        mock_collection.drop_index.assert_not_called()
+        mock_collection.create_index.assert_not_called()
+
+    @patch('app.database.AsyncMongoClient')
+    def test_async_client_replaced_on_new_loop_is_closed(self, mock_client_class):
+        """Test the async client of a previous event loop is closed when a new loop replaces it"""
+        first, second = MagicMock(), MagicMock()
+        first.close = AsyncMock()
+        second.close = AsyncMock()
+        mock_client_class.side_effect = [first, second]
+
+        async def use():
+            get_async_db()
+            get_async_db()
+            await asyncio.sleep(0)
+
+        with patch('app.database.async_client', None), patch('app.database.async_db', None), \
+                patch('app.database._async_loop', None):
+            asyncio.run(use())
+            first.close.assert_not_awaited()
+            asyncio.run(use())
+            asyncio.run(close_async_db())
+
+        self.assertEqual(mock_client_class.call_count, 2)
+        first.close.assert_awaited_once()
+        second.close.assert_awaited_once()
+
     @patch('app.database.logger')
     def test_database_functions_exist(self, mock_logger):
         """Test that database functions exist and are callable"""
@@ -9,7 +9,7 @@ class TestErrorHandling(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(app)
 
-    @patch('app.crud.record.record_crud.get')
+    @patch('app.crud.record.record_crud.get_async')
     def test_record_not_found(self, mock_get):
         """Test 404 response when record not found"""
         mock_get.side_effect = ResourceNotFoundException("Record not found")
@@ -20,12 +20,12 @@ class TestErrorHandling(unittest.TestCase):
         data = response.json()
         self.assertIn("message", data)
 
-    @patch('app.crud.record.record_crud.search')
+    @patch('app.crud.record.record_crud.search_async')
     def test_no_search_results(self, mock_search):
         """Test 404 response when no search results found"""
         mock_search.side_effect = KeyWordNotFoundException("No results found")
         
-        response = self.client.get("/records/?searchphrase=nonexistent")
+        response = self.client.get("/records/?searchphrase=nonexistent&size=10")
         
         self.assertEqual(response.status_code, 404)
 